@@ -0,0 +1,189 @@
+#  Copyright (c) 2021
+#
+#  This file, asrLoadTest.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+"""
+Talks to a running Alice from several devices at once. For every device, a hotword detection is
+published, and once Alice starts listening on that device, a recorded wav file is streamed as
+audio frames at real time pace, followed by silence. The latency is the time between the end
+of the speech and the captured text. The devices must be known to Alice, and their own audio
+servers stopped, so that they don't stream their microphone at the same time.
+
+Usage: python -m benchmarks.asrLoadTest --devices kitchen office --wav turnOnTheLights.wav
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+import wave
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import paho.mqtt.client as mqtt
+
+from core.commons import constants
+from core.server.model.AudioFrameFormat import AudioFrameFormat
+
+
+BLOCK_SAMPLES = 320  # 20ms at 16kHz
+SILENCE_SECONDS = 3
+
+
+@dataclass
+class SessionRun(object):
+	deviceUid: str
+	pcm: bytes
+	listening: threading.Event = field(default_factory=threading.Event)
+	captured: threading.Event = field(default_factory=threading.Event)
+	sessionId: str = ''
+	speechEndAt: float = 0
+	capturedAt: float = 0
+	text: str = ''
+	error: str = ''
+
+
+	@property
+	def latency(self) -> Optional[float]:
+		return self.capturedAt - self.speechEndAt if self.capturedAt and self.speechEndAt else None
+
+
+def readPcm(path: Path) -> bytes:
+	with wave.open(str(path), 'rb') as wav:
+		if wav.getframerate() != 16000 or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+			raise Exception(f'{path} must be 16kHz 16 bits mono')
+		return wav.readframes(wav.getnframes())
+
+
+class LoadTest(object):
+
+	def __init__(self, host: str, port: int, runs: List[SessionRun]):
+		self._runs: Dict[str, SessionRun] = {run.deviceUid: run for run in runs}
+		self._frameFormat = AudioFrameFormat()
+		self._client = mqtt.Client()
+		self._client.on_message = self.onMessage
+		self._client.connect(host, port)
+		self._client.subscribe([(constants.TOPIC_ASR_START_LISTENING, 0), (constants.TOPIC_TEXT_CAPTURED, 0), (constants.TOPIC_SESSION_ENDED, 0)])
+		self._client.loop_start()
+
+
+	def onMessage(self, _client, _userdata, message: mqtt.MQTTMessage):
+		payload = json.loads(message.payload)
+		if message.topic == constants.TOPIC_ASR_START_LISTENING:
+			run = self._runs.get(payload.get('siteId'))
+			if run and not run.listening.is_set():
+				run.sessionId = payload.get('sessionId')
+				run.listening.set()
+			return
+
+		run = next((run for run in self._runs.values() if run.sessionId and run.sessionId == payload.get('sessionId')), None)
+		if not run or run.captured.is_set():
+			return
+
+		if message.topic == constants.TOPIC_TEXT_CAPTURED:
+			run.text = payload.get('text', '')
+		else:
+			run.error = f'Session ended: {payload.get("termination", dict()).get("reason", "unknown")}'
+
+		run.capturedAt = time.perf_counter()
+		run.captured.set()
+
+
+	def stream(self, run: SessionRun, timeout: float):
+		self._client.publish(constants.TOPIC_HOTWORD_DETECTED, json.dumps({
+			'siteId'             : run.deviceUid,
+			'modelId'            : 'default',
+			'modelVersion'       : '',
+			'modelType'          : 'universal',
+			'currentSensitivity' : 0.5,
+			'detectionSignalMs'  : int(time.time() * 1000),
+			'endSignalMs'        : int(time.time() * 1000)
+		}))
+
+		if not run.listening.wait(timeout):
+			run.error = 'Alice never started listening'
+			return
+
+		topic = constants.TOPIC_AUDIO_FRAME.format(run.deviceUid)
+		blockSize = BLOCK_SAMPLES * 2
+		silence = bytes(blockSize)
+		blocks = [run.pcm[i:i + blockSize] for i in range(0, len(run.pcm), blockSize)]
+		lastSpeechBlock = len(blocks) - 1
+		blocks += [silence] * int(SILENCE_SECONDS * 1000 / 20)
+
+		start = time.perf_counter()
+		for i, block in enumerate(blocks):
+			if run.captured.is_set():
+				break
+
+			if len(block) < blockSize:
+				block += bytes(blockSize - len(block))
+
+			self._client.publish(topic, bytes(self._frameFormat.buildFrame(block)))
+			if i == lastSpeechBlock:
+				run.speechEndAt = time.perf_counter()
+
+			# Real time pace, without drifting
+			delay = start + (i + 1) * 0.02 - time.perf_counter()
+			if delay > 0:
+				time.sleep(delay)
+
+		if not run.captured.wait(timeout):
+			run.error = 'Nothing captured'
+
+
+	def run(self, timeout: float):
+		threads = [threading.Thread(target=self.stream, args=[run, timeout]) for run in self._runs.values()]
+		for thread in threads:
+			thread.start()
+
+		for thread in threads:
+			thread.join()
+
+		self._client.loop_stop()
+		self._client.disconnect()
+
+
+def report(runs: List[SessionRun]):
+	print(f'{"device":>16} {"latency ms":>11}  text')
+	for run in runs:
+		latency = f'{run.latency * 1000:>11.0f}' if run.latency is not None else f'{"-":>11}'
+		print(f'{run.deviceUid:>16} {latency}  {run.text or run.error}')
+
+	latencies = sorted(run.latency for run in runs if run.latency is not None and not run.error)
+	if latencies:
+		print(f'{len(latencies)}/{len(runs)} sessions captured, latency median {statistics.median(latencies) * 1000:.0f}ms, max {latencies[-1] * 1000:.0f}ms')
+	else:
+		print(f'0/{len(runs)} sessions captured')
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Concurrent Asr sessions load test')
+	parser.add_argument('--host', default='localhost')
+	parser.add_argument('--port', type=int, default=1883)
+	parser.add_argument('--devices', nargs='+', required=True, help='Uids of devices known to Alice')
+	parser.add_argument('--wav', nargs='+', type=Path, required=True, help='16kHz 16 bits mono recordings, used in turn by the devices')
+	parser.add_argument('--timeout', type=float, default=20)
+	args = parser.parse_args()
+
+	recordings = [readPcm(path) for path in args.wav]
+	sessionRuns = [SessionRun(deviceUid=deviceUid, pcm=recordings[i % len(recordings)]) for i, deviceUid in enumerate(args.devices)]
+	LoadTest(host=args.host, port=args.port, runs=sessionRuns).run(timeout=args.timeout)
+	report(sessionRuns)
@@ -0,0 +1,131 @@
+#  Copyright (c) 2021
+#
+#  This file, asrRecognizerPool.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+"""
+Decodes recorded commands with Vosk the way VoskAsr does, and reports the time to the first partial
+and the time to the final result, counted from the start of the session, for:
+- fresh: a recognizer is built for every session, as VoskAsr used to
+- pooled: the recognizer is taken from a warm pool and reset after the session
+- grammar: a pooled recognizer restricted to the given sentences, as for sessions expecting a few intents
+
+Audio is fed at real time pace by default, as satellites stream it, use --fast to feed it as fast as possible.
+
+Usage: python -m benchmarks.asrRecognizerPool --lang en-us --wav turnOnTheLights.wav --phrases "turn on the lights" "turn off the lights"
+"""
+
+import argparse
+import json
+import statistics
+import time
+import wave
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import vosk
+
+from core.asr.model.RecognizerPool import RecognizerPool
+
+
+SAMPLERATE = 16000
+CHUNK = 1024 * 2  # What the Recorder yields, 1024 samples
+
+
+@dataclass
+class Timings(object):
+	firstPartial: List[float] = field(default_factory=list)
+	final: List[float] = field(default_factory=list)
+	texts: List[str] = field(default_factory=list)
+
+
+def readPcm(path: Path) -> bytes:
+	with wave.open(str(path), 'rb') as wav:
+		if wav.getframerate() != SAMPLERATE or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+			raise Exception(f'{path} must be 16kHz 16 bits mono')
+		return wav.readframes(wav.getnframes())
+
+
+def decode(acquire: Callable, release: Callable, pcm: bytes, realTime: bool, timings: Timings):
+	start = time.perf_counter()
+	firstPartial: Optional[float] = None
+
+	recognizer = acquire()
+	for i in range(0, len(pcm), CHUNK):
+		if realTime:
+			delay = start + (i + CHUNK) / 2 / SAMPLERATE - time.perf_counter()
+			if delay > 0:
+				time.sleep(delay)
+
+		if recognizer.AcceptWaveform(pcm[i:i + CHUNK]):
+			break
+
+		if firstPartial is None and json.loads(recognizer.PartialResult())['partial']:
+			firstPartial = time.perf_counter() - start
+
+	text = json.loads(recognizer.FinalResult())['text']
+	timings.final.append(time.perf_counter() - start)
+	release(recognizer)
+
+	if firstPartial is not None:
+		timings.firstPartial.append(firstPartial)
+	timings.texts.append(' '.join(word for word in text.split() if word != '[unk]'))
+
+
+def summary(values: List[float]) -> str:
+	if not values:
+		return f'{"-":>8} {"-":>8}'
+	return f'{statistics.median(values) * 1000:>8.0f} {max(values) * 1000:>8.0f}'
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Vosk recognizer pool benchmark')
+	parser.add_argument('--lang', default='en-us', help='Vosk model language, downloaded if needed')
+	parser.add_argument('--model', type=Path, help='Path to a Vosk model, instead of --lang')
+	parser.add_argument('--wav', nargs='+', type=Path, required=True, help='16kHz 16 bits mono recordings of short commands')
+	parser.add_argument('--phrases', nargs='*', default=list(), help='Sentences of the grammar restricted recognizer')
+	parser.add_argument('--runs', type=int, default=10, help='Sessions per recording and mode')
+	parser.add_argument('--fast', action='store_true', help='Feed the audio as fast as possible instead of real time')
+	args = parser.parse_args()
+
+	vosk.SetLogLevel(-1)
+	model = vosk.Model(str(args.model)) if args.model else vosk.Model(lang=args.lang)
+	recordings = [readPcm(path) for path in args.wav]
+
+	pool = RecognizerPool(factory=lambda: vosk.KaldiRecognizer(model, SAMPLERATE), size=1, reset=lambda recognizer: recognizer.Reset())
+	pool.warm()
+	modes = {
+		'fresh' : (lambda: vosk.KaldiRecognizer(model, SAMPLERATE), lambda recognizer: None),
+		'pooled': (pool.acquire, pool.release)
+	}
+
+	if args.phrases:
+		grammar = json.dumps([phrase.lower() for phrase in args.phrases] + ['[unk]'])
+		grammarPool = RecognizerPool(factory=lambda: vosk.KaldiRecognizer(model, SAMPLERATE, grammar), size=1, reset=lambda recognizer: recognizer.Reset())
+		grammarPool.warm()
+		modes['grammar'] = (grammarPool.acquire, grammarPool.release)
+
+	print(f'{"mode":>8} {"first partial ms":>17} {"final ms":>17}  text')
+	print(f'{"":>8} {"median":>8} {"max":>8} {"median":>8} {"max":>8}')
+	for mode, (acquireRecognizer, releaseRecognizer) in modes.items():
+		modeTimings = Timings()
+		for _ in range(args.runs):
+			for recording in recordings:
+				decode(acquireRecognizer, releaseRecognizer, recording, not args.fast, modeTimings)
+
+		print(f'{mode:>8} {summary(modeTimings.firstPartial)} {summary(modeTimings.final)}  {" | ".join(sorted(set(modeTimings.texts)))}')
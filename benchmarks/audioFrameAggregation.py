@@ -0,0 +1,188 @@
+#  Copyright (c) 2021
+#
+#  This file, audioFrameAggregation.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+"""
+Streams real time audio blocks from simulated satellites through an mqtt broker, for several
+frame aggregation sizes, and reports the broker cpu usage and the delay between the capture of
+a block and its delivery to the consumers, which is what delays the wakeword detection.
+
+Needs a running broker. Broker cpu is only reported when its process can be found, by pid or name.
+
+Usage: python -m benchmarks.audioFrameAggregation --host localhost --devices 4 --aggregation 1 3 5 --seconds 10
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from typing import Dict, List, Optional
+
+import paho.mqtt.client as mqtt
+import psutil
+
+from core.commons import constants
+from core.server.model.AudioFrameBus import AudioFrameBus
+from core.server.model.AudioFrameFormat import AudioFrameFormat
+
+
+BLOCK_DURATION = 0.02
+BLOCK = bytes(640)
+
+
+def findBroker(pid: Optional[int], name: str) -> Optional[psutil.Process]:
+	if pid:
+		return psutil.Process(pid)
+
+	for process in psutil.process_iter(['name']):
+		if process.info['name'] == name:
+			return process
+
+	return None
+
+
+def cpuTime(process: Optional[psutil.Process]) -> float:
+	if not process:
+		return 0
+	times = process.cpu_times()
+	return times.user + times.system
+
+
+class Consumer(object):
+
+	def __init__(self):
+		self.bus = AudioFrameBus()
+		self.latencies: List[float] = list()
+		# Capture time of the first block of every frame, in publishing order, per device
+		self.captures: Dict[str, List[float]] = dict()
+		self.received: Dict[str, int] = dict()
+		self.bus.subscribe(name='benchmark', callback=self.onAudioFrame)
+
+
+	def onAudioFrame(self, payload: memoryview, deviceUid: str):
+		now = time.time()
+		index = self.received.get(deviceUid, 0)
+		self.received[deviceUid] = index + 1
+		timestamp = self.captures[deviceUid][index]
+
+		# A block is available once fully captured, every block of the frame waited for the last one
+		blocks = len(self.bus.pcm(payload, deviceUid)) // len(BLOCK)
+		self.latencies.extend(now - (timestamp + (block + 1) * BLOCK_DURATION) for block in range(blocks))
+
+
+	def onMessage(self, _client, _userdata, message: mqtt.MQTTMessage):
+		self.bus.dispatch(deviceUid=self.bus.deviceUidFromTopic(message.topic), payload=message.payload)
+
+
+def satellite(client: mqtt.Client, deviceUid: str, frameFormat: AudioFrameFormat, seconds: float, consumer: Consumer):
+	topic = constants.TOPIC_AUDIO_FRAME.format(deviceUid)
+	captures = consumer.captures.setdefault(deviceUid, list())
+	blocks = list()
+	timestamp = 0.0
+	sequence = 0
+	start = time.time()
+	tick = start
+
+	while tick - start < seconds:
+		tick += BLOCK_DURATION
+		time.sleep(max(0.0, tick - time.time()))
+
+		if not blocks:
+			timestamp = time.time() - BLOCK_DURATION
+		blocks.append(BLOCK)
+
+		if len(blocks) == frameFormat.aggregation:
+			captures.append(timestamp)
+			client.publish(topic, frameFormat.buildFrame(b''.join(blocks), sequence=sequence, timestamp=timestamp))
+			sequence += 1
+			blocks = list()
+
+
+def run(host: str, port: int, deviceCount: int, aggregations: List[int], seconds: float, broker: Optional[psutil.Process]):
+	print(f'{"blocks":>7} {"ms/frame":>9} {"msg/s":>8} {"broker cpu %":>13} {"client cpu %":>13} {"latency ms":>11} {"p95 ms":>8} {"max ms":>8} {"lost":>6}')
+
+	for aggregation in aggregations:
+		consumer = Consumer()
+		frameFormat = AudioFrameFormat(format=AudioFrameFormat.PCM, aggregation=aggregation)
+
+		subscriber = mqtt.Client()
+		subscriber.on_message = consumer.onMessage
+		subscriber.connect(host, port)
+		subscriber.subscribe(constants.TOPIC_AUDIO_FRAME.format('+'))
+		subscriber.loop_start()
+
+		publishers = list()
+		for index in range(deviceCount):
+			deviceUid = f'benchmark{index}'
+			consumer.bus.setFrameFormat(deviceUid=deviceUid, frameFormat=frameFormat)
+			publisher = mqtt.Client()
+			publisher.connect(host, port)
+			publisher.loop_start()
+			publishers.append((deviceUid, publisher))
+
+		time.sleep(0.5)
+		brokerStart = cpuTime(broker)
+		clientStart = time.process_time()
+		wallStart = time.time()
+
+		threads = [threading.Thread(target=satellite, args=[publisher, deviceUid, frameFormat, seconds, consumer]) for deviceUid, publisher in publishers]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+
+		time.sleep(0.5)
+		wall = time.time() - wallStart
+		brokerCpu = (cpuTime(broker) - brokerStart) / wall * 100
+		clientCpu = (time.process_time() - clientStart) / wall * 100
+
+		for _deviceUid, publisher in publishers:
+			publisher.loop_stop()
+			publisher.disconnect()
+		subscriber.loop_stop()
+		subscriber.disconnect()
+
+		messages = sum(len(captures) for captures in consumer.captures.values())
+		latencies = sorted(consumer.latencies) or [0]
+		lost = sum(consumer.bus.droppedFrames(deviceUid) for deviceUid, _publisher in publishers)
+		print(
+			f'{aggregation:>7} {aggregation * BLOCK_DURATION * 1000:>9.0f} {messages / seconds:>8.0f} '
+			f'{brokerCpu if broker else float("nan"):>13.1f} {clientCpu:>13.1f} {statistics.mean(latencies) * 1000:>11.1f} '
+			f'{latencies[int(len(latencies) * 0.95)] * 1000:>8.1f} {latencies[-1] * 1000:>8.1f} {lost:>6}'
+		)
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Audio frame aggregation benchmark')
+	parser.add_argument('--host', default='localhost')
+	parser.add_argument('--port', type=int, default=1883)
+	parser.add_argument('--devices', type=int, default=4)
+	parser.add_argument('--aggregation', type=int, nargs='+', default=[1, 3, 4, 5])
+	parser.add_argument('--seconds', type=float, default=10)
+	parser.add_argument('--brokerPid', type=int, default=None)
+	parser.add_argument('--brokerName', default='mosquitto')
+	args = parser.parse_args()
+
+	run(
+		host=args.host,
+		port=args.port,
+		deviceCount=args.devices,
+		aggregations=args.aggregation,
+		seconds=args.seconds,
+		broker=findBroker(args.brokerPid, args.brokerName)
+	)
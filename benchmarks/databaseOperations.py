@@ -0,0 +1,104 @@
+#  Copyright (c) 2021
+#
+#  This file, databaseOperations.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+"""
+Runs the DatabaseManager public methods against a scratch database, once opening a connection
+per call like it used to and once with the pooled per thread connections.
+
+Usage: python -m benchmarks.databaseOperations --operations 2000
+"""
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable
+
+from core.commons.CommonsManager import CommonsManager
+from core.util.DatabaseManager import DatabaseManager
+
+
+SCHEMA = {
+	'telemetry': [
+		'id INTEGER PRIMARY KEY',
+		'service TEXT NOT NULL',
+		'value TEXT NOT NULL',
+		'timestamp INTEGER NOT NULL'
+	]
+}
+
+
+class BenchmarkDatabaseManager(DatabaseManager):
+	Commons = SimpleNamespace(getFunctionCaller=lambda **_kwargs: 'Benchmark', dictFromRow=CommonsManager.dictFromRow)
+	ConfigManager = SimpleNamespace(getAliceConfigByName=lambda _name: False)
+
+
+	def __init__(self, databaseFile: str):
+		super().__init__()
+		self._databaseFile = databaseFile
+
+
+class LegacyDatabaseManager(BenchmarkDatabaseManager):
+
+	def getConnection(self) -> sqlite3.Connection:
+		con = sqlite3.connect(self._databaseFile, timeout=10)
+		con.row_factory = sqlite3.Row
+		return con
+
+
+	def releaseConnection(self, database: sqlite3.Connection):
+		database.close()
+
+
+def measure(operations: int, func: Callable[[int], None]) -> float:
+	start = time.perf_counter()
+	for i in range(operations):
+		func(i)
+	return operations / (time.perf_counter() - start)
+
+
+def run(operations: int):
+	print(f'{"operation":>10} {"legacy ops/s":>13} {"pooled ops/s":>13} {"speedup":>8}')
+
+	with tempfile.TemporaryDirectory() as directory:
+		results = dict()
+		for label, manager in [('legacy', LegacyDatabaseManager(str(Path(directory, 'legacy.db')))), ('pooled', BenchmarkDatabaseManager(str(Path(directory, 'pooled.db'))))]:
+			manager.initDB(schema=SCHEMA, callerName='Benchmark')
+			results[label] = {
+				'insert': measure(operations, lambda i: manager.insert(tableName='telemetry', callerName='Benchmark', values={'service': 'bench', 'value': str(i), 'timestamp': i})),
+				'update': measure(operations, lambda i: manager.update(tableName='telemetry', callerName='Benchmark', values={'value': 'updated'}, row=('id', i + 1))),
+				'fetch' : measure(operations, lambda i: manager.fetch(tableName='telemetry', callerName='Benchmark', query='SELECT * FROM :__table__ WHERE id = :id', values={'id': i + 1})),
+				'delete': measure(operations, lambda i: manager.delete(tableName='telemetry', callerName='Benchmark', query='DELETE FROM :__table__ WHERE id = :id', values={'id': i + 1}))
+			}
+			manager.closeConnections()
+
+		for operation in results['legacy']:
+			legacy = results['legacy'][operation]
+			pooled = results['pooled'][operation]
+			print(f'{operation:>10} {legacy:>13.0f} {pooled:>13.0f} {pooled / legacy:>7.1f}x')
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='DatabaseManager operations benchmark')
+	parser.add_argument('--operations', type=int, default=2000)
+	args = parser.parse_args()
+
+	run(operations=args.operations)
@@ -0,0 +1,161 @@
+#  Copyright (c) 2021
+#
+#  This file, deviceLookups.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+"""
+Runs the DeviceManager lookups against growing device counts, once scanning every device like
+it used to and once through the maintained indexes. The heartbeat check looks every device
+with a heartbeat up by uid, like checkHeartbeats does every two seconds.
+
+Usage: python -m benchmarks.deviceLookups --devices 10 100 1000
+"""
+
+import argparse
+import time
+from types import SimpleNamespace
+from typing import Callable, List, Optional
+from unittest import mock
+
+from core.device.DeviceManager import DeviceManager
+from core.device.model.DeviceAbility import DeviceAbility
+
+
+LOCATIONS = 10
+SKILLS = ['ZigbeeDevices', 'Tasmota', 'AliceSatellite', 'Sonos']
+
+
+class BenchmarkDevice(object):
+
+	def __init__(self, deviceId: int, deviceType: object, skillName: str, abilities: int):
+		self.id = deviceId
+		self.uid = f'device-{deviceId}'
+		self.parentLocation = deviceId % LOCATIONS + 1
+		self.skillName = skillName
+		self.deviceType = deviceType
+		self.abilities = abilities
+		self.connected = True
+
+
+	def getAbilities(self) -> int:
+		return self.abilities
+
+
+	def hasAbilities(self, abilities: List[DeviceAbility]) -> bool:
+		check = 0
+		for ability in abilities:
+			check |= ability
+		return self.abilities & check == check
+
+
+class BenchmarkDeviceManager(DeviceManager):
+	Commons = SimpleNamespace(getFunctionCaller=lambda **_kwargs: 'Benchmark')
+	ConfigManager = SimpleNamespace(getAliceConfigByName=lambda _name: 0)
+
+
+	def __init__(self):
+		with mock.patch('socket.socket'):
+			super().__init__()
+		self.loadingDone = True
+
+
+	def logInfo(self, *args, **kwargs):
+		pass
+
+
+class LegacyDeviceManager(BenchmarkDeviceManager):
+
+	def getDevice(self, deviceId: int = None, uid: str = None) -> Optional[BenchmarkDevice]:
+		if deviceId:
+			return self._devices.get(deviceId, None)
+
+		ret = None
+		for device in self._devices.values():
+			if device.uid == uid:
+				ret = device
+		return ret
+
+
+	def getMainDevice(self) -> Optional[BenchmarkDevice]:
+		try:
+			return self._filterDevices(abilities=[DeviceAbility.IS_CORE], connectedOnly=False)[0]
+		except:
+			return None
+
+
+	def _filterDevices(self, locationId: int = None, skillName: str = None, deviceType: object = None, abilities: List[DeviceAbility] = None, connectedOnly: bool = True) -> List[BenchmarkDevice]:
+		ret = list()
+		for device in self._devices.values():
+			if (locationId and device.parentLocation != locationId) \
+					or (skillName and device.skillName != skillName) \
+					or (deviceType and device.deviceType != deviceType) \
+					or (connectedOnly and not device.connected) \
+					or (abilities and not device.hasAbilities(abilities)):
+				continue
+
+			ret.append(device)
+
+		return ret
+
+
+def populate(manager: DeviceManager, count: int, deviceTypes: List[object]):
+	manager._addDevice(BenchmarkDevice(1, deviceTypes[0], 'AliceCore', DeviceAbility.IS_CORE | DeviceAbility.PLAY_SOUND | DeviceAbility.CAPTURE_SOUND))
+	for deviceId in range(2, count + 1):
+		abilities = DeviceAbility.IS_SATELITTE | DeviceAbility.PLAY_SOUND if deviceId % 10 == 0 else DeviceAbility.NONE
+		manager._addDevice(BenchmarkDevice(deviceId, deviceTypes[deviceId % len(deviceTypes)], SKILLS[deviceId % len(SKILLS)], abilities))
+
+
+def measure(seconds: float, func: Callable[[], None]) -> float:
+	calls = 0
+	start = time.perf_counter()
+	while time.perf_counter() - start < seconds:
+		func()
+		calls += 1
+	return (time.perf_counter() - start) / calls * 1_000_000
+
+
+def run(counts: List[int], seconds: float):
+	print(f'{"devices":>8} {"operation":>14} {"legacy µs":>11} {"indexed µs":>11} {"speedup":>8}')
+
+	deviceTypes = [object() for _ in range(8)]
+	for count in counts:
+		results = dict()
+		for label, manager in [('legacy', LegacyDeviceManager()), ('indexed', BenchmarkDeviceManager())]:
+			populate(manager, count, deviceTypes)
+			uids = [f'device-{deviceId}' for deviceId in range(1, count + 1)]
+			results[label] = {
+				'mainDevice': measure(seconds, manager.getMainDevice),
+				'byUid'     : measure(seconds, lambda: manager.getDevice(uid=uids[-1])),
+				'byLocation': measure(seconds, lambda: manager.getDevicesByLocation(3, connectedOnly=False)),
+				'byType'    : measure(seconds, lambda: manager.getDevicesByType(deviceTypes[5])),
+				'abilities' : measure(seconds, lambda: manager.getDevicesWithAbilities([DeviceAbility.IS_SATELITTE])),
+				'heartbeats': measure(seconds, lambda: [manager.getDevice(uid=uid) for uid in uids])
+			}
+
+		for operation in results['legacy']:
+			legacy = results['legacy'][operation]
+			indexed = results['indexed'][operation]
+			print(f'{count:>8} {operation:>14} {legacy:>11.2f} {indexed:>11.2f} {legacy / indexed:>7.1f}x')
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='DeviceManager lookups benchmark')
+	parser.add_argument('--devices', type=int, nargs='+', default=[10, 100, 1000])
+	parser.add_argument('--seconds', type=float, default=0.5)
+	args = parser.parse_args()
+
+	run(counts=args.devices, seconds=args.seconds)
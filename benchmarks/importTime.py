@@ -0,0 +1,122 @@
+#  Copyright (c) 2021
+#
+#  This file, importTime.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+"""
+Measures, with python -X importtime in a fresh interpreter, what importing every manager module takes,
+that is what SuperManager.initManagers imports before the managers can be created. Lists the slowest
+packages and checks that the packages only some features need are not imported on boot.
+
+Usage: python -m benchmarks.importTime --budget 4000 --top 15
+"""
+
+import argparse
+import inspect
+import re
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+from core.base.SuperManager import SuperManager
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Loaded on first use only, see core.util.model.LazyModule
+DEFERRED = ['googletrans', 'langdetect', 'sounddevice', 'pydub', 'flask_cors', 'bcrypt', 'jwt']
+
+IMPORT_LINE = re.compile(r'^import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \|(?P<indent>\s*)(?P<name>\S+)')
+
+
+@dataclass
+class ImportTime(object):
+	name: str
+	selfTime: float  # Milliseconds
+	cumulative: float  # Milliseconds
+	depth: int
+
+
+def managerModules() -> List[str]:
+	return re.findall(r'from (core\.[\w.]+) import', inspect.getsource(SuperManager.initManagers))
+
+
+def measure() -> List[ImportTime]:
+	"""
+	Imports the manager modules in a new interpreter
+	:return: every module imported, in import order
+	"""
+	code = '\n'.join(f'import {module}' for module in ['core.base.SuperManager'] + managerModules())
+	process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, capture_output=True, text=True)
+	if process.returncode:
+		raise RuntimeError(f'Importing the managers failed: {process.stderr[-2000:]}')
+
+	imports = list()
+	for line in process.stderr.splitlines():
+		match = IMPORT_LINE.match(line)
+		if not match:
+			continue
+
+		imports.append(ImportTime(
+			name=match['name'],
+			selfTime=int(match['self']) / 1000,
+			cumulative=int(match['cumulative']) / 1000,
+			depth=(len(match['indent']) - 1) // 2
+		))
+
+	return imports
+
+
+def totalTime(imports: List[ImportTime]) -> float:
+	return sum(importTime.selfTime for importTime in imports)
+
+
+def deferredImported(imports: List[ImportTime]) -> List[str]:
+	"""
+	:param imports:
+	:return: the deferred packages that got imported anyway
+	"""
+	names = {importTime.name for importTime in imports}
+	return [name for name in DEFERRED if name in names]
+
+
+def run(budget: float, top: int) -> bool:
+	imports = measure()
+	total = totalTime(imports)
+
+	print(f'{"package":<40} {"cumulative ms":>14}')
+	for importTime in sorted((importTime for importTime in imports if importTime.depth == 0), key=lambda importTime: importTime.cumulative, reverse=True)[:top]:
+		print(f'{importTime.name:<40} {importTime.cumulative:>14.1f}')
+
+	print(f'\n{len(imports)} modules imported in {total:.1f} ms, budget {budget:.1f} ms')
+
+	deferred = deferredImported(imports)
+	if deferred:
+		print(f'Imported on boot although deferred: {", ".join(deferred)}')
+
+	return total <= budget and not deferred
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Manager modules import time')
+	parser.add_argument('--budget', type=float, default=4000, help='milliseconds')
+	parser.add_argument('--top', type=int, default=15)
+	args = parser.parse_args()
+
+	sys.exit(0 if run(budget=args.budget, top=args.top) else 1)
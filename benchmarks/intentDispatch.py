@@ -0,0 +1,114 @@
+#  Copyright (c) 2021
+#
+#  This file, intentDispatch.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+"""
+Dispatches synthetic sessions against hundreds of fake skills, comparing the legacy
+per skill topic filtering with the intent router.
+
+Usage: python -m benchmarks.intentDispatch --skills 60 200 500 --intents 8 --sessions 5000
+"""
+
+import argparse
+import random
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+from core.base.model.AliceSkill import AliceSkill
+from core.base.model.Intent import Intent
+from core.base.model.IntentRouter import IntentRouter
+
+
+class FakeSkill(AliceSkill):
+
+	# noinspection PyMissingConstructor
+	def __init__(self, name: str, intents: List[str]):
+		self._name = name
+		self._active = True
+		self._supportedIntents: Dict[str, Intent] = dict()
+		for intentName in intents:
+			intent = Intent(intentName, fallbackFunction=self.handler)
+			self._supportedIntents[str(intent)] = intent
+
+
+	# noinspection PyUnusedLocal
+	@staticmethod
+	def handler(session) -> bool:
+		return True
+
+
+def makeSkills(skillCount: int, intentCount: int) -> List[FakeSkill]:
+	return [FakeSkill(name=f'Skill{i}', intents=[f'skill{i}Intent{j}' for j in range(intentCount)]) for i in range(skillCount)]
+
+
+def makeSessions(skills: List[FakeSkill], sessionCount: int) -> list:
+	topics = [topic for skill in skills for topic in skill.supportedIntents]
+	topics.append('hermes/intent/notHandledByAnySkill')
+	return [SimpleNamespace(message=SimpleNamespace(topic=random.choice(topics)), currentState='') for _ in range(sessionCount)]
+
+
+def legacyDispatch(skills: List[FakeSkill], session) -> bool:
+	for skill in skills:
+		if skill.onMessageDispatch(session):
+			return True
+	return False
+
+
+def routerDispatch(router: IntentRouter, skills: Dict[str, FakeSkill], session) -> bool:
+	for skillName, intent in router.match(session.message.topic):
+		if skills[skillName].onMessageDispatch(session, intent=intent):
+			return True
+	return False
+
+
+def measure(func: Callable, sessions: list) -> float:
+	start = time.perf_counter()
+	for session in sessions:
+		func(session)
+	return (time.perf_counter() - start) / len(sessions) * 1_000_000
+
+
+def run(skillCounts: List[int], intentCount: int, sessionCount: int):
+	print(f'{"skills":>8} {"intents":>8} {"legacy µs/msg":>15} {"router µs/msg":>15} {"build ms":>10} {"speedup":>8}')
+
+	for skillCount in skillCounts:
+		skills = makeSkills(skillCount, intentCount)
+		sessions = makeSessions(skills, sessionCount)
+
+		start = time.perf_counter()
+		router = IntentRouter()
+		for skill in skills:
+			router.addSkill(skillName=skill.name, intents=skill.supportedIntents)
+		buildTime = (time.perf_counter() - start) * 1000
+
+		byName = {skill.name: skill for skill in skills}
+		legacy = measure(lambda session: legacyDispatch(skills, session), sessions)
+		routed = measure(lambda session: routerDispatch(router, byName, session), sessions)
+
+		print(f'{skillCount:>8} {router.intentCount:>8} {legacy:>15.2f} {routed:>15.2f} {buildTime:>10.2f} {legacy / routed:>7.1f}x')
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Intent dispatch benchmark')
+	parser.add_argument('--skills', type=int, nargs='+', default=[60, 200, 500])
+	parser.add_argument('--intents', type=int, default=8)
+	parser.add_argument('--sessions', type=int, default=5000)
+	args = parser.parse_args()
+
+	run(skillCounts=args.skills, intentCount=args.intents, sessionCount=args.sessions)
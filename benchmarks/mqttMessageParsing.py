@@ -0,0 +1,194 @@
+#  Copyright (c) 2021
+#
+#  This file, mqttMessageParsing.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+"""
+Pushes Hermes intent messages through MqttManager.onMqttMessage, down to a skill reading the
+session slots and custom data, once decoding the payload in every helper like it used to and
+once through the parsed message. Managers outside of the message path are replaced by stubs.
+
+Usage: python -m benchmarks.mqttMessageParsing --messages 20000
+"""
+
+import argparse
+import json
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Dict, List
+from unittest import mock
+
+from paho.mqtt.client import MQTTMessage
+
+from core.commons.CommonsManager import CommonsManager
+from core.commons.model.ParsedMessage import ParsedMessage
+from core.dialog.model.DialogSession import DialogSession
+from core.server.MqttManager import MqttManager
+
+
+def intentPayload(sessionId: str, slots: int) -> bytes:
+	locations = ['kitchen', 'living room', 'bedroom', 'office', 'garage']
+	return json.dumps({
+		'sessionId'    : sessionId,
+		'customData'   : json.dumps({'userId': 'john', 'origin': 'satellite', 'expectedSlots': ['Location']}),
+		'siteId'       : 'satellite-kitchen',
+		'input'        : 'turn on the lights in the ' + ' and '.join(locations[:slots]),
+		'asrTokens'    : [[{'value': word, 'confidence': 0.95, 'rangeStart': 0, 'rangeEnd': 4, 'time': {'start': 0.1, 'end': 0.3}} for word in 'turn on the lights in the kitchen'.split()]],
+		'asrConfidence': 0.92,
+		'intent'       : {'intentName': 'Lights:TurnOn', 'confidenceScore': 0.93},
+		'slots'        : [{
+			'rawValue'       : location,
+			'value'          : {'kind': 'Custom', 'value': location},
+			'alternatives'   : [],
+			'range'          : {'start': 26, 'end': 26 + len(location)},
+			'entity'         : 'Location',
+			'slotName'       : 'Location',
+			'confidenceScore': 0.9
+		} for location in locations[:slots]],
+		'alternatives' : [{'intentName': 'Lights:TurnOff', 'confidenceScore': 0.04, 'slots': []}]
+	}).encode()
+
+
+class BenchmarkDialogManager(object):
+
+	def __init__(self):
+		self.sessions: Dict[str, DialogSession] = dict()
+
+
+	def getSession(self, sessionId: str) -> DialogSession:
+		return self.sessions.get(sessionId)
+
+
+class BenchmarkMultiIntentManager(object):
+
+	@staticmethod
+	def processMessage(message: MQTTMessage) -> bool:
+		CommonsManager.parseSessionId(message)
+		return False
+
+
+class BenchmarkSkillManager(object):
+
+	def __init__(self):
+		self.consumed = 0
+
+
+	@staticmethod
+	def getSkillInstance(_skillName: str):
+		return None
+
+
+	def dispatchMessage(self, session: DialogSession) -> bool:
+		# What an intent handler typically reads
+		if session.slotValue('Location') and session.customData.get('userId'):
+			self.consumed += 1
+		return True
+
+
+class BenchmarkMqttManager(MqttManager):
+	Commons = CommonsManager
+	ConfigManager = SimpleNamespace(getAliceConfigByName=lambda _name: False)
+	MultiIntentManager = BenchmarkMultiIntentManager()
+
+
+	def __init__(self):
+		super().__init__()
+		self.dialogManager = BenchmarkDialogManager()
+		self.skillManager = BenchmarkSkillManager()
+
+
+	@property
+	def DialogManager(self) -> BenchmarkDialogManager:
+		return self.dialogManager
+
+
+	@property
+	def SkillManager(self) -> BenchmarkSkillManager:
+		return self.skillManager
+
+
+	def broadcast(self, *args, **kwargs):
+		pass
+
+
+	def logInfo(self, *args, **kwargs):
+		pass
+
+
+	def logDebug(self, *args, **kwargs):
+		pass
+
+
+def buildMessages(count: int, sessions: List[str], slots: int) -> List[MQTTMessage]:
+	payloads = {sessionId: intentPayload(sessionId, slots) for sessionId in sessions}
+	messages = list()
+	for i in range(count):
+		message = MQTTMessage(mid=i, topic=b'hermes/intent/Lights:TurnOn')
+		message.payload = payloads[sessions[i % len(sessions)]]
+		messages.append(message)
+	return messages
+
+
+def measure(manager: BenchmarkMqttManager, messages: List[MQTTMessage]) -> float:
+	start = time.perf_counter()
+	for message in messages:
+		manager.onMqttMessage(None, None, message)
+	return len(messages) / (time.perf_counter() - start)
+
+
+def run(count: int, slots: List[int]):
+	superManager = SimpleNamespace(
+		CommonsManager=CommonsManager,
+		ConfigManager=SimpleNamespace(getAliceConfigByName=lambda _name: False),
+		DeviceManager=None
+	)
+
+	print(f'{"slots":>6} {"legacy msg/s":>13} {"parsed msg/s":>13} {"speedup":>8}')
+	with mock.patch('core.dialog.model.DialogSession.SuperManager') as superManagerClass, \
+			mock.patch('core.base.SuperManager.SuperManager') as superManagerModule:
+		superManagerClass.getInstance.return_value = superManager
+		superManagerModule.getInstance.return_value = superManager
+
+		for slotCount in slots:
+			results = dict()
+			for label in ('legacy', 'parsed'):
+				manager = BenchmarkMqttManager()
+				sessions = [str(uuid.uuid4()) for _ in range(20)]
+				for sessionId in sessions:
+					manager.dialogManager.sessions[sessionId] = DialogSession(deviceUid='satellite-kitchen', sessionId=sessionId)
+
+				messages = buildMessages(count, sessions, slotCount)
+				if label == 'legacy':
+					with mock.patch.object(ParsedMessage, 'parse', new=staticmethod(lambda message: message)):
+						results[label] = measure(manager, messages)
+				else:
+					results[label] = measure(manager, messages)
+
+				if manager.skillManager.consumed != count:
+					raise Exception(f'Only {manager.skillManager.consumed} of {count} messages reached the skill')
+
+			print(f'{slotCount:>6} {results["legacy"]:>13.0f} {results["parsed"]:>13.0f} {results["parsed"] / results["legacy"]:>7.1f}x')
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Mqtt message parsing benchmark')
+	parser.add_argument('--messages', type=int, default=20000)
+	parser.add_argument('--slots', type=int, nargs='+', default=[1, 3, 5])
+	args = parser.parse_args()
+
+	run(count=args.messages, slots=args.slots)
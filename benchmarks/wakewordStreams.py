@@ -0,0 +1,148 @@
+#  Copyright (c) 2021
+#
+#  This file, wakewordStreams.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+"""
+Replays multi-room recordings through the per device Porcupine detection, offline, every room at the
+same time as it would be streamed by its satellite, and reports per room the false accepts, the misses
+and the cpu used. The labels file lists, per recording name, the seconds at which a wakeword was said.
+A detection within the tolerance after a label is a hit, any other detection a false accept.
+
+Labels example: {"kitchen": [3.2, 17.8], "office": [9.5]}
+
+Usage: python -m benchmarks.wakewordStreams --recordings kitchen=kitchen.wav office=office.wav --labels labels.json --workers 2
+"""
+
+import argparse
+import json
+import threading
+import time
+import wave
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+import pvporcupine
+
+from core.voice.model.WakewordStreams import WakewordStream, WakewordStreams
+
+
+BLOCK_SAMPLES = 320  # 20ms at 16kHz
+REFRACTORY = 1.0  # Consecutive frames detecting the same wakeword count once
+
+
+@dataclass
+class Room(object):
+	name: str
+	pcm: bytes
+	labels: List[float]
+	detections: List[float] = field(default_factory=list)
+
+
+	def score(self, tolerance: float) -> dict:
+		labels = list(self.labels)
+		falseAccepts = 0
+		for detection in self.detections:
+			label = next((label for label in labels if 0 <= detection - label <= tolerance), None)
+			if label is None:
+				falseAccepts += 1
+			else:
+				labels.remove(label)
+
+		return {'hits': len(self.labels) - len(labels), 'misses': len(labels), 'falseAccepts': falseAccepts}
+
+
+def readPcm(path: Path) -> bytes:
+	with wave.open(str(path), 'rb') as wav:
+		if wav.getframerate() != WakewordStreams.SAMPLERATE or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+			raise Exception(f'{path} must be 16kHz 16 bits mono')
+		return wav.readframes(wav.getnframes())
+
+
+def replay(streams: WakewordStreams, room: Room, frameLength: int, realTime: bool):
+	blockSize = BLOCK_SAMPLES * 2
+	start = time.perf_counter()
+	for i, offset in enumerate(range(0, len(room.pcm), blockSize)):
+		if realTime:
+			delay = start + i * BLOCK_SAMPLES / WakewordStreams.SAMPLERATE - time.perf_counter()
+			if delay > 0:
+				time.sleep(delay)
+		else:
+			# As fast as the detection goes, without overrunning the device buffer
+			while streams.backlog(room.name) > WakewordStreams.SAMPLERATE:
+				time.sleep(0.001)
+
+		streams.feed(room.name, room.pcm[offset:offset + blockSize])
+
+	# Let the detection catch up on the last frames
+	while streams.backlog(room.name) >= frameLength:
+		time.sleep(0.01)
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Per device wakeword detection benchmark')
+	parser.add_argument('--recordings', nargs='+', required=True, help='name=path of 16kHz 16 bits mono recordings, one per room')
+	parser.add_argument('--labels', type=Path, help='Json file of the wakeword times, in seconds, per recording name')
+	parser.add_argument('--keywords', nargs='+', default=['porcupine', 'bumblebee', 'terminator', 'blueberry'])
+	parser.add_argument('--workers', type=int, default=0, help='0 for as many as cpu cores')
+	parser.add_argument('--tolerance', type=float, default=1.5, help='Seconds after a label a detection still counts as a hit')
+	parser.add_argument('--fast', action='store_true', help='Replay as fast as possible instead of real time')
+	args = parser.parse_args()
+
+	allLabels: Dict[str, List[float]] = json.loads(args.labels.read_text()) if args.labels else dict()
+	rooms: Dict[str, Room] = dict()
+	for recording in args.recordings:
+		roomName, path = recording.split('=', 1)
+		rooms[roomName] = Room(name=roomName, pcm=readPcm(Path(path)), labels=allLabels.get(roomName, list()))
+
+
+	def onDetection(stream: WakewordStream, _keyword: int):
+		position = stream.processed / WakewordStreams.SAMPLERATE
+		detections = rooms[stream.deviceUid].detections
+		if not detections or position - detections[-1] > REFRACTORY:
+			detections.append(position)
+
+
+	probe = pvporcupine.create(keywords=args.keywords)
+	porcupineFrameLength = probe.frame_length
+	probe.delete()
+
+	wakewordStreams = WakewordStreams(factory=lambda: pvporcupine.create(keywords=args.keywords), onDetection=onDetection, pauseOnDetection=False)
+	wakewordStreams.start(workers=args.workers)
+
+	cpuStart = time.process_time()
+	wallStart = time.perf_counter()
+	threads = [threading.Thread(target=replay, args=[wakewordStreams, room, porcupineFrameLength, not args.fast]) for room in rooms.values()]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+
+	wall = time.perf_counter() - wallStart
+	cpu = time.process_time() - cpuStart
+	stats = wakewordStreams.stats()
+	wakewordStreams.stop()
+
+	print(f'{"room":>12} {"audio s":>8} {"detect":>7} {"hits":>5} {"misses":>7} {"false":>6} {"cpu %":>6} {"max frame ms":>13} {"overruns":>9}')
+	for room in rooms.values():
+		roomStats = stats['devices'].get(room.name, dict())
+		score = room.score(args.tolerance)
+		print(f'{room.name:>12} {roomStats.get("audioSeconds", 0):>8.1f} {len(room.detections):>7} {score["hits"]:>5} {score["misses"]:>7} {score["falseAccepts"]:>6} '
+			f'{roomStats.get("cpuLoad", 0) * 100:>6.2f} {roomStats.get("maxFrameTime", 0) * 1000:>13.2f} {roomStats.get("overruns", 0):>9}')
+
+	print(f'{len(rooms)} rooms on {stats["workers"]} workers, {wall:.1f}s wall, {cpu:.1f}s process cpu')
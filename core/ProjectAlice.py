@@ -28,12 +28,14 @@ from core.base.model.Version import Version
 from core.commons import constants
 from core.commons.model.Singleton import Singleton
 from core.util.Stopwatch import Stopwatch
+from core.util.model.BootProfiler import BootProfiler
 from core.util.model.Logger import Logger
 from core.webui.model.UINotificationType import UINotificationType
 
 
 class ProjectAlice(Singleton):
 	NAME = 'ProjectAlice'
+	BOOT_TRACE_FILE = Path('var/logs/bootTrace.json')
 
 
 	def __init__(self, restartHandler: callable):
@@ -45,6 +47,7 @@ class ProjectAlice(Singleton):
 		self._shuttingDown = False
 		self._restart = False
 		self._restartHandler = restartHandler
+		self._bootProfiler = BootProfiler()
 
 		if not self.checkDependencies():
 			self._restart = True
@@ -57,12 +60,27 @@ class ProjectAlice(Singleton):
 				self._superManager.onStart()
 
 				if self._superManager.ConfigManager.getAliceConfigByName('useHLC'):
-					self._superManager.Commons.runRootSystemCommand(['systemctl', 'start', 'hermesledcontrol'])
+					with self._bootProfiler.span(name='hermesledcontrol', category='subprocess'):
+						self._superManager.Commons.runRootSystemCommand(['systemctl', 'start', 'hermesledcontrol'])
 
 				self._superManager.onBooted()
 
 			self._logger.logInfo(f'Started in {stopWatch} seconds')
 			self._booted = True
+			self.logBootProfile()
+
+
+	def logBootProfile(self):
+		"""
+		Ends the boot profiling, writes the boot timeline and logs the slowest steps
+		"""
+		self._bootProfiler.finish()
+		if self._bootProfiler.writeTrace(self.BOOT_TRACE_FILE):
+			self._logger.logDebug(f'Boot timeline written to {self.BOOT_TRACE_FILE}')
+
+		slowest = ', '.join(f'{bootSpan.name} {bootSpan.wallTime:.2f}s' for bootSpan in self._bootProfiler.slowest(category='manager'))
+		if slowest:
+			self._logger.logInfo(f'Slowest managers to start: {slowest}')
 
 
 	def checkDependencies(self) -> bool:
@@ -117,6 +135,11 @@ class ProjectAlice(Singleton):
 		return self._booted
 
 
+	@property
+	def bootProfiler(self) -> BootProfiler:
+		return self._bootProfiler
+
+
 	@property
 	def restart(self) -> bool:
 		return self._restart
@@ -17,13 +17,12 @@
 #
 #  Last modified: 2021.07.31 at 15:54:28 CEST
 
+import threading
+import time
 from importlib import import_module, reload
 
-import paho.mqtt.client as mqtt
-from googletrans import Translator
-from langdetect import detect
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
 from core.asr.model import Asr
 from core.asr.model.ASRResult import ASRResult
@@ -31,6 +30,11 @@ from core.asr.model.Recorder import Recorder
 from core.base.model.Manager import Manager
 from core.commons import constants
 from core.dialog.model.DialogSession import DialogSession
+from core.util.model.LazyModule import lazyImport
+
+# Only needed to translate what is captured when the language is overridden
+googletrans = lazyImport('googletrans')
+langdetect = lazyImport('langdetect')
 
 
 class ASRManager(Manager):
@@ -41,12 +45,18 @@ class ASRManager(Manager):
 		super().__init__(self.NAME)
 		self._asr = None
 		self._streams: Dict[str, Recorder] = dict()
-		self._translator = Translator()
+		self._translator = None
 		self._usingFallback = False
+		self._sessionSlots: Optional[threading.BoundedSemaphore] = None
+		self._maxSessions = 0
+		self._statsLock = threading.Lock()
+		self._sessionStats = {'decoding': 0, 'queued': 0, 'decoded': 0, 'dropped': 0, 'maxQueueTime': 0}
 
 
 	def onStart(self):
 		super().onStart()
+		self._maxSessions = int(self.ConfigManager.getAliceConfigByName('asrMaxSessions') or 0)
+		self._sessionSlots = threading.BoundedSemaphore(self._maxSessions) if self._maxSessions > 0 else None
 		self._startASREngine()
 
 
@@ -129,6 +139,13 @@ class ASRManager(Manager):
 		return self._asr
 
 
+	@property
+	def translator(self):
+		if not self._translator:
+			self._translator = googletrans.Translator()
+		return self._translator
+
+
 	def onInternetConnected(self):
 		if not self._usingFallback or self.ConfigManager.getAliceConfigByName('stayCompletelyOffline') or self.ConfigManager.getAliceConfigByName('keepASROffline') or \
 				self.ConfigManager.getAliceConfigByName('asrFallback') == self.ConfigManager.getAliceConfigByName('asr'):
@@ -147,6 +164,7 @@ class ASRManager(Manager):
 
 	def onStartListening(self, session: DialogSession):
 		self._asr.onStartListening(session)
+		self._asr.newContext(session)
 		self.ThreadManager.newThread(name=f'streamdecode_{session.deviceUid}', target=self.decodeStream, args=[session])
 
 
@@ -162,7 +180,17 @@ class ASRManager(Manager):
 
 
 	def decodeStream(self, session: DialogSession):
-		result: ASRResult = self._asr.decodeStream(session)
+		if not self._waitForSlot(session):
+			self._asr.end(session)
+			if session.hasEnded:
+				return
+			result = None
+		else:
+			try:
+				result: ASRResult = self._asr.decodeStream(session)
+			finally:
+				self._asr.end(session)
+				self._releaseSlot()
 
 		if result and result.text:
 			if session.hasEnded:
@@ -172,9 +200,9 @@ class ASRManager(Manager):
 
 			text = result.text
 			if self.LanguageManager.overrideLanguage and not self.ConfigManager.getAliceConfigByName('stayCompletelyOffline') and not self.ConfigManager.getAliceConfigByName('keepASROffline'):
-				language = detect(text)
+				language = langdetect.detect(text)
 				if language != 'en':
-					text = self._translator.translate(text=text, src=language, dest='en').text
+					text = self.translator.translate(text=text, src=language, dest='en').text
 					self.logDebug(f'Asr translated to: {text}')
 
 			self.MqttManager.publish(topic=constants.TOPIC_TEXT_CAPTURED, payload={'sessionId': session.sessionId, 'text': text, 'device': session.deviceUid, 'likelihood': result.likelihood, 'seconds': result.processingTime})
@@ -189,11 +217,74 @@ class ASRManager(Manager):
 			self.MqttManager.endSession(sessionId=session.sessionId, forceEnd=True)
 
 
-	def onAudioFrame(self, message: mqtt.MQTTMessage, deviceUid: str):
-		if deviceUid not in self._streams or not self._streams[deviceUid].isRecording:
+	def _waitForSlot(self, session: DialogSession) -> bool:
+		"""
+		Waits for one of the asrMaxSessions decoding slots. Meanwhile the session recorder buffers the audio,
+		so a queued session only starts late. Gives up if the session ends or after the asr timeout
+		:param session:
+		:return: True if a slot was acquired
+		"""
+		with self._statsLock:
+			self._sessionStats['queued'] += 1
+
+		acquired = False
+		start = time.monotonic()
+		try:
+			if not self._sessionSlots or self._sessionSlots.acquire(blocking=False):
+				acquired = True
+				return True
+
+			self.logInfo(f'All {self._maxSessions} Asr slots busy, queuing session of device **{session.deviceUid}**')
+			deadline = start + int(self.ConfigManager.getAliceConfigByName('asrTimeout'))
+			while not session.hasEnded and time.monotonic() < deadline:
+				if self._sessionSlots.acquire(timeout=0.1):
+					acquired = True
+					break
+
+			if acquired and session.hasEnded:
+				self._sessionSlots.release()
+				acquired = False
+
+			return acquired
+		finally:
+			queueTime = time.monotonic() - start
+			with self._statsLock:
+				self._sessionStats['queued'] -= 1
+				self._sessionStats['maxQueueTime'] = max(self._sessionStats['maxQueueTime'], queueTime)
+				if acquired:
+					self._sessionStats['decoding'] += 1
+				else:
+					self._sessionStats['dropped'] += 1
+
+
+	def _releaseSlot(self):
+		with self._statsLock:
+			self._sessionStats['decoding'] -= 1
+			self._sessionStats['decoded'] += 1
+
+		if self._sessionSlots:
+			self._sessionSlots.release()
+
+
+	@property
+	def sessionStats(self) -> dict:
+		"""
+		Sessions being decoded and waiting for a decoding slot, decoded and dropped sessions and the longest wait for a slot
+		:return:
+		"""
+		with self._statsLock:
+			stats = dict(self._sessionStats)
+
+		stats['maxSessions'] = self._maxSessions
+		return stats
+
+
+	def onAudioFrame(self, payload: memoryview, deviceUid: str):
+		recorder = self._streams.get(deviceUid)
+		if not recorder or not recorder.isRecording:
 			return
 
-		self._streams[deviceUid].onAudioFrame(message, deviceUid)
+		recorder.onAudioFrame(payload, deviceUid)
 
 
 	def onSessionError(self, session: DialogSession):
@@ -201,33 +292,47 @@ class ASRManager(Manager):
 			return
 
 		self._streams[session.deviceUid].onSessionError(session)
-		self._streams.pop(session.deviceUid, None)
+		self._asr.end(session)
 
 
 	def onSessionEnded(self, session: DialogSession):
 		if not self._asr or session.deviceUid not in self._streams or not self._streams[session.deviceUid].isRecording:
 			return
 
-		self._asr.end()
-		self._streams.pop(session.deviceUid, None)
+		self._asr.end(session)
 
 
 	def onVadUp(self, deviceUid: str):
 		if not self._asr or deviceUid not in self._streams or not self._streams[deviceUid].isRecording:
 			return
 
-		self._asr.onVadUp()
+		self._asr.onVadUp(deviceUid=deviceUid)
 
 
 	def onVadDown(self, deviceUid: str):
 		if not self._asr or deviceUid not in self._streams or not self._streams[deviceUid].isRecording:
 			return
 
-		self._asr.onVadDown()
+		self._asr.onVadDown(deviceUid=deviceUid)
 
 
 	def addRecorder(self, deviceUid: str, recorder: Recorder):
 		self._streams[deviceUid] = recorder
+		self.MqttManager.subscribeAudioFrames(name=self.name, callback=self.onAudioFrame, deviceUid=deviceUid)
+
+
+	def removeRecorder(self, deviceUid: str, recorder: Recorder = None):
+		"""
+		Stops feeding the recorder of the given device
+		:param deviceUid:
+		:param recorder: only remove the device recorder if it is this one, it might already belong to a newer session
+		:return:
+		"""
+		if recorder and self._streams.get(deviceUid) is not recorder:
+			return
+
+		self._streams.pop(deviceUid, None)
+		self.MqttManager.unsubscribeAudioFrames(name=self.name, deviceUid=deviceUid)
 
 
 	def updateASRCredentials(self, asr: str):
@@ -18,16 +18,15 @@
 #  Last modified: 2021.04.13 at 12:56:45 CEST
 
 import json
-import paho.mqtt.client as mqtt
 import threading
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
+from core.asr.model.AsrContext import AsrContext
 from core.asr.model.Recorder import Recorder
 from core.base.model.ProjectAliceObject import ProjectAliceObject
 from core.commons import constants
 from core.dialog.model.DialogSession import DialogSession
-from core.util.model.AliceEvent import AliceEvent
 
 
 class Asr(ProjectAliceObject):
@@ -39,10 +38,8 @@ class Asr(ProjectAliceObject):
 		self._capableOfArbitraryCapture = False
 		self._isOnlineASR = False
 		self._isStreamAble = True
-		self._timeout: AliceEvent = self.ThreadManager.newEvent('asrTimeout')
-		self._timeoutTimer: Optional[threading.Timer] = None
-		self._recorder: Optional[Recorder] = None
-		self._previousPartialRecord = ''
+		self._contexts: Dict[str, AsrContext] = dict()
+		self._contextsLock = threading.Lock()
 		super().__init__()
 
 
@@ -67,20 +64,26 @@ class Asr(ProjectAliceObject):
 
 	def onStop(self):
 		self.logInfo(f'Stopping {self.NAME}')
-		self._timeout.set()
+		with self._contextsLock:
+			contexts = list(self._contexts.values())
 
+		for context in contexts:
+			context.timeout.set()
+			context.recorder.stopRecording()
 
-	def onAudioFrame(self, message: mqtt.MQTTMessage, deviceUid: str):
+
+	def onAudioFrame(self, payload: memoryview, deviceUid: str):
 		# Superseeded if needed
 		pass
 
 
-	def onVadUp(self, **kwargs):
-		# Superseeded if needed
-		pass
+	def onVadUp(self, deviceUid: str):
+		context = self.getContext(deviceUid)
+		if context:
+			context.triggerFlag.set()
 
 
-	def onVadDown(self, **kwargs):
+	def onVadDown(self, deviceUid: str):
 		# Superseeded if needed
 		pass
 
@@ -91,19 +94,88 @@ class Asr(ProjectAliceObject):
 
 
 	def decodeStream(self, session: DialogSession):
-		self._timeout.clear()
-		self._timeoutTimer = self.ThreadManager.newTimer(interval=int(self.ConfigManager.getAliceConfigByName('asrTimeout')), func=self.timeout)
+		# Superseeded, get the session context with startDecoding
+		pass
+
+
+	def newContext(self, session: DialogSession) -> AsrContext:
+		"""
+		Creates the decoding context of a session. Its recorder starts buffering the device audio right
+		away, so that nothing is lost while the session waits for a free decoding slot
+		:param session:
+		:return:
+		"""
+		timeout = threading.Event()
+		recorder = Recorder(timeout, session.user, session.deviceUid)
+		context = AsrContext(session=session, recorder=recorder, timeout=timeout)
+		with self._contextsLock:
+			previous = self._contexts.get(session.deviceUid)
+			self._contexts[session.deviceUid] = context
+
+		if previous:
+			self._endContext(previous)
+
+		recorder.startRecording()
+		self.ASRManager.addRecorder(session.deviceUid, recorder)
+		return context
+
+
+	def getContext(self, deviceUid: str) -> Optional[AsrContext]:
+		return self._contexts.get(deviceUid)
+
+
+	def startDecoding(self, session: DialogSession) -> AsrContext:
+		"""
+		Returns the context of the session, created if the session was not queued first, and starts its timeout
+		:param session:
+		:return:
+		"""
+		context = self._contexts.get(session.deviceUid)
+		if not context or context.session is not session:
+			context = self.newContext(session)
 
+		context.timeoutTimer = self.ThreadManager.newTimer(interval=int(self.ConfigManager.getAliceConfigByName('asrTimeout')), func=self.timeout, args=[context])
+		return context
 
-	def end(self):
-		self._recorder.stopRecording()
-		if self._timeoutTimer and self._timeoutTimer.is_alive():
-			self._timeoutTimer.cancel()
 
+	def end(self, session: DialogSession):
+		"""
+		Stops the recorder of the session and drops its context
+		:param session:
+		:return:
+		"""
+		with self._contextsLock:
+			context = self._contexts.get(session.deviceUid)
+			if not context or context.session is not session:
+				return
+			self._contexts.pop(session.deviceUid)
 
-	def timeout(self):
-		self._timeout.set()
-		self.logWarning('Asr timed out')
+		self._endContext(context)
+
+
+	def _endContext(self, context: AsrContext):
+		context.recorder.stopRecording()
+		if context.timeoutTimer and context.timeoutTimer.is_alive():
+			context.timeoutTimer.cancel()
+
+		self.ASRManager.removeRecorder(context.deviceUid, context.recorder)
+
+
+	def timeout(self, context: AsrContext):
+		context.timeout.set()
+		context.recorder.stopRecording()
+		self.logWarning(f'Asr timed out on device **{context.deviceUid}**')
+
+
+	@property
+	def activeSessions(self) -> int:
+		return len(self._contexts)
+
+
+	@property
+	def recognizerStats(self) -> dict:
+		# Superseeded by the Asr keeping recognizers ready
+		return dict()
 
 
 	def checkLanguage(self) -> bool:
@@ -119,9 +191,10 @@ class Asr(ProjectAliceObject):
 
 
 	def partialTextCaptured(self, session: DialogSession, text: str, likelihood: float, seconds: float):
-		if not text or text.strip() == self._previousPartialRecord:
+		context = self._contexts.get(session.deviceUid)
+		if not text or not context or text.strip() == context.previousPartial:
 			return
-		self._previousPartialRecord = text.strip()
+		context.previousPartial = text.strip()
 		self.MqttManager.publish(constants.TOPIC_PARTIAL_TEXT_CAPTURED, json.dumps({
 			'text'      : text,
 			'likelihood': likelihood,
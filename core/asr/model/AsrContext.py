@@ -0,0 +1,52 @@
+#  Copyright (c) 2021
+#
+#  This file, AsrContext.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+from core.asr.model.Recorder import Recorder
+from core.dialog.model.DialogSession import DialogSession
+from core.util.model.ThreadTimer import ThreadTimer
+
+
+@dataclass(eq=False)
+class AsrContext(object):
+	"""
+	Everything an Asr needs to decode one session: the recorder of the session device, the timeout
+	and the voice activity flag. The Asr keeps one per device, so that several devices can be decoded
+	at the same time while sharing the loaded model
+	"""
+	session: DialogSession
+	recorder: Recorder
+	timeout: threading.Event
+	triggerFlag: threading.Event = field(default_factory=threading.Event)
+	timeoutTimer: Optional[ThreadTimer] = None
+	previousPartial: str = ''
+
+
+	@property
+	def deviceUid(self) -> str:
+		return self.session.deviceUid
+
+
+	@property
+	def sessionId(self) -> str:
+		return self.session.sessionId
+
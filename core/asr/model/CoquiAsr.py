@@ -17,13 +17,12 @@
 #
 #  Last modified: 2021.04.13 at 12:56:45 CEST
 
-import numpy as np
 from pathlib import Path
 from typing import Generator, Optional
 
 from core.asr.model.ASRResult import ASRResult
 from core.asr.model.Asr import Asr
-from core.asr.model.Recorder import Recorder
+from core.asr.model.RecognizerPool import RecognizerPool
 from core.dialog.model.DialogSession import DialogSession
 from core.util.Stopwatch import Stopwatch
 
@@ -52,7 +51,7 @@ class CoquiAsr(Asr):
 		self._langPath = Path(self.Commons.rootDir(), f'trained/asr/coqui/{self.LanguageManager.activeLanguage}')
 
 		self._model: Optional[stt.Model] = None
-		self._triggerFlag = self.ThreadManager.newEvent('asrTriggerFlag')
+		self._streams: Optional[RecognizerPool] = None
 
 
 	def onStart(self):
@@ -67,6 +66,25 @@ class CoquiAsr(Asr):
 		self._model.enableExternalScorer(f'{self._langPath}/lm.scorer')
 		self.logInfo('Scorer Loaded')
 
+		# Finished streams can't be reused, the pool builds the next ones in the background
+		self._streams = RecognizerPool(
+			factory=self._model.createStream,
+			size=int(self.ConfigManager.getAliceConfigByName('asrRecognizerPool') or 0),
+			discard=lambda stream: stream.freeStream()
+		)
+		self._streams.warm()
+
+
+	def onStop(self):
+		super().onStop()
+		if self._streams:
+			self._streams.clear()
+
+
+	@property
+	def recognizerStats(self) -> dict:
+		return {'freeForm': self._streams.stats} if self._streams else dict()
+
 
 	def installDependencies(self) -> bool:
 		#		if not super().installDependencies():
@@ -126,38 +144,29 @@ class CoquiAsr(Asr):
 			return False
 
 
-	def onVadUp(self):
-		self._triggerFlag.set()
-
-
-	def onVadDown(self):
-		if not self._triggerFlag.is_set():
+	def onVadDown(self, deviceUid: str):
+		context = self.getContext(deviceUid)
+		if not context or not context.triggerFlag.is_set():
 			return
 
-		self._recorder.stopRecording()
+		context.recorder.stopRecording()
 
 
 	def decodeStream(self, session: DialogSession) -> Optional[ASRResult]:
-		super().decodeStream(session)
+		context = self.startDecoding(session)
 		result = None
 
 		with Stopwatch() as processingTime:
-			with Recorder(self._timeout, session.user, session.deviceUid) as recorder:
-				self.ASRManager.addRecorder(session.deviceUid, recorder)
-				self._recorder = recorder
-				streamContext = self._model.createStream()
-				for chunk in recorder:
-					if not chunk:
-						break
-
-					streamContext.feedAudioContent(np.frombuffer(chunk, np.int16))
+			with context.recorder as recorder:
+				streamContext = self._streams.acquire()
+				for chunk in recorder.samples():
+					streamContext.feedAudioContent(chunk)
 
 					result = streamContext.intermediateDecode()
 					self.partialTextCaptured(session=session, text=result, likelihood=1, seconds=0)
 
 			text = streamContext.finishStream()
-			self._triggerFlag.clear()
-			self.end()
+			self.end(session)
 
 		return ASRResult(
 			text=text,
@@ -17,13 +17,11 @@
 #
 #  Last modified: 2021.04.13 at 12:56:45 CEST
 
-import numpy as np
 from pathlib import Path
 from typing import Generator, Optional
 
 from core.asr.model.ASRResult import ASRResult
 from core.asr.model.Asr import Asr
-from core.asr.model.Recorder import Recorder
 from core.dialog.model.DialogSession import DialogSession
 from core.util.Stopwatch import Stopwatch
 
@@ -52,7 +50,6 @@ class DeepSpeechAsr(Asr):
 		self._langPath = Path(self.Commons.rootDir(), f'trained/asr/deepspeech/{self.LanguageManager.activeLanguage}')
 
 		self._model: Optional[deepspeech.Model] = None
-		self._triggerFlag = self.ThreadManager.newEvent('asrTriggerFlag')
 
 
 	def onStart(self):
@@ -99,38 +96,29 @@ class DeepSpeechAsr(Asr):
 			return False
 
 
-	def onVadUp(self):
-		self._triggerFlag.set()
-
-
-	def onVadDown(self):
-		if not self._triggerFlag.is_set():
+	def onVadDown(self, deviceUid: str):
+		context = self.getContext(deviceUid)
+		if not context or not context.triggerFlag.is_set():
 			return
 
-		self._recorder.stopRecording()
+		context.recorder.stopRecording()
 
 
 	def decodeStream(self, session: DialogSession) -> Optional[ASRResult]:
-		super().decodeStream(session)
+		context = self.startDecoding(session)
 		result = None
 
 		with Stopwatch() as processingTime:
-			with Recorder(self._timeout, session.user, session.deviceUid) as recorder:
-				self.ASRManager.addRecorder(session.deviceUid, recorder)
-				self._recorder = recorder
+			with context.recorder as recorder:
 				streamContext = self._model.createStream()
-				for chunk in recorder:
-					if not chunk:
-						break
-
-					self._model.feedAudioContent(streamContext, np.frombuffer(chunk, np.int16))
+				for chunk in recorder.samples():
+					self._model.feedAudioContent(streamContext, chunk)
 
 					result = self._model.intermediateDecode(streamContext)
 					self.partialTextCaptured(session=session, text=result, likelihood=1, seconds=0)
 
 			text = self._model.finishStream(streamContext)
-			self._triggerFlag.clear()
-			self.end()
+			self.end(session)
 
 		return ASRResult(
 			text=text,
@@ -24,7 +24,6 @@ from typing import Iterable, Optional
 
 from core.asr.model.ASRResult import ASRResult
 from core.asr.model.Asr import Asr
-from core.asr.model.Recorder import Recorder
 from core.dialog.model.DialogSession import DialogSession
 from core.util.Stopwatch import Stopwatch
 
@@ -79,14 +78,11 @@ class GoogleAsr(Asr):
 
 
 	def decodeStream(self, session: DialogSession) -> Optional[ASRResult]:
-		super().decodeStream(session)
+		context = self.startDecoding(session)
 
-		recorder = Recorder(self._timeout, session.user, session.deviceUid)
-		self.ASRManager.addRecorder(session.deviceUid, recorder)
-		self._recorder = recorder
 		result = None
 		with Stopwatch() as processingTime:
-			with recorder as stream:
+			with context.recorder as stream:
 				audioStream = stream.audioStream()
 				# noinspection PyUnresolvedReferences
 				try:
@@ -97,7 +93,7 @@ class GoogleAsr(Asr):
 					self._internetLostFlag.clear()
 					self.logWarning(f'Failed ASR request: {e}')
 
-			self.end()
+			self.end(session)
 
 		return ASRResult(
 			text=result[0],
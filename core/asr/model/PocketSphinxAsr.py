@@ -19,12 +19,12 @@
 
 import shutil
 import tarfile
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 from core.asr.model.ASRResult import ASRResult
 from core.asr.model.Asr import Asr
-from core.asr.model.Recorder import Recorder
 from core.commons import constants
 from core.dialog.model.DialogSession import DialogSession
 from core.util.Stopwatch import Stopwatch
@@ -59,7 +59,8 @@ class PocketSphinxAsr(Asr):
 		super().__init__()
 		self._capableOfArbitraryCapture = True
 		self._isOnlineASR = False
-		self._decoder: Optional[Decoder] = None
+		self._decoders: List[Decoder] = list()
+		self._decodersLock = threading.Lock()
 		self._config = None
 
 
@@ -78,7 +79,7 @@ class PocketSphinxAsr(Asr):
 		self._config.set_string('-hmm', f'{pocketSphinxPath}/model/{self.LanguageManager.activeLanguageAndCountryCode.lower()}')
 		self._config.set_string('-lm', f'{pocketSphinxPath}/model/{self.LanguageManager.activeLanguageAndCountryCode.lower()}.lm.bin')
 		self._config.set_string('-dict', f'{pocketSphinxPath}/model/cmudict-{self.LanguageManager.activeLanguageAndCountryCode.lower()}.dict')
-		self._decoder = Decoder(self._config)
+		self._decoders = [Decoder(self._config)]
 
 
 	def checkLanguage(self) -> bool:
@@ -94,15 +95,6 @@ class PocketSphinxAsr(Asr):
 		return True
 
 
-	def timeout(self):
-		super().timeout()
-		try:
-			self._decoder.end_utt()
-		except:
-			# If this fails we don't care, at least we tried to close the utterance
-			pass
-
-
 	def downloadLanguage(self, forceLang: str = '') -> bool:
 		lang = forceLang or self.LanguageManager.activeLanguageAndCountryCode
 		self.logInfo(f'Downloading language model for "{lang}"')
@@ -139,41 +131,67 @@ class PocketSphinxAsr(Asr):
 		return True
 
 
+	def _acquireDecoder(self) -> Decoder:
+		"""
+		Decoders hold the utterance state, so concurrent sessions each need their own.
+		Free ones are reused, so there are never more than the concurrent sessions
+		:return:
+		"""
+		with self._decodersLock:
+			if self._decoders:
+				return self._decoders.pop()
+
+		return Decoder(self._config)
+
+
+	def _releaseDecoder(self, decoder: Decoder):
+		try:
+			decoder.end_utt()
+		except:
+			# Utterance already ended
+			pass
+
+		with self._decodersLock:
+			self._decoders.append(decoder)
+
+
 	def decodeStream(self, session: DialogSession) -> Optional[ASRResult]:
-		super().decodeStream(session)
+		context = self.startDecoding(session)
+		decoder = self._acquireDecoder()
 
 		result = None
 		counter = 0
-		with Stopwatch() as processingTime:
-			with Recorder(self._timeout, session.user, session.deviceUid) as recorder:
-				self.ASRManager.addRecorder(session.deviceUid, recorder)
-				self._recorder = recorder
-				self._decoder.start_utt()
-				inSpeech = False
-				for chunk in recorder:
-					if self._timeout.is_set():
-						break
-
-					self._decoder.process_raw(chunk, False, False)
-					hypothesis = self._decoder.hyp()
-					if hypothesis:
-						counter += 1
-						if counter == 10:
-							self.partialTextCaptured(session, hypothesis.hypstr, hypothesis.prob, processingTime.time)
-							counter = 0
-					if self._decoder.get_in_speech() != inSpeech:
-						inSpeech = self._decoder.get_in_speech()
-						if not inSpeech:
-							self._decoder.end_utt()
-							result = self._decoder.hyp() if self._decoder.hyp() else None
+		try:
+			with Stopwatch() as processingTime:
+				with context.recorder as recorder:
+					decoder.start_utt()
+					inSpeech = False
+					for chunk in recorder:
+						if context.timeout.is_set():
 							break
 
-				self.end()
+						decoder.process_raw(chunk, False, False)
+						hypothesis = decoder.hyp()
+						if hypothesis:
+							counter += 1
+							if counter == 10:
+								self.partialTextCaptured(session, hypothesis.hypstr, hypothesis.prob, processingTime.time)
+								counter = 0
+						if decoder.get_in_speech() != inSpeech:
+							inSpeech = decoder.get_in_speech()
+							if not inSpeech:
+								decoder.end_utt()
+								result = decoder.hyp() if decoder.hyp() else None
+								break
+
+					self.end(session)
+		finally:
+			self._releaseDecoder(decoder)
 
 		return ASRResult(
 			text=result.hypstr.strip(),
 			session=session,
-			likelihood=self._decoder.hyp().prob,
+			likelihood=result.prob,
 			processingTime=processingTime.time
 		) if result else None
 
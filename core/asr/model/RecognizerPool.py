@@ -0,0 +1,174 @@
+#  Copyright (c) 2021
+#
+#  This file, RecognizerPool.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import threading
+from typing import Any, Callable, List
+
+from core.base.model.ProjectAliceObject import ProjectAliceObject
+
+
+class RecognizerPool(ProjectAliceObject):
+	"""
+	Keeps recognizers ready for the next sessions, so that a session doesn't wait for one to be built
+	before its first partial. Reusable recognizers are reset and returned to the pool at the end of a
+	session. Recognizers that can't be reused, such as finished Coqui streams, are dropped and the
+	pool is refilled in the background instead
+	"""
+
+	def __init__(self, factory: Callable[[], Any], size: int, reset: Callable[[Any], None] = None, discard: Callable[[Any], None] = None):
+		"""
+		:param factory: builds a new recognizer
+		:param size: how many free recognizers are kept ready
+		:param reset: resets a recognizer for a new session. None if recognizers can't be reused
+		:param discard: frees an unused recognizer when the pool is cleared
+		"""
+		super().__init__()
+		self._factory = factory
+		self._size = max(size, 0)
+		self._reset = reset
+		self._discard = discard
+		self._free: List[Any] = list()
+		self._lock = threading.Lock()
+		self._refilling = False
+		self._stats = {'created': 0, 'reused': 0, 'discarded': 0}
+
+
+	@property
+	def size(self) -> int:
+		return self._size
+
+
+	@property
+	def reusable(self) -> bool:
+		return self._reset is not None
+
+
+	def warm(self):
+		"""
+		Fills the pool up to its size
+		:return:
+		"""
+		while True:
+			with self._lock:
+				if len(self._free) >= self._size:
+					return
+
+			recognizer = self._create()
+			with self._lock:
+				if len(self._free) >= self._size:
+					return
+				self._free.append(recognizer)
+
+
+	def acquire(self) -> Any:
+		"""
+		Returns a free recognizer, or builds one if the pool is empty
+		:return:
+		"""
+		with self._lock:
+			recognizer = self._free.pop() if self._free else None
+			if recognizer is not None:
+				self._stats['reused'] += 1
+
+		if recognizer is None:
+			recognizer = self._create()
+
+		if not self.reusable:
+			self._refill()
+
+		return recognizer
+
+
+	def release(self, recognizer: Any):
+		"""
+		Resets the recognizer and returns it to the pool, or drops it if it can't be reused or the pool is full
+		:param recognizer:
+		:return:
+		"""
+		if recognizer is None:
+			return
+
+		if self.reusable:
+			try:
+				self._reset(recognizer)
+			except Exception as e:
+				self.logWarning(f'Failed resetting recognizer, dropping it: {e}')
+			else:
+				with self._lock:
+					if len(self._free) < self._size:
+						self._free.append(recognizer)
+						return
+
+		with self._lock:
+			self._stats['discarded'] += 1
+
+
+	def clear(self):
+		with self._lock:
+			free = self._free
+			self._free = list()
+
+		if not self._discard:
+			return
+
+		for recognizer in free:
+			try:
+				self._discard(recognizer)
+			except Exception as e:
+				self.logWarning(f'Failed discarding recognizer: {e}')
+
+
+	def _create(self) -> Any:
+		recognizer = self._factory()
+		with self._lock:
+			self._stats['created'] += 1
+		return recognizer
+
+
+	def _refill(self):
+		with self._lock:
+			if self._refilling or len(self._free) >= self._size:
+				return
+			self._refilling = True
+
+		self.ThreadManager.doLater(interval=0, func=self._backgroundWarm)
+
+
+	def _backgroundWarm(self):
+		try:
+			self.warm()
+		except Exception as e:
+			self.logWarning(f'Failed refilling recognizer pool: {e}')
+		finally:
+			with self._lock:
+				self._refilling = False
+
+
+	@property
+	def stats(self) -> dict:
+		"""
+		Free recognizers and how many were built, reused from the pool and dropped
+		:return:
+		"""
+		with self._lock:
+			stats = dict(self._stats)
+			stats['free'] = len(self._free)
+
+		stats['size'] = self._size
+		return stats
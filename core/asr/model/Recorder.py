@@ -17,27 +17,30 @@
 #
 #  Last modified: 2021.07.30 at 19:56:37 CEST
 
-import io
-import paho.mqtt.client as mqtt
-import queue
-import wave
+from threading import Event
 from typing import Generator
 
+import numpy as np
+
 from core.base.model.ProjectAliceObject import ProjectAliceObject
 from core.dialog.model.DialogSession import DialogSession
-from core.util.model.AliceEvent import AliceEvent
-from core.voice.WakewordRecorder import WakewordRecorderState
+from core.util.model.AudioRingBuffer import AudioRingBuffer
 
 
 class Recorder(ProjectAliceObject):
+	SAMPLERATE = 16000
+	CHUNK_SAMPLES = 4096
+
 
-	def __init__(self, timeoutFlag: AliceEvent, user: str, deviceUid: str):
+	def __init__(self, timeoutFlag: Event, user: str, deviceUid: str):
 		super().__init__()
 		self._user = user,
 		self._deviceUid = deviceUid
 		self._recording = False
 		self._timeoutFlag = timeoutFlag
-		self._buffer = queue.Queue()
+		self._forwardFrames = False
+		# A session can wait for a decoding slot and then be decoded for as long as the Asr timeout
+		self._buffer = AudioRingBuffer(capacity=self.SAMPLERATE * 2 * int(self.ConfigManager.getAliceConfigByName('asrTimeout') or 10))
 
 
 	def __enter__(self):
@@ -59,77 +62,56 @@ class Recorder(ProjectAliceObject):
 
 
 	def startRecording(self):
+		if self._recording:
+			return
+
+		# Checked once per session, not for every frame
+		asr = self.ASRManager.asr
+		self._forwardFrames = bool(asr and not asr.isStreamAble)
 		self._recording = True
 
 
 	def stopRecording(self):
 		self._recording = False
-		self._buffer.put(None)
-
-
-	def onAudioFrame(self, message: mqtt.MQTTMessage, deviceUid: str):
-		with io.BytesIO(message.payload) as buffer:
-			try:
-				with wave.open(buffer, 'rb') as wav:
-					frame = wav.readframes(512)
-					while frame:
-						self._buffer.put(frame)
-
-						if self.ConfigManager.getAliceConfigByName('recordAudioAfterWakeword') or self.WakewordRecorder.state == WakewordRecorderState.RECORDING:
-							self.AudioServer.recordFrame(deviceUid, frame)
-
-						if not self.ASRManager.asr.isStreamAble:
-							self.ASRManager.asr.recordFrame(frame)
-
-						frame = wav.readframes(512)
-
-			except Exception as e:
-				self.logError(f'Error recording user speech: {e}')
-
-
-	def __iter__(self):
-		while self._recording:
-			if self._timeoutFlag.is_set():
+		self._buffer.close()
+
+
+	def onAudioFrame(self, payload: memoryview, deviceUid: str):
+		try:
+			pcm = self.MqttManager.audioFrameBus.pcm(payload, deviceUid)
+			self._buffer.write(pcm)
+		except Exception as e:
+			self.logError(f'Error recording user speech: {e}')
+			return
+
+		if self._forwardFrames:
+			self.ASRManager.asr.recordFrame(pcm.tobytes())
+
+
+	def samples(self) -> Generator[np.ndarray, None, None]:
+		"""
+		Yields the recorded samples as int16 views on the recorder buffer, without copying them. A view must
+		be consumed before the next one is asked for. The last samples are yielded once the recording stops
+		:return:
+		"""
+		while not self._timeoutFlag.is_set():
+			chunk = self._buffer.read(maxSamples=self.CHUNK_SAMPLES)
+			if chunk is None:
 				return
 
-			chunk = self._buffer.get()
-
-			if not chunk:
-				break
-
 			yield chunk
 
-		# Empty the buffer
-		data = list()
-		while not self._buffer.empty():
-			chunk = self._buffer.get(block=False)
-			if not chunk or not self._recording:
-				break
 
-			data.append(chunk)
-
-		yield b''.join(data)
+	def __iter__(self):
+		for chunk in self.samples():
+			yield chunk.tobytes()
 
 
 	def audioStream(self) -> Generator:
-		while not self._buffer.empty() or self._recording:
-			if self._timeoutFlag.is_set():
+		while not self._timeoutFlag.is_set():
+			chunk = self._buffer.read()
+			if chunk is None:
 				return
 
-			chunk = self._buffer.get()
-			if not chunk:
-				return
-
-			data = [chunk]
-
-			while self._recording:
-				try:
-					chunk = self._buffer.get(block=False)
-					if not chunk or not self._recording:
-						return
-
-					data.append(chunk)
-				except queue.Empty:
-					break
-
-			yield b''.join(data)
+			# Whatever else came in meanwhile goes along
+			yield chunk.tobytes() + self._buffer.readAll()
@@ -18,12 +18,14 @@
 #  Last modified: 2022.06.20 at 13:00:00 CEST
 
 import json
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
 from core.asr.model.ASRResult import ASRResult
 from core.asr.model.Asr import Asr
-from core.asr.model.Recorder import Recorder
+from core.asr.model.RecognizerPool import RecognizerPool
 from core.dialog.model.DialogSession import DialogSession
 from core.util.Stopwatch import Stopwatch
 
@@ -42,6 +44,10 @@ class VoskAsr(Asr):
 			'vosk'
 		}
 	}
+	SAMPLERATE = 16000
+	MAX_GRAMMAR_PHRASES = 500
+	MAX_GRAMMAR_POOLS = 8
+
 
 	def __init__(self):
 		super().__init__()
@@ -49,6 +55,9 @@ class VoskAsr(Asr):
 		self._isOnlineASR = False
 		self._model: Optional[vosk.Model] = None
 		self._langPath = Path(self.Commons.rootDir(), f'trained/asr/vosk/{self.LanguageManager.activeLanguage}')
+		self._recognizers: Optional[RecognizerPool] = None
+		self._grammarPools: Dict[str, RecognizerPool] = OrderedDict()
+		self._grammarPoolsLock = threading.Lock()
 
 
 	def onStart(self):
@@ -57,30 +66,98 @@ class VoskAsr(Asr):
 		self._model = vosk.Model(lang=self.LanguageManager.activeLanguageAndCountryCode.lower())
 		self.logInfo('Model loaded')
 
+		self._grammarPools = OrderedDict()
+		self._recognizers = RecognizerPool(
+			factory=lambda: vosk.KaldiRecognizer(self._model, self.SAMPLERATE),
+			size=int(self.ConfigManager.getAliceConfigByName('asrRecognizerPool') or 0),
+			reset=self.resetRecognizer
+		)
+		self._recognizers.warm()
+
+
+	def onStop(self):
+		super().onStop()
+		if self._recognizers:
+			self._recognizers.clear()
+
+		with self._grammarPoolsLock:
+			self._grammarPools = OrderedDict()
+
+
+	@staticmethod
+	def resetRecognizer(recognizer):
+		recognizer.Reset()
+
+
+	def recognizerPool(self, session: DialogSession) -> RecognizerPool:
+		"""
+		Sessions expecting a few intents only are decoded against a grammar made of these intents sentences,
+		which is faster and more accurate on short commands. Other sessions use the free form recognizers
+		:param session:
+		:return:
+		"""
+		if not session.intentFilter or not self.ConfigManager.getAliceConfigByName('asrCommandGrammar'):
+			return self._recognizers
+
+		phrases = self.DialogTemplateManager.commandPhrases(intents=session.intentFilter, maxPhrases=self.MAX_GRAMMAR_PHRASES)
+		if not phrases:
+			return self._recognizers
+
+		grammar = json.dumps(phrases + ['[unk]'], ensure_ascii=False)
+		with self._grammarPoolsLock:
+			pool = self._grammarPools.get(grammar)
+			if pool:
+				self._grammarPools.move_to_end(grammar)
+				return pool
+
+			pool = RecognizerPool(
+				factory=lambda: vosk.KaldiRecognizer(self._model, self.SAMPLERATE, grammar),
+				size=1,
+				reset=self.resetRecognizer
+			)
+			self._grammarPools[grammar] = pool
+			if len(self._grammarPools) > self.MAX_GRAMMAR_POOLS:
+				self._grammarPools.popitem(last=False)
+
+		return pool
+
+
+	@property
+	def recognizerStats(self) -> dict:
+		with self._grammarPoolsLock:
+			grammars = [pool.stats for pool in self._grammarPools.values()]
+
+		return {
+			'freeForm': self._recognizers.stats if self._recognizers else dict(),
+			'grammars': grammars
+		}
+
 
 	def decodeStream(self, session: DialogSession) -> Optional[ASRResult]:
-		super().decodeStream(session)
+		context = self.startDecoding(session)
 		result = None
 
 		with Stopwatch() as processingTime:
-			with Recorder(self._timeout, session.user, session.deviceUid) as recorder:
-				self.ASRManager.addRecorder(session.deviceUid, recorder)
-				self._recorder = recorder
-				recognizer = vosk.KaldiRecognizer(self._model, 16000)
-				for chunk in recorder:
-					if not chunk:
-						break
-
-					endOfSpeech = recognizer.AcceptWaveform(chunk)
-					if endOfSpeech:
-						break
-
-					result = json.loads(recognizer.PartialResult())
-					if result['partial']:
-						self.partialTextCaptured(session=session, text=result['partial'], likelihood=1, seconds=0)
-
-				result = json.loads(recognizer.FinalResult())['text']
-				self.end()
+			with context.recorder as recorder:
+				pool = self.recognizerPool(session)
+				recognizer = pool.acquire()
+				try:
+					for chunk in recorder:
+						if not chunk:
+							break
+
+						endOfSpeech = recognizer.AcceptWaveform(chunk)
+						if endOfSpeech:
+							break
+
+						result = json.loads(recognizer.PartialResult())
+						if result['partial']:
+							self.partialTextCaptured(session=session, text=self.cleanText(result['partial']), likelihood=1, seconds=0)
+
+					result = self.cleanText(json.loads(recognizer.FinalResult())['text'])
+				finally:
+					pool.release(recognizer)
+				self.end(session)
 
 		return ASRResult(
 			text=result,
@@ -88,3 +165,9 @@ class VoskAsr(Asr):
 			likelihood=1.0,
 			processingTime=processingTime.time
 		) if result else None
+
+
+	@staticmethod
+	def cleanText(text: str) -> str:
+		# Grammar recognizers output [unk] for whatever is not part of the grammar
+		return ' '.join(word for word in text.split() if word != '[unk]')
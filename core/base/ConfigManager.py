@@ -20,15 +20,18 @@ import inspect
 import json
 import logging
 import re
-import sounddevice as sd
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 from core.ProjectAliceExceptions import ConfigurationUpdateFailed, VitalConfigMissing
 from core.base.SuperManager import SuperManager
 from core.base.model.Manager import Manager
+from core.util.model.LazyModule import lazyImport
 from core.webui.model.UINotificationType import UINotificationType
 
+# Loads PortAudio, only needed to list the audio devices
+sd = lazyImport('sounddevice')
+
 
 class ConfigManager(Manager):
 	TEMPLATE_FILE = Path('configTemplate.json')
@@ -18,29 +18,37 @@
 #  Last modified: 2021.08.02 at 06:12:17 CEST
 
 
+import functools
 import importlib
 import json
+import psutil
 import requests
 import shutil
+import sys
+import threading
+import time
 import traceback
 from AliceGit import Exceptions as GitErrors
 from AliceGit.Exceptions import NotGitRepository, PathNotFoundException
 from AliceGit.Git import Repository
 from contextlib import suppress
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 from core.ProjectAliceExceptions import AccessLevelTooLow, GithubNotFound, SkillInstanceFailed, SkillNotConditionCompliant, SkillStartDelayed, SkillStartingFailed
 from core.base.SuperManager import SuperManager
 from core.base.model import Intent
 from core.base.model.AliceSkill import AliceSkill
 from core.base.model.FailedAliceSkill import FailedAliceSkill
+from core.base.model.IntentRouter import IntentRouter
+from core.base.model.LazyAliceSkill import LazyAliceSkill
 from core.base.model.Manager import Manager
 from core.base.model.Version import Version
 from core.commons import constants
 from core.dialog.model.DialogSession import DialogSession
 from core.util.Decorators import IfSetting, Online, deprecated
 from core.util.model.AliceEvent import AliceEvent
+from core.util.model.DependencyRunner import DependencyRunner, TaskTiming
 from core.webui.model.UINotificationType import UINotificationType
 
 
@@ -85,6 +93,19 @@ class SkillManager(Manager):
 		self._deactivatedSkills: Dict[str, AliceSkill] = dict()
 		self._failedSkills: Dict[str, Union[AliceSkill, FailedAliceSkill]] = dict()
 
+		# Indexes of the active skills, rebuilt on demand after skill lifecycle changes
+		self._intentRouter: Optional[IntentRouter] = None
+		self._eventSubscribers: Dict[str, list] = dict()
+
+		# Skills each skill requires, per their install file, and the time they took to boot
+		self._skillDependencies: Dict[str, List[str]] = dict()
+		self._skillBootTimes: Dict[str, Dict[str, dict]] = dict()
+		self._configLock = threading.Lock()
+
+		# Lazy skills loaded since boot, with when they were last used
+		self._lazyLastUsed: Dict[str, float] = dict()
+		self._lazyLock = threading.RLock()
+
 
 	@property
 	def supportedIntents(self) -> List[Dict]:
@@ -140,6 +161,22 @@ class SkillManager(Manager):
 		return {**self._activeSkills, **self._deactivatedSkills, **self._failedSkills}
 
 
+	@property
+	def intentRouter(self) -> IntentRouter:
+		"""
+		Returns the topic index of the active skills, building it if it was invalidated
+		:return:
+		"""
+		router = self._intentRouter
+		if router is None:
+			cache = self._eventSubscribers
+			router = self.buildIntentRouter()
+			# Do not keep the index if skills changed while it was being built
+			if cache is self._eventSubscribers:
+				self._intentRouter = router
+		return router
+
+
 	@property
 	def skillList(self) -> List:
 		"""
@@ -178,6 +215,7 @@ class SkillManager(Manager):
 		if updates and self.ConfigManager.getAliceConfigByName('skillAutoUpdate'):
 			self.updateSkills(skills=updates, withSkillRestart=False)
 
+		bootStart = time.perf_counter()
 		self.initSkills()
 
 		for skillName in self._deactivatedSkills:
@@ -185,6 +223,10 @@ class SkillManager(Manager):
 
 		self.startAllSkills()
 
+		lazySkills = len([skill for skill in self._activeSkills.values() if isinstance(skill, LazyAliceSkill)])
+		resident = psutil.Process().memory_info().rss / 1024 / 1024
+		self.logInfo(f'Skills booted in {time.perf_counter() - bootStart:.2f} seconds, {lazySkills} lazy, {resident:.0f}MB resident')
+
 
 	def onBooted(self):
 		self.skillBroadcast(constants.EVENT_BOOTED)
@@ -197,6 +239,17 @@ class SkillManager(Manager):
 			self.stopSkill(skillName=skillName)
 
 
+	def onFiveMinute(self):
+		timeout = self.ConfigManager.getAliceConfigByName('lazySkillsIdleUnload')
+		if not timeout:
+			return
+
+		limit = time.monotonic() - int(timeout) * 60
+		for skillName, lastUsed in list(self._lazyLastUsed.items()):
+			if lastUsed < limit:
+				self.unloadSkill(skillName=skillName)
+
+
 	def onQuarterHour(self):
 		if self._busyInstalling.is_set() or self.ProjectAlice.restart or self.ProjectAlice.updating or self.NluManager.training:
 			return
@@ -527,75 +580,121 @@ class SkillManager(Manager):
 	def initSkills(self, onlyInit: str = '', reload: bool = False):
 		"""
 		Initializing skills by checking their condition compliance and instantiating them.
-		Does check if a skill fails and is required
+		Does check if a skill fails and is required. Skills are initialized in parallel, each
+		after the skills it depends on
 		:param onlyInit: If specified, will only init the given skill name
 		:param reload: If the skill is already instantiated, performs a module reload, after an update per example.
 		:return:
 		"""
+		self.invalidateSkillIndexes()
 
-		for skillName in self._skillList:
-			if onlyInit and skillName != onlyInit:
-				continue
+		if onlyInit:
+			if onlyInit in self._skillList:
+				self._initSkill(skillName=onlyInit, reload=reload)
+			return
 
-			self._activeSkills.pop(skillName, None)
-			self._failedSkills.pop(skillName, None)
-			self._deactivatedSkills.pop(skillName, None)
+		self._skillDependencies = {skillName: self.getSkillDependencies(skillName=skillName) for skillName in self._skillList}
+		runner = DependencyRunner(workers=self.ConfigManager.getAliceConfigByName('skillInitWorkers') or 1, name='skillInit')
+		timings = runner.run(
+			tasks={skillName: self.bootProfiled(name=f'{skillName} init', category='skill', func=functools.partial(self._initSkill, skillName=skillName, reload=reload)) for skillName in self._skillList},
+			dependencies=self._skillDependencies
+		)
+		self._recordBootTimes(phase='init', timings=timings)
 
-			try:
-				installFilePath = self.getSkillInstallFilePath(skillName=skillName)
-				installFile = json.loads(installFilePath.read_text())
-			except Exception as e:
-				if skillName in self.NEEDED_SKILLS:
-					self.logFatal(f'Cannot load skill install file for skill **{skillName}**. The skill is required to continue: {e}')
-					return
-				else:
-					self.logWarning(f'Cannot load skill install file for skill **{skillName}**, skipping: {e}')
-					continue
 
-			try:
-				skillActiveState = self.isSkillActive(skillName=skillName)
-				if not skillActiveState:
-					if skillName in self.NEEDED_SKILLS:
-						self.logFatal(f"Skill {skillName} marked as disabled but it cannot be")
-						return
-					else:
-						self.logInfo(f'Skill {skillName} is disabled')
+	def _initSkill(self, skillName: str, reload: bool = False) -> bool:
+		"""
+		Initializes one skill
+		:param skillName:
+		:param reload:
+		:return: False if a required skill failed and Alice cannot continue
+		"""
+		self._activeSkills.pop(skillName, None)
+		self._failedSkills.pop(skillName, None)
+		self._deactivatedSkills.pop(skillName, None)
+		self._lazyLastUsed.pop(skillName, None)
+
+		try:
+			installFilePath = self.getSkillInstallFilePath(skillName=skillName)
+			installFile = json.loads(installFilePath.read_text())
+		except Exception as e:
+			if skillName in self.NEEDED_SKILLS:
+				self.logFatal(f'Cannot load skill install file for skill **{skillName}**. The skill is required to continue: {e}')
+				return False
+			else:
+				self.logWarning(f'Cannot load skill install file for skill **{skillName}**, skipping: {e}')
+				return True
+
+		try:
+			skillActiveState = self.isSkillActive(skillName=skillName)
+			if not skillActiveState:
+				if skillName in self.NEEDED_SKILLS:
+					self.logFatal(f"Skill {skillName} marked as disabled but it cannot be")
+					return False
 				else:
-					self.checkSkillConditions(installFile)
+					self.logInfo(f'Skill {skillName} is disabled')
+			else:
+				self.checkSkillConditions(installFile)
 
+			if skillActiveState and self.isSkillLazy(skillName=skillName):
+				skillInstance = LazyAliceSkill(installer=installFile, skillPath=self.getSkillDirectory(skillName=skillName))
+			else:
 				skillInstance = self.instantiateSkill(skillName=skillName, reload=reload)
-				if skillInstance:
-					if skillName in self.NEEDED_SKILLS:
-						skillInstance.required = True
 
-					if skillActiveState:
-						self._activeSkills[skillInstance.name] = skillInstance
-					else:
-						self._deactivatedSkills[skillName] = skillInstance
+			if skillInstance:
+				if skillName in self.NEEDED_SKILLS:
+					skillInstance.required = True
 
-					self.ConfigManager.loadCheckAndUpdateSkillConfigurations(skillToLoad=skillName)
+				if skillActiveState:
+					self._activeSkills[skillInstance.name] = skillInstance
+					self.invalidateSkillIndexes()
 				else:
-					if skillName in self.NEEDED_SKILLS:
-						self.logFatal('The skill is required to continue...')
-						return
-					else:
-						self._failedSkills[skillName] = FailedAliceSkill(installFile)
-			except SkillNotConditionCompliant as e:
-				if self.notCompliantSkill(skillName=skillName, exception=e):
-					self._failedSkills[skillName] = FailedAliceSkill(installFile)
-					self.changeSkillStateInDB(skillName=skillName, newState=False)
-					continue
-				else:
-					return
-			except Exception as e:
-				self.logError(f'Something went wrong loading skill {skillName}: {repr(e)}', printStack=True)
+					self._deactivatedSkills[skillName] = skillInstance
+
+				# The skill configurations share one file
+				with self._configLock:
+					self.ConfigManager.loadCheckAndUpdateSkillConfigurations(skillToLoad=skillName)
+			else:
 				if skillName in self.NEEDED_SKILLS:
 					self.logFatal('The skill is required to continue...')
-					return
+					return False
 				else:
 					self._failedSkills[skillName] = FailedAliceSkill(installFile)
-					self.changeSkillStateInDB(skillName=skillName, newState=False)
-					continue
+		except SkillNotConditionCompliant as e:
+			if self.notCompliantSkill(skillName=skillName, exception=e):
+				self._failedSkills[skillName] = FailedAliceSkill(installFile)
+				self.changeSkillStateInDB(skillName=skillName, newState=False)
+			else:
+				return False
+		except Exception as e:
+			self.logError(f'Something went wrong loading skill {skillName}: {repr(e)}', printStack=True)
+			if skillName in self.NEEDED_SKILLS:
+				self.logFatal('The skill is required to continue...')
+				return False
+			else:
+				self._failedSkills[skillName] = FailedAliceSkill(installFile)
+				self.changeSkillStateInDB(skillName=skillName, newState=False)
+
+		return True
+
+
+	def getSkillDependencies(self, skillName: str) -> List[str]:
+		"""
+		Returns the installed skills the given skill requires, as declared in its install file conditions
+		:param skillName:
+		:return:
+		"""
+		try:
+			installFile = json.loads(self.getSkillInstallFilePath(skillName=skillName).read_text())
+			dependencies = installFile.get('conditions', dict()).get('skill', list())
+		except Exception:
+			return list()
+
+		if isinstance(dependencies, str):
+			dependencies = [dependencies]
+
+		dependencies = [dependency.split('/')[-1] for dependency in dependencies]
+		return [dependency for dependency in dependencies if dependency in self._skillList]
 
 
 	def getSkillInstallFilePath(self, skillName: str) -> Path:
@@ -794,6 +893,7 @@ class SkillManager(Manager):
 		if skillName in self._activeSkills:
 			skill = self._activeSkills.pop(skillName, None)
 			self.deactivatedSkills[skillName] = skill
+			self.invalidateSkillIndexes()
 			skill.onStop()
 			self.broadcast(
 				method=constants.EVENT_SKILL_STOPPED,
@@ -811,6 +911,8 @@ class SkillManager(Manager):
 		:param state:
 		:return:
 		"""
+		self.invalidateSkillIndexes()
+
 		try:
 			skills = self.allWorkingSkills
 			confs = [{
@@ -842,29 +944,101 @@ class SkillManager(Manager):
 
 	def startAllSkills(self):
 		"""
-		Starts all the discovered skills
+		Starts all the discovered skills, in parallel, each after the skills it depends on.
+		They are then broadcasted as started all at once
 		:return:
 		"""
 		supportedIntents = list()
 
-		for skillName in self._activeSkills.copy():
-			try:
-				supportedIntents += self.startSkill(skillName)
-			except SkillStartingFailed:
+		# Verify the tables of all the skills at once, they then find their schema up to date when starting
+		self.DatabaseManager.initDBs({skill.name: skill.databaseSchema for skill in self._activeSkills.values() if skill.databaseSchema})
+
+		skillNames = list(self._activeSkills)
+		runner = DependencyRunner(workers=self.ConfigManager.getAliceConfigByName('skillInitWorkers') or 1, name='skillStart')
+		timings = runner.run(
+			tasks={skillName: self.bootProfiled(name=f'{skillName} start', category='skill', func=functools.partial(self._startSkillOnBoot, skillName=skillName)) for skillName in skillNames},
+			dependencies=self._skillDependencies
+		)
+		self._recordBootTimes(phase='start', timings=timings)
+
+		started = list()
+		for skillName in skillNames:
+			timing = timings.get(skillName)
+			if not timing or timing.result is None:
 				continue
-			except SkillStartDelayed:
-				self.logInfo(f'Skill {skillName} start is delayed')
+
+			supportedIntents += timing.result
+			if skillName in self._activeSkills and not self._activeSkills[skillName].failedStarting:
+				started.append(skillName)
 
 		supportedIntents = list(set(supportedIntents))
 		self._supportedIntents = supportedIntents
 
+		if started:
+			self.broadcast(
+				method=constants.EVENT_SKILLS_STARTED,
+				exceptions=[constants.DUMMY],
+				propagateToSkills=True,
+				skills=started
+			)
+
+			# Skills still listening to single skill starts, there's no need to broadcast those everywhere
+			for skillName in started:
+				self.skillBroadcast(method=constants.EVENT_SKILL_STARTED, skill=skillName)
+
 		self.logInfo(f'Skills started. {len(supportedIntents)} intents supported')
+		self._logBootReport()
+
+
+	def _startSkillOnBoot(self, skillName: str) -> Optional[Dict]:
+		"""
+		Starts a skill without broadcasting it
+		:param skillName:
+		:return: the skill supported intents, None if the skill failed or is delayed
+		"""
+		try:
+			return self.startSkill(skillName, broadcast=False)
+		except SkillStartingFailed:
+			return None
+		except SkillStartDelayed:
+			self.logInfo(f'Skill {skillName} start is delayed')
+			return None
+
+
+	def _recordBootTimes(self, phase: str, timings: Dict[str, TaskTiming]):
+		for skillName, timing in timings.items():
+			self._skillBootTimes.setdefault(skillName, dict())[phase] = timing.toDict()
 
 
-	def startSkill(self, skillName: str) -> Dict:
+	@property
+	def skillBootReport(self) -> Dict[str, dict]:
+		"""
+		Wall and cpu time spent initializing and starting each skill on boot, the slowest first
+		:return:
+		"""
+		report = dict()
+		for skillName, phases in self._skillBootTimes.items():
+			report[skillName] = {**phases, 'total': round(sum(phase['wallTime'] for phase in phases.values()), 4)}
+
+		return dict(sorted(report.items(), key=lambda item: item[1]['total'], reverse=True))
+
+
+	def _logBootReport(self):
+		report = self.skillBootReport
+		if not report:
+			return
+
+		slowest = ', '.join(f'{skillName} {times["total"]:.2f}s' for skillName, times in list(report.items())[:5])
+		self.logInfo(f'Slowest skills to boot: {slowest}')
+		for skillName, times in report.items():
+			self.logDebug(f'{skillName}: init {times.get("init", dict()).get("wallTime", 0):.3f}s, start {times.get("start", dict()).get("wallTime", 0):.3f}s')
+
+
+	def startSkill(self, skillName: str, broadcast: bool = True) -> Dict:
 		"""
 		Starts a skill
 		:param skillName:
+		:param broadcast: Whether to broadcast the skill as started, on boot they are all broadcasted at once
 		:return:
 		"""
 		if skillName in self._activeSkills:
@@ -891,16 +1065,18 @@ class SkillManager(Manager):
 			return dict()
 
 		try:
+			self.invalidateSkillIndexes()
 			skillInstance.onStart()
 			if self.ProjectAlice.isBooted:
 				skillInstance.onBooted()
 
-			self.broadcast(
-				method=constants.EVENT_SKILL_STARTED,
-				exceptions=[constants.DUMMY],
-				propagateToSkills=True,
-				skill=skillName
-			)
+			if broadcast:
+				self.broadcast(
+					method=constants.EVENT_SKILL_STARTED,
+					exceptions=[constants.DUMMY],
+					propagateToSkills=True,
+					skill=skillName
+				)
 		except SkillStartingFailed:
 			try:
 				skillInstance.failedStarting = True
@@ -917,6 +1093,7 @@ class SkillManager(Manager):
 			except:
 				self._activeSkills.pop(skillName, None)
 				self._deactivatedSkills.pop(skillName, None)
+				self.invalidateSkillIndexes()
 
 			self._failedSkills[skillName] = FailedAliceSkill(skillInstance.installer)
 
@@ -1018,15 +1195,159 @@ class SkillManager(Manager):
 		)
 
 
+	@staticmethod
+	def isCatchAll(skillInstance: Union[AliceSkill, LazyAliceSkill]) -> bool:
+		"""
+		Whether the skill overrides the message filtering, in which case it receives every message
+		:param skillInstance:
+		:return:
+		"""
+		if isinstance(skillInstance, LazyAliceSkill):
+			return False
+
+		klass = type(skillInstance)
+		return getattr(klass, 'onMessageDispatch', None) is not AliceSkill.onMessageDispatch or getattr(klass, 'filterIntent', None) is not AliceSkill.filterIntent
+
+
+	def isSkillLazy(self, skillName: str) -> bool:
+		"""
+		Whether the skill is configured to only be loaded once used. Required skills and skills
+		with devices or widgets are always loaded on boot
+		:param skillName:
+		:return:
+		"""
+		lazySkills = {name.strip() for name in (self.ConfigManager.getAliceConfigByName('lazySkills') or '').split(',')}
+		if skillName not in lazySkills or skillName in self.NEEDED_SKILLS:
+			return False
+
+		if not LazyAliceSkill.canBeLazy(self.getSkillDirectory(skillName=skillName)):
+			self.logInfo(f'Skill **{skillName}** has devices or widgets, it cannot be lazy')
+			return False
+
+		return True
+
+
+	def loadLazySkill(self, skillName: str) -> Optional[AliceSkill]:
+		"""
+		Imports and starts a lazy skill, replacing its placeholder
+		:param skillName:
+		:return: the started skill, None if it failed
+		"""
+		with self._lazyLock:
+			skill = self._activeSkills.get(skillName, None)
+			if not isinstance(skill, LazyAliceSkill):
+				return skill
+
+			self.logInfo(f'Loading lazy skill **{skillName}**')
+			skillInstance = self.instantiateSkill(skillName=skillName)
+			if not skillInstance:
+				skill.onStop()
+				self._activeSkills.pop(skillName, None)
+				self._failedSkills[skillName] = FailedAliceSkill(skill.installer)
+				self.invalidateSkillIndexes()
+				return None
+
+			self._activeSkills[skillName] = skillInstance
+			self._lazyLastUsed[skillName] = time.monotonic()
+
+			try:
+				self.startSkill(skillName)
+			except SkillStartDelayed:
+				self.logInfo(f'Skill {skillName} start is delayed')
+
+			return self._activeSkills.get(skillName, None)
+
+
+	def unloadSkill(self, skillName: str) -> bool:
+		"""
+		Stops a lazy skill that was loaded and puts its placeholder back, freeing its code. Skills with
+		timers still pending are kept
+		:param skillName:
+		:return: whether the skill was unloaded
+		"""
+		with self._lazyLock:
+			skillInstance = self._activeSkills.get(skillName, None)
+			if not skillInstance or isinstance(skillInstance, LazyAliceSkill):
+				self._lazyLastUsed.pop(skillName, None)
+				return False
+
+			if self.ThreadManager.hasPendingTimers(owner=skillInstance):
+				return False
+
+			self.logInfo(f'Unloading idle skill **{skillName}**')
+			self._lazyLastUsed.pop(skillName, None)
+			skillInstance.onStop()
+
+			placeholder = LazyAliceSkill(installer=skillInstance.installer, skillPath=self.getSkillDirectory(skillName=skillName))
+			self._activeSkills[skillName] = placeholder
+			self.invalidateSkillIndexes()
+			placeholder.onStart()
+
+			# Drop the skill modules, so that they can be garbage collected
+			for module in [name for name in sys.modules if name == f'skills.{skillName}' or name.startswith(f'skills.{skillName}.')]:
+				sys.modules.pop(module, None)
+
+			skillsPackage = sys.modules.get('skills', None)
+			if skillsPackage:
+				skillsPackage.__dict__.pop(skillName, None)
+
+			return True
+
+
+	def buildIntentRouter(self) -> IntentRouter:
+		"""
+		Indexes the supported intents of the active skills. Skills overriding the message filtering
+		cannot be indexed and receive every message, as they used to
+		:return:
+		"""
+		router = IntentRouter()
+		for skillName, skillInstance in self._activeSkills.copy().items():
+			router.addSkill(skillName=skillName, intents=skillInstance.supportedIntents, catchAll=self.isCatchAll(skillInstance))
+
+		self.logDebug(f'Indexed {router.intentCount} intents for {router.skillCount} skills')
+		return router
+
+
+	def invalidateSkillIndexes(self):
+		"""
+		Flags the intent index and the event subscribers as outdated, they will be rebuilt on next use
+		:return:
+		"""
+		self._intentRouter = None
+		self._eventSubscribers = dict()
+
+
 	def dispatchMessage(self, session: DialogSession) -> bool:
 		"""
 		Dispatches a MQTT message to skills until one accepts it and returns True. If the intent wasn't consumed, return False
 		:param session:
 		:return:
 		"""
-		for skillName, skillInstance in self._activeSkills.items():
+		for skillName, intent in self.intentRouter.match(session.message.topic):
+			skillInstance = self._activeSkills.get(skillName, None)
+			if not skillInstance:
+				continue
+
+			if isinstance(skillInstance, LazyAliceSkill):
+				skillInstance = self.loadLazySkill(skillName=skillName)
+				if not skillInstance:
+					continue
+
+				# The intent was routed from what the skill declares, the skill now tells how it handles it
+				if self.isCatchAll(skillInstance):
+					intent = None
+				elif intent is not None:
+					intent = skillInstance.supportedIntents.get(str(intent), None)
+					if not intent:
+						continue
+			elif skillName in self._lazyLastUsed:
+				self._lazyLastUsed[skillName] = time.monotonic()
+
 			try:
-				consumed = skillInstance.onMessageDispatch(session)
+				if intent is None:
+					consumed = skillInstance.onMessageDispatch(session)
+				else:
+					consumed = skillInstance.onMessageDispatch(session, intent=intent)
 			except AccessLevelTooLow:
 				# The command was recognized but required higher access level
 				return True
@@ -1121,7 +1442,13 @@ class SkillManager(Manager):
 		:return:
 		"""
 		if skillName in self._activeSkills:
-			return self._activeSkills[skillName]
+			skillInstance = self._activeSkills[skillName]
+			if isinstance(skillInstance, LazyAliceSkill):
+				return self.loadLazySkill(skillName=skillName)
+
+			if skillName in self._lazyLastUsed:
+				self._lazyLastUsed[skillName] = time.monotonic()
+			return skillInstance
 		elif skillName in self._deactivatedSkills:
 			return self._deactivatedSkills[skillName]
 		elif skillName in self._failedSkills:
@@ -1144,24 +1471,45 @@ class SkillManager(Manager):
 		if not method.startswith('on'):
 			method = f'on{method[0].capitalize() + method[1:]}'
 
-		for skillName, skillInstance in self._activeSkills.items():
+		for skillName, func, eventFunc in self.getEventSubscribers(method):
 
 			if filterOut and skillName in filterOut:
 				continue
 
 			try:
-				func = getattr(skillInstance, method, None)
 				if func:
 					func(**kwargs)
 
-				func = getattr(skillInstance, 'onEvent', None)
-				if func:
-					func(event=method, **kwargs)
+				if eventFunc:
+					eventFunc(event=method, **kwargs)
 
 			except TypeError as e:
 				self.logWarning(f'Failed to broadcast event {method} to {skillName}: {e}')
 
 
+	def getEventSubscribers(self, method: str) -> List[Tuple[str, Optional[Callable], Optional[Callable]]]:
+		"""
+		Returns the active skills implementing the given event handler or a generic onEvent handler,
+		with both handlers already bound. Skills only inheriting the empty handlers are left out
+		:param method: the event handler name, onXxx
+		:return:
+		"""
+		cache = self._eventSubscribers
+		subscribers = cache.get(method, None)
+		if subscribers is not None:
+			return subscribers
+
+		subscribers = list()
+		for skillName, skillInstance in self._activeSkills.copy().items():
+			func = getattr(skillInstance, method) if skillInstance.handlesEvent(method) else None
+			eventFunc = getattr(skillInstance, 'onEvent', None)
+			if func or eventFunc:
+				subscribers.append((skillName, func, eventFunc))
+
+		cache[method] = subscribers
+		return subscribers
+
+
 	def removeSkill(self, skillName: str):
 		"""
 		Deletes a skill completely
@@ -1185,6 +1533,7 @@ class SkillManager(Manager):
 		self._failedSkills.pop(skillName, None)
 
 		self.removeSkillFromDB(skillName=skillName)
+		self.invalidateSkillIndexes()
 
 		with suppress():
 			repo = self.getSkillRepository(skillName=skillName)
@@ -1267,6 +1616,7 @@ class SkillManager(Manager):
 		self._deactivatedSkills = dict()
 		self._failedSkills = dict()
 		self._skillList = dict()
+		self.invalidateSkillIndexes()
 
 
 	def isSkillUserModified(self, skillName: str) -> bool:
@@ -19,7 +19,10 @@
 
 from __future__ import annotations
 
+from typing import Dict, List
+
 from core.device.model.DeviceAbility import DeviceAbility
+from core.util.model.BootProfiler import BootProfiler
 from core.util.model.Logger import Logger
 
 
@@ -39,6 +42,10 @@ class SuperManager(object):
 		SuperManager._INSTANCE = self
 		self._managers = dict()
 
+		# Per event name, the managers implementing the handler. Only cached once the managers are all started
+		self._eventSubscribers: Dict[str, list] = dict()
+		self._cacheEventSubscribers = False
+
 		self.projectAlice             = mainClass
 		self.AliceWatchManager        = None #NOSONAR
 		self.ApiManager               = None #NOSONAR
@@ -79,46 +86,51 @@ class SuperManager(object):
 
 
 	def onStart(self):
+		self.invalidateEventSubscribers(cache=False)
+
 		try:
 			bugReportManager = self._managers.pop('BugReportManager')
-			bugReportManager.onStart()
+			self._startManager(bugReportManager)
 			self._managers[bugReportManager.name] = bugReportManager
 
 			commons = self._managers.pop('CommonsManager')
-			commons.onStart()
+			self._startManager(commons)
 
 			stateManager = self._managers.pop('StateManager')
-			stateManager.onStart()
+			self._startManager(stateManager)
 
 			subprocessManager = self._managers.pop('SubprocessManager')
-			subprocessManager.onStart()
+			self._startManager(subprocessManager)
 
 			configManager = self._managers.pop('ConfigManager')
-			configManager.onStart()
+			self._startManager(configManager)
 
 			languageManager = self._managers.pop('LanguageManager')
-			languageManager.onStart()
+			self._startManager(languageManager)
 
 			webUINotificationManager = self._managers.pop('WebUINotificationManager')
-			webUINotificationManager.onStart()
+			self._startManager(webUINotificationManager)
 
 			locationManager = self._managers.pop('LocationManager')
-			locationManager.onStart()
+			self._startManager(locationManager)
 
 			audioServer = self._managers.pop('AudioManager')
-			audioServer.onStart()
+			self._startManager(audioServer)
 
 			internetManager = self._managers.pop('InternetManager')
-			internetManager.onStart()
+			self._startManager(internetManager)
 
 			databaseManager = self._managers.pop('DatabaseManager')
-			databaseManager.onStart()
+			self._startManager(databaseManager)
+
+			# Verify the tables of the managers still to start at once, they then find their schema up to date
+			databaseManager.initDBs({manager.name: manager.databaseSchema for manager in self._managers.values() if manager and manager.databaseSchema})
 
 			userManager = self._managers.pop('UserManager')
-			userManager.onStart()
+			self._startManager(userManager)
 
 			mqttManager = self._managers.pop('MqttManager')
-			mqttManager.onStart()
+			self._startManager(mqttManager)
 
 			talkManager = self._managers.pop('TalkManager')
 			skillManager = self._managers.pop('SkillManager')
@@ -131,16 +143,16 @@ class SuperManager(object):
 
 			for manager in self._managers.copy().values():
 				if manager and manager.name != self.BugReportManager.name:
-					manager.onStart()
+					self._startManager(manager)
 
-			talkManager.onStart()
-			nluManager.onStart()
-			skillManager.onStart()
-			deviceManager.onStart()
-			widgetManager.onStart()
-			dialogTemplateManager.onStart()
-			assistantManager.onStart()
-			nodeRedManager.onStart()
+			self._startManager(talkManager)
+			self._startManager(nluManager)
+			self._startManager(skillManager)
+			self._startManager(deviceManager)
+			self._startManager(widgetManager)
+			self._startManager(dialogTemplateManager)
+			self._startManager(assistantManager)
+			self._startManager(nodeRedManager)
 
 			self._managers[configManager.name] = configManager
 			self._managers[audioServer.name] = audioServer
@@ -168,13 +180,21 @@ class SuperManager(object):
 			traceback.print_exc()
 			Logger().logFatal(f'Error while starting managers: {e}')
 
+		self.invalidateEventSubscribers(cache=True)
+
+
+	def _startManager(self, manager):
+		with BootProfiler.spanFor(self.projectAlice, name=f'{manager.name}.onStart', category='manager'):
+			manager.onStart()
+
 
 	def onBooted(self):
 		manager = None
 		try:
 			for manager in self._managers.values():
 				if manager:
-					manager.onBooted()
+					with BootProfiler.spanFor(self.projectAlice, name=f'{manager.name}.onBooted', category='manager'):
+						manager.onBooted()
 		except Exception as e:
 			Logger().logError(f'Error while sending onBooted to manager **{manager.name}**: {e}')
 
@@ -260,9 +280,12 @@ class SuperManager(object):
 		self.WebUINotificationManager = WebUINotificationManager()
 
 		self._managers = {name: manager for name, manager in self.__dict__.items() if name.endswith('Manager')}
+		self.invalidateEventSubscribers(cache=False)
 
 
 	def onStop(self):
+		self.invalidateEventSubscribers(cache=False)
+
 		mqttManager = self._managers.pop('MqttManager', None) # Mqtt goes down last with bug reporter
 		bugReportManager = self._managers.pop('BugReportManager', None) # bug reporter goes down as last
 
@@ -293,6 +316,41 @@ class SuperManager(object):
 				Logger().logError(f'Error stopping BugReportManager: {e}')
 
 
+	def getEventSubscribers(self, method: str) -> List:
+		"""
+		Returns the managers implementing the given event handler, the ones inheriting the empty handler are left out
+		:param method: the event handler name, onXxx
+		:return:
+		"""
+		subscribers = self._eventSubscribers.get(method, None)
+		if subscribers is not None:
+			return subscribers
+
+		subscribers = list()
+		for name, manager in self._managers.copy().items():
+			if not manager:
+				self._managers.pop(name, None)
+				continue
+
+			if manager.handlesEvent(method):
+				subscribers.append(manager)
+
+		if self._cacheEventSubscribers:
+			self._eventSubscribers[method] = subscribers
+
+		return subscribers
+
+
+	def invalidateEventSubscribers(self, cache: bool = True):
+		"""
+		Clears the event subscribers cache, to be called whenever the managers change
+		:param cache: Whether subscribers can be cached again. Not the case while managers are starting or stopping
+		:return:
+		"""
+		self._cacheEventSubscribers = cache
+		self._eventSubscribers = dict()
+
+
 	def getManager(self, managerName: str):
 		return self._managers.get(managerName, None)
 
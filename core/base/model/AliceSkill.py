@@ -29,10 +29,11 @@ from copy import copy
 from markdown import markdown
 from paho.mqtt import client as MQTTClient
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Union
+from typing import Any, Dict, Generator, Iterable, List, Optional, Union
 
 from core.ProjectAliceExceptions import AccessLevelTooLow, SkillInstanceFailed
 from core.base.model.Intent import Intent
+from core.base.model.IntentRouter import IntentRouter
 from core.base.model.ProjectAliceObject import ProjectAliceObject
 from core.base.model.Version import Version
 from core.commons import constants
@@ -377,6 +378,11 @@ class AliceSkill(ProjectAliceObject):
 		self._name = value
 
 
+	@property
+	def databaseSchema(self) -> Optional[dict]:
+		return self._databaseSchema
+
+
 	@property
 	def author(self) -> str:
 		return self._author
@@ -518,9 +524,7 @@ class AliceSkill(ProjectAliceObject):
 
 	@staticmethod
 	def intentNameMoreSpecific(intentName: str, oldIntentName: str) -> bool:
-		cleanedIntentName = intentName.rstrip('#').split('+')[0]
-		cleanedOldIntentName = oldIntentName.rstrip('#').split('+')[0]
-		return cleanedIntentName > cleanedOldIntentName
+		return IntentRouter.intentNameMoreSpecific(intentName, oldIntentName)
 
 
 	def filterIntent(self, session: DialogSession) -> Optional[Intent]:
@@ -539,8 +543,18 @@ class AliceSkill(ProjectAliceObject):
 		return matchingIntent
 
 
-	def onMessageDispatch(self, session: DialogSession) -> bool:
-		intent = self.filterIntent(session)
+	def onMessageDispatch(self, session: DialogSession, intent: Intent = None) -> bool:
+		"""
+		Handles the session message
+		:param session:
+		:param intent: the matching intent, if already resolved by the skill manager intent router
+		:return:
+		"""
+		if intent is None:
+			intent = self.filterIntent(session)
+		elif not self.active:
+			return False
+
 		if not intent:
 			return False
 
@@ -660,8 +674,16 @@ class AliceSkill(ProjectAliceObject):
 		return self.DatabaseManager.fetch(tableName=tableName, query=query, values=values, callerName=self.name)
 
 
-	def databaseInsert(self, tableName: str, query: str = None, values: dict = None) -> int:
-		return self.DatabaseManager.insert(tableName=tableName, query=query, values=values, callerName=self.name)
+	def databaseIterFetch(self, tableName: str, query: str, values: dict = None, rowType: str = 'dict', pageSize: int = 0) -> Generator:
+		return self.DatabaseManager.iterFetch(tableName=tableName, query=query, values=values, callerName=self.name, rowType=rowType, pageSize=pageSize)
+
+
+	def databaseInsert(self, tableName: str, query: str = None, values: dict = None, blocking: bool = True) -> Optional[int]:
+		return self.DatabaseManager.insert(tableName=tableName, query=query, values=values, callerName=self.name, blocking=blocking)
+
+
+	def databaseInsertMany(self, tableName: str, values: Iterable[dict], query: str = None, chunkSize: int = 500) -> int:
+		return self.DatabaseManager.insertMany(tableName=tableName, query=query, values=values, callerName=self.name, chunkSize=chunkSize)
 
 
 	def randomTalk(self, text: str, replace: Union[str, List] = None, skill: str = None) -> str:
@@ -0,0 +1,131 @@
+#  Copyright (c) 2021
+#
+#  This file, IntentRouter.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+from typing import Dict, List, Optional, Tuple, Union
+
+from core.base.model.Intent import Intent
+
+
+class TopicNode(object):
+	__slots__ = ['children', 'entries']
+
+
+	def __init__(self):
+		self.children: Dict[str, TopicNode] = dict()
+		self.entries: List[Tuple[int, int, str, str, Union[Intent, str]]] = list()
+
+
+class IntentRouter(object):
+	"""
+	Topic trie built from the skills supported intents. Maps an incoming mqtt topic
+	straight to the skills subscribed to it, following the mqtt wildcard rules
+	"""
+
+	def __init__(self):
+		self._root = TopicNode()
+		self._catchAll: List[Tuple[int, str]] = list()
+		self._skillCount = 0
+		self._intentCount = 0
+
+
+	@property
+	def skillCount(self) -> int:
+		return self._skillCount
+
+
+	@property
+	def intentCount(self) -> int:
+		return self._intentCount
+
+
+	def addSkill(self, skillName: str, intents: Dict[str, Union[Intent, str]], catchAll: bool = False):
+		"""
+		Indexes the given skill intents. Skills are matched in the order they are added
+		:param skillName:
+		:param intents: the skill supported intents, topic as key
+		:param catchAll: the skill filters intents by itself and gets every message
+		:return:
+		"""
+		order = self._skillCount
+		self._skillCount += 1
+
+		if catchAll:
+			self._catchAll.append((order, skillName))
+			return
+
+		for index, (intentName, intent) in enumerate(intents.items()):
+			node = self._root
+			for level in str(intentName).split('/'):
+				node = node.children.setdefault(level, TopicNode())
+
+			node.entries.append((order, index, skillName, str(intentName), intent))
+			self._intentCount += 1
+
+
+	def match(self, topic: str) -> List[Tuple[str, Optional[Union[Intent, str]]]]:
+		"""
+		Returns the skills concerned by the given topic, in skill order, with the most specific
+		matching intent of each skill. Catch all skills are returned with None as intent
+		:param topic:
+		:return:
+		"""
+		levels = topic.split('/')
+		found = list()
+		self._walk(self._root, levels, 0, found, topic.startswith('$'))
+		found.sort(key=lambda entry: (entry[0], entry[1]))
+
+		best: Dict[str, list] = dict()
+		for order, _index, skillName, intentName, intent in found:
+			current = best.get(skillName)
+			if not current or self.intentNameMoreSpecific(intentName, current[1]):
+				best[skillName] = [order, intentName, intent]
+
+		candidates = [(order, skillName, intent) for skillName, (order, _intentName, intent) in best.items()]
+		candidates.extend((order, skillName, None) for order, skillName in self._catchAll)
+		candidates.sort(key=lambda entry: entry[0])
+
+		return [(skillName, intent) for _order, skillName, intent in candidates]
+
+
+	def _walk(self, node: TopicNode, levels: List[str], depth: int, found: list, systemTopic: bool):
+		# Wildcards on first level do not match topics starting with $, as per mqtt specs
+		wildcards = not (depth == 0 and systemTopic)
+
+		if wildcards and '#' in node.children:
+			found.extend(node.children['#'].entries)
+
+		if depth == len(levels):
+			found.extend(node.entries)
+			return
+
+		child = node.children.get(levels[depth])
+		if child:
+			self._walk(child, levels, depth + 1, found, systemTopic)
+
+		if wildcards:
+			child = node.children.get('+')
+			if child:
+				self._walk(child, levels, depth + 1, found, systemTopic)
+
+
+	@staticmethod
+	def intentNameMoreSpecific(intentName: str, oldIntentName: str) -> bool:
+		cleanedIntentName = intentName.rstrip('#').split('+')[0]
+		cleanedOldIntentName = oldIntentName.rstrip('#').split('+')[0]
+		return cleanedIntentName > cleanedOldIntentName
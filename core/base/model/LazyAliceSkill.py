@@ -0,0 +1,219 @@
+#  Copyright (c) 2021
+#
+#  This file, LazyAliceSkill.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+from AliceGit.Git import Repository
+from core.base.model.Intent import Intent
+from core.base.model.ProjectAliceObject import ProjectAliceObject
+from core.base.model.Version import Version
+from core.commons import constants
+from core.dialog.model.DialogSession import DialogSession
+
+
+class LazyAliceSkill(ProjectAliceObject):
+	"""
+	Stands for an active skill whose code isn't loaded yet. It subscribes the intents the skill declares
+	in its dialog template, so that they are trained and routed, and the skill manager replaces it with
+	the real skill when the first of them, or the skill itself, is asked for
+	"""
+
+	def __init__(self, installer: dict, skillPath: Path):
+		self._installer = installer
+		self._name = installer['name']
+		self._version = self._installer.get('version', '0.0.1')
+		self._icon = self._installer.get('icon', 'fas fa-biohazard')
+		self._aliceMinVersion = Version.fromString(self._installer.get('aliceMinVersion', '1.0.0-b4'))
+		self._maintainers = self._installer.get('maintainers', list())
+		self._description = self._installer.get('desc', '')
+		self._category = self._installer.get('category', constants.UNKNOWN)
+		self._conditions = self._installer.get('conditions', dict())
+		self._skillPath = skillPath
+		self._repository: Optional[Repository] = None
+		self._active = True
+		super().__init__()
+		self._supportedIntents: Dict[str, Intent] = self.loadDeclaredIntents()
+
+
+	@staticmethod
+	def canBeLazy(skillPath: Path) -> bool:
+		"""
+		Skills bringing devices or widgets are needed as soon as those are displayed or used, they cannot wait
+		:param skillPath:
+		:return:
+		"""
+		return not (skillPath / 'devices').is_dir() and not (skillPath / 'widgets').is_dir()
+
+
+	def loadDeclaredIntents(self) -> Dict[str, Intent]:
+		"""
+		Reads the intents the skill declares in its dialog template for the active language
+		:return:
+		"""
+		intents = dict()
+		try:
+			dialogTemplate = json.loads(self.getResource(f'dialogTemplate/{self.LanguageManager.activeLanguage}.json').read_text())
+		except FileNotFoundError:
+			return intents
+		except ValueError as e:
+			self.logWarning(f'Dialog template of skill **{self._name}** is corrupted: {e}')
+			return intents
+
+		for intentDefinition in dialogTemplate.get('intents', list()):
+			intent = Intent(intentDefinition['name'])
+			intents[str(intent)] = intent
+
+		return intents
+
+
+	@staticmethod
+	def onMessageDispatch(_session: DialogSession, intent: Intent = None) -> bool:
+		return False
+
+
+	def onStart(self):
+		self.SkillManager.configureSkillIntents(self._name, True)
+
+
+	def onStop(self):
+		self._active = False
+		self.SkillManager.configureSkillIntents(self._name, False)
+
+
+	def onBooted(self) -> bool:
+		return True
+
+
+	def subscribeIntents(self):
+		self.MqttManager.subscribeSkillIntents(self._supportedIntents)
+
+
+	def unsubscribeIntents(self):
+		self.MqttManager.unsubscribeSkillIntents(self._supportedIntents)
+
+
+	def __repr__(self) -> str:
+		return json.dumps(self.toDict())
+
+
+	def __str__(self) -> str:
+		return self.__repr__()
+
+
+	@property
+	def name(self) -> str:
+		return self._name
+
+
+	@property
+	def version(self) -> str:
+		return self._version
+
+
+	@property
+	def installer(self) -> dict:
+		return self._installer
+
+
+	@property
+	def conditions(self) -> dict:
+		return self._conditions
+
+
+	@property
+	def supportedIntents(self) -> Dict[str, Intent]:
+		return self._supportedIntents
+
+
+	@property
+	def active(self) -> bool:
+		return self._active
+
+
+	@property
+	def required(self) -> bool:
+		return False
+
+
+	@property
+	def delayed(self) -> bool:
+		return False
+
+
+	@property
+	def failedStarting(self) -> bool:
+		return False
+
+
+	@property
+	def databaseSchema(self) -> Optional[dict]:
+		return None
+
+
+	@property
+	def widgets(self) -> list:
+		return list()
+
+
+	@property
+	def deviceTypes(self) -> list:
+		return list()
+
+
+	@property
+	def repository(self) -> Repository:
+		if not self._repository:
+			self._repository = Repository(directory=self._skillPath, init=True, raiseIfExisting=False)
+		return self._repository
+
+
+	@property
+	def modified(self) -> bool:
+		return self.repository.isDirty()
+
+
+	@property
+	def skillPath(self) -> Path:
+		return self._skillPath
+
+
+	def getResource(self, resourcePathFile: str = '') -> Path:
+		return self.skillPath / resourcePathFile
+
+
+	def toDict(self) -> dict:
+		return {
+			'name'           : self._name,
+			'author'         : self._installer.get('author', constants.UNKNOWN),
+			'version'        : self._version,
+			'modified'       : self.modified,
+			'updateAvailable': False,
+			'active'         : self._active,
+			'lazy'           : True,
+			'maintainers'    : self._maintainers,
+			'settings'       : self.ConfigManager.getSkillConfigs(self._name),
+			'icon'           : self._icon,
+			'description'    : self._description,
+			'category'       : self._category,
+			'aliceMinVersion': str(self._aliceMinVersion)
+		}
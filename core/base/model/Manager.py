@@ -17,7 +17,7 @@
 #
 #  Last modified: 2021.04.13 at 12:56:46 CEST
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Generator, Iterable, List, Optional
 
 from core.base.SuperManager import SuperManager
 from core.base.model.ProjectAliceObject import ProjectAliceObject
@@ -40,6 +40,11 @@ class Manager(ProjectAliceObject):
 		return self._name
 
 
+	@property
+	def databaseSchema(self) -> Optional[dict]:
+		return self._databaseSchema
+
+
 	@property
 	def isActive(self) -> bool:
 		return self._isActive
@@ -106,8 +111,19 @@ class Manager(ProjectAliceObject):
 		return self.DatabaseManager.fetch(tableName=tableName, query=query, values=values, callerName=self.name)
 
 
-	def databaseInsert(self, tableName: str, query: str = None, values: dict = None) -> int:
-		return self.DatabaseManager.insert(tableName=tableName, query=query, values=values, callerName=self.name)
+	def databaseIterFetch(self, tableName: str, query: str = None, values: dict = None, rowType: str = 'dict', pageSize: int = 0) -> Generator[Any, None, None]:
+		if not query:
+			query = 'SELECT * FROM :__table__'
+
+		return self.DatabaseManager.iterFetch(tableName=tableName, query=query, values=values, callerName=self.name, rowType=rowType, pageSize=pageSize)
+
+
+	def databaseInsert(self, tableName: str, query: str = None, values: dict = None, blocking: bool = True) -> Optional[int]:
+		return self.DatabaseManager.insert(tableName=tableName, query=query, values=values, callerName=self.name, blocking=blocking)
+
+
+	def databaseInsertMany(self, tableName: str, values: Iterable[dict], query: str = None, chunkSize: int = 500) -> int:
+		return self.DatabaseManager.insertMany(tableName=tableName, query=query, values=values, callerName=self.name, chunkSize=chunkSize)
 
 
 	def pruneTable(self, tableName: str):
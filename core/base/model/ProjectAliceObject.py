@@ -24,11 +24,12 @@ import re
 from copy import copy
 from importlib_metadata import PackageNotFoundError, version as packageVersion
 from pathlib import Path
-from typing import TYPE_CHECKING, Union
+from typing import Callable, TYPE_CHECKING, Union
 
 import core.base.SuperManager as SM
 from core.base.model.Version import Version
 from core.commons import constants
+from core.util.model.BootProfiler import BootProfiler
 from core.util.model.Logger import Logger
 
 
@@ -113,27 +114,20 @@ class ProjectAliceObject(object):
 			method = f'on{method[0].capitalize() + method[1:]}'
 
 		# Give absolute priority to DialogManager
+		dialogManager = SM.SuperManager.getInstance().getManager('DialogManager')
 		try:
-			func = getattr(SM.SuperManager.getInstance().getManager('DialogManager'), method, None)
-			if func:
-				func(**kwargs)
+			if dialogManager and dialogManager.handlesEvent(method):
+				getattr(dialogManager, method)(**kwargs)
 
 		except TypeError as e:
 			self.logWarning(f'Failed to broadcast event **{method}** to **DialogManager**: {e}')
 
-		deadManagers = list()
-		for name, man in SM.SuperManager.getInstance().managers.copy().items():
-			if not man:
-				deadManagers.append(name)
-				continue
-
+		for man in SM.SuperManager.getInstance().getEventSubscribers(method):
 			if (manager and man.name != manager.name) or man.name in exceptions:
 				continue
 
 			try:
-				func = getattr(man, method, None)
-				if func:
-					func(**kwargs)
+				getattr(man, method)(**kwargs)
 
 			except TypeError as e:
 				self.logWarning(f'Failed to broadcast event **{method}** to **{man.name}**: {e}')
@@ -141,9 +135,6 @@ class ProjectAliceObject(object):
 		if propagateToSkills:
 			self.SkillManager.skillBroadcast(method=method, **kwargs)
 
-		for name in deadManagers:
-			del SM.SuperManager.getInstance().managers[name]
-
 		if method == 'onAudioFrame':
 			return
 
@@ -162,6 +153,17 @@ class ProjectAliceObject(object):
 		)
 
 
+	@classmethod
+	def handlesEvent(cls, method: str) -> bool:
+		"""
+		Whether this class implements the given event handler instead of inheriting the empty one
+		:param method: the event handler name, onXxx
+		:return:
+		"""
+		func = getattr(cls, method, None)
+		return func is not None and func is not getattr(ProjectAliceObject, method, None)
+
+
 	def checkDependencies(self) -> bool:
 		self.logInfo('Checking dependencies')
 
@@ -292,6 +294,24 @@ class ProjectAliceObject(object):
 		return f'[{self.__class__.__name__}] {text}'
 
 
+	def bootSpan(self, name: str, category: str, **kwargs):
+		"""
+		Times a boot step with the boot profiler, does nothing when Alice isn't booting through ProjectAlice
+		:param name:
+		:param category: manager, skill, database, subprocess...
+		:param kwargs: added to the trace event arguments
+		:return: a context manager
+		"""
+		return BootProfiler.spanFor(getattr(SM.SuperManager.getInstance(), 'projectAlice', None), name=name, category=category, **kwargs)
+
+
+	def bootProfiled(self, name: str, category: str, func: Callable) -> Callable:
+		"""
+		Returns func timed as a boot step, or func itself when Alice isn't booting through ProjectAlice
+		"""
+		return BootProfiler.wrapFor(getattr(SM.SuperManager.getInstance(), 'projectAlice', None), name=name, category=category, func=func)
+
+
 	def onStart(self):
 		pass  # Super object function is overridden only if needed
 
@@ -324,6 +344,10 @@ class ProjectAliceObject(object):
 		pass  # Super object function is overridden only if needed
 
 
+	def onSkillsStarted(self, skills: list):
+		pass  # Super object function is overridden only if needed
+
+
 	def onSkillStopped(self, skill: str):
 		pass  # Super object function is overridden only if needed
 
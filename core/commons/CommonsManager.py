@@ -17,7 +17,6 @@
 #
 #  Last modified: 2021.04.13 at 12:56:46 CEST
 
-from collections import defaultdict
 from ctypes import *
 
 import hashlib
@@ -35,20 +34,21 @@ import time
 import uuid
 from contextlib import contextmanager, suppress
 from datetime import datetime
-from googletrans import Translator
 from paho.mqtt.client import MQTTMessage
 from pathlib import Path
 from typing import Any, Optional, Union
 from uuid import UUID
 
 import core.base.SuperManager as SuperManager
-import core.commons.model.Slot as slotModel
 from core.base.model.Manager import Manager
-from core.commons import constants
+from core.commons.model.ParsedMessage import ParsedMessage
 from core.commons.model.PartOfDay import PartOfDay
 from core.dialog.model.DialogSession import DialogSession
+from core.util.model.LazyModule import lazyImport
 from core.webui.model.UINotificationType import UINotificationType
 
+googletrans = lazyImport('googletrans')
+
 
 class CommonsManager(Manager):
 	ERROR_HANDLER_FUNC = CFUNCTYPE(None, c_char_p, c_int, c_char_p, c_int, c_char_p)
@@ -131,72 +131,54 @@ class CommonsManager(Manager):
 
 	@staticmethod
 	def payload(message: MQTTMessage) -> Optional[dict]:
-		try:
-			payload = json.loads(message.payload)
-			if isinstance(payload, bool):
-				var = message.topic.split('/')[-1]
-				payload = {var: payload}
-		except (ValueError, TypeError):
-			if message.payload:
-				var = message.topic.split('/')[-1]
-				payload = {var: message.payload}
-			else:
-				payload = None
+		"""
+		The parsing helpers return copies of what a ParsedMessage keeps, callers can modify them
+		"""
+		if isinstance(message, ParsedMessage):
+			payload = message.parsedPayload
+			return dict(payload) if isinstance(payload, dict) else payload
 
-		return payload
+		return ParsedMessage.decodePayload(message)
 
 
 	@classmethod
 	def parseSlotsToObjects(cls, message: MQTTMessage) -> dict:
-		slots = defaultdict(list)
-		data = cls.payload(message)
-
-		if not isinstance(data, dict):
-			return dict()
+		if isinstance(message, ParsedMessage):
+			return {slotName: list(slots) for slotName, slots in message.slotsAsObjects.items()}
 
-		for slotData in data.get('slots', dict()):
-			slot = slotModel.Slot(**slotData)
-			slots[slot.slotName].append(slot)
-		return slots
+		return ParsedMessage.slotObjectsFromPayload(cls.payload(message))
 
 
 	@classmethod
 	def parseSlots(cls, message: MQTTMessage) -> dict:
-		data = cls.payload(message)
+		if isinstance(message, ParsedMessage):
+			return dict(message.slots)
 
-		if not isinstance(data, dict):
-			return dict()
-
-		return {slot['slotName']: slot['rawValue'] for slot in data.get('slots', dict())}
+		return ParsedMessage.slotsFromPayload(cls.payload(message))
 
 
 	@classmethod
 	def parseSessionId(cls, message: MQTTMessage) -> Union[str, bool]:
-		data = cls.payload(message)
-
-		if not isinstance(data, dict):
-			return False
+		if isinstance(message, ParsedMessage):
+			return message.sessionId
 
-		return data.get('sessionId', False)
+		return ParsedMessage.sessionIdFromPayload(cls.payload(message))
 
 
 	@classmethod
 	def parseCustomData(cls, message: MQTTMessage) -> dict:
-		try:
-			data = cls.payload(message)
-			return json.loads(data['customData'])
-		except (ValueError, TypeError, KeyError):
-			return dict()
+		if isinstance(message, ParsedMessage):
+			return dict(message.customData)
+
+		return ParsedMessage.customDataFromPayload(cls.payload(message))
 
 
 	@classmethod
 	def parseDeviceUid(cls, message: MQTTMessage) -> str:
-		data = cls.payload(message)
-
-		if not isinstance(data, dict):
-			return constants.UNKNOWN
+		if isinstance(message, ParsedMessage):
+			return message.deviceUid
 
-		return data.get('siteId', data.get('IPAddress', SuperManager.SuperManager.getInstance().ConfigManager.getAliceConfigByName('uuid')))
+		return ParsedMessage.deviceUidFromPayload(cls.payload(message))
 
 
 	@staticmethod
@@ -342,8 +324,8 @@ class CommonsManager(Manager):
 			kwargs['src'] = destLang
 
 		if isinstance(text, str):
-			return Translator().translate(**kwargs).text
-		return [result.text for result in Translator().translate(**kwargs)]
+			return googletrans.Translator().translate(**kwargs).text
+		return [result.text for result in googletrans.Translator().translate(**kwargs)]
 
 
 	def runRootSystemCommand(self, commands: Union[list, str], shell: bool = False, stdout=subprocess.PIPE, stderr=subprocess.PIPE) -> subprocess.CompletedProcess:
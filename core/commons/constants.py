@@ -50,6 +50,7 @@ TOPIC_ASR_STOP_LISTENING               = 'hermes/asr/stopListening'
 TOPIC_ASR_TOGGLE_OFF                   = 'hermes/asr/toggleOff'
 TOPIC_ASR_TOGGLE_ON                    = 'hermes/asr/toggleOn'
 TOPIC_AUDIO_FRAME                      = 'hermes/audioServer/{}/audioFrame'
+TOPIC_AUDIO_FRAME_FORMAT               = 'hermes/audioServer/{}/audioFrameFormat'
 TOPIC_CONTINUE_SESSION                 = 'hermes/dialogueManager/continueSession'
 TOPIC_DIALOGUE_MANAGER_CONFIGURE       = 'hermes/dialogueManager/configure'
 TOPIC_END_SESSION                      = 'hermes/dialogueManager/endSession'
@@ -167,6 +168,7 @@ EVENT_SKILL_DELETED                    = 'skillDeleted'
 EVENT_SKILL_INSTALL_FAILED             = 'skillInstallFailed'
 EVENT_SKILL_INSTALLED                  = 'skillInstalled'
 EVENT_SKILL_STARTED                    = 'skillStarted'
+EVENT_SKILLS_STARTED                   = 'skillsStarted'
 EVENT_SKILL_STOPPED                    = 'skillStopped'
 EVENT_SKILL_UPDATED                    = 'skillUpdated'
 EVENT_SKILL_DEACTIVATED                = 'skillDeactivated'
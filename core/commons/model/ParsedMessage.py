@@ -0,0 +1,195 @@
+#  Copyright (c) 2021
+#
+#  This file, ParsedMessage.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import json
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Union
+
+from paho.mqtt.client import MQTTMessage
+
+import core.base.SuperManager as SuperManager
+from core.commons import constants
+from core.commons.model.Slot import Slot
+
+
+_UNSET = object()
+
+
+class ParsedMessage(MQTTMessage):
+	"""
+	An mqtt message that decodes its payload, slots, custom data, session id and device uid once,
+	on first access, and keeps them. It is a MQTTMessage, so it can be handed to anything expecting
+	one, and the CommonsManager parsing helpers read from it instead of decoding again.
+	The parsed values are shared by everyone reading them and must not be modified, the CommonsManager
+	helpers return copies of them
+	"""
+
+	__slots__ = '_decodedTopic', '_parsedPayload', '_slots', '_slotsAsObjects', '_sessionId', '_customData', '_deviceUid'
+
+
+	def __init__(self, mid: int = 0, topic: bytes = b''):
+		super().__init__(mid=mid, topic=topic)
+		self._decodedTopic = None
+		self._parsedPayload = _UNSET
+		self._slots = None
+		self._slotsAsObjects = None
+		self._sessionId = _UNSET
+		self._customData = None
+		self._deviceUid = None
+
+
+	@classmethod
+	def parse(cls, message: MQTTMessage):
+		"""
+		Wraps the given message, unless it already is a parsed one
+		:param message:
+		:return: ParsedMessage
+		"""
+		if isinstance(message, cls):
+			return message
+
+		parsed = cls(mid=message.mid, topic=message._topic)
+		parsed.timestamp = message.timestamp
+		parsed.state = message.state
+		parsed.dup = message.dup
+		parsed.payload = message.payload
+		parsed.qos = message.qos
+		parsed.retain = message.retain
+		parsed.info = message.info
+		parsed.properties = getattr(message, 'properties', None)
+		return parsed
+
+
+	@property
+	def topic(self) -> str:
+		if self._decodedTopic is None:
+			self._decodedTopic = self._topic.decode('utf-8')
+		return self._decodedTopic
+
+
+	@topic.setter
+	def topic(self, value: bytes):
+		self._topic = value
+		self._decodedTopic = None
+
+
+	@property
+	def parsedPayload(self) -> Optional[Union[dict, list, str, int, float]]:
+		if self._parsedPayload is _UNSET:
+			self._parsedPayload = self.decodePayload(self)
+		return self._parsedPayload
+
+
+	@property
+	def slots(self) -> Dict[str, str]:
+		if self._slots is None:
+			self._slots = self.slotsFromPayload(self.parsedPayload)
+		return self._slots
+
+
+	@property
+	def slotsAsObjects(self) -> Dict[str, List[Slot]]:
+		if self._slotsAsObjects is None:
+			self._slotsAsObjects = self.slotObjectsFromPayload(self.parsedPayload)
+		return self._slotsAsObjects
+
+
+	@property
+	def sessionId(self) -> Union[str, bool]:
+		if self._sessionId is _UNSET:
+			self._sessionId = self.sessionIdFromPayload(self.parsedPayload)
+		return self._sessionId
+
+
+	@property
+	def customData(self) -> dict:
+		if self._customData is None:
+			self._customData = self.customDataFromPayload(self.parsedPayload)
+		return self._customData
+
+
+	@property
+	def deviceUid(self) -> str:
+		if self._deviceUid is None:
+			self._deviceUid = self.deviceUidFromPayload(self.parsedPayload)
+		return self._deviceUid
+
+
+	@staticmethod
+	def decodePayload(message: MQTTMessage) -> Optional[Union[dict, list, str, int, float]]:
+		try:
+			payload = json.loads(message.payload)
+			if isinstance(payload, bool):
+				payload = {message.topic.split('/')[-1]: payload}
+		except (ValueError, TypeError):
+			if message.payload:
+				payload = {message.topic.split('/')[-1]: message.payload}
+			else:
+				payload = None
+
+		return payload
+
+
+	@staticmethod
+	def slotsFromPayload(data: Any) -> Dict[str, str]:
+		if not isinstance(data, dict):
+			return dict()
+
+		return {slot['slotName']: slot['rawValue'] for slot in data.get('slots', dict())}
+
+
+	@staticmethod
+	def slotObjectsFromPayload(data: Any) -> Dict[str, List[Slot]]:
+		if not isinstance(data, dict):
+			return dict()
+
+		slots = defaultdict(list)
+		for slotData in data.get('slots', dict()):
+			slot = Slot(**slotData)
+			slots[slot.slotName].append(slot)
+		return slots
+
+
+	@staticmethod
+	def sessionIdFromPayload(data: Any) -> Union[str, bool]:
+		if not isinstance(data, dict):
+			return False
+
+		return data.get('sessionId', False)
+
+
+	@staticmethod
+	def customDataFromPayload(data: Any) -> dict:
+		try:
+			return json.loads(data['customData'])
+		except (ValueError, TypeError, KeyError):
+			return dict()
+
+
+	@staticmethod
+	def deviceUidFromPayload(data: Any) -> str:
+		if not isinstance(data, dict):
+			return constants.UNKNOWN
+
+		if 'siteId' in data:
+			return data['siteId']
+		elif 'IPAddress' in data:
+			return data['IPAddress']
+
+		return SuperManager.SuperManager.getInstance().ConfigManager.getAliceConfigByName('uuid')
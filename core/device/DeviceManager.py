@@ -24,7 +24,7 @@ import time
 import uuid
 from paho.mqtt.client import MQTTMessage
 from serial.tools import list_ports
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 from core.base.model.Manager import Manager
 from core.commons import constants
@@ -35,11 +35,13 @@ from core.device.model.DeviceLink import DeviceLink
 from core.device.model.DeviceType import DeviceType
 from core.device.model.Heartbeat import Heartbeat
 from core.dialog.model.DialogSession import DialogSession
+from core.util.model.CoalescedWriter import CoalescedWriter
 
 
 class DeviceManager(Manager):
 	DB_DEVICE = 'myDevices'
 	DB_LINKS = 'deviceLinks'
+	ABILITIES = tuple(DeviceAbility)
 	DATABASE = {
 		DB_DEVICE: [
 			'id INTEGER PRIMARY KEY',
@@ -67,8 +69,18 @@ class DeviceManager(Manager):
 		self._loopCounter = 0
 
 		self._devices: Dict[int, Device] = dict()
+		self._mainDevice: Optional[Device] = None
+		self._devicesByUid: Dict[str, Device] = dict()
+		self._devicesByLocation: Dict[int, Dict[int, Device]] = dict()
+		self._devicesBySkill: Dict[str, Dict[int, Device]] = dict()
+		self._devicesByType: Dict[DeviceType, Dict[int, Device]] = dict()
+		self._devicesByAbility: Dict[DeviceAbility, Dict[int, Device]] = dict()
+		self._connectedDevices: Dict[int, Device] = dict()
+		self._indexKeys: Dict[int, Tuple] = dict()
+		self._indexLock = threading.RLock()
 		self._deviceLinks: Dict[int, DeviceLink] = dict()
 		self._deviceTypes: Dict[str, Dict[str, DeviceType]] = dict()
+		self._deviceWriter = CoalescedWriter(tableName=self.DB_DEVICE, callerName=self.name, toRow=Device.toDBRow)
 
 		self._heartbeats = dict()
 		self._heartbeatsCheckTimer = None
@@ -124,8 +136,8 @@ class DeviceManager(Manager):
 		self.MqttManager.publish(topic=constants.TOPIC_CORE_RECONNECTION)
 		self.getMainDevice().connected = True
 
-		if self._devices:
-			self.ThreadManager.newThread(name='checkHeartbeats', target=self.checkHeartbeats)
+		if self._devices and not self._heartbeatsCheckTimer:
+			self._heartbeatsCheckTimer = self.ThreadManager.newTimer(interval=2, func=self.checkHeartbeats, periodic=True)
 
 		for device in self._devices.values():
 			device.onBooted()
@@ -142,28 +154,33 @@ class DeviceManager(Manager):
 		for device in self._devices.values():
 			device.onStop()
 
+		if self._heartbeatsCheckTimer:
+			self._heartbeatsCheckTimer.cancel()
+
 		if self._heartbeat:
 			self._heartbeat.stopHeartBeat()
+
+		self._deviceWriter.flush()
 		self.MqttManager.publish(topic=constants.TOPIC_CORE_DISCONNECTION)
 
 
 	def onSkillDeleted(self, skill: str):
-		# noinspection SqlResolve
-		self.DatabaseManager.delete(
-			tableName=self.DB_DEVICE,
-			callerName=self.name,
-			values={
-				'skillName': skill
-			}
-		)
+		# Also waits for a flush that may still hold devices removed on skill deactivation
+		with self._deviceWriter.forget(*self._devicesBySkill.get(skill, dict())):
+			# noinspection SqlResolve
+			self.DatabaseManager.delete(
+				tableName=self.DB_DEVICE,
+				callerName=self.name,
+				values={
+					'skillName': skill
+				}
+			)
 
 
 	def onSkillDeactivated(self, skill: str):
 		self.removeDeviceTypesForSkill(skillName=skill)
-		tmp = self._devices.copy()
-		for deviceUid, device in tmp.items():
-			if device.skillName == skill:
-				self._devices.pop(deviceUid, None)
+		for device in list(self._devicesBySkill.get(skill, dict()).values()):
+			self._removeDevice(device)
 
 
 	def loadDevices(self):
@@ -180,7 +197,7 @@ class DeviceManager(Manager):
 				skillImport = importlib.import_module(f'skills.{data.get("skillName")}.devices.{data.get("typeName")}')
 				klass = getattr(skillImport, data.get('typeName'))
 				device = klass(data)
-				self._devices[device.id] = device
+				self._addDevice(device)
 			except Exception:
 				self.logError("Couldn't create device instance")
 
@@ -215,8 +232,6 @@ class DeviceManager(Manager):
 					self.logWarning(f'Device **{device.displayName}** has not given a signal since {device.deviceType.heartbeatRate} seconds or more')
 					self.deviceDisconnecting(device.uid)
 
-		self._heartbeatsCheckTimer = self.ThreadManager.newTimer(interval=2, func=self.checkHeartbeats)
-
 
 	def getDevice(self, deviceId: int = None, uid: [str, uuid.UUID] = None) -> Optional[Device]:
 		"""
@@ -231,9 +246,7 @@ class DeviceManager(Manager):
 		elif uid:
 			if not isinstance(uid, str):
 				uid = str(uid)
-			for device in self._devices.values():
-				if device.uid == uid:
-					ret = device
+			ret = self._devicesByUid.get(uid, None)
 		else:
 			raise Exception('Cannot get a device without id or uid')
 
@@ -289,15 +302,7 @@ class DeviceManager(Manager):
 		:param connectedOnly: Whether to return non-connected devices
 		:return: A list of Device instances
 		"""
-		ret = list()
-		for device in self._devices.values():
-			if connectedOnly and not device.connected:
-				continue
-
-			if device.hasAbilities(abilities):
-				ret.append(device)
-
-		return ret
+		return self._filterDevices(abilities=abilities, connectedOnly=connectedOnly)
 
 
 	def getDevicesByType(self, deviceType: DeviceType, connectedOnly: bool = True) -> List[Device]:
@@ -307,16 +312,7 @@ class DeviceManager(Manager):
 		:param deviceType: DeviceType
 		:return: list of Device instances
 		"""
-
-		ret = list()
-		for device in self._devices.values():
-			if connectedOnly and not device.connected:
-				continue
-
-			if device.deviceType == deviceType:
-				ret.append(device)
-
-		return ret
+		return self._filterDevices(deviceType=deviceType, connectedOnly=connectedOnly)
 
 
 	def getDevicesByLocation(self, locationId: int, deviceType: DeviceType = None, abilities: List[DeviceAbility] = None, connectedOnly: bool = True) -> List[Device]:
@@ -345,7 +341,8 @@ class DeviceManager(Manager):
 
 	def _filterDevices(self, locationId: int = None, skillName: str = None, deviceType: DeviceType = None, abilities: List[DeviceAbility] = None, connectedOnly: bool = True) -> List[Device]:
 		"""
-		Returns a list of devices fitting the optional arguments
+		Returns a list of devices fitting the optional arguments. Only the smallest of the matching
+		indexes is walked, its devices are then checked against the other indexes
 		:param locationId: the location id, only mandatory argument
 		:param skillName: the skill the device belongs to
 		:param deviceType: The device type that it must be
@@ -353,19 +350,123 @@ class DeviceManager(Manager):
 		:param connectedOnly: Whether to return non-connected devices
 		:return: list of Device instances
 		"""
+		with self._indexLock:
+			indexes = list()
+			if locationId:
+				indexes.append(self._devicesByLocation.get(locationId, dict()))
+			if skillName:
+				indexes.append(self._devicesBySkill.get(skillName, dict()))
+			if deviceType:
+				indexes.append(self._devicesByType.get(deviceType, dict()))
+			if connectedOnly:
+				indexes.append(self._connectedDevices)
+			if abilities:
+				indexes.extend(self._devicesByAbility.get(ability, dict()) for ability in self._splitAbilities(abilities))
+
+			if not indexes:
+				return list(self._devices.values())
+
+			indexes.sort(key=len)
+			ret = list(indexes[0].values())
+			for index in indexes[1:]:
+				ret = [device for device in ret if device.id in index]
 
-		ret = list()
-		for device in self._devices.values():
-			if (locationId and device.parentLocation != locationId) \
-					or (skillName and device.skillName != skillName) \
-					or (deviceType and device.deviceType != deviceType) \
-					or (connectedOnly and not device.connected) \
-					or (abilities and not device.hasAbilities(abilities)):
-				continue
+			return ret
+
+
+	@staticmethod
+	def _splitAbilities(abilities: Union[int, List[DeviceAbility]]) -> List[DeviceAbility]:
+		"""
+		Returns the single abilities contained in an abilities bitmask or in a list of abilities
+		:param abilities:
+		:return:
+		"""
+		if not isinstance(abilities, int):
+			check = 0
+			for ability in abilities:
+				check |= ability
+			abilities = check
+
+		return [ability for ability in DeviceManager.ABILITIES if abilities & ability]
+
+
+	def _addDevice(self, device: Device):
+		with self._indexLock:
+			self._devices[device.id] = device
+			self._indexDevice(device)
+
+
+	def _removeDevice(self, device: Device):
+		self._deviceWriter.discard(device.id)
+		with self._indexLock:
+			if self._devices.get(device.id) is device:
+				self._devices.pop(device.id, None)
+			self._unindexDevice(device)
 
-			ret.append(device)
 
-		return ret
+	def reindexDevice(self, device: Device):
+		"""
+		Called by the devices when their uid, location, abilities or connection status change,
+		to keep the lookup indexes up to date. Devices not yet added are ignored
+		:param device:
+		:return:
+		"""
+		with self._indexLock:
+			if device.id not in self._indexKeys or self._devices.get(device.id) is not device:
+				return
+
+			self._unindexDevice(device)
+			self._indexDevice(device)
+
+
+	def _indexDevice(self, device: Device):
+		abilities = self._splitAbilities(device.getAbilities() or 0)
+		self._indexKeys[device.id] = (device.uid, device.parentLocation, device.skillName, device.deviceType, abilities)
+
+		self._devicesByUid[device.uid] = device
+		self._devicesByLocation.setdefault(device.parentLocation, dict())[device.id] = device
+		self._devicesBySkill.setdefault(device.skillName, dict())[device.id] = device
+		self._devicesByType.setdefault(device.deviceType, dict())[device.id] = device
+		for ability in abilities:
+			self._devicesByAbility.setdefault(ability, dict())[device.id] = device
+
+		if device.connected:
+			self._connectedDevices[device.id] = device
+
+		if not self._mainDevice and DeviceAbility.IS_CORE in abilities:
+			self._mainDevice = device
+
+
+	def _unindexDevice(self, device: Device):
+		keys = self._indexKeys.pop(device.id, None)
+		if not keys:
+			return
+
+		uid, locationId, skillName, deviceType, abilities = keys
+		if self._devicesByUid.get(uid) is device:
+			self._devicesByUid.pop(uid, None)
+
+		self._dropFromIndex(self._devicesByLocation, locationId, device.id)
+		self._dropFromIndex(self._devicesBySkill, skillName, device.id)
+		self._dropFromIndex(self._devicesByType, deviceType, device.id)
+		for ability in abilities:
+			self._dropFromIndex(self._devicesByAbility, ability, device.id)
+
+		self._connectedDevices.pop(device.id, None)
+
+		if self._mainDevice is device:
+			self._mainDevice = next(iter(self._devicesByAbility.get(DeviceAbility.IS_CORE, dict()).values()), None)
+
+
+	@staticmethod
+	def _dropFromIndex(index: dict, key, deviceId: int):
+		devices = index.get(key)
+		if devices is None:
+			return
+
+		devices.pop(deviceId, None)
+		if not devices:
+			index.pop(key, None)
 
 
 	def getDeviceType(self, skillName: str, deviceType: str) -> Optional[DeviceType]:
@@ -383,11 +484,7 @@ class DeviceManager(Manager):
 		Returns the main device, the only one having the IS_CORE ability
 		:return: Device instance
 		"""
-		try:
-			devices = self.getDevicesWithAbilities(abilities=[DeviceAbility.IS_CORE], connectedOnly=False)
-			return devices[0]
-		except:
-			return None
+		return self._mainDevice
 
 
 	def addNewDeviceFromWebUI(self, data: Dict) -> Optional[Device]:
@@ -456,7 +553,7 @@ class DeviceManager(Manager):
 		skillImport = importlib.import_module(f'skills.{skillName}.devices.{deviceType}')
 		klass = getattr(skillImport, deviceType)
 		device = klass(data)
-		self._devices[device.id] = device
+		self._addDevice(device)
 
 		if device.deviceType.allowLocationLinks:
 			self.addDeviceLink(targetLocation=locationId, deviceId=device.id)
@@ -470,6 +567,11 @@ class DeviceManager(Manager):
 		return self._devices
 
 
+	@property
+	def deviceWriter(self) -> CoalescedWriter:
+		return self._deviceWriter
+
+
 	def updateDeviceSettings(self, deviceId: int, data: dict) -> Optional[Device]:
 		"""
 		Updates the UI part of a device
@@ -509,7 +611,7 @@ class DeviceManager(Manager):
 				self._deviceLinks[int(linkId)].updateConfigs(link['configs'])
 				self._deviceLinks[int(linkId)].saveToDB()
 
-		device.saveToDB()
+		device.markDirty()
 		return device
 
 
@@ -545,8 +647,9 @@ class DeviceManager(Manager):
 		else:
 			device.onStop()
 			self.deleteDeviceLinks(deviceId=device.id)
-			self._devices.pop(device.id, None)
-			self.DatabaseManager.delete(tableName=self.DB_DEVICE, callerName=self.name, values={'id': device.id})
+			self._removeDevice(device)
+			with self._deviceWriter.forget(device.id):
+				self.DatabaseManager.delete(tableName=self.DB_DEVICE, callerName=self.name, values={'id': device.id})
 
 		self.MqttManager.publish(constants.TOPIC_DEVICE_DELETED, payload={'uid': device.uid, 'id': device.id})
 
@@ -620,7 +723,7 @@ class DeviceManager(Manager):
 
 		self._heartbeats[uid] = round(time.time())
 		if not self._heartbeatsCheckTimer:
-			self._heartbeatsCheckTimer = self.ThreadManager.newTimer(interval=2, func=self.checkHeartbeats)
+			self._heartbeatsCheckTimer = self.ThreadManager.newTimer(interval=2, func=self.checkHeartbeats, periodic=True)
 
 		return device
 
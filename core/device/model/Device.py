@@ -17,8 +17,11 @@
 #
 #  Last modified: 2021.08.02 at 06:38:49 CEST
 
+import copy
 import json
 import sqlite3
+import threading
+import time
 import uuid
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
@@ -34,6 +37,8 @@ from core.webui.model.OnDeviceClickReaction import OnDeviceClickReaction
 
 
 class Device(ProjectAliceObject):
+	PUBLISH_INTERVAL = 0.5  # Seconds, the device changes published more often are grouped
+
 
 	def __init__(self, data: Union[sqlite3.Row, Dict]):
 
@@ -57,6 +62,13 @@ class Device(ProjectAliceObject):
 
 		self._secret = ''  # Used to verify devices reply from UI
 
+		# Last state published over mqtt, changes are published as deltas against it
+		self._publishedState: dict = dict()
+		self._lastPublish = 0
+		self._publishTimer = None
+		self._publishLock = threading.Lock()
+		self._stopped = False  # Stopped devices, deleted or shut down, are not written nor published anymore
+
 		if not self._deviceType:
 			self.logError(f'Failed retrieving device type for device {self._typeName}')
 			raise DeviceTypeUndefined(self._typeName)
@@ -109,12 +121,21 @@ class Device(ProjectAliceObject):
 
 	def onStart(self):
 		super().onStart()
+		with self._publishLock:
+			self._stopped = False
+
 		if self.skillInstance:
 			self.skillInstance.registerDeviceInstance(self)
 
 
 	def onStop(self):
 		super().onStop()
+		with self._publishLock:
+			self._stopped = True
+			if self._publishTimer:
+				self._publishTimer.cancel()
+				self._publishTimer = None
+
 		if self.skillInstance:
 			self.skillInstance.unregisterDeviceInstance(self)
 
@@ -259,6 +280,8 @@ class Device(ProjectAliceObject):
 		for ability in abilities:
 			self._abilities |= ability.value
 
+		self.DeviceManager.reindexDevice(self)
+
 
 	# noinspection SqlResolve
 	def saveToDB(self):
@@ -267,34 +290,20 @@ class Device(ProjectAliceObject):
 		:return:
 		"""
 		if self._id != -1:
+			self.DeviceManager.deviceWriter.discard(self._id)
 			self.DatabaseManager.replace(
 				tableName=self.DeviceManager.DB_DEVICE,
 				query='REPLACE INTO :__table__ (id, uid, parentLocation, typeName, skillName, settings, deviceParams, deviceConfigs) VALUES (:id, :uid, :parentLocation, :typeName, :skillName, :settings, :deviceParams, :deviceConfigs)',
 				callerName=self.DeviceManager.name,
-				values={
-					'id'            : self._id,
-					'uid'           : self._uid,
-					'parentLocation': self._parentLocation,
-					'typeName'      : self._typeName,
-					'skillName'     : self._skillName,
-					'settings'      : json.dumps(self._settings),
-					'deviceParams'  : json.dumps(self._deviceParams),
-					'deviceConfigs' : json.dumps(self._deviceConfigs)
-				}
+				values=self.toDBRow()
 			)
 		else:
+			values = self.toDBRow()
+			values.pop('id')
 			deviceId = self.DatabaseManager.insert(
 				tableName=self.DeviceManager.DB_DEVICE,
 				callerName=self.DeviceManager.name,
-				values={
-					'uid'           : self._uid,
-					'parentLocation': self._parentLocation,
-					'typeName'      : self._typeName,
-					'skillName'     : self._skillName,
-					'settings'      : json.dumps(self._settings),
-					'deviceParams'  : json.dumps(self._deviceParams),
-					'deviceConfigs' : json.dumps(self._deviceConfigs)
-				}
+				values=values
 			)
 
 			self._id = deviceId
@@ -302,6 +311,40 @@ class Device(ProjectAliceObject):
 		self.publishDevice()
 
 
+	def toDBRow(self) -> dict:
+		"""
+		The device database row
+		:return:
+		"""
+		return {
+			'id'            : self._id,
+			'uid'           : self._uid,
+			'parentLocation': self._parentLocation,
+			'typeName'      : self._typeName,
+			'skillName'     : self._skillName,
+			'settings'      : json.dumps(self._settings),
+			'deviceParams'  : json.dumps(self._deviceParams),
+			'deviceConfigs' : json.dumps(self._deviceConfigs)
+		}
+
+
+	def markDirty(self):
+		"""
+		Called when the device params, configs or settings change. The device row is written with the
+		next batch of changed devices and only what changed is published, at most every PUBLISH_INTERVAL
+		:return:
+		"""
+		if self._stopped:
+			return
+
+		if self._id == -1:
+			self.saveToDB()
+			return
+
+		self.DeviceManager.deviceWriter.markDirty(self._id, self)
+		self.publishDevice(delta=True)
+
+
 	def getLocation(self) -> Optional[Location]:
 		"""
 		Returns the location this device is directly assigned to.
@@ -310,13 +353,50 @@ class Device(ProjectAliceObject):
 		return self.LocationManager.getLocation(locId=self.parentLocation)
 
 
-	def publishDevice(self):
+	def publishDevice(self, delta: bool = False):
 		"""
 		Whenever something changes on the device, the device data are published over mqtt
 		to refresh the UI per example
+		:param delta: only publish the device fields that changed since the last publication, flagged as delta.
+		Deltas are sent at most once every PUBLISH_INTERVAL, the changes in between being grouped
 		:return:
 		"""
-		self.MqttManager.publish(constants.TOPIC_DEVICE_UPDATED, payload={'uid': self._uid, 'device': self.toDict()})
+		if self._stopped:
+			return
+
+		if delta:
+			with self._publishLock:
+				if self._publishTimer:
+					return
+
+				wait = self._lastPublish + self.PUBLISH_INTERVAL - time.monotonic()
+				if wait > 0:
+					self._publishTimer = self.ThreadManager.newTimer(interval=wait, func=self._publishState, kwargs={'delta': True})
+					return
+
+		self._publishState(delta=delta)
+
+
+	def _publishState(self, delta: bool):
+		state = self.toDict()
+		with self._publishLock:
+			self._publishTimer = None
+			if self._stopped:
+				return
+
+			changes = {key: value for key, value in state.items() if self._publishedState.get(key) != value}
+			if delta and not changes:
+				return
+
+			self._publishedState = copy.deepcopy(state)
+			self._lastPublish = time.monotonic()
+
+		if delta:
+			payload = {'uid': self._uid, 'delta': True, 'device': {'id': self._id, 'uid': self._uid, **changes}}
+		else:
+			payload = {'uid': self._uid, 'device': state}
+
+		self.MqttManager.publish(constants.TOPIC_DEVICE_UPDATED, payload=payload)
 
 
 	def pairingDone(self, uid: str):
@@ -326,6 +406,7 @@ class Device(ProjectAliceObject):
 		:return:
 		"""
 		self._uid = uid
+		self.DeviceManager.reindexDevice(self)
 		self.saveToDB()
 		self.broadcastUpdated()
 
@@ -361,6 +442,7 @@ class Device(ProjectAliceObject):
 		:return:
 		"""
 		self._connected = value
+		self.DeviceManager.reindexDevice(self)
 
 
 	@property
@@ -399,6 +481,7 @@ class Device(ProjectAliceObject):
 	@parentLocation.setter
 	def parentLocation(self, value: int):
 		self._parentLocation = value
+		self.DeviceManager.reindexDevice(self)
 
 
 	@property
@@ -466,7 +549,7 @@ class Device(ProjectAliceObject):
 
 	def updateSettings(self, settings: dict):
 		self._settings = {**self._settings, **settings}
-		self.saveToDB()
+		self.markDirty()
 
 
 	def getConfig(self, key: str, default: Any = False) -> Any:
@@ -475,12 +558,12 @@ class Device(ProjectAliceObject):
 
 	def updateConfigs(self, configs: dict):
 		self._deviceConfigs = {**self._deviceConfigs, **configs}
-		self.saveToDB()
+		self.markDirty()
 
 
 	def updateConfig(self, key: str, value: Any):
 		self._deviceConfigs[key] = value
-		self.saveToDB()
+		self.markDirty()
 
 
 	def getParam(self, key: str, default: Any = False) -> Any:
@@ -489,12 +572,12 @@ class Device(ProjectAliceObject):
 
 	def updateParams(self, params: dict):
 		self._deviceParams = {**self._deviceParams, **params}
-		self.saveToDB()
+		self.markDirty()
 
 
 	def updateParam(self, key: str, value: Any):
 		self._deviceParams[key] = value
-		self.saveToDB()
+		self.markDirty()
 
 
 	def onUIClick(self) -> dict:
@@ -21,7 +21,6 @@ import json
 import uuid
 from paho.mqtt.client import MQTTMessage
 from pathlib import Path
-from threading import Timer
 from typing import Dict, Optional, Set
 
 from core.base.model.Manager import Manager
@@ -29,6 +28,7 @@ from core.commons import constants
 from core.commons.model.PartOfDay import PartOfDay
 from core.device.model.DeviceAbility import DeviceAbility
 from core.dialog.model.DialogSession import DialogSession
+from core.util.model.ThreadTimer import ThreadTimer
 from core.voice.WakewordRecorder import WakewordRecorderState
 
 
@@ -46,7 +46,7 @@ class DialogManager(Manager):
 		self._sessionsByDeviceUids: Dict[str: DialogSession] = dict()
 		self._endedSessions: Dict[str: DialogSession] = dict()
 		self._feedbackSounds: Dict[str: bool] = dict()
-		self._sessionTimeouts: Dict[str, Timer] = dict()
+		self._sessionTimeouts: Dict[str, ThreadTimer] = dict()
 		self._revivePendingSessions: Dict[str, DialogSession] = dict()
 
 		self._disabledByDefaultIntents = set()
@@ -274,9 +274,8 @@ class DialogManager(Manager):
 		"""
 		if 'text' in session.payload:
 			session.payload['input'] = session.payload['text']
-		session.payload.setdefault('intent', dict())
-		session.payload['intent']['intentName'] = 'UserRandomAnswer'
-		session.payload['intent']['confidenceScore'] = 1.0
+		# The intent is copied, the payload is only a shallow copy of the parsed message one
+		session.payload['intent'] = {**session.payload.get('intent', dict()), 'intentName': 'UserRandomAnswer', 'confidenceScore': 1.0}
 		session.payload['alternatives'] = list()
 		session.payload['slots'] = list()
 		self.onIntentParsed(session)
@@ -522,7 +521,8 @@ class DialogManager(Manager):
 			tableName='notRecognizedIntents',
 			values={
 				'text': session.input
-			}
+			},
+			blocking=False
 		)
 
 
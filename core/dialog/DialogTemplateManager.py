@@ -17,7 +17,9 @@
 #
 #  Last modified: 2021.04.13 at 12:56:46 CEST
 
+import itertools
 import json
+import re
 from pathlib import Path
 from typing import Dict, Generator, List, Optional
 
@@ -26,9 +28,13 @@ from core.base.model.Manager import Manager
 from core.commons import constants
 from core.dialog.model.DialogSession import DialogSession
 from core.dialog.model.DialogTemplate import DialogTemplate
+from core.dialog.model.DialogTemplateSlotType import DialogTemplateSlotType
 
 
 class DialogTemplateManager(Manager):
+	UTTERANCE_REGEX = re.compile('{(.+?:=>.+?)}')
+	PHRASE_CLEANUP = re.compile(r"[^\w' ]+")
+
 
 	def __init__(self):
 		super().__init__()
@@ -246,6 +252,67 @@ class DialogTemplateManager(Manager):
 		self.ThreadManager.doLater(interval=2, func=self.AssistantManager.checkAssistant)
 
 
+	def commandPhrases(self, intents: list, maxPhrases: int) -> Optional[List[str]]:
+		"""
+		Lists every sentence the given intents can be said with, their slots expanded to the slot values
+		and synonyms. This is what an Asr grammar restricted to these intents accepts
+		:param intents: intent names, with or without their topic
+		:param maxPhrases: give up past this many sentences
+		:return: the sorted sentences, or None if the intents accept free text, are unknown or have too many sentences
+		"""
+		if not intents or not self._intentsToSkills:
+			return None
+
+		phrases = set()
+		for intentName in intents:
+			intentName = intentName.split('/')[-1]
+			dialogTemplate = self._intentsToSkills.get(intentName)
+			if not dialogTemplate:
+				return None
+
+			intent = dialogTemplate.myIntents[intentName]
+			slotTypes = {slot['name']: slot['type'] for slot in intent.slots}
+			for utterance in intent.utterances:
+				parts = list()
+				for part in self.UTTERANCE_REGEX.split(utterance):
+					if ':=>' not in part:
+						parts.append([part])
+						continue
+
+					slotType = self._slotType(slotTypes.get(part.split(':=>')[1]))
+					if not slotType or slotType.automaticallyExtensible:
+						return None
+
+					values = list()
+					for value in slotType.myValues.values():
+						values.append(value['value'])
+						values.extend(value.get('synonyms', list()) or list())
+					parts.append(values)
+
+				for combination in itertools.product(*parts):
+					phrase = ' '.join(self.PHRASE_CLEANUP.sub(' ', ''.join(combination)).lower().split())
+					if phrase:
+						phrases.add(phrase)
+
+					if len(phrases) > maxPhrases:
+						return None
+
+		return sorted(phrases) if phrases else None
+
+
+	def _slotType(self, slotTypeName: Optional[str]) -> Optional[DialogTemplateSlotType]:
+		# Slot types are fused into the first skill declaring them, builtin ones have no values
+		if not slotTypeName:
+			return None
+
+		for dialogTemplate in self._slotTypes.get(slotTypeName, list()):
+			slotType = dialogTemplate.getSlot(slotTypeName)
+			if slotType:
+				return slotType
+
+		return None
+
+
 	@classmethod
 	def skillResource(cls) -> Generator[Path, None, None]:
 		languageManager = SuperManager.getInstance().LanguageManager
@@ -18,7 +18,6 @@
 #  Last modified: 2021.04.13 at 12:56:47 CEST
 import hashlib
 import shutil
-import threading
 from paho.mqtt import client as mqtt
 from pathlib import Path
 from typing import Optional
@@ -27,6 +26,7 @@ from core.base.model.Manager import Manager
 from core.base.model.StateType import StateType
 from core.commons import constants
 from core.nlu.model.NluEngine import NluEngine
+from core.util.model.ThreadTimer import ThreadTimer
 
 
 class NluManager(Manager):
@@ -39,7 +39,7 @@ class NluManager(Manager):
 			self._pathToCache.mkdir(parents=True)
 		self._training = False
 		self._offshoreTrainerReady = False
-		self._offshoreRespondTimer: threading.Timer = Optional[None]
+		self._offshoreRespondTimer: Optional[ThreadTimer] = None
 
 
 	def onStart(self):
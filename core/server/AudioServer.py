@@ -18,27 +18,33 @@
 #  Last modified: 2021.07.28 at 17:03:33 CEST
 
 import io
-import sounddevice as sd
 import time
 import uuid
 import wave
 from pathlib import Path
-# noinspection PyUnresolvedReferences,PyProtectedMember
-from scipy._lib._ccallback import CData
-from typing import Dict, Optional
+from typing import Dict, List, Optional, TYPE_CHECKING
 from webrtcvad import Vad
 
 from core.ProjectAliceExceptions import PlayBytesStopped
 from core.base.model.Manager import Manager
 from core.commons import constants
 from core.dialog.model.DialogSession import DialogSession
+from core.server.model.AudioFrameFormat import AudioFrameFormat
 from core.util.model.AliceEvent import AliceEvent
+from core.util.model.LazyModule import lazyImport
 from core.voice.WakewordRecorder import WakewordRecorderState
 
+if TYPE_CHECKING:
+	# noinspection PyUnresolvedReferences,PyProtectedMember
+	from scipy._lib._ccallback import CData
+
+sd = lazyImport('sounddevice')
+
 
 class AudioManager(Manager):
 	SAMPLERATE = 16000
 	FRAMES_PER_BUFFER = 320
+	FRAME_RING_SIZE = 8
 
 	LAST_USER_SPEECH = 'var/cache/lastUserpeech_{}_{}.wav'
 	SECOND_LAST_USER_SPEECH = 'var/cache/secondLastUserSpeech_{}_{}.wav'
@@ -52,6 +58,16 @@ class AudioManager(Manager):
 		self._waves: Dict[str, wave.Wave_write] = dict()
 		self._audioInputStream = None
 
+		self._frameFormat = AudioFrameFormat(sampleRate=self.SAMPLERATE)
+		self._frameHeaderSize = 0
+		self._frameBlockSize = 0
+		self._frameRing: List[bytearray] = list()
+		self._frameRingIndex = 0
+		self._frameBlocks = 0
+		self._frameSequence = 0
+		self._frameTimestamp = 0.0
+		self._audioFrameTopic = ''
+
 		if not self.ConfigManager.getAliceConfigByName('disableCapture'):
 			self._vad = Vad(2)
 
@@ -92,9 +108,35 @@ class AudioManager(Manager):
 
 	def onBooted(self):
 		if not self.ConfigManager.getAliceConfigByName('disableCapture'):
+			self.prepareAudioFrames()
 			self.ThreadManager.newThread(name='audioPublisher', target=self.publishAudio)
 
 
+	def prepareAudioFrames(self):
+		"""
+		Announces the frame format of this device and preallocates the frames that will be published,
+		the headers never change as long as the frames have the same size
+		:return:
+		"""
+		self._frameFormat = AudioFrameFormat(
+			format=AudioFrameFormat.PCM if self.ConfigManager.getAliceConfigByName('rawAudioFrames') else AudioFrameFormat.WAV,
+			sampleRate=self.SAMPLERATE,
+			aggregation=max(1, int(self.ConfigManager.getAliceConfigByName('audioFrameAggregation') or 1))
+		)
+
+		deviceUid = self.DeviceManager.getMainDevice().uid
+		self._audioFrameTopic = constants.TOPIC_AUDIO_FRAME.format(deviceUid)
+		self.MqttManager.publish(topic=constants.TOPIC_AUDIO_FRAME_FORMAT.format(deviceUid), payload=self._frameFormat.toDict(), retain=True)
+
+		self._frameBlockSize = self.FRAMES_PER_BUFFER * self._frameFormat.sampleWidth * self._frameFormat.channels
+		frame = self._frameFormat.buildFrame(bytes(self._frameBlockSize * self._frameFormat.aggregation))
+		self._frameHeaderSize = len(frame) - self._frameBlockSize * self._frameFormat.aggregation
+		self._frameRing = [bytearray(frame) for _ in range(self.FRAME_RING_SIZE)]
+		self._frameRingIndex = 0
+		self._frameBlocks = 0
+		self._frameSequence = 0
+
+
 	def setDefaults(self):
 		self.logInfo(f'Using **{self._audioInput}** for audio input')
 		self.logInfo(f'Using **{self._audioOutput}** for audio output')
@@ -119,25 +161,36 @@ class AudioManager(Manager):
 		if path.exists():
 			path.rename(Path(self.SECOND_LAST_USER_SPEECH.format(session.user, session.deviceUid)))
 
+		frameFormat = self.MqttManager.audioFrameBus.frameFormat(session.deviceUid)
 		waveFile = wave.open(str(path), 'wb')
-		waveFile.setsampwidth(2)
-		waveFile.setframerate(self.AudioServer.SAMPLERATE)
-		waveFile.setnchannels(1)
+		waveFile.setsampwidth(frameFormat.sampleWidth)
+		waveFile.setframerate(frameFormat.sampleRate)
+		waveFile.setnchannels(frameFormat.channels)
 		self._waves[session.deviceUid] = waveFile
+		self.MqttManager.subscribeAudioFrames(name=self.name, callback=self.onAudioFrame, deviceUid=session.deviceUid)
 
 
 	def onCaptured(self, session: DialogSession):
+		self.MqttManager.unsubscribeAudioFrames(name=self.name, deviceUid=session.deviceUid)
 		wav = self._waves.pop(session.deviceUid, None)
 		if not wav:
 			return
 		wav.close()
 
 
-	def recordFrame(self, deviceUid: str, frame: bytes):
-		if deviceUid not in self._waves:
+	def onAudioFrame(self, payload: memoryview, deviceUid: str):
+		try:
+			self.recordFrame(deviceUid, self.MqttManager.audioFrameBus.pcm(payload, deviceUid))
+		except Exception as e:
+			self.logError(f'Error recording user speech: {e}')
+
+
+	def recordFrame(self, deviceUid: str, frame: (bytes, memoryview)):
+		waveFile = self._waves.get(deviceUid)
+		if not waveFile:
 			return
 
-		self._waves[deviceUid].writeframes(frame)
+		waveFile.writeframes(frame)
 
 
 	def publishAudio(self) -> None:
@@ -174,6 +227,7 @@ class AudioManager(Manager):
 						speech = True
 						silence = self.SAMPLERATE / self.FRAMES_PER_BUFFER
 						speechFrames = 0
+						self.flushAudioFrames()
 						self.MqttManager.publish(
 							topic=constants.TOPIC_VAD_UP.format(self.DeviceManager.getMainDevice().uid),
 							payload={
@@ -187,6 +241,7 @@ class AudioManager(Manager):
 							speech = False
 							silence = 0
 							speechFrames = 0
+							self.flushAudioFrames()
 							self.MqttManager.publish(
 								topic=constants.TOPIC_VAD_DOWN.format(self.DeviceManager.getMainDevice().uid),
 								payload={
@@ -202,19 +257,54 @@ class AudioManager(Manager):
 
 	def publishAudioFrames(self, frames: bytes) -> None:
 		"""
-		receives some audio frames, adds them to the buffer and publishes them to MQTT
+		receives some audio frames, writes them in the next preallocated frame and publishes them to MQTT
+		once the frame holds as many blocks as the aggregation asks for
 		:param frames:
 		:return:
 		"""
-		with io.BytesIO() as buffer:
-			with wave.open(buffer, 'wb') as wav:
-				wav.setnchannels(1)
-				wav.setsampwidth(2)
-				wav.setframerate(self.SAMPLERATE)
-				wav.writeframes(frames)
+		if not self._frameRing:
+			self.prepareAudioFrames()
+
+		if len(frames) != self._frameBlockSize:
+			self.flushAudioFrames()
+			self._publishAudioFrame(self._frameFormat.buildFrame(bytes(frames), sequence=self._frameSequence, timestamp=time.time()))
+			return
+
+		frame = self._frameRing[self._frameRingIndex]
+		if not self._frameBlocks:
+			self._frameTimestamp = time.time()
+
+		offset = self._frameHeaderSize + self._frameBlocks * self._frameBlockSize
+		frame[offset:offset + self._frameBlockSize] = frames
+		self._frameBlocks += 1
+
+		if self._frameBlocks < self._frameFormat.aggregation:
+			return
+
+		if self._frameFormat.isAggregated:
+			AudioFrameFormat.HEADER.pack_into(frame, 0, self._frameSequence, self._frameTimestamp)
+
+		self._frameRingIndex = (self._frameRingIndex + 1) % len(self._frameRing)
+		self._publishAudioFrame(frame)
+
+
+	def flushAudioFrames(self) -> None:
+		"""
+		Publishes the blocks waiting for the current aggregated frame to be complete
+		:return:
+		"""
+		if not self._frameBlocks:
+			return
+
+		frame = self._frameRing[self._frameRingIndex]
+		data = frame[self._frameHeaderSize:self._frameHeaderSize + self._frameBlocks * self._frameBlockSize]
+		self._publishAudioFrame(self._frameFormat.buildFrame(data, sequence=self._frameSequence, timestamp=self._frameTimestamp))
+
 
-			audioFrames = buffer.getvalue()
-			self.MqttManager.publish(topic=constants.TOPIC_AUDIO_FRAME.format(self.DeviceManager.getMainDevice().uid), payload=bytearray(audioFrames))
+	def _publishAudioFrame(self, frame: bytearray) -> None:
+		self._frameBlocks = 0
+		self._frameSequence = (self._frameSequence + 1) & 0xFFFFFFFF
+		self.MqttManager.publish(topic=self._audioFrameTopic, payload=frame)
 
 
 	def onPlayBytes(self, payload: bytearray, deviceUid: str, sessionId: str = None, requestId: str = None):
@@ -246,7 +336,7 @@ class AudioManager(Manager):
 					channels = wav.getnchannels()
 					framerate = wav.getframerate()
 
-					def streamCallback(outData: buffer, frames: int, _time: CData, _status: sd.CallbackFlags):
+					def streamCallback(outData: buffer, frames: int, _time: 'CData', _status: sd.CallbackFlags):
 						data = wav.readframes(frames)
 						if len(data) < len(outData):
 							outData[:len(data)] = data
@@ -22,21 +22,27 @@ import paho.mqtt.client as mqtt
 import paho.mqtt.publish as publish
 import random
 import re
+import threading
 import traceback
 import uuid
 from pathlib import Path
-from typing import List, Union
+from typing import Callable, List, Union
 
 from core.base.model.Intent import Intent
 from core.base.model.Manager import Manager
 from core.commons import constants
+from core.commons.model.ParsedMessage import ParsedMessage
 from core.device.model.Device import Device
 from core.device.model.DeviceAbility import DeviceAbility
+from core.server.model.AudioFrameBus import AudioFrameBus
+from core.server.model.AudioFrameFormat import AudioFrameFormat
+from core.server.model.MqttDispatcher import MqttDispatcher
 
 
 class MqttManager(Manager):
 	DEFAULT_CLIENT_EXTENSION = '@mqtt'
 	TOPIC_AUDIO_FRAME = constants.TOPIC_AUDIO_FRAME.replace('{}', '+')
+	AUDIO_FRAMES_QUEUE = 50
 
 
 	def __init__(self):
@@ -46,7 +52,9 @@ class MqttManager(Manager):
 		self._multiDetectionsHolder = list()
 		self._deactivatedIntents = list()
 
-		self._audioFrameRegex = re.compile(self.TOPIC_AUDIO_FRAME.replace('+', '(.*)'))
+		self._audioFrameBus = AudioFrameBus()
+		self._dispatcher = MqttDispatcher(laneKey=self._messageLane)
+		self._multiDetectionsLock = threading.Lock()
 		self._wakewordDetectedRegex = re.compile(constants.TOPIC_WAKEWORD_DETECTED.replace('{}', '(.*)'))
 		self._vadUpRegex = re.compile(constants.TOPIC_VAD_UP.replace('{}', '(.*)'))
 		self._vadDownRegex = re.compile(constants.TOPIC_VAD_DOWN.replace('{}', '(.*)'))
@@ -57,43 +65,47 @@ class MqttManager(Manager):
 	def onStart(self):
 		super().onStart()
 
-		self._mqttClient.on_message = self.onMqttMessage
+		self._dispatcher.start(workers=int(self.ConfigManager.getAliceConfigByName('mqttWorkers') or 0))
+
+		self._mqttClient.on_message = self._dispatcher.wrap(self.onMqttMessage)
 		self._mqttClient.on_connect = self.onConnect
 		self._mqttClient.on_log = self.onLog
 
-		self._mqttClient.message_callback_add(constants.TOPIC_HOTWORD_DETECTED, self.onHotwordDetected)
+		self.addMessageCallback(self.TOPIC_AUDIO_FRAME, self.onAudioFrame, laneKey=self._topicLane, maxQueue=self.AUDIO_FRAMES_QUEUE)
+		self.addMessageCallback(constants.TOPIC_AUDIO_FRAME_FORMAT.format('+'), self.onAudioFrameFormat)
+		self.addMessageCallback(constants.TOPIC_HOTWORD_DETECTED, self.onHotwordDetected)
 		for username in self.UserManager.getAllUserNames():
-			self._mqttClient.message_callback_add(constants.TOPIC_WAKEWORD_DETECTED.replace('{user}', username), self.onHotwordDetected)
-
-		self._mqttClient.message_callback_add(constants.TOPIC_SESSION_STARTED, self.sessionStarted)
-		self._mqttClient.message_callback_add(constants.TOPIC_ASR_START_LISTENING, self.startListening)
-		self._mqttClient.message_callback_add(constants.TOPIC_ASR_STOP_LISTENING, self.stopListening)
-		self._mqttClient.message_callback_add(constants.TOPIC_ASR_TOGGLE_ON, self.asrToggleOn)
-		self._mqttClient.message_callback_add(constants.TOPIC_ASR_TOGGLE_OFF, self.asrToggleOff)
-		self._mqttClient.message_callback_add(constants.TOPIC_INTENT_PARSED, self.intentParsed)
-		self._mqttClient.message_callback_add(constants.TOPIC_TEXT_CAPTURED, self.captured)
-		self._mqttClient.message_callback_add(constants.TOPIC_TTS_SAY, self.intentSay)
-		self._mqttClient.message_callback_add(constants.TOPIC_TTS_FINISHED, self.sayFinished)
-		self._mqttClient.message_callback_add(constants.TOPIC_SESSION_ENDED, self.sessionEnded)
-		self._mqttClient.message_callback_add(constants.TOPIC_CONTINUE_SESSION, self.continueSession)
-		self._mqttClient.message_callback_add(constants.TOPIC_INTENT_NOT_RECOGNIZED, self.intentNotRecognized)
-		self._mqttClient.message_callback_add(constants.TOPIC_SESSION_QUEUED, self.sessionQueued)
-		self._mqttClient.message_callback_add(constants.TOPIC_NLU_QUERY, self.nluQuery)
-		self._mqttClient.message_callback_add(constants.TOPIC_PARTIAL_TEXT_CAPTURED, self.nluPartialCapture)
-		self._mqttClient.message_callback_add(constants.TOPIC_HOTWORD_TOGGLE_ON, self.hotwordToggleOn)
-		self._mqttClient.message_callback_add(constants.TOPIC_HOTWORD_TOGGLE_OFF, self.hotwordToggleOff)
-		self._mqttClient.message_callback_add(constants.TOPIC_END_SESSION, self.eventEndSession)
-		self._mqttClient.message_callback_add(constants.TOPIC_START_SESSION, self.startSession)
-		self._mqttClient.message_callback_add(constants.TOPIC_DEVICE_HEARTBEAT, self.deviceHeartbeat)
-		self._mqttClient.message_callback_add(constants.TOPIC_TOGGLE_FEEDBACK_ON, self.toggleFeedback)
-		self._mqttClient.message_callback_add(constants.TOPIC_TOGGLE_FEEDBACK_OFF, self.toggleFeedback)
-		self._mqttClient.message_callback_add(constants.TOPIC_NLU_INTENT_NOT_RECOGNIZED, self.nluIntentNotRecognized)
-		self._mqttClient.message_callback_add(constants.TOPIC_NLU_ERROR, self.nluError)
-		self._mqttClient.message_callback_add(constants.TOPIC_NLU_TRAINER_READY, self.nluOffshoreTrainerReady)
-		self._mqttClient.message_callback_add(constants.TOPIC_NLU_TRAINER_STOPPED, self.nluOffshoreTrainerStopped)
-		self._mqttClient.message_callback_add(constants.TOPIC_NLU_TRAINER_TRAINING_RESULT, self.nluOffshoreTrainerResult)
-		self._mqttClient.message_callback_add(constants.TOPIC_NLU_TRAINER_REFUSE_FAILED, self.nluOffshoreTrainerRefusedFailed)
-		self._mqttClient.message_callback_add(constants.TOPIC_NLU_TRAINER_TRAINING, self.nluOffshoreTrainerTraining)
+			self.addMessageCallback(constants.TOPIC_WAKEWORD_DETECTED.replace('{user}', username), self.onHotwordDetected)
+
+		self.addMessageCallback(constants.TOPIC_SESSION_STARTED, self.sessionStarted)
+		self.addMessageCallback(constants.TOPIC_ASR_START_LISTENING, self.startListening)
+		self.addMessageCallback(constants.TOPIC_ASR_STOP_LISTENING, self.stopListening)
+		self.addMessageCallback(constants.TOPIC_ASR_TOGGLE_ON, self.asrToggleOn)
+		self.addMessageCallback(constants.TOPIC_ASR_TOGGLE_OFF, self.asrToggleOff)
+		self.addMessageCallback(constants.TOPIC_INTENT_PARSED, self.intentParsed)
+		self.addMessageCallback(constants.TOPIC_TEXT_CAPTURED, self.captured)
+		self.addMessageCallback(constants.TOPIC_TTS_SAY, self.intentSay)
+		self.addMessageCallback(constants.TOPIC_TTS_FINISHED, self.sayFinished)
+		self.addMessageCallback(constants.TOPIC_SESSION_ENDED, self.sessionEnded)
+		self.addMessageCallback(constants.TOPIC_CONTINUE_SESSION, self.continueSession)
+		self.addMessageCallback(constants.TOPIC_INTENT_NOT_RECOGNIZED, self.intentNotRecognized)
+		self.addMessageCallback(constants.TOPIC_SESSION_QUEUED, self.sessionQueued)
+		self.addMessageCallback(constants.TOPIC_NLU_QUERY, self.nluQuery)
+		self.addMessageCallback(constants.TOPIC_PARTIAL_TEXT_CAPTURED, self.nluPartialCapture)
+		self.addMessageCallback(constants.TOPIC_HOTWORD_TOGGLE_ON, self.hotwordToggleOn)
+		self.addMessageCallback(constants.TOPIC_HOTWORD_TOGGLE_OFF, self.hotwordToggleOff)
+		self.addMessageCallback(constants.TOPIC_END_SESSION, self.eventEndSession)
+		self.addMessageCallback(constants.TOPIC_START_SESSION, self.startSession)
+		self.addMessageCallback(constants.TOPIC_DEVICE_HEARTBEAT, self.deviceHeartbeat)
+		self.addMessageCallback(constants.TOPIC_TOGGLE_FEEDBACK_ON, self.toggleFeedback)
+		self.addMessageCallback(constants.TOPIC_TOGGLE_FEEDBACK_OFF, self.toggleFeedback)
+		self.addMessageCallback(constants.TOPIC_NLU_INTENT_NOT_RECOGNIZED, self.nluIntentNotRecognized)
+		self.addMessageCallback(constants.TOPIC_NLU_ERROR, self.nluError)
+		self.addMessageCallback(constants.TOPIC_NLU_TRAINER_READY, self.nluOffshoreTrainerReady)
+		self.addMessageCallback(constants.TOPIC_NLU_TRAINER_STOPPED, self.nluOffshoreTrainerStopped)
+		self.addMessageCallback(constants.TOPIC_NLU_TRAINER_TRAINING_RESULT, self.nluOffshoreTrainerResult)
+		self.addMessageCallback(constants.TOPIC_NLU_TRAINER_REFUSE_FAILED, self.nluOffshoreTrainerRefusedFailed)
+		self.addMessageCallback(constants.TOPIC_NLU_TRAINER_TRAINING, self.nluOffshoreTrainerTraining)
 
 		self.connect()
 
@@ -101,17 +113,61 @@ class MqttManager(Manager):
 	def onBooted(self):
 		super().onBooted()
 		# listen to all VAD messages - if the device is unknown nothing bad will happen -> reduced amount of subscriptions
-		self._mqttClient.message_callback_add(constants.TOPIC_VAD_UP.format('+'), self.onVADUp)
-		self._mqttClient.message_callback_add(constants.TOPIC_VAD_DOWN.format('+'), self.onVADDown)
+		self.addMessageCallback(constants.TOPIC_VAD_UP.format('+'), self.onVADUp)
+		self.addMessageCallback(constants.TOPIC_VAD_DOWN.format('+'), self.onVADDown)
 
 		for device in self.DeviceManager.getDevicesWithAbilities(abilities=[DeviceAbility.PLAY_SOUND, DeviceAbility.CAPTURE_SOUND], connectedOnly=False):
-			self._mqttClient.message_callback_add(constants.TOPIC_PLAY_BYTES.format(device.uid), self.topicPlayBytes)
-			self._mqttClient.message_callback_add(constants.TOPIC_PLAY_BYTES_FINISHED.format(device.uid), self.topicPlayBytesFinished)
+			self.addMessageCallback(constants.TOPIC_PLAY_BYTES.format(device.uid), self.topicPlayBytes, laneKey=self._audioServerLane)
+			self.addMessageCallback(constants.TOPIC_PLAY_BYTES_FINISHED.format(device.uid), self.topicPlayBytesFinished)
 
 
 	def onStop(self):
 		super().onStop()
 		self.disconnect()
+		self._dispatcher.stop()
+
+
+	def addMessageCallback(self, topic: str, callback: Callable, laneKey: Callable[[mqtt.MQTTMessage], str] = None, maxQueue: int = 0):
+		"""
+		Registers a message callback for the given topic filter, handled through the mqtt worker pool, see MqttDispatcher
+		:param topic: the topic filter
+		:param callback: the paho message callback
+		:param laneKey: returns the ordering key of a raw message, per device or session if None
+		:param maxQueue: drop the oldest queued message past this many, per ordering key
+		:return:
+		"""
+		self._mqttClient.message_callback_add(topic, self._dispatcher.wrap(callback, topic=topic, laneKey=laneKey, maxQueue=maxQueue))
+
+
+	def _messageLane(self, message: ParsedMessage) -> str:
+		"""
+		Messages of a same device are handled in order. Messages only known by their session
+		follow the device of the session, anything else is ordered per topic
+		:param message:
+		:return:
+		"""
+		payload = message.parsedPayload
+		if isinstance(payload, dict):
+			if 'siteId' in payload:
+				return str(payload['siteId'])
+
+			sessionId = payload.get('sessionId')
+			if sessionId:
+				session = self.DialogManager.getSession(sessionId)
+				return session.deviceUid if session else sessionId
+
+		return message.topic
+
+
+	@staticmethod
+	def _topicLane(message: mqtt.MQTTMessage) -> str:
+		return message.topic
+
+
+	@staticmethod
+	def _audioServerLane(message: mqtt.MQTTMessage) -> str:
+		# hermes/audioServer/<deviceUid>/...
+		return message.topic.split('/')[2]
 
 
 	def onLog(self, _client, _userdata, level, buf):
@@ -151,7 +207,8 @@ class MqttManager(Manager):
 			(constants.TOPIC_NLU_TRAINER_STOPPED, 0),
 			(constants.TOPIC_NLU_TRAINER_REFUSE_FAILED, 0),
 			(constants.TOPIC_NLU_TRAINER_TRAINING, 0),
-			(self.TOPIC_AUDIO_FRAME, 0)
+			(self.TOPIC_AUDIO_FRAME, 0),
+			(constants.TOPIC_AUDIO_FRAME_FORMAT.format('+'), 0)
 		]
 
 		for username in self.UserManager.getAllUserNames():
@@ -212,19 +269,10 @@ class MqttManager(Manager):
 
 	def onMqttMessage(self, _client, _userdata, message: mqtt.MQTTMessage):
 		try:
-			if self._audioFrameRegex.match(message.topic):
-				self.broadcast(
-					method=constants.EVENT_AUDIO_FRAME,
-					exceptions=[self.name],
-					propagateToSkills=True,
-					message=message,
-					deviceUid=message.topic.replace('hermes/audioServer/', '').replace('/audioFrame', '')
-				)
-				return
-
 			if message.topic == constants.TOPIC_INTENT_PARSED:
 				return
 
+			message = ParsedMessage.parse(message)
 			payload = self.Commons.payload(message)
 			sessionId = self.Commons.parseSessionId(message)
 
@@ -306,14 +354,44 @@ class MqttManager(Manager):
 			traceback.print_exc()
 
 
+	def onAudioFrame(self, _client, _data, msg: mqtt.MQTTMessage):
+		deviceUid = self._audioFrameBus.deviceUidFromTopic(msg.topic)
+		self._audioFrameBus.dispatch(deviceUid=deviceUid, payload=msg.payload)
+		self.SkillManager.skillBroadcast(constants.EVENT_AUDIO_FRAME, message=msg, deviceUid=deviceUid)
+
+
+	def onAudioFrameFormat(self, _client, _data, msg: mqtt.MQTTMessage):
+		deviceUid = msg.topic.split('/')[2]
+		frameFormat = AudioFrameFormat.fromDict(self.Commons.payload(msg))
+		self._audioFrameBus.setFrameFormat(deviceUid=deviceUid, frameFormat=frameFormat)
+		self.logDebug(f'Device **{deviceUid}** sends {frameFormat.format} audio frames at {frameFormat.sampleRate}Hz')
+
+
+	def subscribeAudioFrames(self, name: str, callback: Callable[[memoryview, str], None], deviceUid: str = None):
+		"""
+		Subscribes to the audio frames, see AudioFrameBus
+		:param name: the consumer name
+		:param callback: called with a memoryview of the frame payload and the device uid
+		:param deviceUid: only receive the frames of this device, all devices if None
+		:return:
+		"""
+		self._audioFrameBus.subscribe(name=name, callback=callback, deviceUid=deviceUid)
+
+
+	def unsubscribeAudioFrames(self, name: str, deviceUid: str = None):
+		self._audioFrameBus.unsubscribe(name=name, deviceUid=deviceUid)
+
+
 	def onHotwordDetected(self, _client, _data, msg):
+		msg = ParsedMessage.parse(msg)
 		deviceUid = self.Commons.parseDeviceUid(msg)
 		payload = self.Commons.payload(msg)
 
-		if not self._multiDetectionsHolder:
-			self.ThreadManager.doLater(interval=0.5, func=self.handleMultiDetection)
+		with self._multiDetectionsLock:
+			if not self._multiDetectionsHolder:
+				self.ThreadManager.doLater(interval=0.5, func=self.handleMultiDetection)
 
-		self._multiDetectionsHolder.append(payload['siteId'])
+			self._multiDetectionsHolder.append(payload['siteId'])
 
 		user = constants.UNKNOWN_USER
 		if payload['modelType'] == 'personal':
@@ -329,8 +407,11 @@ class MqttManager(Manager):
 
 
 	def handleMultiDetection(self):
-		if len(self._multiDetectionsHolder) <= 1:
+		with self._multiDetectionsLock:
+			detections = self._multiDetectionsHolder
 			self._multiDetectionsHolder = list()
+
+		if len(detections) <= 1:
 			return
 
 		sessions = self.DialogManager.sessions
@@ -338,25 +419,26 @@ class MqttManager(Manager):
 			payload = self.Commons.payload(sessions[sessionId].message)
 			if not payload:
 				continue
-			if payload['siteId'] != self._multiDetectionsHolder[0]:
+			if payload['siteId'] != detections[0]:
 				self.endSession(sessionId=sessionId, forceEnd=True)
 
-		self._multiDetectionsHolder = list()
-
 
 	def hotwordToggleOn(self, _client, _data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		deviceUid = self.Commons.parseDeviceUid(msg)
 		session = self.DialogManager.getSession(self.Commons.parseSessionId(msg))
 		self.broadcast(method=constants.EVENT_HOTWORD_TOGGLE_ON, exceptions=[constants.DUMMY], propagateToSkills=True, deviceUid=deviceUid, session=session)
 
 
 	def hotwordToggleOff(self, _client, _data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		deviceUid = self.Commons.parseDeviceUid(msg)
 		session = self.DialogManager.getSession(self.Commons.parseSessionId(msg))
 		self.broadcast(method=constants.EVENT_HOTWORD_TOGGLE_OFF, exceptions=[constants.DUMMY], propagateToSkills=True, deviceUid=deviceUid, session=session)
 
 
 	def sessionStarted(self, _client, _data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		session = self.DialogManager.getSession(sessionId=self.Commons.parseSessionId(msg))
 
 		if session:
@@ -365,6 +447,7 @@ class MqttManager(Manager):
 
 
 	def sessionQueued(self, _client, _data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		sessionId = self.Commons.parseSessionId(msg)
 		session = self.DialogManager.getSession(sessionId)
 
@@ -374,6 +457,7 @@ class MqttManager(Manager):
 
 
 	def nluQuery(self, _client, _data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		sessionId = self.Commons.parseSessionId(msg)
 		deviceUid = self.Commons.parseDeviceUid(msg)
 
@@ -395,6 +479,7 @@ class MqttManager(Manager):
 
 
 	def startListening(self, _client, _data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		sessionId = self.Commons.parseSessionId(msg)
 		session = self.DialogManager.getSession(sessionId=sessionId)
 
@@ -404,6 +489,7 @@ class MqttManager(Manager):
 
 
 	def stopListening(self, _client, _data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		sessionId = self.Commons.parseSessionId(msg)
 		session = self.DialogManager.getSession(sessionId=sessionId)
 
@@ -413,6 +499,7 @@ class MqttManager(Manager):
 
 
 	def captured(self, _client, _data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		sessionId = self.Commons.parseSessionId(msg)
 		session = self.DialogManager.getSession(sessionId=sessionId)
 
@@ -422,6 +509,7 @@ class MqttManager(Manager):
 
 
 	def intentParsed(self, client, data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		sessionId = self.Commons.parseSessionId(msg)
 		session = self.DialogManager.getSession(sessionId=sessionId)
 
@@ -456,6 +544,7 @@ class MqttManager(Manager):
 
 
 	def continueSession(self, _client, _data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		sessionId = self.Commons.parseSessionId(msg)
 		session = self.DialogManager.getSession(sessionId)
 		if session:
@@ -466,6 +555,7 @@ class MqttManager(Manager):
 
 
 	def sessionEnded(self, _client, data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		sessionId = self.Commons.parseSessionId(msg)
 		session = self.DialogManager.getSession(sessionId)
 
@@ -496,6 +586,7 @@ class MqttManager(Manager):
 
 
 	def intentSay(self, _client, _data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		sessionId = self.Commons.parseSessionId(msg)
 		payload = self.Commons.payload(msg)
 
@@ -514,6 +605,7 @@ class MqttManager(Manager):
 
 
 	def sayFinished(self, _client, _data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		sessionId = self.Commons.parseSessionId(msg)
 		uid = ''
 		session = self.DialogManager.getSession(sessionId)
@@ -525,6 +617,7 @@ class MqttManager(Manager):
 
 
 	def intentNotRecognized(self, _client, _data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		sessionId = self.Commons.parseSessionId(msg)
 		session = self.DialogManager.getSession(sessionId)
 
@@ -550,6 +643,7 @@ class MqttManager(Manager):
 
 
 	def nluPartialCapture(self, _client, _data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		session = self.DialogManager.getSession(self.Commons.parseSessionId(msg))
 
 		if session:
@@ -559,6 +653,7 @@ class MqttManager(Manager):
 
 
 	def nluIntentNotRecognized(self, _client, _data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		session = self.DialogManager.getSession(self.Commons.parseSessionId(msg))
 
 		if session:
@@ -567,6 +662,7 @@ class MqttManager(Manager):
 
 
 	def nluError(self, _client, _data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		session = self.DialogManager.getSession(self.Commons.parseSessionId(msg))
 
 		if session:
@@ -575,6 +671,7 @@ class MqttManager(Manager):
 
 
 	def startSession(self, _client, _data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		self.broadcast(
 			method=constants.EVENT_START_SESSION,
 			exceptions=[self.name],
@@ -623,6 +720,7 @@ class MqttManager(Manager):
 
 
 	def eventEndSession(self, _client, _data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		sessionId = self.Commons.parseSessionId(msg)
 		session = self.DialogManager.getSession(sessionId)
 		if session:
@@ -645,12 +743,14 @@ class MqttManager(Manager):
 
 
 	def topicPlayBytesFinished(self, _client, _data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		deviceUid = self.Commons.parseDeviceUid(msg)
 		sessionId = self.Commons.parseSessionId(msg)
 		self.broadcast(method=constants.EVENT_PLAY_BYTES_FINISHED, exceptions=self.name, propagateToSkills=True, deviceUid=deviceUid, sessionId=sessionId)
 
 
 	def deviceHeartbeat(self, _client, _data, msg: mqtt.MQTTMessage):
+		msg = ParsedMessage.parse(msg)
 		payload = self.Commons.payload(msg)
 		uid = payload.get('uid', None)
 		if not uid:
@@ -905,7 +1005,7 @@ class MqttManager(Manager):
 			sessionId = str(uuid.uuid4())
 
 		session = self.DialogManager.getSession(sessionId=sessionId)
-		if session and not self.TTSManager.speaking:
+		if session and not self.TTSManager.isSpeaking(sessionId):
 			session.lastWasSoundPlayOnly = True
 
 		if not location:
@@ -987,6 +1087,20 @@ class MqttManager(Manager):
 		return self._mqttClient
 
 
+	@property
+	def audioFrameBus(self) -> AudioFrameBus:
+		return self._audioFrameBus
+
+
+	@property
+	def dispatchStats(self) -> dict:
+		"""
+		Per topic counts, queue depth, queue wait and handler latency histograms of the mqtt worker pool
+		:return:
+		"""
+		return self._dispatcher.stats()
+
+
 	def toggleFeedbackSounds(self, state='On'):
 		"""
 		Activates or disables the feedback sounds, on all devices
@@ -1077,3 +1191,8 @@ class MqttManager(Manager):
 				'skillName': skill
 			}
 		)
+
+
+	def onSkillsStarted(self, skills: list):
+		for skill in skills:
+			self.onSkillStarted(skill=skill)
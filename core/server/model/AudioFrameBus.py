@@ -0,0 +1,197 @@
+#  Copyright (c) 2021
+#
+#  This file, AudioFrameBus.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.base.model.ProjectAliceObject import ProjectAliceObject
+from core.commons import constants
+from core.server.model.AudioFrameFormat import AudioFrameFormat
+
+
+@dataclass
+class AudioFrameConsumer(object):
+	name: str
+	callback: Callable[[memoryview, str], None]
+	deviceUid: Optional[str] = None
+	calls: int = 0
+	errors: int = 0
+	totalTime: float = 0
+	maxTime: float = 0
+
+
+	def toDict(self) -> dict:
+		return {
+			'name'       : self.name,
+			'deviceUid'  : self.deviceUid,
+			'calls'      : self.calls,
+			'errors'     : self.errors,
+			'totalTime'  : self.totalTime,
+			'maxTime'    : self.maxTime,
+			'averageTime': self.totalTime / self.calls if self.calls else 0
+		}
+
+
+class AudioFrameBus(ProjectAliceObject):
+	"""
+	Delivers the audio frames straight to the consumers subscribed to them, per device, instead
+	of going through the event broadcast. Consumers receive a memoryview of the mqtt payload
+	and the device uid and must not keep the view past their call. The payload is in the format
+	the device announced, use pcm() to get the samples whatever the format. Aggregated frames
+	are sequenced, the bus counts the frames that never made it and logs them at most once per
+	LOSS_WARNING_INTERVAL per device, as an overloaded Alice loses frames from every device all the time
+	"""
+
+	TOPIC_PREFIX, TOPIC_SUFFIX = constants.TOPIC_AUDIO_FRAME.split('{}')
+	LOSS_WARNING_INTERVAL = 60
+
+
+	def __init__(self):
+		super().__init__()
+		self._lock = threading.Lock()
+		self._consumers: Dict[Tuple[str, Optional[str]], AudioFrameConsumer] = dict()
+		self._routes: Dict[str, Tuple[AudioFrameConsumer, ...]] = dict()
+		self._formats: Dict[str, AudioFrameFormat] = dict()
+		self._defaultFormat = AudioFrameFormat()
+		self._sequences: Dict[str, int] = dict()
+		self._droppedFrames: Dict[str, int] = dict()
+		self._lossWarnings: Dict[str, Tuple[float, int]] = dict()  # Last warning time and dropped frames count then
+
+
+	def subscribe(self, name: str, callback: Callable[[memoryview, str], None], deviceUid: str = None):
+		"""
+		Subscribes a consumer to the audio frames. Subscribing again with the same name and device replaces the callback
+		:param name: the consumer name, used for the counters
+		:param callback: called with the frame and the device uid
+		:param deviceUid: only receive the frames of this device, all devices if None
+		:return:
+		"""
+		with self._lock:
+			self._consumers[(name, deviceUid)] = AudioFrameConsumer(name=name, callback=callback, deviceUid=deviceUid)
+			self._routes = dict()
+
+
+	def unsubscribe(self, name: str, deviceUid: str = None):
+		with self._lock:
+			if self._consumers.pop((name, deviceUid), None):
+				self._routes = dict()
+
+
+	def isSubscribed(self, name: str, deviceUid: str = None) -> bool:
+		return (name, deviceUid) in self._consumers
+
+
+	def deviceUidFromTopic(self, topic: str) -> str:
+		return topic[len(self.TOPIC_PREFIX):len(topic) - len(self.TOPIC_SUFFIX)]
+
+
+	def setFrameFormat(self, deviceUid: str, frameFormat: AudioFrameFormat):
+		self._formats[deviceUid] = frameFormat
+		self._sequences.pop(deviceUid, None)
+
+
+	def frameFormat(self, deviceUid: str) -> AudioFrameFormat:
+		return self._formats.get(deviceUid, self._defaultFormat)
+
+
+	def pcm(self, payload: memoryview, deviceUid: str) -> memoryview:
+		"""
+		Returns the pcm samples of a frame, whether the device sends wav or raw frames
+		:param payload: the frame as received by the consumer
+		:param deviceUid:
+		:return:
+		"""
+		return self._formats.get(deviceUid, self._defaultFormat).pcm(payload)
+
+
+	def dispatch(self, deviceUid: str, payload: bytes):
+		"""
+		Hands the frame over to the consumers of the given device, timing every consumer
+		:param deviceUid:
+		:param payload: the raw mqtt payload
+		:return:
+		"""
+		frameFormat = self._formats.get(deviceUid)
+		if frameFormat and frameFormat.isAggregated:
+			self._checkSequence(deviceUid, frameFormat, payload)
+
+		consumers = self._routes.get(deviceUid)
+		if consumers is None:
+			consumers = self._buildRoute(deviceUid)
+
+		if not consumers:
+			return
+
+		frame = memoryview(payload)
+		for consumer in consumers:
+			start = time.perf_counter()
+			try:
+				consumer.callback(frame, deviceUid)
+			except Exception as e:
+				consumer.errors += 1
+				self.logError(f'Audio frame consumer **{consumer.name}** failed: {e}')
+
+			elapsed = time.perf_counter() - start
+			consumer.calls += 1
+			consumer.totalTime += elapsed
+			if elapsed > consumer.maxTime:
+				consumer.maxTime = elapsed
+
+
+	def _checkSequence(self, deviceUid: str, frameFormat: AudioFrameFormat, payload: bytes):
+		try:
+			sequence, _timestamp = frameFormat.sequence(payload)
+		except struct.error:
+			return
+
+		last = self._sequences.get(deviceUid)
+		self._sequences[deviceUid] = sequence
+		if last is None:
+			return
+
+		missed = (sequence - last - 1) & 0xFFFFFFFF
+		# A huge gap is a publisher restarting its sequence, not lost frames
+		if 0 < missed < 0x80000000:
+			dropped = self._droppedFrames.get(deviceUid, 0) + missed
+			self._droppedFrames[deviceUid] = dropped
+
+			now = time.monotonic()
+			lastWarning, droppedThen = self._lossWarnings.get(deviceUid, (None, 0))
+			if lastWarning is None or now - lastWarning > self.LOSS_WARNING_INTERVAL:
+				self._lossWarnings[deviceUid] = (now, dropped)
+				self.logWarning(f'Lost {dropped - droppedThen} audio frame(s) from device **{deviceUid}**, {dropped} since start')
+
+
+	def droppedFrames(self, deviceUid: str) -> int:
+		return self._droppedFrames.get(deviceUid, 0)
+
+
+	def _buildRoute(self, deviceUid: str) -> Tuple[AudioFrameConsumer, ...]:
+		with self._lock:
+			routes = self._routes
+			consumers = tuple(consumer for consumer in self._consumers.values() if consumer.deviceUid is None or consumer.deviceUid == deviceUid)
+			routes[deviceUid] = consumers
+			return consumers
+
+
+	def stats(self) -> List[dict]:
+		return [consumer.toDict() for consumer in list(self._consumers.values())]
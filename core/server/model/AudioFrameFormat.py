@@ -0,0 +1,153 @@
+#  Copyright (c) 2021
+#
+#  This file, AudioFrameFormat.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import io
+import struct
+import wave
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+@dataclass
+class AudioFrameFormat(object):
+	"""
+	Format of the audio frames a device publishes. Wav frames carry their own header, raw pcm frames
+	don't and rely on the format the device announced once on its audio frame format topic.
+	Aggregated frames hold several capture blocks and start with a sequence number and the
+	capture timestamp of their first block
+	"""
+	WAV = 'wav'
+	PCM = 'pcm'
+	HEADER = struct.Struct('<Id')
+
+	format: str = WAV
+	sampleRate: int = 16000
+	channels: int = 1
+	sampleWidth: int = 2
+	aggregation: int = 1
+
+
+	@property
+	def isRaw(self) -> bool:
+		return self.format == self.PCM
+
+
+	@property
+	def isAggregated(self) -> bool:
+		return self.aggregation > 1
+
+
+	@classmethod
+	def fromDict(cls, data: dict):
+		return cls(
+			format=data.get('format', cls.WAV),
+			sampleRate=int(data.get('sampleRate', 16000)),
+			channels=int(data.get('channels', 1)),
+			sampleWidth=int(data.get('sampleWidth', 2)),
+			aggregation=int(data.get('aggregation', 1))
+		)
+
+
+	def toDict(self) -> dict:
+		return {
+			'format'     : self.format,
+			'sampleRate' : self.sampleRate,
+			'channels'   : self.channels,
+			'sampleWidth': self.sampleWidth,
+			'aggregation': self.aggregation
+		}
+
+
+	def pcm(self, payload: memoryview) -> memoryview:
+		"""
+		Returns the pcm samples of the given frame, without copying them
+		:param payload: the frame as received
+		:return:
+		"""
+		if self.isAggregated:
+			payload = payload[self.HEADER.size:]
+
+		return payload if self.isRaw else self.wavData(payload)
+
+
+	def sequence(self, payload: memoryview) -> Optional[Tuple[int, float]]:
+		"""
+		Returns the sequence number and the capture timestamp of an aggregated frame
+		:param payload: the frame as received
+		:return: None if the frames are not aggregated
+		"""
+		if not self.isAggregated:
+			return None
+
+		return self.HEADER.unpack_from(payload)
+
+
+	def buildFrame(self, data: bytes, sequence: int = 0, timestamp: float = 0) -> bytearray:
+		"""
+		Builds a complete frame out of the given pcm data
+		:param data: the pcm samples
+		:param sequence: the frame sequence number, for aggregated frames
+		:param timestamp: the capture time of the first block, for aggregated frames
+		:return:
+		"""
+		frame = bytearray(self.HEADER.pack(sequence, timestamp)) if self.isAggregated else bytearray()
+		if not self.isRaw:
+			frame += self.wavHeader(len(data))
+
+		frame += data
+		return frame
+
+
+	def wavHeader(self, dataSize: int) -> bytes:
+		"""
+		Builds the wav header for a frame of the given size
+		:param dataSize: size of the pcm data, in bytes
+		:return:
+		"""
+		with io.BytesIO() as buffer:
+			with wave.open(buffer, 'wb') as wav:
+				wav.setnchannels(self.channels)
+				wav.setsampwidth(self.sampleWidth)
+				wav.setframerate(self.sampleRate)
+				wav.writeframes(bytes(dataSize))
+
+			return buffer.getvalue()[:-dataSize or None]
+
+
+	@staticmethod
+	def wavData(payload: memoryview) -> memoryview:
+		"""
+		Walks the wav chunks and returns a view on the data chunk
+		:param payload: a wav file
+		:return:
+		"""
+		if payload[:4] != b'RIFF' or payload[8:12] != b'WAVE':
+			raise ValueError('Audio frame is not a wav file')
+
+		offset = 12
+		while offset + 8 <= len(payload):
+			chunkId = payload[offset:offset + 4]
+			size = int.from_bytes(payload[offset + 4:offset + 8], 'little')
+			offset += 8
+			if chunkId == b'data':
+				return payload[offset:offset + size]
+
+			offset += size + (size & 1)
+
+		raise ValueError('Audio frame has no data chunk')
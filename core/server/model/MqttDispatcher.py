@@ -0,0 +1,273 @@
+#  Copyright (c) 2021
+#
+#  This file, MqttDispatcher.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import bisect
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from paho.mqtt.client import MQTTMessage
+
+from core.base.model.ProjectAliceObject import ProjectAliceObject
+from core.commons.model.ParsedMessage import ParsedMessage
+
+
+@dataclass
+class Histogram(object):
+	bounds: Tuple[float, ...]
+	counts: List[int] = field(default_factory=list)
+	samples: int = 0
+	total: float = 0
+	maxValue: float = 0
+
+
+	def __post_init__(self):
+		self.counts = [0] * (len(self.bounds) + 1)
+
+
+	def add(self, value: float):
+		self.counts[bisect.bisect_left(self.bounds, value)] += 1
+		self.samples += 1
+		self.total += value
+		if value > self.maxValue:
+			self.maxValue = value
+
+
+	def toDict(self) -> dict:
+		buckets = {f'<={bound}': count for bound, count in zip(self.bounds, self.counts)}
+		buckets[f'>{self.bounds[-1]}'] = self.counts[-1]
+		return {
+			'buckets': buckets,
+			'samples': self.samples,
+			'average': self.total / self.samples if self.samples else 0,
+			'max'    : self.maxValue
+		}
+
+
+@dataclass
+class TopicStats(object):
+	DEPTH_BOUNDS = (0, 1, 2, 5, 10, 50, 100, 500)
+	TIME_BOUNDS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+	messages: int = 0
+	dropped: int = 0
+	errors: int = 0
+	queueDepth: Histogram = field(default_factory=lambda: Histogram(TopicStats.DEPTH_BOUNDS))
+	wait: Histogram = field(default_factory=lambda: Histogram(TopicStats.TIME_BOUNDS))
+	latency: Histogram = field(default_factory=lambda: Histogram(TopicStats.TIME_BOUNDS))
+
+
+	def toDict(self) -> dict:
+		return {
+			'messages'  : self.messages,
+			'dropped'   : self.dropped,
+			'errors'    : self.errors,
+			'queueDepth': self.queueDepth.toDict(),
+			'wait'      : self.wait.toDict(),
+			'latency'   : self.latency.toDict()
+		}
+
+
+@dataclass
+class Route(object):
+	topic: Optional[str]
+	callback: Callable[[Any, Any, MQTTMessage], None]
+	laneKey: Callable[[MQTTMessage], str]
+	maxQueue: int = 0
+	parse: bool = True
+
+
+@dataclass
+class Lane(object):
+	key: str
+	queue: Deque[Tuple[Route, Any, Any, MQTTMessage, float]]
+	active: bool = False
+
+
+class MqttDispatcher(ProjectAliceObject):
+	"""
+	Sits between paho and the message handlers, so that a slow handler doesn't hold the paho network
+	thread and every other device with it. Messages are queued in lanes, a lane per ordering key, and
+	a lane's messages are handled one after the other, in the order they came in. Different lanes
+	are handled concurrently by a bounded worker pool. Lanes with a maximum queue size drop their
+	oldest message when full, which is what we want for audio frames. With no workers, the handlers
+	are called by paho directly, as they used to
+	"""
+
+	DRAIN_BATCH = 16
+
+
+	def __init__(self, laneKey: Callable[[ParsedMessage], str]):
+		super().__init__()
+		self._laneKey = laneKey
+		self._lock = threading.Lock()
+		self._lanes: Dict[str, Lane] = dict()
+		self._stats: Dict[str, TopicStats] = dict()
+		self._executor: Optional[ThreadPoolExecutor] = None
+		self._workers = 0
+
+
+	def start(self, workers: int):
+		if self._executor or workers <= 0:
+			return
+
+		self._workers = workers
+		self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mqttWorker')
+
+
+	def stop(self):
+		"""
+		Drops the queued messages and stops the workers, without waiting for the running handlers
+		:return:
+		"""
+		with self._lock:
+			executor = self._executor
+			self._executor = None
+			self._workers = 0
+			for lane in self._lanes.values():
+				lane.queue.clear()
+			self._lanes = dict()
+
+		if executor:
+			executor.shutdown(wait=False)
+
+
+	def wrap(self, callback: Callable[[Any, Any, MQTTMessage], None], topic: str = None, laneKey: Callable[[MQTTMessage], str] = None, maxQueue: int = 0) -> Callable[[Any, Any, MQTTMessage], None]:
+		"""
+		Returns a paho message callback queuing the messages for the given callback
+		:param callback: the message handler
+		:param topic: the topic filter the callback is registered for, used for the stats. None to keep stats per message topic
+		:param laneKey: returns the ordering key of a raw message. If None, the message is parsed and the dispatcher default is used
+		:param maxQueue: when set, the lanes of this callback drop their oldest message past this size
+		:return:
+		"""
+		if not self._executor:
+			return callback
+
+		route = Route(topic=topic, callback=callback, laneKey=laneKey or self._laneKey, maxQueue=maxQueue, parse=laneKey is None)
+
+
+		def onMessage(client, userdata, message: MQTTMessage):
+			self.dispatch(route, client, userdata, message)
+
+
+		return onMessage
+
+
+	def dispatch(self, route: Route, client, userdata, message: MQTTMessage):
+		executor = self._executor
+		if not executor:
+			return
+
+		try:
+			if route.parse:
+				message = ParsedMessage.parse(message)
+			key = route.laneKey(message)
+		except Exception as e:
+			self.logError(f'Cannot order message on topic **{message.topic}**: {e}')
+			return
+
+		with self._lock:
+			lane = self._lanes.get(key)
+			if not lane:
+				lane = Lane(key=key, queue=deque(maxlen=route.maxQueue or None))
+				self._lanes[key] = lane
+
+			stats = self._topicStats(route.topic or message.topic)
+			depth = len(lane.queue)
+			stats.queueDepth.add(depth)
+			if lane.queue.maxlen and depth == lane.queue.maxlen:
+				droppedRoute, _client, _userdata, droppedMessage, _queued = lane.queue[0]
+				self._topicStats(droppedRoute.topic or droppedMessage.topic).dropped += 1
+
+			lane.queue.append((route, client, userdata, message, time.perf_counter()))
+			if lane.active:
+				return
+			lane.active = True
+
+		self._submit(executor, lane)
+
+
+	def _submit(self, executor: ThreadPoolExecutor, lane: Lane):
+		try:
+			executor.submit(self._drain, lane)
+		except RuntimeError:
+			pass  # Shutting down
+
+
+	def _drain(self, lane: Lane):
+		for _ in range(self.DRAIN_BATCH):
+			with self._lock:
+				if not lane.queue:
+					lane.active = False
+					if self._lanes.get(lane.key) is lane:
+						self._lanes.pop(lane.key)
+					return
+
+				route, client, userdata, message, queued = lane.queue.popleft()
+
+			self._handle(route, client, userdata, message, queued)
+
+		# Give the other lanes a chance before going on with this one
+		executor = self._executor
+		if executor:
+			self._submit(executor, lane)
+
+
+	def _handle(self, route: Route, client, userdata, message: MQTTMessage, queued: float):
+		start = time.perf_counter()
+		failed = False
+		try:
+			route.callback(client, userdata, message)
+		except Exception as e:
+			failed = True
+			self.logError(f'Handler for topic **{message.topic}** failed: {e}')
+
+		end = time.perf_counter()
+		with self._lock:
+			stats = self._topicStats(route.topic or message.topic)
+			stats.messages += 1
+			stats.errors += failed
+			stats.wait.add(start - queued)
+			stats.latency.add(end - start)
+
+
+	def _topicStats(self, topic: str) -> TopicStats:
+		stats = self._stats.get(topic)
+		if not stats:
+			stats = self._stats[topic] = TopicStats()
+		return stats
+
+
+	def queueDepth(self, key: str) -> int:
+		lane = self._lanes.get(key)
+		return len(lane.queue) if lane else 0
+
+
+	def stats(self) -> dict:
+		with self._lock:
+			return {
+				'workers': self._workers,
+				'lanes'  : len(self._lanes),
+				'queued' : sum(len(lane.queue) for lane in self._lanes.values()),
+				'topics' : {topic: stats.toDict() for topic, stats in self._stats.items()}
+			}
@@ -17,8 +17,6 @@
 #
 #  Last modified: 2021.04.13 at 12:56:47 CEST
 
-import bcrypt
-import jwt
 from pathlib import Path
 from time import time
 from typing import Any, Dict, Optional, Union
@@ -27,6 +25,11 @@ from core.base.model.Manager import Manager
 from core.commons import constants
 from core.user.model.AccessLevels import AccessLevel
 from core.user.model.User import User
+from core.util.model.LazyModule import lazyImport
+
+# Only needed when users log in or get their pin changed
+bcrypt = lazyImport('bcrypt')
+jwt = lazyImport('jwt')
 
 
 class UserManager(Manager):
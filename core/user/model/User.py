@@ -17,10 +17,12 @@
 #
 #  Last modified: 2021.04.13 at 12:56:47 CEST
 
-import bcrypt
 import typing
 
 from core.base.model.ProjectAliceObject import ProjectAliceObject
+from core.util.model.LazyModule import lazyImport
+
+bcrypt = lazyImport('bcrypt')
 
 
 class User(ProjectAliceObject):
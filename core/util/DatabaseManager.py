@@ -17,30 +17,250 @@
 #
 #  Last modified: 2021.04.13 at 12:56:47 CEST
 
+import hashlib
+import itertools
+import json
+import queue
 import sqlite3
+import threading
 import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Generator, Iterable, List, Optional, Union
 
 from core.ProjectAliceExceptions import DbConnectionError, InvalidQuery
 from core.base.model.Manager import Manager
 from core.commons import constants
 from core.commons.CommonsManager import CommonsManager
+from core.util.model.DatabaseWrite import DatabaseWrite
 
 
 # noinspection SqlResolve
 class DatabaseManager(Manager):
 	TABLE_TAG = ':__table__'
+	SCHEMA_TABLE = 'DatabaseManager_schemas'
+	CACHED_STATEMENTS = 256
+	WRITE_QUEUE_SIZE = 2000
+	WRITE_BATCH_SIZE = 200
+	WRITE_TIMEOUT = 30
+
+	ROW_DICT = 'dict'
+	ROW_TUPLE = 'tuple'
+	ROW_SQLITE = 'sqlite'
 
 
 	def __init__(self):
 		super().__init__()
-		self._tables = list()
+		self._tables = set()
+		self._schemaLock = threading.Lock()
+		self._databaseFile = constants.DATABASE_FILE
+		self._local = threading.local()
+		self._connections: Dict[int, sqlite3.Connection] = dict()
+		self._connectionsLock = threading.Lock()
+
+		self._writeBehind = False
+		self._writeQueue: queue.Queue = queue.Queue(maxsize=self.WRITE_QUEUE_SIZE)
+		self._writeLock = threading.Condition()
+		self._queueing = 0  # Writes being put in the queue, the writer is only stopped once they are all in
+		self._writer: Optional[threading.Thread] = None
+		self._writeStats = {'maxDepth': 0, 'written': 0, 'failed': 0, 'batches': 0, 'largestBatch': 0}
 
 
 	def onStart(self):
 		super().onStart()
 		self.fetchTables()
+		if self.ConfigManager.getAliceConfigByName('databaseWriteBehind'):
+			self.startWriteBehind()
+
+
+	def onStop(self):
+		super().onStop()
+		self.stopWriteBehind()
+		self.closeConnections()
+
+
+	@property
+	def writeBehind(self) -> bool:
+		return self._writeBehind
+
+
+	@property
+	def writeQueueStats(self) -> dict:
+		return {'depth': self._writeQueue.qsize(), **self._writeStats}
+
+
+	def startWriteBehind(self):
+		"""
+		From now on, inserts, updates and deletes are queued and committed in batches by a
+		single writer thread. By default writes still wait for their commit and report their
+		errors, writes made with blocking=False don't. Reads do not wait for the queue, use
+		flush() to read writes made without blocking
+		:return:
+		"""
+		with self._writeLock:
+			if self._writeBehind:
+				return
+
+			self._writer = self.ThreadManager.newThread(name='databaseWriter', target=self._writeWorker)
+			self._writeBehind = True
+
+
+	def stopWriteBehind(self):
+		"""
+		Commits every queued write and goes back to writing on the calling thread
+		:return:
+		"""
+		with self._writeLock:
+			if not self._writeBehind:
+				return
+
+			self._writeBehind = False
+			self._writeLock.wait_for(lambda: not self._queueing)
+
+		self._writeQueue.put(None)
+		if self._writer:
+			self._writer.join()
+			self._writer = None
+
+
+	def flush(self, timeout: float = None) -> bool:
+		"""
+		Waits for every write queued so far to be committed
+		:param timeout: seconds
+		:return: False if it timed out
+		"""
+		try:
+			barrier = self._queueWrite(DatabaseWrite(done=threading.Event()))
+		except DbConnectionError:
+			return False
+
+		return barrier.done.wait(timeout) if barrier else True
+
+
+	def _queueWrite(self, write: DatabaseWrite) -> Optional[DatabaseWrite]:
+		"""
+		Queues a write if in write behind mode. The lock is not held while waiting for room in a full queue,
+		so that one waiting write doesn't hold up the others, flush() and stopWriteBehind()
+		:param write:
+		:return: the queued write, None if not in write behind mode
+		"""
+		with self._writeLock:
+			if not self._writeBehind:
+				return None
+
+			self._queueing += 1
+
+		try:
+			self._writeQueue.put(write, timeout=self.WRITE_TIMEOUT)
+		except queue.Full:
+			raise DbConnectionError(f'Write queue full, write for component {write.callerName} in table {write.tableName} not queued within {self.WRITE_TIMEOUT} seconds')
+		finally:
+			with self._writeLock:
+				self._queueing -= 1
+				self._writeStats['maxDepth'] = max(self._writeStats['maxDepth'], self._writeQueue.qsize())
+				if not self._queueing:
+					self._writeLock.notify_all()
+
+		return write
+
+
+	def _awaitWrite(self, write: DatabaseWrite) -> Any:
+		"""
+		Waits for a queued write to be committed, for at most WRITE_TIMEOUT seconds
+		:param write:
+		:return: the write result
+		"""
+		if not write.done.wait(self.WRITE_TIMEOUT):
+			raise DbConnectionError(f'Queued write for component {write.callerName} in table {write.tableName} was not committed within {self.WRITE_TIMEOUT} seconds')
+
+		if write.error:
+			raise write.error
+
+		return write.result
+
+
+	def _queueStatement(self, write: DatabaseWrite, blocking: bool, action: str) -> Optional[bool]:
+		"""
+		Queues an update or delete. These don't raise, the writer thread already logged a failed statement
+		:param write:
+		:param blocking: wait for the statement to be committed
+		:param action: updating, deleting... for the log
+		:return: None if not in write behind mode, False if the statement failed, timed out or could not be queued
+		"""
+		try:
+			if not self._queueWrite(write):
+				return None
+
+			if blocking:
+				self._awaitWrite(write)
+			return True
+		except DbConnectionError as e:
+			self.logWarning(f'Error {action} data for component **{write.callerName}** in table **{write.tableName}**: {e}')
+			return False
+		except Exception:
+			return False
+
+
+	def _writeWorker(self):
+		database = self.getConnection()
+		running = True
+
+		while running:
+			batch = [self._writeQueue.get()]
+			while len(batch) < self.WRITE_BATCH_SIZE:
+				try:
+					batch.append(self._writeQueue.get_nowait())
+				except queue.Empty:
+					break
+
+			running = None not in batch
+			self._writeBatch(database, [write for write in batch if write])
+
+		self.releaseConnection(database)
+
+
+	def _writeBatch(self, database: sqlite3.Connection, batch: List[DatabaseWrite]):
+		cursor = database.cursor()
+		try:
+			startTime = time.time()
+			cursor.execute('BEGIN')
+			for write in batch:
+				if not write.query:
+					continue
+
+				cursor.execute('SAVEPOINT write')
+				try:
+					if write.many:
+						cursor.executemany(write.query, write.values)
+						write.result = len(write.values)
+					else:
+						cursor.execute(write.query, write.values)
+						write.result = cursor.lastrowid
+					cursor.execute('RELEASE write')
+				except Exception as e:
+					cursor.execute('ROLLBACK TO write')
+					cursor.execute('RELEASE write')
+					write.error = e
+					self._writeStats['failed'] += 1
+					self.logWarning(f'Error writing data for component **{write.callerName}** in table **{write.tableName}**: {e}')
+
+			database.commit()
+			if self.ConfigManager.getAliceConfigByName('databaseProfiling'):
+				self.logDebug(f'It took {time.time() - startTime} seconds to commit {len(batch)} queued writes')
+		except Exception as e:
+			self.logError(f'Failed committing {len(batch)} queued database writes: {e}')
+			self.releaseConnection(database)
+			for write in batch:
+				write.error = write.error or e
+		finally:
+			cursor.close()
+
+		self._writeStats['written'] += len(batch)
+		self._writeStats['batches'] += 1
+		self._writeStats['largestBatch'] = max(self._writeStats['largestBatch'], len(batch))
+
+		for write in batch:
+			if write.done:
+				write.done.set()
 
 
 	def fetchTables(self):
@@ -48,145 +268,248 @@ class DatabaseManager(Manager):
 		cursor = database.cursor()
 		try:
 			cursor.execute("SELECT name FROM main.sqlite_master WHERE type = 'table' and name NOT LIKE 'sqlite_%'")
-			self._tables = cursor.fetchall()
+			self._tables = {row[0] for row in cursor.fetchall()}
 			cursor.close()
-			database.close()
 		except sqlite3.Error as e:
 			self.logError(f'Something went wrong fetching database tables: {e}')
 			try:
 				cursor.close()
-				database.close()
 			except:
 				pass  # what else is there to do?
 			return False
 
 
 	def clearDB(self):
+		self.closeConnections()
 		Path(self.Commons.rootDir(), 'system/database/data.db').unlink()
 
 
 	def getConnection(self) -> sqlite3.Connection:
+		"""
+		Returns the connection of the calling thread, opening it on first use. Connections are kept
+		open for the thread lifetime, in WAL mode, and cache their prepared statements
+		:return:
+		"""
+		if self.ConfigManager.getAliceConfigByName('databaseProfiling'):
+			self.logDebug(f'DB lock acquired by {CommonsManager.getFunctionCaller(depth=5)}->{CommonsManager.getFunctionCaller(depth=4)}->{CommonsManager.getFunctionCaller(depth=3)}')
+
+		con = getattr(self._local, 'connection', None)
+		if con:
+			return con
+
 		try:
-			if self.ConfigManager.getAliceConfigByName('databaseProfiling'):
-				self.logDebug(f'DB lock acquired by {CommonsManager.getFunctionCaller(depth=5)}->{CommonsManager.getFunctionCaller(depth=4)}->{CommonsManager.getFunctionCaller(depth=3)}')
-			con = sqlite3.connect(constants.DATABASE_FILE, timeout=10)
+			con = sqlite3.connect(self._databaseFile, timeout=10, check_same_thread=False, cached_statements=self.CACHED_STATEMENTS)
+			con.execute('PRAGMA journal_mode = WAL')
+			con.execute('PRAGMA synchronous = NORMAL')
 		except sqlite3.Error as e:
-			self.logError(f'Failed to connect to DB ({constants.DATABASE_FILE}): {e}')
+			self.logError(f'Failed to connect to DB ({self._databaseFile}): {e}')
 			raise DbConnectionError()
 		con.row_factory = sqlite3.Row
+
+		self._local.connection = con
+		with self._connectionsLock:
+			self._closeDeadConnections()
+			self._connections[threading.get_ident()] = con
+
 		return con
 
 
+	def releaseConnection(self, database: sqlite3.Connection):
+		"""
+		Connections stay open, releasing one only makes sure it is not left inside a transaction
+		:param database:
+		:return:
+		"""
+		try:
+			if database.in_transaction:
+				database.rollback()
+		except sqlite3.Error as e:
+			self.logError(f'Failed releasing database connection: {e}')
+
+
+	def closeConnections(self):
+		with self._connectionsLock:
+			for con in self._connections.values():
+				try:
+					con.close()
+				except sqlite3.Error:
+					pass  # Closing anyway
+
+			self._connections = dict()
+			self._local = threading.local()
+
+
+	def _closeDeadConnections(self):
+		alive = {thread.ident for thread in threading.enumerate()}
+		for ident in [ident for ident in self._connections if ident not in alive or ident == threading.get_ident()]:
+			try:
+				self._connections.pop(ident).close()
+			except sqlite3.Error:
+				pass  # Closing anyway
+
+
 	def initDB(self, schema: dict, callerName: str) -> bool:
-		database = self.getConnection()
-		cursor = database.cursor()
-		ret = True
+		"""
+		Creates or migrates the tables of a component
+		:param schema: the component tables and their columns
+		:param callerName: the component name, prefixing its tables
+		:return: False if the tables could not be verified
+		"""
+		return self.initDBs({callerName: schema})[callerName]
 
-		try:
-			# First check for new tables and columns addition/deprecation/type changes
-			for tableName, queries in schema.items():
 
-				fullTableName = f'{callerName}_{tableName}'
-				colsQuery = ', '.join(queries)
+	def initDBs(self, schemas: Dict[str, dict]) -> Dict[str, bool]:
+		"""
+		Creates or migrates the tables of several components, in one transaction. The hash of every
+		verified schema is stored, components whose schema did not change since and whose tables all
+		exist are not inspected again
+		:param schemas: the schema of every component, by component name
+		:return: whether the tables of each component could be verified
+		"""
+		name = f'initDB {next(iter(schemas))}' if len(schemas) == 1 else f'initDBs ({len(schemas)} components)'
+		with self.bootSpan(name=name, category='database', components=list(schemas)):
+			return self._initDBs(schemas)
 
-				if colsQuery.count(' UNIQUE') > 1:
-					colsQuery = colsQuery.replace(' UNIQUE', '')
-					uniqueList = [query.split(' ')[0] for query in queries if 'UNIQUE' in query]
-					unique = f", UNIQUE({', '.join(uniqueList)})"
-				else:
-					unique = ''
 
-				query = ''
-				try:
-					query = f"SELECT COUNT(name) FROM sqlite_master WHERE type = 'table' and name='{fullTableName}'"
-					cursor.execute(query)
-					if cursor.fetchone()[0] < 1:
-						self.logInfo(f'Missing data table **{fullTableName}**, creating it...')
-						try:
-							cursor.execute(f'CREATE TABLE {fullTableName} ({colsQuery}{unique})')
-							database.commit()
-							continue
-						except sqlite3.Error:
-							database.rollback()
-							raise
-				except sqlite3.Error as e:
-					self.logError(f'Something went wrong creating database table **{fullTableName}** for component **{callerName}**. The query was "{query}": {e}.')
-					continue
+	def _initDBs(self, schemas: Dict[str, dict]) -> Dict[str, bool]:
+		results = {callerName: True for callerName in schemas}
+
+		with self._schemaLock:
+			database = self.getConnection()
+			cursor = database.cursor()
+
+			try:
+				cursor.execute(f'CREATE TABLE IF NOT EXISTS {self.SCHEMA_TABLE} (component TEXT PRIMARY KEY, hash TEXT NOT NULL)')
+				cursor.execute('BEGIN')
+				cursor.execute("SELECT name FROM main.sqlite_master WHERE type = 'table' and name NOT LIKE 'sqlite_%'")
+				self._tables = {row[0] for row in cursor.fetchall()}
+				cursor.execute(f'SELECT component, hash FROM {self.SCHEMA_TABLE}')
+				hashes = {row[0]: row[1] for row in cursor.fetchall()}
+
+				for callerName, schema in schemas.items():
+					schemaHash = self.schemaHash(schema)
+					if hashes.get(callerName) == schemaHash and all(f'{callerName}_{tableName}' in self._tables for tableName in schema):
+						continue
+
+					cursor.execute('SAVEPOINT schema')
+					try:
+						if self._verifySchema(cursor, schema, callerName):
+							cursor.execute(f'REPLACE INTO {self.SCHEMA_TABLE} (component, hash) VALUES (?, ?)', (callerName, schemaHash))
+						cursor.execute('RELEASE schema')
+					except Exception as e:
+						self.logError(f'Something went wrong initializing database for component **{callerName}**: {e}')
+						cursor.execute('ROLLBACK TO schema')
+						cursor.execute('RELEASE schema')
+						results[callerName] = False
+
+				database.commit()
+			except sqlite3.Error as e:
+				self.logError(f'Failed initializing database: {e}')
+				results = {callerName: False for callerName in schemas}
+			finally:
+				cursor.close()
+				self.releaseConnection(database)
+
+			# Tables changed by rolled back components must be read again on next call
+			if not all(results.values()):
+				self.fetchTables()
+
+		return results
+
+
+	@staticmethod
+	def schemaHash(schema: dict) -> str:
+		return hashlib.sha1(json.dumps(schema, sort_keys=True).encode()).hexdigest()
+
+
+	def _verifySchema(self, cursor: sqlite3.Cursor, schema: dict, callerName: str) -> bool:
+		"""
+		Creates the missing tables of a component, adds its new columns, rebuilds the tables whose
+		columns changed and drops the tables it doesn't declare anymore. Runs in the caller transaction
+		:param cursor:
+		:param schema:
+		:param callerName:
+		:return: False if something could not be fixed and the schema should be checked again next time
+		"""
+		complete = True
+
+		# First check for new tables and columns addition/deprecation/type changes
+		for tableName, queries in schema.items():
+
+			fullTableName = f'{callerName}_{tableName}'
+			colsQuery = ', '.join(queries)
+
+			if colsQuery.count(' UNIQUE') > 1:
+				colsQuery = colsQuery.replace(' UNIQUE', '')
+				uniqueList = [query.split(' ')[0] for query in queries if 'UNIQUE' in query]
+				unique = f", UNIQUE({', '.join(uniqueList)})"
+			else:
+				unique = ''
 
+			if fullTableName not in self._tables:
+				self.logInfo(f'Missing data table **{fullTableName}**, creating it...')
 				try:
-					cursor.execute(f'PRAGMA table_info({fullTableName})')
-					rows = cursor.fetchall()
-					installedColumns = {x[1]: x[2] for x in rows}
-
-					cols = dict()
-					for column in schema[tableName]:
-						colName: str = column.split(' ')[0]
-						if colName.lower().startswith('unique'):
-							continue
-
-						colType = column.split(' ')[1]
-						cols[colName] = colType
-						if colName not in installedColumns:
-							oldColName = [val for val in installedColumns if colName.casefold() == val.casefold()]
-							if oldColName:
-								self.logWarning(f'Found a case-changed column from **{oldColName[0]}** to **{colName}** for table **{fullTableName}** in component **{callerName}**')
-								cursor.execute(f'ALTER TABLE {fullTableName} RENAME COLUMN {oldColName[0]} TO {colName}')
-							else:
-								self.logWarning(f'Found a missing column **{colName}** for table **{fullTableName}** in component **{callerName}**')
-								cursor.execute(f'ALTER TABLE {fullTableName} ADD COLUMN {colName} {colType}')
-
-					database.commit()
+					cursor.execute(f'CREATE TABLE {fullTableName} ({colsQuery}{unique})')
+					self._tables.add(fullTableName)
 				except sqlite3.Error as e:
-					self.logError(f'Failed altering table **{fullTableName}** for component **{callerName}**: {e}')
-					database.rollback()
-					raise Exception
+					self.logError(f'Something went wrong creating database table **{fullTableName}** for component **{callerName}**: {e}.')
+					complete = False
+				continue
 
-				try:
-					cursor.execute(f'PRAGMA table_info({fullTableName})')
-					rows = cursor.fetchall()
-					installedColumns = {x[1]: x[2] for x in rows}
-
-					doUpdate = False
-					for column in installedColumns:
-						if column not in cols:
-							self.logInfo(f'Found a deprecated column **{column}** for table **{fullTableName}** in component **{callerName}**')
-							doUpdate = True
-						elif installedColumns[column].lower() != cols[column].lower():
-							self.logInfo(f'Column **{column}** has changed data type for component **{callerName}**')
-							doUpdate = True
-
-					if doUpdate:
-						cursor.execute(f"ALTER TABLE {fullTableName} RENAME TO {'bak_' + fullTableName}")
-						cursor.execute(f'CREATE TABLE {fullTableName} ({colsQuery})')
-						cursor.execute(f"INSERT INTO {fullTableName} SELECT {', '.join(cols)} FROM {'bak_' + fullTableName}")
-						cursor.execute(f"DROP TABLE {'bak_' + fullTableName}")
-						database.commit()
+			try:
+				cursor.execute(f'PRAGMA table_info({fullTableName})')
+				installedColumns = {x[1]: x[2] for x in cursor.fetchall()}
 
-				except sqlite3.Error as e:
-					self.logError(f'Something went wrong initializing database for skill {callerName}: {e}')
-					database.rollback()
-					raise Exception
+				cols = dict()
+				for column in queries:
+					colName: str = column.split(' ')[0]
+					if colName.lower().startswith('unique'):
+						continue
 
-			self.fetchTables()
+					colType = column.split(' ')[1]
+					cols[colName] = colType
+					if colName not in installedColumns:
+						oldColName = [val for val in installedColumns if colName.casefold() == val.casefold()]
+						if oldColName:
+							self.logWarning(f'Found a case-changed column from **{oldColName[0]}** to **{colName}** for table **{fullTableName}** in component **{callerName}**')
+							cursor.execute(f'ALTER TABLE {fullTableName} RENAME COLUMN {oldColName[0]} TO {colName}')
+							installedColumns[colName] = installedColumns.pop(oldColName[0])
+						else:
+							self.logWarning(f'Found a missing column **{colName}** for table **{fullTableName}** in component **{callerName}**')
+							cursor.execute(f'ALTER TABLE {fullTableName} ADD COLUMN {colName} {colType}')
+							installedColumns[colName] = colType
+			except sqlite3.Error as e:
+				self.logError(f'Failed altering table **{fullTableName}** for component **{callerName}**: {e}')
+				raise
 
-			# Let's check if we did not drop a table since an older version
-			for tableName in self._tables:
-				tableName = tableName['name']
-				if not tableName.startswith('sqlite_') and tableName.startswith(callerName + '_') and tableName.split('_')[1] not in schema:
-					self.logWarning(f'Found a deprecated table **{tableName}** for component **{callerName}**')
+			doUpdate = False
+			for column in installedColumns:
+				if column not in cols:
+					self.logInfo(f'Found a deprecated column **{column}** for table **{fullTableName}** in component **{callerName}**')
+					doUpdate = True
+				elif installedColumns[column].lower() != cols[column].lower():
+					self.logInfo(f'Column **{column}** has changed data type for component **{callerName}**')
+					doUpdate = True
+
+			if doUpdate:
+				cursor.execute(f"ALTER TABLE {fullTableName} RENAME TO {'bak_' + fullTableName}")
+				cursor.execute(f'CREATE TABLE {fullTableName} ({colsQuery})')
+				cursor.execute(f"INSERT INTO {fullTableName} SELECT {', '.join(cols)} FROM {'bak_' + fullTableName}")
+				cursor.execute(f"DROP TABLE {'bak_' + fullTableName}")
+
+		# Let's check if we did not drop a table since an older version
+		for tableName in list(self._tables):
+			if tableName.startswith(callerName + '_') and tableName.split('_')[1] not in schema:
+				self.logWarning(f'Found a deprecated table **{tableName}** for component **{callerName}**')
 
-					try:
-						cursor.execute(f'DROP TABLE {tableName}')
-						database.commit()
-					except sqlite3.Error as e:
-						self.logError(f'Failed dropping deprecated table **{tableName}** for component **{callerName}**: {e}')
-						continue
-		except:
-			ret = False
-		finally:
-			cursor.close()
-			database.close()
-		return ret
+				try:
+					cursor.execute(f'DROP TABLE {tableName}')
+					self._tables.discard(tableName)
+				except sqlite3.Error as e:
+					self.logError(f'Failed dropping deprecated table **{tableName}** for component **{callerName}**: {e}')
+					complete = False
+
+		return complete
 
 
 	def dropTable(self, tableName: str, callerName: str) -> bool:
@@ -203,30 +526,31 @@ class DatabaseManager(Manager):
 		finally:
 			try:
 				cursor.close()
-				database.close()
+				self.releaseConnection(database)
 			except:
 				pass  # Well, what's to do here....
 
 		return ret
 
 
-	def replace(self, tableName: str, query: str = None, callerName: str = None, values: dict = None) -> int:
+	def replace(self, tableName: str, query: str = None, callerName: str = None, values: dict = None, blocking: bool = True) -> int:
 		if not query:
 			cols = ', '.join(values)
 			data = ', :'.join(values)
 			query = f'REPLACE INTO :__table__ ({cols}) VALUES (:{data})'
 
-		return self.insert(tableName, query, callerName, values)
+		return self.insert(tableName, query, callerName, values, blocking)
 
 
-	def insert(self, tableName: str, query: str = None, callerName: str = None, values: dict = None) -> int:
+	def insert(self, tableName: str, query: str = None, callerName: str = None, values: dict = None, blocking: bool = True) -> Optional[int]:
 		"""
 		Insert data in database
 		:param values:
 		:param tableName:
 		:param query:
 		:param callerName:
-		:return: list
+		:param blocking: in write behind mode, wait for the row to be committed to get its id
+		:return: the inserted row id, None if queued without blocking
 		"""
 		if not values:
 			raise Exception('Cannot DB insert without values...')
@@ -244,6 +568,10 @@ class DatabaseManager(Manager):
 		if not query:
 			raise InvalidQuery
 
+		write = self._queueWrite(DatabaseWrite(query=query, values=values, callerName=callerName, tableName=tableName, done=threading.Event() if blocking else None))
+		if write:
+			return self._awaitWrite(write) if blocking else None
+
 		database = self.getConnection()
 		cursor = database.cursor()
 		exception = None
@@ -273,7 +601,7 @@ class DatabaseManager(Manager):
 		except Exception as e:
 			self.logError(f'FATAL ERROR: {e}')
 		try:
-			database.close()
+			self.releaseConnection(database)
 		except Exception as e:
 			self.logError(f'FATAL ERROR: {e}')
 
@@ -285,7 +613,89 @@ class DatabaseManager(Manager):
 			raise exception
 
 
-	def update(self, tableName: str, callerName: str, values: dict = None, query: str = None, row: tuple = None) -> bool:
+	def replaceMany(self, tableName: str, callerName: str = None, values: Iterable[dict] = None, query: str = None, chunkSize: int = 500, blocking: bool = True) -> int:
+		"""
+		Same as insertMany, replacing the rows that conflict with a unique constraint
+		"""
+		return self.insertMany(tableName=tableName, callerName=callerName or self.Commons.getFunctionCaller(), values=values, query=query, chunkSize=chunkSize, verb='REPLACE', blocking=blocking)
+
+
+	def insertMany(self, tableName: str, callerName: str = None, values: Iterable[dict] = None, query: str = None, chunkSize: int = 500, verb: str = 'INSERT', blocking: bool = True) -> int:
+		"""
+		Insert many rows in one transaction. Rows are streamed to the database by chunks, so
+		values can be a generator
+		:param tableName:
+		:param callerName:
+		:param values: list or generator of dicts, all rows having the same keys as the first one unless a query is given
+		:param query: optional, using named placeholders
+		:param chunkSize: how many rows are sent to the database at once
+		:param verb: INSERT or REPLACE
+		:param blocking: in write behind mode, wait for the rows to be committed and raise if they were not
+		:return: the number of inserted rows, or queued rows if not blocking
+		"""
+		if not callerName:
+			callerName = self.Commons.getFunctionCaller()
+
+		rows = iter(values or list())
+		first = next(rows, None)
+		if first is None:
+			return 0
+
+		if not query:
+			cols = ', '.join(first)
+			data = ', :'.join(first)
+			query = f'{verb} INTO :__table__ ({cols}) VALUES (:{data})'
+
+		query = self.basicChecks(tableName, query, callerName, first)
+		if not query:
+			raise InvalidQuery
+
+		rows = itertools.chain([first], rows)
+		if self._writeBehind:
+			rows = list(rows)
+			write = self._queueWrite(DatabaseWrite(query=query, values=rows, callerName=callerName, tableName=tableName, many=True, done=threading.Event() if blocking else None))
+			if write:
+				return self._awaitWrite(write) if blocking else len(rows)
+
+		database = self.getConnection()
+		cursor = database.cursor()
+		count = 0
+
+		try:
+			startTime = time.time()
+			while True:
+				chunk = list(itertools.islice(rows, max(1, chunkSize)))
+				if not chunk:
+					break
+
+				cursor.executemany(query, chunk)
+				count += len(chunk)
+
+			database.commit()
+			if self.ConfigManager.getAliceConfigByName('databaseProfiling'):
+				self.logDebug(f'It took {time.time() - startTime} seconds to INSERT {count} rows in {tableName} DB ')
+		except sqlite3.Error as e:
+			self.logWarning(f'Error inserting data for component **{callerName}** in table **{tableName}**: {e}')
+			database.rollback()
+			raise
+		finally:
+			cursor.close()
+			self.releaseConnection(database)
+
+		return count
+
+
+	def update(self, tableName: str, callerName: str, values: dict = None, query: str = None, row: tuple = None, blocking: bool = True) -> bool:
+		"""
+		Update data in database
+		:param tableName:
+		:param callerName:
+		:param values:
+		:param query:
+		:param row: the column name and value identifying the row to update, if no query is given
+		:param blocking: in write behind mode, wait for the update to be committed
+		:return: False if the update failed, always True if queued without blocking
+		"""
 		if not query and not values:
 			self.logWarning('Cannot update database with neither query or values set')
 			return False
@@ -298,6 +708,10 @@ class DatabaseManager(Manager):
 		if not query:
 			raise InvalidQuery
 
+		queued = self._queueStatement(DatabaseWrite(query=query, values=values or dict(), callerName=callerName, tableName=tableName, done=threading.Event() if blocking else None), blocking=blocking, action='updating')
+		if queued is not None:
+			return queued
+
 		database = self.getConnection()
 		cursor = database.cursor()
 		ret = True
@@ -318,7 +732,7 @@ class DatabaseManager(Manager):
 		finally:
 			try:
 				cursor.close()
-				database.close()
+				self.releaseConnection(database)
 			except:
 				pass  # what else is there to do??
 
@@ -334,22 +748,71 @@ class DatabaseManager(Manager):
 		:param callerName:
 		:return: list
 		"""
+		return list(self.iterFetch(tableName=tableName, query=query, callerName=callerName, values=values))
+
+
+	def fetchOne(self, tableName: str, query: str, callerName: str, values: dict = None, rowType: str = ROW_DICT) -> Optional[Union[Dict[str, Any], tuple, sqlite3.Row]]:
+		"""
+		Fetch the first row matching the query, without reading the rest of the result set
+		:param tableName:
+		:param query:
+		:param callerName:
+		:param values:
+		:param rowType: ROW_DICT, ROW_TUPLE or ROW_SQLITE
+		:return: the row, or None if nothing matched
+		"""
+		rows = self.iterFetch(tableName=tableName, query=query, callerName=callerName, values=values, rowType=rowType)
+		try:
+			return next(rows, None)
+		finally:
+			rows.close()
+
+
+	def iterFetch(self, tableName: str, query: str, callerName: str, values: dict = None, rowType: str = ROW_DICT, pageSize: int = 0) -> Generator[Any, None, None]:
+		"""
+		Fetch data from database, lazily. Rows are read from the cursor as they are consumed, so large
+		result sets are never held in memory at once. The cursor stays open on the thread connection
+		until the generator is exhausted or closed, break out of the loop or close() it when done early
+		:param tableName:
+		:param query:
+		:param callerName:
+		:param values:
+		:param rowType: ROW_DICT to copy the rows into dicts, ROW_TUPLE for plain tuples or ROW_SQLITE for the sqlite3.Row objects
+		:param pageSize: if set, yields lists of up to that many rows instead of single rows
+		:return: generator
+		"""
+		if rowType not in (self.ROW_DICT, self.ROW_TUPLE, self.ROW_SQLITE):
+			raise ValueError(f'Unknown row type **{rowType}**')
+
 		if not values:
 			values = dict()
 
-		rows = list()
 		query = self.basicChecks(tableName, query, callerName, values)
 		if not query:
-			return rows
+			return
 
 		database = self.getConnection()
 		cursor = database.cursor()
+		if rowType == self.ROW_TUPLE:
+			cursor.row_factory = None
+
+		convert = self.Commons.dictFromRow if rowType == self.ROW_DICT else None
 
 		try:
 			startTime = time.time()
 			cursor.execute(query, values)
-			for row in cursor:
-				rows.append(self.Commons.dictFromRow(row))
+
+			if pageSize > 0:
+				while True:
+					page = cursor.fetchmany(pageSize)
+					if not page:
+						break
+					yield [convert(row) for row in page] if convert else page
+			elif convert:
+				for row in cursor:
+					yield convert(row)
+			else:
+				yield from cursor
 
 			if self.ConfigManager.getAliceConfigByName('databaseProfiling'):
 				self.logDebug(f'It took {time.time() - startTime} seconds to FETCH from {tableName} DB ')
@@ -358,19 +821,26 @@ class DatabaseManager(Manager):
 		finally:
 			try:
 				cursor.close()
-				database.close()
+				self.releaseConnection(database)
 			except:
 				pass  # Well, what's to do here....
 
-		return rows
-
 
-	def purge(self, tableName: str, callerName: str):
+	def purge(self, tableName: str, callerName: str, blocking: bool = True) -> bool:
 		query = 'DELETE FROM :__table__ WHERE 1'
-		self.delete(tableName=tableName, callerName=callerName, query=query)
+		return self.delete(tableName=tableName, callerName=callerName, query=query, blocking=blocking)
 
 
-	def delete(self, tableName: str, callerName: str, query: str = None, values: dict = None):
+	def delete(self, tableName: str, callerName: str, query: str = None, values: dict = None, blocking: bool = True) -> bool:
+		"""
+		Delete data from database
+		:param tableName:
+		:param callerName:
+		:param query:
+		:param values:
+		:param blocking: in write behind mode, wait for the delete to be committed
+		:return: False if the delete failed, always True if queued without blocking
+		"""
 
 		if not values:
 			values = dict()
@@ -381,9 +851,14 @@ class DatabaseManager(Manager):
 
 		query = self.basicChecks(tableName, query, callerName)
 		if not query:
-			return
+			return False
+
+		queued = self._queueStatement(DatabaseWrite(query=query, values=values, callerName=callerName, tableName=tableName, done=threading.Event() if blocking else None), blocking=blocking, action='deleting')
+		if queued is not None:
+			return queued
 
 		database = self.getConnection()
+		ret = True
 		try:
 			startTime = time.time()
 			database.execute(query, values)
@@ -392,29 +867,38 @@ class DatabaseManager(Manager):
 				self.logDebug(f'It took {time.time() - startTime} seconds to DELETE in {tableName} DB ')
 		except DbConnectionError as e:
 			self.logWarning(f'Error deleting from table **{tableName}** for component **{callerName}**: {e}')
+			ret = False
 		except sqlite3.Error as e:
 			self.logWarning(f'Error deleting from table **{tableName}** for component **{callerName}**: {e}')
 			database.rollback()
+			ret = False
 
 		try:
-			database.close()
+			self.releaseConnection(database)
 		except:
 			pass  # Well, what's to do here....
 
+		return ret
+
 
 	# noinspection SqlResolve
-	def prune(self, tableName: str, callerName: str):
+	def prune(self, tableName: str, callerName: str, blocking: bool = True) -> bool:
 		"""
 		Removes first X entries of a table
 		:param tableName: str
 		:param callerName: str
-		:return:
+		:param blocking: in write behind mode, wait for the delete to be committed
+		:return: False if pruning failed, always True if queued without blocking
 		"""
 
 		query = f"DELETE FROM :__table__ WHERE id not in (SELECT id FROM :__table__ ORDER BY id DESC LIMIT {self.ConfigManager.getAliceConfigByName('autoPruneStoredData')})"
 		query = self.basicChecks(tableName, query, callerName)
 		if not query:
-			return
+			return False
+
+		queued = self._queueStatement(DatabaseWrite(query=query, callerName=callerName, tableName=tableName, done=threading.Event() if blocking else None), blocking=blocking, action='pruning')
+		if queued is not None:
+			return queued
 
 		database = self.getConnection()
 		try:
@@ -423,13 +907,16 @@ class DatabaseManager(Manager):
 			database.commit()
 			if self.ConfigManager.getAliceConfigByName('databaseProfiling'):
 				self.logDebug(f'It took {time.time() - startTime} seconds to PRUNE {tableName} DB ')
+			return True
 		except DbConnectionError as e:
 			self.logWarning(f'Error pruning table **{tableName}** for component **{callerName}**: {e}')
 		except sqlite3.Error as e:
 			self.logWarning(f'Error pruning table **{tableName}** for component **{callerName}**: {e}')
 			database.rollback()
 		finally:
-			database.close()
+			self.releaseConnection(database)
+
+		return False
 
 
 	def basicChecks(self, tableName: str, query: str, callerName: str, values: dict = None) -> Optional[str]:
@@ -68,7 +68,8 @@ class SubprocessManager(Manager):
 
 		self.logInfo(f'Starting the subprocess {name}')
 		self._subproc[name] = AliceSubprocess(name=name, cmd=cmd, stoppedCallback=stoppedCallback, autoRestart=autoRestart)
-		self._subproc[name].start()
+		with self.bootSpan(name=name, category='subprocess', cmd=cmd):
+			self._subproc[name].start()
 		return True
 
 
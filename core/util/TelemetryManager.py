@@ -161,7 +161,8 @@ class TelemetryManager(Manager):
 		self.databaseInsert(
 			tableName='telemetry',
 			query='INSERT INTO :__table__ (type, value, service, deviceId, timestamp, locationId) VALUES (:type, :value, :service, :deviceId, :timestamp, :locationId)',
-			values={'type': ttype.value, 'value': value, 'service': service, 'deviceId': deviceId, 'timestamp': round(timestamp), 'locationId': locationId}
+			values={'type': ttype.value, 'value': value, 'service': service, 'deviceId': deviceId, 'timestamp': round(timestamp), 'locationId': locationId},
+			blocking=False
 		)
 
 		telemetrySkill = self.SkillManager.getSkillInstance('Telemetry')
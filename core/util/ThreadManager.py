@@ -25,6 +25,7 @@ from core.util.Decorators import IfSetting
 from core.util.model.AliceEvent import AliceEvent
 from core.util.model.MemoryProfiler import MemoryProfiler
 from core.util.model.ThreadTimer import ThreadTimer
+from core.util.model.TimerScheduler import TimerScheduler
 
 
 class ThreadManager(Manager):
@@ -32,7 +33,7 @@ class ThreadManager(Manager):
 	def __init__(self):
 		super().__init__()
 
-		self._timers = list()
+		self._scheduler = TimerScheduler(workers=int(self.ConfigManager.getAliceConfigByName('timerWorkers') or TimerScheduler.WORKERS))
 		self._threads = dict()
 		self._events = dict()
 		self._memProfiler = MemoryProfiler()
@@ -40,9 +41,7 @@ class ThreadManager(Manager):
 
 	def onStop(self):
 		super().onStop()
-		for timer in self._timers:
-			if timer.timer.isAlive():
-				timer.timer.cancel()
+		self._scheduler.stop()
 
 		for thread in self._threads.values():
 			if thread.isAlive():
@@ -65,36 +64,34 @@ class ThreadManager(Manager):
 
 
 	def onQuarterHour(self):
-		deadTimers = 0
 		deadThreads = 0
-		timers = self._timers.copy()
-		for threadTimer in timers:
-			if not threadTimer.timer.isAlive():
-				self._timers.remove(threadTimer)
-				deadTimers += 1
-
 		threads = self._threads.copy()
 		for threadName, thread in threads.items():
 			if not thread.is_alive():
 				self._threads.pop(threadName, None)
 				deadThreads += 1
 
-		if deadTimers > 0:
-			self.logInfo(f'Cleaned {deadTimers} dead timer', 'timer')
-
 		if deadThreads > 0:
 			self.logInfo(f'Cleaned {deadThreads} dead thread', 'thread')
 
 
-	def newTimer(self, interval: float, func: Callable, autoStart: bool = True, args: list = None, kwargs: dict = None) -> threading.Timer:
-		args = args or list()
-		kwargs = kwargs or dict()
-
-		threadTimer = ThreadTimer(callback=func, args=args, kwargs=kwargs)
-		timer = threading.Timer(interval=interval, function=self.onTimerEnd, args=[threadTimer])
-		timer.daemon = True
-		threadTimer.timer = timer
-		self._timers.append(threadTimer)
+	def newTimer(self, interval: float, func: Callable, autoStart: bool = True, args: list = None, kwargs: dict = None, periodic: bool = False) -> ThreadTimer:
+		"""
+		Calls func after interval seconds, from the timer scheduler worker pool. The returned timer can be
+		cancelled, started later if autoStart is False or waited for, like a threading.Timer
+		:param interval: seconds
+		:param func: the callback
+		:param autoStart: whether to start counting right away
+		:param args: the callback args
+		:param kwargs: the callback kwargs
+		:param periodic: call func every interval seconds, until the timer is cancelled
+		:return: ThreadTimer
+		"""
+		interval = float(interval)
+		if periodic and interval <= 0:
+			raise ValueError('Periodic timers need a positive interval')
+
+		timer = ThreadTimer(callback=func, args=args or list(), kwargs=kwargs or dict(), interval=interval, periodic=periodic, scheduler=self._scheduler)
 
 		if autoStart:
 			timer.start()
@@ -106,23 +103,27 @@ class ThreadManager(Manager):
 		self.newTimer(interval=interval, func=func, args=args, kwargs=kwargs)
 
 
-	def onTimerEnd(self, timer: ThreadTimer):
-		if not timer or not timer.callback:
-			return
-
-		timer.callback(*timer.args, **timer.kwargs)
-		self.removeTimer(timer)
-
-
 	def removeTimer(self, timer: ThreadTimer):
-		if not timer or not timer.callback:
-			return
-
-		if timer.timer.is_alive():
-			timer.timer.cancel()
-
-		if timer in self._timers:
-			self._timers.remove(timer)
+		if timer:
+			timer.cancel()
+
+
+	def hasPendingTimers(self, owner: object) -> bool:
+		"""
+		Whether a timer still to fire calls back a method of the given object
+		:param owner:
+		:return:
+		"""
+		return any(getattr(timer.callback, '__self__', None) is owner for timer in self._scheduler.pending())
+
+
+	@property
+	def timerStats(self) -> dict:
+		"""
+		Counters of the timer scheduler: pending timers, fired, cancelled, failed, slow and late callbacks, running callbacks and callback lag
+		:return:
+		"""
+		return self._scheduler.stats()
 
 
 	def newThread(self, name: str, target: Callable, autostart: bool = True, args: list = None, kwargs: dict = None) -> threading.Thread:
@@ -0,0 +1,186 @@
+#  Copyright (c) 2021
+#
+#  This file, AudioRingBuffer.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import threading
+from typing import Optional, Union
+
+import numpy as np
+
+
+class AudioRingBuffer(object):
+	"""
+	A preallocated ring of 16 bits samples, written by the audio frame consumers and read by one
+	reader thread. Readers either get exact frames, copied into their own array, as wakeword engines
+	need, or views on the ring without any copy. When full, the oldest samples are overwritten
+	"""
+
+	def __init__(self, capacity: int):
+		"""
+		:param capacity: in samples
+		"""
+		self._ring = np.zeros(capacity, dtype=np.int16)
+		self._capacity = capacity
+		self._readPos = 0  # Absolute sample positions, the ring index is position % capacity
+		self._writePos = 0
+		self._overruns = 0
+		self._closed = False
+		self._condition = threading.Condition()
+
+
+	@property
+	def capacity(self) -> int:
+		return self._capacity
+
+
+	@property
+	def available(self) -> int:
+		return self._writePos - self._readPos
+
+
+	@property
+	def overruns(self) -> int:
+		"""
+		How many samples were overwritten before being read
+		:return:
+		"""
+		return self._overruns
+
+
+	@property
+	def closed(self) -> bool:
+		return self._closed
+
+
+	def write(self, pcm: Union[bytes, memoryview, np.ndarray]):
+		"""
+		Appends 16 bits samples, wakes the reader up
+		:param pcm: raw little endian 16 bits samples, or an int16 array
+		:return:
+		"""
+		samples = pcm if isinstance(pcm, np.ndarray) else np.frombuffer(pcm, dtype=np.int16)
+		count = len(samples)
+		if not count:
+			return
+
+		with self._condition:
+			if self._closed:
+				return
+
+			if count > self._capacity:
+				# Only the last samples fit, the others are counted as overwritten
+				self._writePos += count - self._capacity
+				samples = samples[-self._capacity:]
+				count = self._capacity
+
+			start = self._writePos % self._capacity
+			first = min(count, self._capacity - start)
+			self._ring[start:start + first] = samples[:first]
+			if first < count:
+				self._ring[:count - first] = samples[first:]
+
+			self._writePos += count
+			overflow = self._writePos - self._readPos - self._capacity
+			if overflow > 0:
+				self._overruns += overflow
+				self._readPos += overflow
+
+			self._condition.notify()
+
+
+	def readFrame(self, length: int, out: np.ndarray = None, timeout: float = None) -> Optional[np.ndarray]:
+		"""
+		Waits for exactly length samples and copies them out
+		:param length: the frame length, in samples
+		:param out: an int16 array of at least length samples to copy into, reused from frame to frame. Allocated if None
+		:param timeout: in seconds, None to wait until the buffer is closed
+		:return: the frame, or None if the buffer was closed or the timeout reached
+		"""
+		with self._condition:
+			if not self._condition.wait_for(lambda: self._closed or self.available >= length, timeout=timeout) or self.available < length:
+				return None
+
+			frame = out[:length] if out is not None else np.empty(length, dtype=np.int16)
+			start = self._readPos % self._capacity
+			first = min(length, self._capacity - start)
+			frame[:first] = self._ring[start:start + first]
+			if first < length:
+				frame[first:] = self._ring[:length - first]
+
+			self._readPos += length
+			return frame
+
+
+	def read(self, maxSamples: int = 0, timeout: float = None) -> Optional[np.ndarray]:
+		"""
+		Waits for samples and returns a view on the ring, without copying. The view holds the contiguous
+		available samples, so it may be shorter than what's available when the ring wraps around. It is
+		only valid until capacity more samples are written, consume it before
+		:param maxSamples: at most this many samples, 0 for all the contiguous ones
+		:param timeout: in seconds, None to wait until the buffer is closed
+		:return: the samples, or None if the buffer was closed and emptied or the timeout reached
+		"""
+		with self._condition:
+			if not self._condition.wait_for(lambda: self._closed or self.available, timeout=timeout) or not self.available:
+				return None
+
+			start = self._readPos % self._capacity
+			count = min(self.available, self._capacity - start)
+			if maxSamples:
+				count = min(count, maxSamples)
+
+			self._readPos += count
+			return self._ring[start:start + count]
+
+
+	def readAll(self) -> bytes:
+		"""
+		Returns whatever is available, without waiting
+		:return:
+		"""
+		with self._condition:
+			count = self.available
+			start = self._readPos % self._capacity
+			first = min(count, self._capacity - start)
+			data = self._ring[start:start + first].tobytes()
+			if first < count:
+				data += self._ring[:count - first].tobytes()
+
+			self._readPos += count
+			return data
+
+
+	def clear(self):
+		with self._condition:
+			self._readPos = self._writePos
+
+
+	def close(self):
+		"""
+		Wakes the reader up. Samples already written can still be read
+		:return:
+		"""
+		with self._condition:
+			self._closed = True
+			self._condition.notify_all()
+
+
+	def reopen(self):
+		with self._condition:
+			self._closed = False
+			self._readPos = self._writePos
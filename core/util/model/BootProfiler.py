@@ -0,0 +1,260 @@
+#  Copyright (c) 2021
+#
+#  This file, BootProfiler.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, List, Optional
+
+
+@dataclass
+class BootSpan(object):
+	name: str
+	category: str
+	started: float  # Seconds after the boot started
+	wallTime: float
+	cpuTime: float
+	threadId: int
+	threadName: str
+	args: dict = field(default_factory=dict)
+
+
+	def toDict(self) -> dict:
+		return {
+			'name'    : self.name,
+			'category': self.category,
+			'started' : round(self.started, 4),
+			'wallTime': round(self.wallTime, 4),
+			'cpuTime' : round(self.cpuTime, 4),
+			'thread'  : self.threadName
+		}
+
+
+	def toTraceEvent(self, pid: int) -> dict:
+		return {
+			'name': self.name,
+			'cat' : self.category,
+			'ph'  : 'X',
+			'ts'  : round(self.started * 1_000_000),
+			'dur' : round(self.wallTime * 1_000_000),
+			'pid' : pid,
+			'tid' : self.threadId,
+			'args': {**self.args, 'cpuTime': round(self.cpuTime, 6)}
+		}
+
+
+class BootProfiler(object):
+	"""
+	Records the wall and cpu time of the boot steps, manager starts, skill inits, database checks,
+	subprocess launches. Spans are only recorded until the boot is finished, the timeline can then
+	be written as a Chrome trace event file, to be opened in chrome://tracing or Perfetto
+	"""
+
+	def __init__(self):
+		self._spans: List[BootSpan] = list()
+		self._lock = threading.Lock()
+		self._start = time.perf_counter()
+		self._duration: Optional[float] = None
+
+
+	@staticmethod
+	def of(projectAlice: Any) -> Optional[BootProfiler]:
+		"""
+		:param projectAlice: the ProjectAlice instance, if any
+		:return: its boot profiler, None when there's no ProjectAlice, per example in benchmarks and tests
+		"""
+		profiler = getattr(projectAlice, 'bootProfiler', None)
+		return profiler if isinstance(profiler, BootProfiler) else None
+
+
+	@staticmethod
+	def spanFor(projectAlice: Any, name: str, category: str, **kwargs) -> ContextManager:
+		"""
+		Same as span, doing nothing without a boot profiler
+		"""
+		profiler = BootProfiler.of(projectAlice)
+		return profiler.span(name=name, category=category, **kwargs) if profiler else nullcontext()
+
+
+	@staticmethod
+	def wrapFor(projectAlice: Any, name: str, category: str, func: Callable) -> Callable:
+		"""
+		Same as wrap, returning func as is without a boot profiler
+		"""
+		profiler = BootProfiler.of(projectAlice)
+		return profiler.wrap(name=name, category=category, func=func) if profiler else func
+
+
+	@property
+	def recording(self) -> bool:
+		return self._duration is None
+
+
+	@property
+	def duration(self) -> float:
+		return self._duration if self._duration is not None else time.perf_counter() - self._start
+
+
+	@property
+	def spans(self) -> List[BootSpan]:
+		with self._lock:
+			return list(self._spans)
+
+
+	@contextmanager
+	def span(self, name: str, category: str, **kwargs):
+		"""
+		Times the enclosed block, nested spans show stacked on the timeline
+		:param name: the boot step name
+		:param category: manager, skill, database, subprocess...
+		:param kwargs: added to the trace event arguments
+		"""
+		if not self.recording:
+			yield
+			return
+
+		started = time.perf_counter()
+		cpuStart = time.thread_time()
+		try:
+			yield
+		finally:
+			self.record(
+				name=name,
+				category=category,
+				started=started,
+				wallTime=time.perf_counter() - started,
+				cpuTime=time.thread_time() - cpuStart,
+				**kwargs
+			)
+
+
+	def wrap(self, name: str, category: str, func: Callable) -> Callable:
+		"""
+		Returns func timed as a span on each call
+		:param name:
+		:param category:
+		:param func:
+		:return:
+		"""
+		@functools.wraps(func)
+		def wrapper(*args, **kwargs):
+			with self.span(name=name, category=category):
+				return func(*args, **kwargs)
+
+		return wrapper
+
+
+	def record(self, name: str, category: str, started: float, wallTime: float, cpuTime: float, **kwargs):
+		"""
+		Adds a span measured elsewhere, on the calling thread
+		:param name:
+		:param category:
+		:param started: perf_counter value when the step started
+		:param wallTime: seconds
+		:param cpuTime: seconds
+		:param kwargs: added to the trace event arguments
+		"""
+		if not self.recording:
+			return
+
+		thread = threading.current_thread()
+		bootSpan = BootSpan(
+			name=name,
+			category=category,
+			started=started - self._start,
+			wallTime=wallTime,
+			cpuTime=cpuTime,
+			threadId=thread.ident or 0,
+			threadName=thread.name,
+			args=kwargs
+		)
+		with self._lock:
+			self._spans.append(bootSpan)
+
+
+	def finish(self):
+		"""
+		Ends the boot, later spans are ignored
+		"""
+		if self.recording:
+			self._duration = time.perf_counter() - self._start
+
+
+	def toChromeTrace(self) -> dict:
+		pid = os.getpid()
+		events = [bootSpan.toTraceEvent(pid) for bootSpan in self.spans]
+
+		threads = {bootSpan.threadId: bootSpan.threadName for bootSpan in self.spans}
+		for threadId, threadName in threads.items():
+			events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': threadId, 'args': {'name': threadName}})
+
+		return {
+			'traceEvents'    : events,
+			'displayTimeUnit': 'ms',
+			'otherData'      : {'bootTime': round(self.duration, 4)}
+		}
+
+
+	def writeTrace(self, path: Path) -> bool:
+		"""
+		Writes the Chrome trace event file
+		:param path:
+		:return: False if the file could not be written
+		"""
+		try:
+			path.parent.mkdir(parents=True, exist_ok=True)
+			path.write_text(json.dumps(self.toChromeTrace()))
+			return True
+		except OSError:
+			return False
+
+
+	def slowest(self, category: str = '', count: int = 5) -> List[BootSpan]:
+		spans = [bootSpan for bootSpan in self.spans if not category or bootSpan.category == category]
+		return sorted(spans, key=lambda bootSpan: bootSpan.wallTime, reverse=True)[:count]
+
+
+	def summary(self) -> dict:
+		"""
+		The boot time and, per category, the total time and the spans, the slowest first
+		:return:
+		"""
+		categories: Dict[str, dict] = dict()
+		for bootSpan in self.slowest(count=len(self._spans)):
+			category = categories.setdefault(bootSpan.category, {'wallTime': 0, 'cpuTime': 0, 'spans': list()})
+			category['wallTime'] += bootSpan.wallTime
+			category['cpuTime'] += bootSpan.cpuTime
+			category['spans'].append(bootSpan.toDict())
+
+		for category in categories.values():
+			category['wallTime'] = round(category['wallTime'], 4)
+			category['cpuTime'] = round(category['cpuTime'], 4)
+
+		return {
+			'bootTime'  : round(self.duration, 4),
+			'finished'  : not self.recording,
+			'categories': categories
+		}
@@ -0,0 +1,145 @@
+#  Copyright (c) 2021
+#
+#  This file, CoalescedWriter.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional
+
+from core.base.model.ProjectAliceObject import ProjectAliceObject
+from core.util.model.ThreadTimer import ThreadTimer
+
+
+class CoalescedWriter(ProjectAliceObject):
+	"""
+	Persists objects whose state changes often, like devices toggled by skills or widgets dragged
+	around in the UI. Changed objects are only flagged dirty and, delay seconds after the first change,
+	the rows of all the dirty objects are replaced in one transaction, with their latest state
+	"""
+
+	def __init__(self, tableName: str, callerName: str, toRow: Callable[[Any], dict], delay: float = 2):
+		"""
+		:param tableName: the table the rows are replaced in
+		:param callerName: the component owning the table
+		:param toRow: builds the complete row of an object, at flush time
+		:param delay: seconds between the first change and the write
+		"""
+		super().__init__()
+		self._tableName = tableName
+		self._callerName = callerName
+		self._toRow = toRow
+		self._delay = delay
+		self._dirty: Dict[Hashable, Any] = dict()
+		self._lock = threading.Lock()
+		self._flushLock = threading.Lock()
+		self._timer: Optional[ThreadTimer] = None
+		self._stats = {'marked': 0, 'written': 0, 'flushes': 0, 'failed': 0}
+
+
+	def markDirty(self, key: Hashable, obj: Any):
+		"""
+		Flags an object as changed, it is written with the next flush
+		:param key: the object identifier, usually its row id
+		:param obj:
+		"""
+		with self._lock:
+			self._dirty[key] = obj
+			self._stats['marked'] += 1
+			if not self._timer:
+				self._timer = self.ThreadManager.newTimer(interval=self._delay, func=self.flush)
+
+
+	def discard(self, key: Hashable):
+		"""
+		Forgets the pending changes of an object, when it was just written or deleted
+		:param key:
+		"""
+		with self._lock:
+			self._dirty.pop(key, None)
+
+
+	@contextmanager
+	def forget(self, *keys: Hashable) -> Iterator[None]:
+		"""
+		Forgets the pending changes of objects about to be deleted, delete their rows in the with block.
+		No flush runs meanwhile, so a flush that already picked the objects up can't write them back
+		:param keys:
+		"""
+		with self._flushLock:
+			with self._lock:
+				for key in keys:
+					self._dirty.pop(key, None)
+			yield
+
+
+	def isDirty(self, key: Hashable) -> bool:
+		with self._lock:
+			return key in self._dirty
+
+
+	def flush(self) -> int:
+		"""
+		Writes every dirty object now
+		:return: the number of rows written
+		"""
+		with self._flushLock:
+			with self._lock:
+				if self._timer:
+					self._timer.cancel()
+					self._timer = None
+				dirty = self._dirty
+				self._dirty = dict()
+
+			if not dirty:
+				return 0
+
+			try:
+				rows = [self._toRow(obj) for obj in dirty.values()]
+				self.DatabaseManager.replaceMany(tableName=self._tableName, callerName=self._callerName, values=rows)
+			except Exception as e:
+				self.logError(f'Failed writing {len(dirty)} changed rows to **{self._tableName}**: {e}')
+				with self._lock:
+					self._stats['failed'] += 1
+					# Keep what changed since for the next try
+					for key, obj in dirty.items():
+						self._dirty.setdefault(key, obj)
+					if not self._timer:
+						self._timer = self.ThreadManager.newTimer(interval=self._delay, func=self.flush)
+				return 0
+
+			with self._lock:
+				self._stats['written'] += len(rows)
+				self._stats['flushes'] += 1
+
+			return len(rows)
+
+
+	@property
+	def pending(self) -> int:
+		with self._lock:
+			return len(self._dirty)
+
+
+	@property
+	def stats(self) -> dict:
+		"""
+		Changes marked, rows written, flushes and failed flushes. Marked minus written is the count of writes saved
+		:return:
+		"""
+		with self._lock:
+			return {**self._stats, 'pending': len(self._dirty)}
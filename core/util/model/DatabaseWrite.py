@@ -0,0 +1,35 @@
+#  Copyright (c) 2021
+#
+#  This file, DatabaseWrite.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Optional, Union
+
+
+@dataclass
+class DatabaseWrite(object):
+	"""A write waiting in the DatabaseManager write behind queue. A write without query is a flush barrier"""
+	query: str = ''
+	values: Union[dict, list] = field(default_factory=dict)
+	callerName: str = ''
+	tableName: str = ''
+	many: bool = False
+	done: Optional[threading.Event] = None
+	result: Any = None
+	error: Optional[Exception] = None
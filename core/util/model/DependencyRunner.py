@@ -0,0 +1,135 @@
+#  Copyright (c) 2021
+#
+#  This file, DependencyRunner.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from core.base.model.ProjectAliceObject import ProjectAliceObject
+
+
+@dataclass
+class TaskTiming(object):
+	name: str
+	started: float  # Seconds after the run started
+	wallTime: float
+	cpuTime: float
+	result: Any = None
+
+
+	def toDict(self) -> dict:
+		return {
+			'started' : round(self.started, 4),
+			'wallTime': round(self.wallTime, 4),
+			'cpuTime' : round(self.cpuTime, 4)
+		}
+
+
+class DependencyRunner(ProjectAliceObject):
+	"""
+	Runs named tasks on a thread pool, a task only starting once the tasks it depends on are done,
+	whether they succeeded or not. Dependencies on unknown tasks are ignored and circular ones are
+	broken by starting the first waiting task. A task returning False aborts the run, the tasks not
+	started yet are skipped
+	"""
+
+	def __init__(self, workers: int, name: str = 'dependencyRunner'):
+		"""
+		:param workers: worker threads, 1 or less runs the tasks one by one in the calling thread
+		:param name: worker thread name prefix
+		"""
+		super().__init__()
+		self._workers = workers
+		self._name = name
+
+
+	def run(self, tasks: Dict[str, Callable[[], Any]], dependencies: Dict[str, Iterable[str]] = None) -> Dict[str, TaskTiming]:
+		"""
+		:param tasks: task name: callable, started in this order when free to
+		:param dependencies: task name: names of the tasks to wait for
+		:return: the timing and result of every task that ran, by name
+		"""
+		dependencies = dependencies or dict()
+		waitFor = {name: {dependency for dependency in dependencies.get(name, list()) if dependency in tasks and dependency != name} for name in tasks}
+
+		pending: List[str] = list(tasks)
+		running = set()
+		done = set()
+		timings: Dict[str, TaskTiming] = dict()
+		condition = threading.Condition(threading.RLock())
+		aborted = threading.Event()
+		runStart = time.perf_counter()
+
+
+		def runTask(taskName: str):
+			started = time.perf_counter()
+			cpuStart = time.thread_time()
+			result = None
+			try:
+				result = tasks[taskName]()
+			except Exception as e:
+				self.logError(f'Task **{taskName}** failed: {e}', printStack=True)
+			finally:
+				with condition:
+					timings[taskName] = TaskTiming(
+						name=taskName,
+						started=started - runStart,
+						wallTime=time.perf_counter() - started,
+						cpuTime=time.thread_time() - cpuStart,
+						result=result
+					)
+					running.discard(taskName)
+					done.add(taskName)
+					if result is False:
+						aborted.set()
+					condition.notify_all()
+
+
+		executor: Optional[ThreadPoolExecutor] = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix=self._name) if self._workers > 1 else None
+		try:
+			with condition:
+				while pending or running:
+					if aborted.is_set():
+						pending.clear()
+					else:
+						ready = [taskName for taskName in pending if waitFor[taskName] <= done]
+						if not ready and not running:
+							self.logWarning(f'Circular dependencies between **{", ".join(pending)}**, ignoring them')
+							ready = pending[:1]
+
+						for taskName in ready:
+							if aborted.is_set():
+								break
+
+							pending.remove(taskName)
+							running.add(taskName)
+							if executor:
+								executor.submit(runTask, taskName)
+							else:
+								runTask(taskName)
+
+					if running:
+						condition.wait()
+		finally:
+			if executor:
+				executor.shutdown(wait=True)
+
+		return timings
@@ -0,0 +1,108 @@
+#  Copyright (c) 2021
+#
+#  This file, LazyModule.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+from __future__ import annotations
+
+import importlib
+import threading
+import types
+from typing import Dict
+
+
+class LazyModule(types.ModuleType):
+	"""
+	Stands for a module that is only imported on first attribute access. Heavy packages
+	used by some features only then don't slow down the boot of those not using them
+	"""
+
+	_registry: Dict[str, LazyModule] = dict()
+	_registryLock = threading.Lock()
+
+
+	def __init__(self, name: str):
+		super().__init__(name)
+		self.__dict__['_lazyLock'] = threading.Lock()
+		self.__dict__['_lazyModule'] = None
+
+
+	def __getattr__(self, item: str):
+		# Only called for attributes not found the usual way, the module isn't loaded yet
+		return getattr(LazyModule.load(self), item)
+
+
+	def __dir__(self):
+		return dir(LazyModule.load(self))
+
+
+	def __repr__(self) -> str:
+		return f'<lazy module {self.__name__} ({"loaded" if LazyModule.isLoaded(self) else "not loaded"})>'
+
+
+	@staticmethod
+	def isLoaded(module: LazyModule) -> bool:
+		"""
+		Called on the class, the loaded module attributes could shadow it on the instance
+		:param module:
+		:return:
+		"""
+		return module.__dict__['_lazyModule'] is not None
+
+
+	@staticmethod
+	def load(module: LazyModule) -> types.ModuleType:
+		"""
+		Imports the module, if not done yet, and takes over its attributes. Called on the class,
+		the loaded module attributes could shadow it on the instance
+		:param module:
+		:return: the real module
+		"""
+		realModule = module.__dict__['_lazyModule']
+		if realModule is not None:
+			return realModule
+
+		with module.__dict__['_lazyLock']:
+			realModule = module.__dict__['_lazyModule']
+			if realModule is None:
+				realModule = importlib.import_module(module.__name__)
+				module.__dict__.update({key: value for key, value in realModule.__dict__.items() if key not in {'__name__', '__spec__', '__loader__'}})
+				module.__dict__['_lazyModule'] = realModule
+
+		return realModule
+
+
+	@classmethod
+	def lazyImports(cls) -> Dict[str, bool]:
+		"""
+		:return: every lazily imported module name and whether it was loaded
+		"""
+		with cls._registryLock:
+			return {name: LazyModule.isLoaded(module) for name, module in cls._registry.items()}
+
+
+def lazyImport(name: str) -> LazyModule:
+	"""
+	Returns a module imported on first use, to be assigned at the top of a module instead of a plain import:
+	sd = lazyImport('sounddevice')
+	:param name: the full module name, per example 'paho.mqtt.client'
+	:return:
+	"""
+	with LazyModule._registryLock:
+		if name not in LazyModule._registry:
+			LazyModule._registry[name] = LazyModule(name)
+		return LazyModule._registry[name]
@@ -17,14 +17,61 @@
 #
 #  Last modified: 2021.04.13 at 12:56:48 CEST
 
+import threading
 from dataclasses import dataclass, field
-from threading import Timer
-from typing import Callable, Optional
+from typing import Any, Callable, Optional
 
 
-@dataclass
+@dataclass(eq=False)
 class ThreadTimer(object):
+	"""
+	A timer run by the ThreadManager scheduler instead of its own thread. Offers the threading.Timer
+	methods, so it can be cancelled, started later or waited for the same way. Periodic timers run
+	every interval until cancelled
+	"""
 	callback: Callable
 	args: list = field(default_factory=list)
 	kwargs: dict = field(default_factory=dict)
-	timer: Optional[Timer] = None
+	interval: float = 0
+	periodic: bool = False
+	scheduler: Optional[Any] = None
+	deadline: float = 0
+	started: bool = False
+	queued: bool = False
+	cancelled: bool = False
+	finished: threading.Event = field(default_factory=threading.Event)
+
+
+	@property
+	def function(self) -> Callable:
+		return self.callback
+
+
+	def start(self):
+		if self.started:
+			raise RuntimeError('Timers can only be started once')
+
+		self.started = True
+		self.scheduler.schedule(self)
+
+
+	def cancel(self):
+		if self.cancelled or self.finished.is_set():
+			return
+
+		self.cancelled = True
+		self.finished.set()
+		if self.scheduler:
+			self.scheduler.onTimerCancelled(self)
+
+
+	def is_alive(self) -> bool:
+		return self.started and not self.finished.is_set()
+
+
+	def isAlive(self) -> bool:
+		return self.is_alive()
+
+
+	def join(self, timeout: float = None) -> bool:
+		return self.finished.wait(timeout)
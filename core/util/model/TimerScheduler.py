@@ -0,0 +1,231 @@
+#  Copyright (c) 2021
+#
+#  This file, TimerScheduler.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from core.base.model.ProjectAliceObject import ProjectAliceObject
+from core.util.model.ThreadTimer import ThreadTimer
+
+
+class TimerScheduler(ProjectAliceObject):
+	"""
+	Runs all the timers from a single thread waiting on a deadline heap, and hands the due callbacks
+	over to a small worker pool. Cancelled timers stay in the heap until due or until they make up
+	most of it, the heap is then rebuilt. Lag is the delay between a timer deadline and its callback start.
+	Callbacks running longer than SLOW_CALLBACK seconds are logged, as are lags over LAG_WARNING seconds,
+	which mean all the workers were busy
+	"""
+
+	WORKERS = 8
+	REBUILD_THRESHOLD = 64
+	SLOW_CALLBACK = 2.0
+	LAG_WARNING = 1.0
+	LAG_WARNING_INTERVAL = 60
+
+
+	def __init__(self, workers: int = WORKERS, slowCallback: float = SLOW_CALLBACK, lagWarning: float = LAG_WARNING):
+		"""
+		:param workers: how many callbacks can run at the same time
+		:param slowCallback: seconds a callback can run before a warning is logged
+		:param lagWarning: seconds a callback can start late before a warning is logged
+		"""
+		super().__init__()
+		self._workers = max(1, workers)
+		self._slowCallback = slowCallback
+		self._lagWarning = lagWarning
+		self._lastLagWarning: Optional[float] = None
+		self._heap: List[Tuple[float, int, ThreadTimer]] = list()
+		self._sequence = itertools.count()
+		self._condition = threading.Condition()
+		self._thread: Optional[threading.Thread] = None
+		self._executor: Optional[ThreadPoolExecutor] = None
+		self._running = False
+		self._cancelledQueued = 0
+		self._stats = {'scheduled': 0, 'fired': 0, 'cancelled': 0, 'failed': 0, 'running': 0, 'totalLag': 0, 'maxLag': 0, 'slow': 0, 'late': 0}
+
+
+	def start(self):
+		with self._condition:
+			if self._running:
+				return
+
+			self._running = True
+			self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='timerWorker')
+			self._thread = threading.Thread(name='timerScheduler', target=self._run, daemon=True)
+			self._thread.start()
+
+
+	def stop(self):
+		"""
+		Cancels all the pending timers and stops the scheduler. Callbacks already running are not waited for,
+		as this can be called from one of them
+		:return:
+		"""
+		with self._condition:
+			self._running = False
+			timers = [timer for _deadline, _sequence, timer in self._heap]
+			self._heap = list()
+			self._cancelledQueued = 0
+			self._condition.notify_all()
+
+		for timer in timers:
+			timer.queued = False
+			timer.cancel()
+
+		if self._executor:
+			self._executor.shutdown(wait=False)
+
+		if self._thread and self._thread is not threading.current_thread():
+			self._thread.join(timeout=1)
+
+
+	def schedule(self, timer: ThreadTimer):
+		"""
+		Queues a timer to fire after its interval
+		:param timer:
+		:return:
+		"""
+		if not self._running:
+			self.start()
+
+		timer.deadline = time.monotonic() + timer.interval
+		self._push(timer)
+
+
+	def _push(self, timer: ThreadTimer):
+		with self._condition:
+			timer.queued = True
+			heapq.heappush(self._heap, (timer.deadline, next(self._sequence), timer))
+			self._stats['scheduled'] += 1
+			if self._heap[0][2] is timer:
+				self._condition.notify()
+
+
+	def onTimerCancelled(self, timer: ThreadTimer):
+		with self._condition:
+			self._stats['cancelled'] += 1
+			if not timer.queued:
+				return
+
+			self._cancelledQueued += 1
+			if self._cancelledQueued > self.REBUILD_THRESHOLD and self._cancelledQueued > len(self._heap) // 2:
+				self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+				heapq.heapify(self._heap)
+				self._cancelledQueued = 0
+
+
+	def _run(self):
+		while True:
+			with self._condition:
+				if not self._running or self._thread is not threading.current_thread():
+					return
+
+				if not self._heap:
+					self._condition.wait()
+					continue
+
+				deadline, _sequence, timer = self._heap[0]
+				if timer.cancelled:
+					heapq.heappop(self._heap)
+					timer.queued = False
+					self._cancelledQueued -= 1
+					continue
+
+				delay = deadline - time.monotonic()
+				if delay > 0:
+					self._condition.wait(delay)
+					continue
+
+				heapq.heappop(self._heap)
+				timer.queued = False
+
+			try:
+				self._executor.submit(self._execute, timer)
+			except RuntimeError:
+				return  # Shutting down
+
+
+	def _execute(self, timer: ThreadTimer):
+		if timer.cancelled:
+			return
+
+		started = time.monotonic()
+		lag = max(0.0, started - timer.deadline)
+		warnLag = False
+		with self._condition:
+			self._stats['fired'] += 1
+			self._stats['running'] += 1
+			self._stats['totalLag'] += lag
+			self._stats['maxLag'] = max(self._stats['maxLag'], lag)
+			if lag > self._lagWarning:
+				self._stats['late'] += 1
+				# Once busy, all the timers run late, don't log each of them
+				warnLag = self._lastLagWarning is None or started - self._lastLagWarning > self.LAG_WARNING_INTERVAL
+				if warnLag:
+					self._lastLagWarning = started
+			running = self._stats['running']
+
+		name = getattr(timer.callback, '__qualname__', timer.callback)
+		if warnLag:
+			self.logWarning(f'Timer callback **{name}** started {lag:.2f} seconds late, {running} of {self._workers} timer workers busy')
+
+		failed = False
+		try:
+			timer.callback(*timer.args, **timer.kwargs)
+		except Exception as e:
+			failed = True
+			self.logError(f'Timer callback **{name}** failed: {e}')
+
+		duration = time.monotonic() - started
+		with self._condition:
+			self._stats['running'] -= 1
+			self._stats['failed'] += failed
+			self._stats['slow'] += duration > self._slowCallback
+
+		if duration > self._slowCallback:
+			self.logWarning(f'Timer callback **{name}** ran for {duration:.2f} seconds, blocking a timer worker')
+
+		if timer.periodic and not timer.cancelled and self._running:
+			# Next deadline from the previous one, so that periodic timers don't drift
+			timer.deadline = max(timer.deadline + timer.interval, time.monotonic())
+			self._push(timer)
+		else:
+			timer.finished.set()
+
+
+	def pending(self) -> List[ThreadTimer]:
+		with self._condition:
+			return [timer for _deadline, _sequence, timer in self._heap if not timer.cancelled]
+
+
+	def stats(self) -> dict:
+		with self._condition:
+			pending = len(self._heap) - self._cancelledQueued
+			nextDeadline = self._heap[0][0] - time.monotonic() if self._heap else None
+			stats = dict(self._stats)
+
+		stats['pending'] = pending
+		stats['nextIn'] = nextDeadline
+		stats['averageLag'] = stats['totalLag'] / stats['fired'] if stats['fired'] else 0
+		return stats
@@ -17,7 +17,9 @@
 #
 #  Last modified: 2021.07.31 at 15:54:28 CEST
 
+import threading
 from importlib import import_module, reload
+from typing import Generator, Optional, Set
 
 from pathlib import Path
 
@@ -27,6 +29,8 @@ from core.dialog.model.DialogSession import DialogSession
 from core.user.model.User import User
 from core.voice.model.TTSEnum import TTSEnum
 from core.voice.model.Tts import Tts
+from core.voice.model.TtsCache import TtsCache
+from core.voice.model.TtsPool import TtsPool
 
 
 class TTSManager(Manager):
@@ -37,15 +41,116 @@ class TTSManager(Manager):
 		self._fallback = None
 		self._tts = None
 		self._cacheRoot = Path(self.Commons.rootDir(), 'var/cache')
+		self._cache: Optional[TtsCache] = None
+		self._stopWarmup = threading.Event()
+		self._pool = TtsPool()
+		self._speaking: Set[str] = set()
 
 
 	def onStart(self):
 		super().onStart()
+		self._cache = TtsCache(
+			root=self._cacheRoot,
+			maxSize=int(self.ConfigManager.getAliceConfigByName('ttsCacheSize') or 0) * 1024 * 1024,
+			policy=self.ConfigManager.getAliceConfigByName('ttsCacheEviction')
+		)
+		self._cache.load()
 		self._loadTTS(self.ConfigManager.getAliceConfigByName('tts').lower())
 
 
+	def onBooted(self):
+		super().onBooted()
+		self._stopWarmup.clear()
+		if self.ConfigManager.getAliceConfigByName('ttsCacheWarmup'):
+			self.ThreadManager.newThread(name='TtsCacheWarmup', target=self.warmupCache)
+
+
+	def onStop(self):
+		super().onStop()
+		self._stopWarmup.set()
+		self._pool.clear()
+		if self._cache:
+			self._cache.save()
+
+
+	def onFiveMinute(self):
+		timeout = self.ConfigManager.getAliceConfigByName('ttsIdleTimeout')
+		if not timeout:
+			return
+
+		evicted = self._pool.evictIdle(timeout=int(timeout) * 60)
+		if evicted:
+			self.logDebug(f'Released {evicted} idle user Tts')
+
+
+	def warmupCache(self):
+		"""
+		Indexes the speech files cached before the index existed, then synthesizes the talks of the
+		active skills with the current voice, until the cache is almost full
+		:return:
+		"""
+		self._cache.scan(Path(self._cacheRoot, engine.value) for engine in TTSEnum if Path(self._cacheRoot, engine.value).is_dir())
+
+		tts = self._tts
+		if not tts:
+			return
+
+		if tts.online:
+			self.logInfo('Not warming up the Tts cache with an online Tts')
+			return
+
+		synthesized = 0
+		for text in self.talkTexts():
+			if self._stopWarmup.is_set() or self._tts is not tts:
+				break
+
+			if self._cache.isFull(ratio=0.9):
+				self.logInfo('Tts cache almost full, stopping warmup')
+				break
+
+			try:
+				synthesized += tts.preSynthesize(text)
+			except Exception as e:
+				self.logWarning(f'Failed pre-synthesizing "{text}": {e}')
+
+		self._cache.save()
+		if synthesized:
+			self.logInfo(f'Pre-synthesized {synthesized} talks')
+
+
+	def talkTexts(self) -> Generator[str, None, None]:
+		"""
+		Every talk string of the system and the active skills in the active language, except those formatted at runtime
+		:return:
+		"""
+		language = self.LanguageManager.activeLanguage
+		workingSkills = self.SkillManager.allWorkingSkills
+		for skillName, languages in list(self.TalkManager.langData.items()):
+			if skillName != 'system' and skillName not in workingSkills:
+				continue
+
+			for talk in languages.get(language, dict()).values():
+				texts = talk if isinstance(talk, list) else [text for texts in talk.values() if isinstance(texts, list) for text in texts]
+				for text in texts:
+					if isinstance(text, str) and text and '{' not in text:
+						yield text
+
+
 	def _loadTTS(self, userTTS: str = None, user: User = None, forceTts=None):
 		self._fallback = None
+		self._tts = self._createTts(userTTS=userTTS, user=user, forceTts=forceTts)
+		# What made the system Tts change, settings or internet access, concerns the user voices as well
+		self._pool.clear()
+
+
+	def _createTts(self, userTTS: str = None, user: User = None, forceTts=None) -> Optional[Tts]:
+		"""
+		Imports, checks the dependencies of and starts a Tts, falling back to the configured fallback Tts
+		:param userTTS:
+		:param user:
+		:param forceTts:
+		:return: the started Tts, None if even the fallback failed
+		"""
 		if forceTts:
 			systemTTS = forceTts
 		else:
@@ -58,8 +163,6 @@ class TTSManager(Manager):
 		stayOffline = self.ConfigManager.getAliceConfigByName('stayCompletelyOffline')
 		online = self.InternetManager.online
 
-		self._tts = None
-
 		if systemTTS == TTSEnum.PICO.value:
 			package = 'core.voice.model.PicoTts'
 		elif systemTTS == TTSEnum.MYCROFT.value:
@@ -74,45 +177,63 @@ class TTSManager(Manager):
 			package = 'core.voice.model.SnipsTts'
 
 		module = import_module(package)
-		tts = getattr(module, package.rsplit('.', 1)[-1])
-		self._tts = tts(user)
+		ttsClass = getattr(module, package.rsplit('.', 1)[-1])
+		tts = ttsClass(user)
 
-		if not self._tts.checkDependencies():
-			if not self._tts.installDependencies():
-				self._tts = None
+		if not tts.checkDependencies():
+			if not tts.installDependencies():
+				tts = None
 			else:
 				module = reload(module)
-				tts = getattr(module, package.rsplit('.', 1)[-1])
-				self._tts = tts(user)
+				ttsClass = getattr(module, package.rsplit('.', 1)[-1])
+				tts = ttsClass(user)
 
-		if self._tts is None:
+		if tts is None:
 			self.logWarning("Couldn't install Tts, falling back to PicoTts")
 			from core.voice.model.PicoTts import PicoTts
 
-			self._tts = PicoTts(user)
+			tts = PicoTts(user)
 
-		if self._tts.online and (not online or keepTTSOffline or stayOffline):
-			self._tts = None
+		if tts.online and (not online or keepTTSOffline or stayOffline):
+			tts = None
 
-		if self._tts is None:
+		if tts is None:
 			if not forceTts:
 				fallback = self.ConfigManager.getAliceConfigByName('ttsFallback')
 				self.logWarning(f'Tts did not satisfy the user settings, falling back to **{fallback}**')
-				self._loadTTS(userTTS=userTTS, user=user, forceTts=fallback)
-				return
+				return self._createTts(userTTS=userTTS, user=user, forceTts=fallback)
 			else:
 				self.logFatal('Fallback Tts failed, going down')
-				return
+				return None
 
 		try:
-			self._tts.onStart()
+			tts.onStart()
 		except Exception as e:
 			if not forceTts:
 				fallback = self.ConfigManager.getAliceConfigByName('ttsFallback')
 				self.logWarning(f'Tts failed starting, falling back to **{fallback}**')
-				self._loadTTS(userTTS=userTTS, user=user, forceTts=fallback)
+				return self._createTts(userTTS=userTTS, user=user, forceTts=fallback)
 			else:
 				self.logFatal(f"Tts failed starting: {e}")
+				return None
+
+		return tts
+
+
+	def userTts(self, user: User) -> Optional[Tts]:
+		"""
+		The started Tts speaking with the voice settings of the user, built on first use and shared
+		with the users having the same settings
+		:param user:
+		:return:
+		"""
+		key = (
+			user.tts.lower(),
+			user.ttsLanguage or self.ConfigManager.getAliceConfigByName('ttsLanguage') or self.LanguageManager.activeLanguageAndCountryCode,
+			user.ttsType or self.ConfigManager.getAliceConfigByName('ttsType'),
+			user.ttsVoice or self.ConfigManager.getAliceConfigByName('ttsVoice')
+		)
+		return self._pool.get(key=key, factory=lambda: self._createTts(userTTS=user.tts, user=user))
 
 
 	@property
@@ -122,9 +243,25 @@ class TTSManager(Manager):
 
 	@property
 	def speaking(self) -> bool:
-		if not self._tts:
-			return False
-		return self._tts.speaking
+		return bool(self._speaking)
+
+
+	def isSpeaking(self, sessionId: str) -> bool:
+		return sessionId in self._speaking
+
+
+	def speakingStarted(self, session: DialogSession):
+		self._speaking.add(session.sessionId)
+
+
+	def speakingFinished(self, session: DialogSession):
+		if session:
+			self._speaking.discard(session.sessionId)
+
+
+	@property
+	def poolStats(self) -> dict:
+		return self._pool.stats
 
 
 	@property
@@ -132,6 +269,11 @@ class TTSManager(Manager):
 		return self._cacheRoot
 
 
+	@property
+	def cache(self) -> TtsCache:
+		return self._cache
+
+
 	def onInternetConnected(self):
 		if self.ConfigManager.getAliceConfigByName('stayCompletelyOffline') or self.ConfigManager.getAliceConfigByName('keepTTSOffline'):
 			return
@@ -157,9 +299,18 @@ class TTSManager(Manager):
 			self.MqttManager.endSession(sessionId=session.sessionIdl, forceEnd=True)
 			return
 
+		tts = self._tts
 		if session and session.user != constants.UNKNOWN_USER:
 			user: User = self.UserManager.getUser(session.user)
 			if user and user.tts:
-				self._loadTTS(user.tts, user)
+				tts = self.userTts(user) or self._tts
+
+		tts.onSay(session)
+
+
+	def onSayFinished(self, session: DialogSession, uid: str = None):
+		self.speakingFinished(session)
+
 
-		self._tts.onSay(session)
+	def onSessionEnded(self, session: DialogSession):
+		self.speakingFinished(session)
@@ -19,8 +19,6 @@
 
 from importlib import import_module, reload
 
-from paho.mqtt.client import MQTTMessage
-
 from core.base.model.Manager import Manager
 from core.dialog.model.DialogSession import DialogSession
 from core.voice.model.WakewordEngine import WakewordEngine
@@ -37,10 +35,12 @@ class WakewordManager(Manager):
 		super().onStart()
 		if not self.ConfigManager.getAliceConfigByName('disableCapture'):
 			self._startWakewordEngine()
+			self.MqttManager.subscribeAudioFrames(name=self.name, callback=self.onAudioFrame)
 
 
 	def onStop(self):
 		super().onStop()
+		self.MqttManager.unsubscribeAudioFrames(name=self.name)
 		if self._engine:
 			self._engine.onStop()
 
@@ -50,9 +50,9 @@ class WakewordManager(Manager):
 			self._engine.onBooted()
 
 
-	def onAudioFrame(self, message: MQTTMessage, deviceUid: str):
+	def onAudioFrame(self, payload: memoryview, deviceUid: str):
 		if self._engine:
-			self._engine.onAudioFrame(message=message, deviceUid=deviceUid)
+			self._engine.onAudioFrame(payload, deviceUid)
 
 
 	def onHotwordToggleOn(self, deviceUid: str, session: DialogSession):
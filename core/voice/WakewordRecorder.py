@@ -20,16 +20,22 @@
 import shutil
 from enum import Enum
 from pathlib import Path
-from pydub import AudioSegment
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
 from core.base.model.Manager import Manager
 from core.commons import constants
 from core.device.model.DeviceAbility import DeviceAbility
 from core.dialog.model.DialogSession import DialogSession
+from core.util.model.LazyModule import lazyImport
 from core.voice.model.Wakeword import Wakeword
 from core.voice.model.WakewordUploadThread import WakewordUploadThread
 
+if TYPE_CHECKING:
+	from pydub import AudioSegment
+
+# Only needed when recording a new wakeword
+pydub = lazyImport('pydub')
+
 
 class WakewordRecorderState(Enum):
 	IDLE = 1
@@ -112,7 +118,7 @@ class WakewordRecorder(Manager):
 		if not filepath:
 			filepath = self.wakeword.getRawSample()
 
-		sound = AudioSegment.from_file(filepath, format='wav')
+		sound = pydub.AudioSegment.from_file(filepath, format='wav')
 
 		if self._gainFix > 0:
 			sound.append(self._gainFix)
@@ -151,7 +157,7 @@ class WakewordRecorder(Manager):
 		self._workAudioFile()
 
 
-	def detectLeadingSilence(self, sound: AudioSegment) -> int:
+	def detectLeadingSilence(self, sound: 'AudioSegment') -> int:
 		average = sound.dBFS
 		pos = 0
 		while sound[pos: pos + 10].dBFS < (average + self._userTuning) and pos < len(sound):
@@ -20,7 +20,6 @@
 from pathlib import Path
 
 from core.base.SuperManager import SuperManager
-from core.dialog.model.DialogSession import DialogSession
 from core.user.model.User import User
 from core.voice.model.TTSEnum import TTSEnum
 from core.voice.model.Tts import Tts
@@ -255,36 +254,27 @@ class GoogleTts(Tts):
 		)
 
 
-	def onSay(self, session: DialogSession):
-		super().onSay(session)
-
-		if not self._text:
-			return
-
-		tmpFile = self.TEMP_ROOT / self._cacheFile.with_suffix('.mp3')
-		if not self._cacheFile.exists():
-			self.logDebug(f'Downloading file **{self._cacheFile.stem}**')
-			imput = texttospeech.types.module.SynthesisInput(ssml=self._text)
-			audio = texttospeech.types.module.AudioConfig(
-				audio_encoding=texttospeech.enums.AudioEncoding.MP3,
-				sample_rate_hertz=self.AudioServer.SAMPLERATE
-			)
-			voice = texttospeech.types.module.VoiceSelectionParams(
-				language_code=self._lang,
-				name=self._voice
-			)
-
-			response = self._client.synthesize_speech(imput, voice, audio)
-			if not response:
-				self.logError(f'[{self.TTS.value}] Failed downloading speech file')
-				return
+	def _synthesize(self, text: str, cacheFile: Path) -> bool:
+		tmpFile = self.TEMP_ROOT / cacheFile.with_suffix('.mp3')
+		self.logDebug(f'Downloading file **{cacheFile.stem}**')
+		imput = texttospeech.types.module.SynthesisInput(ssml=text)
+		audio = texttospeech.types.module.AudioConfig(
+			audio_encoding=texttospeech.enums.AudioEncoding.MP3,
+			sample_rate_hertz=self.AudioServer.SAMPLERATE
+		)
+		voice = texttospeech.types.module.VoiceSelectionParams(
+			language_code=self._lang,
+			name=self._voice
+		)
 
-			tmpFile.write_bytes(response.audio_content)
+		response = self._client.synthesize_speech(imput, voice, audio)
+		if not response:
+			self.logError(f'[{self.TTS.value}] Failed downloading speech file')
+			return False
 
-			self._mp3ToWave(src=tmpFile, dest=self._cacheFile)
-			tmpFile.unlink()
-			self.logDebug(f'Downloaded speech file **{self._cacheFile.stem}**')
-		else:
-			self.logDebug(f'Using existing cached file **{self._cacheFile.stem}**')
+		tmpFile.write_bytes(response.audio_content)
 
-		self._speak(self._cacheFile, session)
+		self._mp3ToWave(src=tmpFile, dest=cacheFile)
+		tmpFile.unlink()
+		self.logDebug(f'Downloaded speech file **{cacheFile.stem}**')
+		return True
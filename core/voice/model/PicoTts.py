@@ -17,8 +17,9 @@
 #
 #  Last modified: 2021.04.13 at 12:56:48 CEST
 
+from pathlib import Path
+
 from core.base.SuperManager import SuperManager
-from core.dialog.model.DialogSession import DialogSession
 from core.user.model.User import User
 from core.voice.model.TTSEnum import TTSEnum
 from core.voice.model.Tts import Tts
@@ -78,20 +79,11 @@ class PicoTts(Tts):
 		}
 
 
-	def onSay(self, session: DialogSession):
-		super().onSay(session)
-
-		if not self._text:
-			return
-
-		if not self._cacheFile.exists():
-			result = SuperManager.getInstance().CommonsManager.runRootSystemCommand(['pico2wave', '-l', self._lang, '-w', self._cacheFile, f'"{self._text}"'])
-			if result.returncode:
-				self.logError(f'Something went wrong generating speech file: {result.stderr}')
-				return
-			else:
-				self.logDebug(f'Generated speech file **{self._cacheFile.stem}**')
-		else:
-			self.logDebug(f'Using existing cached file **{self._cacheFile.stem}**')
+	def _synthesize(self, text: str, cacheFile: Path) -> bool:
+		result = SuperManager.getInstance().CommonsManager.runRootSystemCommand(['pico2wave', '-l', self._lang, '-w', cacheFile, f'"{text}"'])
+		if result.returncode:
+			self.logError(f'Something went wrong generating speech file: {result.stderr}')
+			return False
 
-		self._speak(file=self._cacheFile, session=session)
+		self.logDebug(f'Generated speech file **{cacheFile.stem}**')
+		return True
@@ -17,18 +17,12 @@
 #
 #  Last modified: 2021.04.13 at 12:56:48 CEST
 
-import io
-import queue
-import struct
-import wave
-from typing import Generator
-
 import pyaudio
-from paho.mqtt.client import MQTTMessage
 
 from core.commons import constants
 from core.dialog.model.DialogSession import DialogSession
 from core.voice.model.WakewordEngine import WakewordEngine
+from core.voice.model.WakewordStreams import WakewordStream, WakewordStreams
 
 
 try:
@@ -45,106 +39,89 @@ class PorcupineWakeword(WakewordEngine):
 			'pvporcupine==1.7.0'
 		}
 	}
+	KEYWORDS = ['porcupine', 'bumblebee', 'terminator', 'blueberry']
 
 
 	def __init__(self):
 		super().__init__()
-		self._working = self.ThreadManager.newEvent('ListenForWakeword')
-		self._buffer = queue.Queue()
-		self._hotwordThread = None
+		self._version = ''
+		self._streams = WakewordStreams(factory=self.createHandle, onDetection=self.onDetection)
 
 		try:
-			self._handler = pvporcupine.create(keywords=['porcupine', 'bumblebee', 'terminator', 'blueberry'])
+			# Every device gets its own handle on its first frame, this one only checks that porcupine works
+			handle = self.createHandle()
+			self._version = handle.version
+			handle.delete()
 			with self.Commons.shutUpAlsaFFS():
 				self._audio = pyaudio.PyAudio()
 		except:
 			self._enabled = False
 
 
+	def createHandle(self):
+		return pvporcupine.create(keywords=self.KEYWORDS)
+
+
+	def onStart(self):
+		super().onStart()
+		# Restarted engine, onBooted won't come again
+		if self.ProjectAlice.isBooted:
+			self.startStreams()
+
+
 	def onBooted(self):
 		super().onBooted()
+		self.startStreams()
+
+
+	def startStreams(self):
 		if self._enabled:
-			self._working.set()
-			self._hotwordThread = self.ThreadManager.newThread(name='HotwordThread', target=self.worker)
+			self._streams.start(workers=int(self.ConfigManager.getAliceConfigByName('wakewordWorkers') or 0))
 
 
 	def onStop(self):
 		super().onStop()
-		if self._enabled:
-			self._working.clear()
-			self._buffer = queue.Queue()
+		self._streams.stop()
 
 
 	def onHotwordToggleOff(self, deviceUid: str, session: DialogSession):
 		if self._enabled:
-			self._working.clear()
-			self._buffer = queue.Queue()
+			self._streams.pause(deviceUid)
 
 
 	def onHotwordToggleOn(self, deviceUid: str, session: DialogSession):
 		if self._enabled:
-			self._working.set()
-			self._buffer = queue.Queue()
-			self._hotwordThread = self.ThreadManager.newThread(name='HotwordThread', target=self.worker)
+			self._streams.resume(deviceUid)
 
 
-	def onAudioFrame(self, message: MQTTMessage, deviceUid: str):
-		if not self.enabled or not self._working.is_set():
+	def onAudioFrame(self, payload: memoryview, deviceUid: str):
+		if not self.enabled:
 			return
 
-		with io.BytesIO(message.payload) as buffer:
-			try:
-				with wave.open(buffer, 'rb') as wav:
-					frame = wav.readframes(self.AudioServer.FRAMES_PER_BUFFER)
-					while frame:
-						self._buffer.put(frame)
-						frame = wav.readframes(self.AudioServer.FRAMES_PER_BUFFER)
-
-			except Exception as e:
-				self.logError(f'Error recording audio frame: {e}')
-
-
-	def worker(self):
-		while True:
-			stream = self.audioStream()
-			for data in stream:
-				if not self._working.is_set():
-					break
-
-				pcm = struct.unpack_from('h' * self._handler.frame_length, data)
-				result = self._handler.process(pcm)
-				if result is not None and result > -1:
-					self.logDebug('Detected wakeword')
-					self.MqttManager.publish(
-						topic=constants.TOPIC_HOTWORD_DETECTED.format('default'),
-						payload={
-							'siteId'            : self.DeviceManager.getMainDevice().uid,
-							'modelId'           : f'porcupine_{result}',
-							'modelVersion'      : self._handler.version,
-							'modelType'         : 'universal',
-							'currentSensitivity': self.ConfigManager.getAliceConfigByName('wakewordSensitivity')
-						}
-					)
-					return
-
-
-	def audioStream(self) -> Generator:
-		while self._working.is_set():
-			chunk = self._buffer.get()
-			if not chunk:
-				return
-
-			data = [chunk]
-			size = len(chunk)
-
-			while self._working and size < 1024:
-				try:
-					chunk = self._buffer.get(block=True)
-					if not chunk or not self._working:
-						return
-					size += len(chunk)
-					data.append(chunk)
-				except queue.Empty:
-					break
-
-			yield b''.join(data)
+		try:
+			self._streams.feed(deviceUid, self.MqttManager.audioFrameBus.pcm(payload, deviceUid))
+		except Exception as e:
+			self.logError(f'Error recording audio frame: {e}')
+
+
+	def onDetection(self, stream: WakewordStream, keyword: int):
+		self.logDebug(f'Detected wakeword on device **{stream.deviceUid}**')
+		self.MqttManager.publish(
+			topic=constants.TOPIC_HOTWORD_DETECTED.format('default'),
+			payload={
+				'siteId'            : stream.deviceUid,
+				'modelId'           : f'porcupine_{keyword}',
+				'modelVersion'      : self._version,
+				'modelType'         : 'universal',
+				'currentSensitivity': self.ConfigManager.getAliceConfigByName('wakewordSensitivity')
+			}
+		)
+
+
+	@property
+	def detectionStats(self) -> dict:
+		"""
+		Worker count and, per device, the audio processed, detections, cpu time and buffer overruns
+		:return:
+		"""
+		return self._streams.stats()
@@ -22,8 +22,6 @@ import hashlib
 import re
 import tempfile
 from pathlib import Path
-from pydub import AudioSegment
-from pydub.exceptions import CouldntDecodeError
 from re import Match
 from typing import Optional
 
@@ -54,10 +52,6 @@ class Tts(ProjectAliceObject):
 		self._voice = ''
 		self._neuralVoice = False
 
-		self._cacheFile: Path = Path()
-		self._text = ''
-		self._speaking = False
-
 		self._supportsSSML = False
 
 
@@ -159,7 +153,7 @@ class Tts(ProjectAliceObject):
 
 	@property
 	def speaking(self) -> bool:
-		return self._speaking
+		return self.TTSManager.speaking
 
 
 	@staticmethod
@@ -177,7 +171,7 @@ class Tts(ProjectAliceObject):
 
 
 	def _speak(self, file: Path, session: DialogSession):
-		self._speaking = True
+		self.TTSManager.speakingStarted(session)
 		session.lastWasSoundPlayOnly = False
 
 		self.MqttManager.playSound(
@@ -187,13 +181,14 @@ class Tts(ProjectAliceObject):
 			deviceUid=session.deviceUid
 		)
 
-		try:
-			duration = round(len(AudioSegment.from_file(file)) / 1000, 2)
-		except CouldntDecodeError:
+		# The duration comes from the cache index, the file is only read once, when first cached
+		entry = self.TTSManager.cache.use(file)
+		if not entry:
 			self.logError('Error decoding TTS file')
-			file.unlink()
+			self.TTSManager.cache.remove(file)
 			self.onSay(session)
 		else:
+			duration = entry.duration
 			self.DialogManager.increaseSessionTimeout(session=session, interval=duration + 1)
 
 			if session.deviceUid == self.DeviceManager.getMainDevice().uid:
@@ -201,7 +196,7 @@ class Tts(ProjectAliceObject):
 
 
 	def _sayFinished(self, session: DialogSession):
-		self._speaking = False
+		self.TTSManager.speakingFinished(session)
 		self.MqttManager.publish(
 			topic=constants.TOPIC_TTS_FINISHED,
 			payload={
@@ -213,11 +208,14 @@ class Tts(ProjectAliceObject):
 
 
 	def onSayFinished(self, session: DialogSession, uid: str = None):
-		self._speaking = False
+		self.TTSManager.speakingFinished(session)
 
 
 	def _checkText(self, session: DialogSession) -> str:
-		text = session.payload['text']
+		return self._cleanText(session.payload['text'])
+
+
+	def _cleanText(self, text: str) -> str:
 		if not self._supportsSSML:
 			# We need to remove all ssml tags but transform some first
 			text = re.sub(self.SPELL_OUT, self._replaceSpellOuts, text)
@@ -235,12 +233,59 @@ class Tts(ProjectAliceObject):
 
 	def onSay(self, session: DialogSession) -> None:
 		"""
-		cleans the requested text for speaking if required and prepares the cache
-		Tts provides must redefine this method, but should call it at the start of their redefinition.
+		Cleans the requested text for speaking if required, synthesizes it unless cached and speaks it
+		Tts providers implement _synthesize. An instance is shared by every session using its voice,
+		so nothing about the session is kept on it
 		:param session:
 		:return:
 		"""
-		self._text = self._checkText(session)
-		if self._text:
-			self._cacheFile = self.cacheDirectory() / (self._hash(text=self._text) + '.wav')
-			self.cacheDirectory().mkdir(parents=True, exist_ok=True)
+		text = self._checkText(session)
+		if not text:
+			return
+
+		cacheFile = self.cacheFile(text)
+		if not self._ensureCached(text=text, cacheFile=cacheFile):
+			return
+
+		self._speak(file=cacheFile, session=session)
+
+
+	def cacheFile(self, text: str) -> Path:
+		return self.cacheDirectory() / (self._hash(text=text) + '.wav')
+
+
+	def preSynthesize(self, text: str) -> bool:
+		"""
+		Synthesizes a text ahead of time, so that it is cached when first said
+		:param text:
+		:return: True if the text was synthesized, False if it was already cached or failed
+		"""
+		text = self._cleanText(text)
+		if not text:
+			return False
+
+		cacheFile = self.cacheFile(text)
+		if cacheFile.exists() or not self._ensureCached(text=text, cacheFile=cacheFile):
+			return False
+
+		return self.TTSManager.cache.store(cacheFile) is not None
+
+
+	def _ensureCached(self, text: str, cacheFile: Path) -> bool:
+		with self.TTSManager.cache.synthesisLock(cacheFile):
+			if cacheFile.exists():
+				self.logDebug(f'Using existing cached file **{cacheFile.stem}**')
+				return True
+
+			cacheFile.parent.mkdir(parents=True, exist_ok=True)
+			return self._synthesize(text=text, cacheFile=cacheFile) and cacheFile.exists()
+
+
+	def _synthesize(self, text: str, cacheFile: Path) -> bool:
+		"""
+		Tts providers redefine this method to write the speech of the text to the cache file, as a wav file
+		:param text: the cleaned text
+		:param cacheFile:
+		:return: True on success
+		"""
+		return False
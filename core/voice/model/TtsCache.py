@@ -0,0 +1,288 @@
+#  Copyright (c) 2021
+#
+#  This file, TtsCache.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import json
+import threading
+import time
+import wave
+import weakref
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from core.base.model.ProjectAliceObject import ProjectAliceObject
+
+
+@dataclass
+class TtsCacheEntry(object):
+	duration: float
+	sampleRate: int
+	size: int
+	lastHit: float
+	hits: int = 0
+
+
+class TtsCache(ProjectAliceObject):
+	"""
+	Index of the synthesized speech files, which are named after the hash of their text and voice. The
+	index keeps the duration, sample rate and size of every file so that a file is never decoded again,
+	and when the files go over the size budget, the least recently, or least frequently, used ones are
+	deleted. Files cached before the index existed are indexed from their wav header on first use
+	"""
+
+	INDEX_FILE = 'ttsIndex.json'
+	EVICTION_POLICIES = ('lru', 'lfu')
+
+
+	def __init__(self, root: Path, maxSize: int = 0, policy: str = 'lru'):
+		"""
+		:param root: the cache root, entries are indexed by their path relative to it
+		:param maxSize: budget in bytes, 0 for no limit
+		:param policy: lru or lfu
+		"""
+		super().__init__()
+		self._root = root
+		self._indexFile = root / self.INDEX_FILE
+		self._maxSize = max(maxSize, 0)
+		self._policy = policy if policy in self.EVICTION_POLICIES else 'lru'
+		self._entries: Dict[str, TtsCacheEntry] = dict()
+		self._size = 0
+		self._dirty = False
+		self._lock = threading.RLock()
+		self._fileLocks = weakref.WeakValueDictionary()
+		self._stats = {'hits': 0, 'stored': 0, 'evicted': 0}
+
+
+	@property
+	def maxSize(self) -> int:
+		return self._maxSize
+
+
+	@property
+	def size(self) -> int:
+		return self._size
+
+
+	def load(self):
+		try:
+			data = json.loads(self._indexFile.read_text())
+		except FileNotFoundError:
+			data = dict()
+		except ValueError:
+			self.logWarning('Tts cache index is corrupted, rebuilding it')
+			data = dict()
+
+		with self._lock:
+			self._entries = dict()
+			for key, entry in data.items():
+				try:
+					self._entries[key] = TtsCacheEntry(**entry)
+				except TypeError:
+					continue
+
+			self._size = sum(entry.size for entry in self._entries.values())
+			self._dirty = False
+
+
+	def save(self):
+		with self._lock:
+			if not self._dirty:
+				return
+			data = {key: asdict(entry) for key, entry in self._entries.items()}
+			self._dirty = False
+
+		try:
+			self._indexFile.parent.mkdir(parents=True, exist_ok=True)
+			tmpFile = self._indexFile.with_suffix('.tmp')
+			tmpFile.write_text(json.dumps(data))
+			tmpFile.replace(self._indexFile)
+		except OSError as e:
+			self.logWarning(f'Failed saving Tts cache index: {e}')
+
+
+	def synthesisLock(self, file: Path) -> threading.Lock:
+		"""
+		A lock per cache file, so that a file is only synthesized once when asked for at the same time
+		:param file:
+		:return:
+		"""
+		with self._lock:
+			lock = self._fileLocks.get(str(file))
+			if lock is None:
+				lock = threading.Lock()
+				self._fileLocks[str(file)] = lock
+			return lock
+
+
+	def get(self, file: Path) -> Optional[TtsCacheEntry]:
+		"""
+		Returns the entry of a cached file, without counting a hit
+		:param file:
+		:return: None if the file isn't cached
+		"""
+		key = self._key(file)
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry and file.exists():
+				return entry
+
+			if entry:
+				self._drop(key)
+
+		return None
+
+
+	def use(self, file: Path) -> Optional[TtsCacheEntry]:
+		"""
+		Counts a hit on the file, indexing it if it was just synthesized or cached before the index existed
+		:param file:
+		:return: the entry, or None if the file is missing or not a valid wav
+		"""
+		key = self._key(file)
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry and file.exists():
+				entry.hits += 1
+				entry.lastHit = time.time()
+				self._stats['hits'] += 1
+				self._dirty = True
+				return entry
+
+			if entry:
+				self._drop(key)
+
+		entry = self.store(file)
+		if entry:
+			with self._lock:
+				entry.hits += 1
+		return entry
+
+
+	def store(self, file: Path, lastHit: float = None) -> Optional[TtsCacheEntry]:
+		"""
+		Indexes a synthesized file, reading its wav header, and evicts over the budget
+		:param file:
+		:param lastHit: defaults to now
+		:return: the entry, or None if the file is missing or not a valid wav
+		"""
+		try:
+			with wave.open(str(file), 'rb') as wav:
+				sampleRate = wav.getframerate()
+				duration = round(wav.getnframes() / sampleRate, 2) if sampleRate else 0
+			size = file.stat().st_size
+		except (OSError, EOFError, wave.Error) as e:
+			self.logWarning(f'Cannot index Tts cache file **{file.name}**: {e}')
+			return None
+
+		key = self._key(file)
+		entry = TtsCacheEntry(duration=duration, sampleRate=sampleRate, size=size, lastHit=lastHit or time.time())
+		with self._lock:
+			previous = self._entries.get(key)
+			if previous:
+				self._size -= previous.size
+			self._entries[key] = entry
+			self._size += size
+			self._stats['stored'] += 1
+			self._dirty = True
+			self._evict(keep=key)
+
+		return entry
+
+
+	def remove(self, file: Path):
+		with self._lock:
+			self._drop(self._key(file))
+
+		self._unlink(file)
+
+
+	def scan(self, directories: Iterable[Path]):
+		"""
+		Indexes the wav files of the given directories that aren't yet, using their modification time as last hit
+		:param directories:
+		:return:
+		"""
+		for directory in directories:
+			for file in directory.rglob('*.wav'):
+				with self._lock:
+					known = self._key(file) in self._entries
+				if not known:
+					self.store(file, lastHit=file.stat().st_mtime)
+
+		self.save()
+
+
+	def isFull(self, ratio: float = 1) -> bool:
+		return bool(self._maxSize) and self._size >= self._maxSize * ratio
+
+
+	def _evict(self, keep: str):
+		if not self._maxSize or self._size <= self._maxSize:
+			return
+
+		if self._policy == 'lfu':
+			order = sorted(self._entries.items(), key=lambda item: (item[1].hits, item[1].lastHit))
+		else:
+			order = sorted(self._entries.items(), key=lambda item: item[1].lastHit)
+
+		for key, _entry in order:
+			if self._size <= self._maxSize:
+				break
+
+			if key == keep:
+				continue
+
+			self._drop(key)
+			self._unlink(self._root / key)
+			self._stats['evicted'] += 1
+
+
+	def _drop(self, key: str):
+		entry = self._entries.pop(key, None)
+		if entry:
+			self._size -= entry.size
+			self._dirty = True
+
+
+	def _unlink(self, file: Path):
+		try:
+			file.unlink()
+		except FileNotFoundError:
+			pass
+		except OSError as e:
+			self.logWarning(f'Failed deleting Tts cache file **{file.name}**: {e}')
+
+
+	def _key(self, file: Path) -> str:
+		try:
+			return str(file.relative_to(self._root))
+		except ValueError:
+			return str(file)
+
+
+	@property
+	def stats(self) -> dict:
+		with self._lock:
+			stats = dict(self._stats)
+			stats['entries'] = len(self._entries)
+			stats['size'] = self._size
+
+		stats['maxSize'] = self._maxSize
+		stats['policy'] = self._policy
+		return stats
@@ -0,0 +1,121 @@
+#  Copyright (c) 2021
+#
+#  This file, TtsPool.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from core.base.model.ProjectAliceObject import ProjectAliceObject
+
+
+TtsKey = Tuple[str, str, str, str]
+
+
+@dataclass
+class TtsPoolEntry(object):
+	tts: Any
+	lastUsed: float
+	uses: int = 0
+
+
+class TtsPool(ProjectAliceObject):
+	"""
+	Started Tts instances, keyed by engine, language, type and voice, so that users with their own
+	voice don't load and start a Tts for every sentence they hear. Instances are built on first use,
+	one key at a time, and dropped once unused for longer than the idle timeout
+	"""
+
+	def __init__(self):
+		super().__init__()
+		self._entries: Dict[TtsKey, TtsPoolEntry] = dict()
+		self._buildLocks: Dict[TtsKey, threading.Lock] = dict()
+		self._lock = threading.Lock()
+		self._stats = {'built': 0, 'reused': 0, 'evicted': 0}
+
+
+	def get(self, key: TtsKey, factory: Callable[[], Any]) -> Optional[Any]:
+		"""
+		Returns the instance for the key, building it if there's none yet
+		:param key: engine, language, type and voice
+		:param factory: builds and starts the instance, returns None on failure
+		:return:
+		"""
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry:
+				return self._use(entry)
+
+			buildLock = self._buildLocks.setdefault(key, threading.Lock())
+
+		with buildLock:
+			# Built meanwhile by a concurrent request for the same voice
+			with self._lock:
+				entry = self._entries.get(key)
+				if entry:
+					return self._use(entry)
+
+			tts = factory()
+			if tts is None:
+				return None
+
+			with self._lock:
+				self._stats['built'] += 1
+				self._entries[key] = TtsPoolEntry(tts=tts, lastUsed=time.monotonic(), uses=1)
+				self._buildLocks.pop(key, None)
+
+			return tts
+
+
+	def evictIdle(self, timeout: float) -> int:
+		"""
+		Drops the instances unused for longer than the timeout
+		:param timeout: seconds
+		:return: the number of dropped instances
+		"""
+		limit = time.monotonic() - timeout
+		with self._lock:
+			idle = [key for key, entry in self._entries.items() if entry.lastUsed < limit]
+			for key in idle:
+				self._entries.pop(key)
+
+			self._stats['evicted'] += len(idle)
+
+		return len(idle)
+
+
+	def clear(self):
+		with self._lock:
+			self._entries = dict()
+
+
+	def _use(self, entry: TtsPoolEntry) -> Any:
+		entry.lastUsed = time.monotonic()
+		entry.uses += 1
+		self._stats['reused'] += 1
+		return entry.tts
+
+
+	@property
+	def stats(self) -> dict:
+		with self._lock:
+			stats = dict(self._stats)
+			stats['instances'] = {'/'.join(key): entry.uses for key, entry in self._entries.items()}
+
+		return stats
@@ -0,0 +1,274 @@
+#  Copyright (c) 2021
+#
+#  This file, WakewordStreams.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from core.base.model.ProjectAliceObject import ProjectAliceObject
+from core.util.model.AudioRingBuffer import AudioRingBuffer
+
+
+@dataclass(eq=False)
+class WakewordStream(object):
+	deviceUid: str
+	buffer: AudioRingBuffer
+	handle: Any = None
+	frame: Optional[np.ndarray] = None
+	listening: bool = True
+	scheduled: bool = False
+	processed: int = 0  # Samples
+	detections: int = 0
+	cpuTime: float = 0
+	maxFrameTime: float = 0
+
+
+	def toDict(self, sampleRate: int) -> dict:
+		seconds = self.processed / sampleRate
+		return {
+			'listening'   : self.listening,
+			'audioSeconds': seconds,
+			'detections'  : self.detections,
+			'cpuTime'     : self.cpuTime,
+			'cpuLoad'     : self.cpuTime / seconds if seconds else 0,
+			'maxFrameTime': self.maxFrameTime,
+			'overruns'    : self.buffer.overruns
+		}
+
+
+class WakewordStreams(ProjectAliceObject):
+	"""
+	Runs a wakeword detector per device, each with its own handle and audio buffer, so that the
+	audio of different rooms never gets mixed and a detection is reported for the right device. A
+	device buffer is drained by the worker pool whenever it holds full frames, a device being
+	processed by one worker at a time, in order
+	"""
+
+	SAMPLERATE = 16000
+	BUFFER_SECONDS = 2
+	DRAIN_BATCH = 32
+
+
+	def __init__(self, factory: Callable[[], Any], onDetection: Callable[[WakewordStream, int], None], pauseOnDetection: bool = True):
+		"""
+		:param factory: creates a detector handle, with a frame_length and a process(pcm) returning the detected keyword index or -1
+		:param onDetection: called with the stream and keyword index on detection, from a worker thread
+		:param pauseOnDetection: stop listening on a device after a detection, until resumed
+		"""
+		super().__init__()
+		self._factory = factory
+		self._onDetection = onDetection
+		self._pauseOnDetection = pauseOnDetection
+		self._streams: Dict[str, WakewordStream] = dict()
+		self._lock = threading.Lock()
+		self._executor: Optional[ThreadPoolExecutor] = None
+		self._workers = 0
+
+
+	@staticmethod
+	def defaultWorkers() -> int:
+		return os.cpu_count() or 1
+
+
+	def start(self, workers: int = 0):
+		"""
+		:param workers: worker threads, 0 for as many as cpu cores
+		:return:
+		"""
+		if self._executor:
+			return
+
+		self._workers = workers if workers > 0 else self.defaultWorkers()
+		self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='wakewordWorker')
+
+
+	def stop(self):
+		"""
+		Stops the workers, waiting for the running detections, and releases the handles
+		:return:
+		"""
+		with self._lock:
+			executor = self._executor
+			self._executor = None
+			streams = list(self._streams.values())
+			self._streams = dict()
+
+		for stream in streams:
+			stream.listening = False
+			stream.buffer.close()
+
+		if executor:
+			executor.shutdown(wait=True)
+
+		for stream in streams:
+			self._deleteHandle(stream)
+
+
+	def feed(self, deviceUid: str, pcm):
+		"""
+		Appends the samples of a device and schedules its detection
+		:param deviceUid:
+		:param pcm: 16 bits samples
+		:return:
+		"""
+		executor = self._executor
+		if not executor:
+			return
+
+		stream = self._streams.get(deviceUid)
+		if not stream:
+			with self._lock:
+				stream = self._streams.get(deviceUid)
+				if not stream:
+					stream = WakewordStream(deviceUid=deviceUid, buffer=AudioRingBuffer(capacity=self.SAMPLERATE * self.BUFFER_SECONDS))
+					self._streams[deviceUid] = stream
+
+		if not stream.listening:
+			return
+
+		stream.buffer.write(pcm)
+		with self._lock:
+			if stream.scheduled:
+				return
+			stream.scheduled = True
+
+		self._submit(executor, stream)
+
+
+	def pause(self, deviceUid: str):
+		stream = self._streams.get(deviceUid)
+		if stream:
+			stream.listening = False
+			stream.buffer.clear()
+
+
+	def resume(self, deviceUid: str):
+		stream = self._streams.get(deviceUid)
+		if stream:
+			# Drop what was said during the pause
+			stream.buffer.clear()
+			stream.listening = True
+
+
+	def pauseAll(self):
+		for deviceUid in list(self._streams):
+			self.pause(deviceUid)
+
+
+	def resumeAll(self):
+		for deviceUid in list(self._streams):
+			self.resume(deviceUid)
+
+
+	def _submit(self, executor: ThreadPoolExecutor, stream: WakewordStream):
+		try:
+			executor.submit(self._drain, stream)
+		except RuntimeError:
+			stream.scheduled = False  # Shutting down
+
+
+	def _drain(self, stream: WakewordStream):
+		try:
+			if stream.handle is None:
+				stream.handle = self._factory()
+				stream.frame = np.empty(stream.handle.frame_length, dtype=np.int16)
+
+			frameLength = len(stream.frame)
+			for _ in range(self.DRAIN_BATCH):
+				if not stream.listening:
+					break
+
+				pcm = stream.buffer.readFrame(frameLength, out=stream.frame, timeout=0)
+				if pcm is None:
+					break
+
+				self._process(stream, pcm)
+		except Exception as e:
+			stream.listening = False
+			self.logError(f'Wakeword detection failed for device **{stream.deviceUid}**: {e}')
+
+		with self._lock:
+			stream.scheduled = False
+			# Frames that came in meanwhile, or a batch cut short to let the other devices through
+			if not stream.listening or stream.handle is None or stream.buffer.available < len(stream.frame):
+				return
+			stream.scheduled = True
+
+		executor = self._executor
+		if executor:
+			self._submit(executor, stream)
+		else:
+			stream.scheduled = False
+
+
+	def _process(self, stream: WakewordStream, pcm: np.ndarray):
+		start = time.thread_time()
+		result = stream.handle.process(pcm)
+		elapsed = time.thread_time() - start
+
+		stream.processed += len(pcm)
+		stream.cpuTime += elapsed
+		if elapsed > stream.maxFrameTime:
+			stream.maxFrameTime = elapsed
+
+		if result is None or result < 0:
+			return
+
+		stream.detections += 1
+		if self._pauseOnDetection:
+			self.pause(stream.deviceUid)
+
+		self._onDetection(stream, result)
+
+
+	def _deleteHandle(self, stream: WakewordStream):
+		if stream.handle is None or not hasattr(stream.handle, 'delete'):
+			return
+
+		try:
+			stream.handle.delete()
+		except Exception as e:
+			self.logWarning(f'Failed releasing wakeword handle of device **{stream.deviceUid}**: {e}')
+
+
+	@property
+	def devices(self) -> list:
+		return list(self._streams)
+
+
+	def backlog(self, deviceUid: str) -> int:
+		"""
+		Samples of the device waiting for detection
+		:param deviceUid:
+		:return:
+		"""
+		stream = self._streams.get(deviceUid)
+		return stream.buffer.available if stream else 0
+
+
+	def stats(self) -> dict:
+		return {
+			'workers': self._workers,
+			'devices': {deviceUid: stream.toDict(self.SAMPLERATE) for deviceUid, stream in list(self._streams.items())}
+		}
@@ -17,7 +17,8 @@
 #
 #  Last modified: 2021.04.13 at 12:56:48 CEST
 
-from core.dialog.model.DialogSession import DialogSession
+from pathlib import Path
+
 from core.user.model.User import User
 from core.voice.model.TTSEnum import TTSEnum
 from core.voice.model.Tts import Tts
@@ -138,33 +139,24 @@ class WatsonTts(Tts):
 		self._client.set_service_url(self.ConfigManager.getAliceConfigByName('ibmCloudAPIURL'))
 
 
-	def onSay(self, session: DialogSession):
-		super().onSay(session)
-
-		if not self._text:
-			return
-
-		tmpFile = self.TEMP_ROOT / self._cacheFile.with_suffix('.mp3')
-		if not self._cacheFile.exists():
-			try:
-				self.logDebug(f'Downloading file **{self._cacheFile.stem}**')
-				response = self._client.synthesize(
-					text=self._text,
-					accept='audio/mp3',
-					voice=self._voice
-				)
-				data = response.result.content
-			except:
-				self.logError(f'[{self.TTS.value}] Failed downloading speech file')
-				return
-
-			tmpFile.write_bytes(data)
+	def _synthesize(self, text: str, cacheFile: Path) -> bool:
+		tmpFile = self.TEMP_ROOT / cacheFile.with_suffix('.mp3')
+		try:
+			self.logDebug(f'Downloading file **{cacheFile.stem}**')
+			response = self._client.synthesize(
+				text=text,
+				accept='audio/mp3',
+				voice=self._voice
+			)
+			data = response.result.content
+		except:
+			self.logError(f'[{self.TTS.value}] Failed downloading speech file')
+			return False
 
-			self._mp3ToWave(src=tmpFile, dest=self._cacheFile)
-			tmpFile.unlink()
+		tmpFile.write_bytes(data)
 
-			self.logDebug(f'Downloaded speech file **{self._cacheFile.stem}**')
-		else:
-			self.logDebug(f'Using existing cached file **{self._cacheFile.stem}**')
+		self._mp3ToWave(src=tmpFile, dest=cacheFile)
+		tmpFile.unlink()
 
-		self._speak(self._cacheFile, session)
+		self.logDebug(f'Downloaded speech file **{cacheFile.stem}**')
+		return True
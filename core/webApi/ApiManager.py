@@ -20,11 +20,12 @@
 import logging
 import random
 import string
+from typing import Optional
 
 from flask import Flask
-from flask_cors import CORS
 
 from core.base.model.Manager import Manager
+from core.util.model.LazyModule import lazyImport
 from core.webApi.model.DevicesApi import DevicesApi
 from core.webApi.model.DialogApi import DialogApi
 from core.webApi.model.LoginApi import LoginApi
@@ -36,17 +37,16 @@ from core.webApi.model.UsersApi import UsersApi
 from core.webApi.model.UtilsApi import UtilsApi
 from core.webApi.model.WidgetsApi import WidgetsApi
 
+flask_cors = lazyImport('flask_cors')
 
-class ApiManager(Manager):
-	app = Flask(__name__)
-	app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
-	CORS(app, resources={r'/api/*': {'origins': '*'}}, expose_headers='*', allow_headers='*')
 
+class ApiManager(Manager):
 	_APIS = [UtilsApi, LoginApi, UsersApi, SkillsApi, DialogApi, TelemetryApi, WidgetsApi, StateApi, MyHomeApi, DevicesApi]
 
 
 	def __init__(self):
 		super().__init__()
+		self._app: Optional[Flask] = None
 		log = logging.getLogger('werkzeug')
 		log.setLevel(logging.ERROR)
 
@@ -54,6 +54,11 @@ class ApiManager(Manager):
 	def onStart(self):
 		super().onStart()
 
+		if not self._app:
+			self._app = Flask(__name__)
+			self._app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
+			flask_cors.CORS(self._app, resources={r'/api/*': {'origins': '*'}}, expose_headers='*', allow_headers='*')
+
 		key = ''.join([random.choice(string.ascii_letters + string.digits + string.punctuation) for _ in range(20)])
 		self.app.secret_key = key.encode()
 		self.app.cors_headers = 'Content-Type'
@@ -92,3 +97,8 @@ class ApiManager(Manager):
 			target=self.app.run,
 			kwargs=options
 		)
+
+
+	@property
+	def app(self) -> Optional[Flask]:
+		return self._app
@@ -69,6 +69,19 @@ class UtilsApi(Api):
 			return jsonify(success=False, message=str(e))
 
 
+	@route('/bootProfile/', methods=['GET'])
+	@ApiAuthenticated
+	def bootProfile(self) -> Response:
+		"""
+		Returns how long the last boot took, per manager, skill, database check and subprocess
+		"""
+		try:
+			return jsonify(success=True, profile=self.ProjectAlice.bootProfiler.summary(), skills=self.SkillManager.skillBootReport)
+		except Exception as e:
+			self.logError(f'Failed retrieving boot profile: {e}')
+			return jsonify(success=False, message=str(e))
+
+
 	@route('/config/', methods=['GET'])
 	def config(self) -> Response:
 		"""
@@ -66,7 +66,8 @@ class NodeRedManager(Manager):
 			return
 
 		self.injectSkillNodes()
-		self.Commons.runRootSystemCommand(['systemctl', 'start', 'nodered'])
+		with self.bootSpan(name='Node-RED', category='subprocess'):
+			self.Commons.runRootSystemCommand(['systemctl', 'start', 'nodered'])
 
 
 	def install(self):
@@ -23,6 +23,7 @@ from pathlib import Path
 from typing import Dict, List, Optional, Union
 
 from core.base.model.Manager import Manager
+from core.util.model.CoalescedWriter import CoalescedWriter
 from core.webui.model.Widget import Widget
 from core.webui.model.WidgetPage import WidgetPage
 
@@ -56,6 +57,7 @@ class WidgetManager(Manager):
 		self._widgets: Dict[int, Widget] = dict()
 		self._pages = dict()
 		self._widgetsByIndex = dict()
+		self._widgetWriter = CoalescedWriter(tableName=self.WIDGETS_TABLE, callerName=self.name, toRow=Widget.toDBRow)
 
 
 	def onStart(self):
@@ -65,6 +67,11 @@ class WidgetManager(Manager):
 		self.getNextZIndex(1)
 
 
+	def onStop(self):
+		super().onStop()
+		self._widgetWriter.flush()
+
+
 	def onSkillInstalled(self, skill: str):
 		self.loadWidgets(skillName=skill)
 
@@ -255,48 +262,52 @@ class WidgetManager(Manager):
 			}
 		)
 
-		self.DatabaseManager.delete(
-			tableName=self.WIDGETS_TABLE,
-			callerName=self.name,
-			values={
-				'page': pageId
-			}
-		)
+		widgetIds = [wid for wid, widget in self._widgets.copy().items() if widget.page == pageId]
+		with self._widgetWriter.forget(*widgetIds):
+			self.DatabaseManager.delete(
+				tableName=self.WIDGETS_TABLE,
+				callerName=self.name,
+				values={
+					'page': pageId
+				}
+			)
 
-		tmp = self._widgets.copy()
-		for wid, widget in tmp.items():
-			if widget.page == pageId:
-				self._widgets.pop(wid, None)
+		for wid in widgetIds:
+			self._widgets.pop(wid, None)
 
 
 	def removeWidget(self, widgetId: int):
-		self.DatabaseManager.delete(
-			tableName=self.WIDGETS_TABLE,
-			callerName=self.name,
-			values={
-				'id': widgetId
-			}
-		)
+		with self._widgetWriter.forget(widgetId):
+			self.DatabaseManager.delete(
+				tableName=self.WIDGETS_TABLE,
+				callerName=self.name,
+				values={
+					'id': widgetId
+				}
+			)
 		self._widgets.pop(widgetId, None)
 
 
 	def onSkillDeleted(self, skill: str):
+		widgetIds = [wid for wid, widget in self._widgets.copy().items() if widget.skill == skill]
 		self.onSkillDeactivated(skill=skill)
 		self._widgetTemplates.pop(skill, None)
-		# noinspection SqlResolve
-		self.DatabaseManager.delete(
-			tableName=self.WIDGETS_TABLE,
-			callerName=self.name,
-			values={
-				'skill': skill
-			}
-		)
+		with self._widgetWriter.forget(*widgetIds):
+			# noinspection SqlResolve
+			self.DatabaseManager.delete(
+				tableName=self.WIDGETS_TABLE,
+				callerName=self.name,
+				values={
+					'skill': skill
+				}
+			)
 
 
 	def onSkillDeactivated(self, skill):
 		tmp = self._widgets.copy()
 		for wid, widget in tmp.items():
 			if widget.skill == skill:
+				self._widgetWriter.discard(wid)
 				self._widgets.pop(wid, None)
 
 
@@ -319,7 +330,7 @@ class WidgetManager(Manager):
 
 		widget.x = x
 		widget.y = y
-		widget.saveToDB()
+		self._widgetWriter.markDirty(widget.id, widget)
 		return True
 
 
@@ -334,7 +345,7 @@ class WidgetManager(Manager):
 		widget.y = y
 		widget.w = w
 		widget.h = h
-		widget.saveToDB()
+		self._widgetWriter.markDirty(widget.id, widget)
 		return True
 
 
@@ -366,6 +377,11 @@ class WidgetManager(Manager):
 		return self._widgets.get(widgetId, None)
 
 
+	@property
+	def widgetWriter(self) -> CoalescedWriter:
+		return self._widgetWriter
+
+
 	@property
 	def widgetTemplates(self) -> dict:
 		return self._widgetTemplates
@@ -100,35 +100,40 @@ class Widget(ProjectAliceObject):
 	# noinspection SqlResolve
 	def saveToDB(self):
 		if self._id != -1:
+			self.WidgetManager.widgetWriter.discard(self._id)
 			self.DatabaseManager.replace(
 				tableName=self.WidgetManager.WIDGETS_TABLE,
 				query='REPLACE INTO :__table__ (id, skill, name, settings, configs, page) VALUES (:id, :skill, :name, :settings, :configs, :page)',
 				callerName=self.WidgetManager.name,
-				values={
-					'id'      : self._id if self._id != 9999 else '',
-					'skill'   : self._skill,
-					'name'    : self._name,
-					'settings': json.dumps(self._settings),
-					'configs' : json.dumps(self._configs),
-					'page'    : self._page
-				}
+				values=self.toDBRow()
 			)
 		else:
+			values = self.toDBRow()
+			values.pop('id')
 			widgetId = self.DatabaseManager.insert(
 				tableName=self.WidgetManager.WIDGETS_TABLE,
 				callerName=self.WidgetManager.name,
-				values={
-					'skill'   : self._skill,
-					'name'    : self._name,
-					'settings': json.dumps(self._settings),
-					'configs' : json.dumps(self._configs),
-					'page'    : self._page
-				}
+				values=values
 			)
 
 			self._setId(widgetId)
 
 
+	def toDBRow(self) -> dict:
+		"""
+		The widget database row
+		:return:
+		"""
+		return {
+			'id'      : self._id if self._id != 9999 else '',
+			'skill'   : self._skill,
+			'name'    : self._name,
+			'settings': json.dumps(self._settings),
+			'configs' : json.dumps(self._configs),
+			'page'    : self._page
+		}
+
+
 	def getCurrentDir(self) -> Path:
 		return Path(inspect.getfile(self.__class__)).parent
 
@@ -18,10 +18,28 @@
 #  Last modified: 2021.04.13 at 12:56:50 CEST
 
 import unittest
+from unittest import mock
+from unittest.mock import MagicMock
+
+from core.asr.model.Asr import Asr
 
 
 class TestAsr(unittest.TestCase):
 
+	def setUp(self):
+		patcher = mock.patch('core.base.SuperManager.SuperManager')
+		superManager = patcher.start()
+		self.addCleanup(patcher.stop)
+
+		self.superManager = MagicMock()
+		self.superManager.ConfigManager.getAliceConfigByName.return_value = 10
+		superManager.getInstance.return_value = self.superManager
+
+		self.asr = Asr()
+		self.kitchen = MagicMock(deviceUid='kitchen', sessionId='kitchenSession')
+		self.office = MagicMock(deviceUid='office', sessionId='officeSession')
+
+
 	def test_capable_of_arbitrary_capture(self):
 		pass # Nothing to test
 
@@ -42,16 +60,68 @@ class TestAsr(unittest.TestCase):
 		pass # Nothing to test
 
 
+	def test_new_context(self):
+		kitchen = self.asr.newContext(self.kitchen)
+		office = self.asr.newContext(self.office)
+
+		self.assertIsNot(kitchen.recorder, office.recorder)
+		self.assertIsNot(kitchen.timeout, office.timeout)
+		self.assertTrue(kitchen.recorder.isRecording)
+		self.assertIs(self.asr.getContext('kitchen'), kitchen)
+		self.assertEqual(self.asr.activeSessions, 2)
+		self.superManager.ASRManager.addRecorder.assert_any_call('kitchen', kitchen.recorder)
+
+		# A new session on the same device replaces the previous context
+		newKitchen = self.asr.newContext(MagicMock(deviceUid='kitchen'))
+		self.assertFalse(kitchen.recorder.isRecording)
+		self.assertIs(self.asr.getContext('kitchen'), newKitchen)
+		self.superManager.ASRManager.removeRecorder.assert_called_once_with('kitchen', kitchen.recorder)
+
+
 	def test_decode_stream(self):
-		pass # Nothing to test
+		queued = self.asr.newContext(self.kitchen)
+		self.assertIs(self.asr.startDecoding(self.kitchen), queued)
+		self.superManager.ThreadManager.newTimer.assert_called_once_with(interval=10, func=self.asr.timeout, args=[queued])
+
+		office = self.asr.startDecoding(self.office)
+		self.assertIs(self.asr.getContext('office'), office)
+		self.assertIs(office.session, self.office)
 
 
 	def test_end(self):
-		pass # Nothing to test
+		kitchen = self.asr.newContext(self.kitchen)
+		office = self.asr.newContext(self.office)
+
+		# Only the session owning the context ends it
+		self.asr.end(MagicMock(deviceUid='kitchen'))
+		self.assertTrue(kitchen.recorder.isRecording)
+
+		self.asr.end(self.kitchen)
+		self.assertFalse(kitchen.recorder.isRecording)
+		self.assertIsNone(self.asr.getContext('kitchen'))
+		self.assertTrue(office.recorder.isRecording)
+		self.assertIs(self.asr.getContext('office'), office)
 
 
 	def test_timeout(self):
-		pass # Nothing to test
+		kitchen = self.asr.newContext(self.kitchen)
+		office = self.asr.newContext(self.office)
+
+		self.asr.timeout(kitchen)
+		self.assertTrue(kitchen.timeout.is_set())
+		self.assertFalse(kitchen.recorder.isRecording)
+		self.assertFalse(office.timeout.is_set())
+		self.assertTrue(office.recorder.isRecording)
+
+
+	def test_on_vad_up(self):
+		kitchen = self.asr.newContext(self.kitchen)
+		office = self.asr.newContext(self.office)
+
+		self.asr.onVadUp(deviceUid='office')
+		self.asr.onVadUp(deviceUid='garage')
+		self.assertTrue(office.triggerFlag.is_set())
+		self.assertFalse(kitchen.triggerFlag.is_set())
 
 
 	def test_check_language(self):
@@ -63,4 +133,10 @@ class TestAsr(unittest.TestCase):
 
 
 	def test_partial_text_captured(self):
-		pass # Nothing to test
+		self.asr.newContext(self.kitchen)
+		self.asr.newContext(self.office)
+
+		self.asr.partialTextCaptured(self.kitchen, 'turn on', 1, 0)
+		self.asr.partialTextCaptured(self.kitchen, 'turn on', 1, 0)
+		self.asr.partialTextCaptured(self.office, 'turn on', 1, 0)
+		self.assertEqual(self.superManager.MqttManager.publish.call_count, 2)
@@ -0,0 +1,112 @@
+#  Copyright (c) 2021
+#
+#  This file, test_RecognizerPool.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import unittest
+from unittest import mock
+from unittest.mock import MagicMock
+
+from core.asr.model.RecognizerPool import RecognizerPool
+
+
+class TestRecognizerPool(unittest.TestCase):
+
+	def setUp(self):
+		patcher = mock.patch('core.base.SuperManager.SuperManager')
+		superManager = patcher.start()
+		self.addCleanup(patcher.stop)
+
+		self.superManager = MagicMock()
+		superManager.getInstance.return_value = self.superManager
+
+		self.factory = MagicMock(side_effect=lambda: MagicMock())
+		self.reset = MagicMock()
+
+
+	def test_warm(self):
+		pool = RecognizerPool(factory=self.factory, size=3, reset=self.reset)
+		pool.warm()
+		pool.warm()
+		self.assertEqual(self.factory.call_count, 3)
+		self.assertDictEqual(pool.stats, {'created': 3, 'reused': 0, 'discarded': 0, 'free': 3, 'size': 3})
+
+
+	def test_acquire_release(self):
+		pool = RecognizerPool(factory=self.factory, size=1, reset=self.reset)
+		pool.warm()
+
+		first = pool.acquire()
+		# The pool is empty, a new one is built on demand
+		second = pool.acquire()
+		self.assertIsNot(first, second)
+		self.assertEqual(self.factory.call_count, 2)
+
+		pool.release(first)
+		pool.release(second)
+		self.reset.assert_any_call(first)
+		self.reset.assert_any_call(second)
+		self.assertIs(pool.acquire(), first)
+		self.assertDictEqual(pool.stats, {'created': 2, 'reused': 2, 'discarded': 1, 'free': 0, 'size': 1})
+		self.superManager.ThreadManager.doLater.assert_not_called()
+
+
+	def test_failing_reset(self):
+		self.reset.side_effect = RuntimeError('broken')
+		pool = RecognizerPool(factory=self.factory, size=1, reset=self.reset)
+		pool.logWarning = MagicMock()
+
+		pool.release(pool.acquire())
+		self.assertEqual(pool.stats['free'], 0)
+		self.assertEqual(pool.stats['discarded'], 1)
+		pool.logWarning.assert_called_once()
+
+
+	def test_not_reusable(self):
+		pool = RecognizerPool(factory=self.factory, size=2)
+		pool.warm()
+
+		recognizer = pool.acquire()
+		self.assertEqual(self.factory.call_count, 2)
+		self.superManager.ThreadManager.doLater.assert_called_once_with(interval=0, func=pool._backgroundWarm)
+
+		# Refilling happens in the background, off the session
+		pool._backgroundWarm()
+		self.assertEqual(pool.stats['free'], 2)
+
+		pool.release(recognizer)
+		self.assertEqual(pool.stats['free'], 2)
+		self.assertEqual(pool.stats['discarded'], 1)
+
+
+	def test_clear(self):
+		discard = MagicMock()
+		pool = RecognizerPool(factory=self.factory, size=2, discard=discard)
+		pool.warm()
+		pool.clear()
+		self.assertEqual(discard.call_count, 2)
+		self.assertEqual(pool.stats['free'], 0)
+
+
+	def test_disabled(self):
+		pool = RecognizerPool(factory=self.factory, size=0, reset=self.reset)
+		pool.warm()
+		self.factory.assert_not_called()
+
+		recognizer = pool.acquire()
+		pool.release(recognizer)
+		self.assertEqual(pool.stats['free'], 0)
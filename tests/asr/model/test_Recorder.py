@@ -17,10 +17,38 @@
 #
 #  Last modified: 2021.04.13 at 12:56:50 CEST
 
+import threading
 import unittest
+from unittest import mock
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from core.asr.model.Recorder import Recorder
+
 
 class TestRecorder(unittest.TestCase):
 
+	def setUp(self):
+		patcher = mock.patch('core.base.SuperManager.SuperManager')
+		superManager = patcher.start()
+		self.addCleanup(patcher.stop)
+
+		self.superManager = MagicMock()
+		self.superManager.ConfigManager.getAliceConfigByName.return_value = 10
+		self.superManager.MqttManager.audioFrameBus.pcm.side_effect = lambda payload, _deviceUid: payload
+		self.superManager.ASRManager.asr.isStreamAble = True
+		superManager.getInstance.return_value = self.superManager
+
+		self.timeout = threading.Event()
+		self.recorder = Recorder(self.timeout, 'user', 'kitchen')
+
+
+	@staticmethod
+	def frame(start: int, count: int = 256) -> memoryview:
+		return memoryview(np.arange(start, start + count, dtype=np.int16).tobytes())
+
+
 	def test_is_recording(self):
 		pass # Nothing to test
 
@@ -38,8 +66,53 @@ class TestRecorder(unittest.TestCase):
 
 
 	def test_on_audio_frame(self):
-		pass # Nothing to test
+		self.recorder.startRecording()
+		self.recorder.onAudioFrame(self.frame(0), 'kitchen')
+		self.recorder.onAudioFrame(self.frame(256), 'kitchen')
+		self.recorder.stopRecording()
+
+		chunks = list(self.recorder)
+		self.assertEqual(b''.join(chunks), np.arange(0, 512, dtype=np.int16).tobytes())
+		self.superManager.ASRManager.asr.recordFrame.assert_not_called()
+
+
+	def test_forward_frames(self):
+		# Checked when the recording starts, not per frame
+		self.superManager.ASRManager.asr.isStreamAble = False
+		self.recorder.startRecording()
+		self.superManager.ASRManager.asr.isStreamAble = True
+
+		self.recorder.onAudioFrame(self.frame(0), 'kitchen')
+		self.superManager.ASRManager.asr.recordFrame.assert_called_once_with(bytes(self.frame(0)))
+
+
+	def test_samples(self):
+		self.recorder.startRecording()
+		received = list()
+		reader = threading.Thread(target=lambda: received.extend(chunk.copy() for chunk in self.recorder.samples()))
+		reader.start()
+
+		for start in range(0, 1024, 256):
+			self.recorder.onAudioFrame(self.frame(start), 'kitchen')
+
+		self.recorder.stopRecording()
+		reader.join(2)
+		self.assertListEqual(np.concatenate(received).tolist(), list(range(1024)))
+
+
+	def test_timeout(self):
+		self.recorder.startRecording()
+		self.recorder.onAudioFrame(self.frame(0), 'kitchen')
+		self.timeout.set()
+		self.assertListEqual(list(self.recorder.samples()), list())
 
 
 	def test_audio_stream(self):
-		pass # Nothing to test
+		self.recorder.startRecording()
+		self.recorder.onAudioFrame(self.frame(0), 'kitchen')
+		self.recorder.onAudioFrame(self.frame(256), 'kitchen')
+		stream = self.recorder.audioStream()
+		self.assertEqual(next(stream), np.arange(0, 512, dtype=np.int16).tobytes())
+
+		self.recorder.stopRecording()
+		self.assertListEqual(list(stream), list())
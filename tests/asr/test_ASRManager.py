@@ -17,11 +17,38 @@
 #
 #  Last modified: 2021.04.13 at 12:56:50 CEST
 
+import threading
 import unittest
+from unittest import mock
+from unittest.mock import MagicMock
+
+from core.asr.ASRManager import ASRManager
+from core.asr.model.ASRResult import ASRResult
 
 
 class TestASRManager(unittest.TestCase):
 
+	def setUp(self):
+		patcher = mock.patch('core.base.SuperManager.SuperManager')
+		superManager = patcher.start()
+		self.addCleanup(patcher.stop)
+
+		self.superManager = MagicMock()
+		self.superManager.ConfigManager.getAliceConfigByName.side_effect = lambda name: {'asrMaxSessions': 1, 'asrTimeout': 2}.get(name, False)
+		self.superManager.LanguageManager.overrideLanguage = False
+		superManager.getInstance.return_value = self.superManager
+
+		self.asrManager = ASRManager()
+		self.asrManager._asr = MagicMock()
+		with mock.patch.object(ASRManager, '_startASREngine'):
+			self.asrManager.onStart()
+
+
+	@staticmethod
+	def session(deviceUid: str) -> MagicMock:
+		return MagicMock(deviceUid=deviceUid, sessionId=f'{deviceUid}Session', hasEnded=False, keptOpen=False)
+
+
 	def test_on_start(self):
 		pass # Nothing to test
 
@@ -59,7 +86,63 @@ class TestASRManager(unittest.TestCase):
 
 
 	def test_decode_stream(self):
-		pass # Nothing to test
+		release = threading.Event()
+		kitchen = self.session('kitchen')
+		office = self.session('office')
+
+
+		def decodeStream(session):
+			if session is kitchen:
+				release.wait(2)
+			return ASRResult(text=f'hello {session.deviceUid}', session=session, likelihood=1, processingTime=0.1)
+
+
+		self.asrManager._asr.decodeStream.side_effect = decodeStream
+		threads = [threading.Thread(target=self.asrManager.decodeStream, args=[session]) for session in (kitchen, office)]
+		threads[0].start()
+		for _ in range(200):
+			if self.asrManager.sessionStats['decoding']:
+				break
+			threading.Event().wait(0.01)
+
+		threads[1].start()
+		for _ in range(200):
+			if self.asrManager.sessionStats['queued']:
+				break
+			threading.Event().wait(0.01)
+
+		# Only one slot, the office session waits for the kitchen one
+		self.assertDictEqual(self.asrManager.sessionStats, {'decoding': 1, 'queued': 1, 'decoded': 0, 'dropped': 0, 'maxQueueTime': self.asrManager.sessionStats['maxQueueTime'], 'maxSessions': 1})
+		self.assertEqual(self.asrManager._asr.decodeStream.call_count, 1)
+
+		release.set()
+		for thread in threads:
+			thread.join(2)
+
+		stats = self.asrManager.sessionStats
+		self.assertEqual(stats['decoded'], 2)
+		self.assertEqual(stats['decoding'], 0)
+		self.assertGreater(stats['maxQueueTime'], 0)
+		texts = [call.kwargs['payload']['text'] for call in self.superManager.MqttManager.publish.call_args_list]
+		self.assertListEqual(texts, ['hello kitchen', 'hello office'])
+		self.asrManager._asr.end.assert_any_call(kitchen)
+		self.asrManager._asr.end.assert_any_call(office)
+
+
+	def test_decode_stream_ended_while_queued(self):
+		self.assertTrue(self.asrManager._sessionSlots.acquire(blocking=False))
+		session = self.session('kitchen')
+		thread = threading.Thread(target=self.asrManager.decodeStream, args=[session])
+		thread.start()
+		threading.Event().wait(0.2)
+		session.hasEnded = True
+		thread.join(2)
+
+		self.assertFalse(thread.is_alive())
+		self.asrManager._asr.decodeStream.assert_not_called()
+		self.asrManager._asr.end.assert_called_once_with(session)
+		self.superManager.MqttManager.endSession.assert_not_called()
+		self.assertEqual(self.asrManager.sessionStats['dropped'], 1)
 
 
 	def test_on_audio_frame(self):
@@ -0,0 +1,86 @@
+#  Copyright (c) 2021
+#
+#  This file, test_IntentRouter.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+from unittest import TestCase
+
+from paho.mqtt import client as MQTTClient
+
+from core.base.model.IntentRouter import IntentRouter
+
+
+class TestIntentRouter(TestCase):
+
+	SUBSCRIPTIONS = [
+		'hermes/intent/Weather',
+		'hermes/intent/#',
+		'hermes/intent/+',
+		'projectalice/devices/+/status',
+		'projectalice/devices/#',
+		'#',
+		'+/intent/Weather'
+	]
+
+	TOPICS = [
+		'hermes/intent/Weather',
+		'hermes/intent/Time',
+		'hermes/intent',
+		'hermes',
+		'projectalice/devices/abc/status',
+		'projectalice/devices',
+		'projectalice/devices/abc/status/extra',
+		'$SYS/broker/load',
+		'other/intent/Weather'
+	]
+
+
+	def test_match_follows_mqtt_rules(self):
+		for subscription in self.SUBSCRIPTIONS:
+			router = IntentRouter()
+			router.addSkill(skillName='skill', intents={subscription: subscription})
+
+			for topic in self.TOPICS:
+				expected = [('skill', subscription)] if MQTTClient.topic_matches_sub(subscription, topic) else list()
+				self.assertListEqual(router.match(topic), expected, f'{subscription} -> {topic}')
+
+
+	def test_match_most_specific(self):
+		router = IntentRouter()
+		router.addSkill(skillName='skill', intents={
+			'hermes/intent/#'      : 'wildcard',
+			'hermes/intent/Weather': 'exact',
+			'hermes/intent/+'      : 'single'
+		})
+
+		self.assertListEqual(router.match('hermes/intent/Weather'), [('skill', 'exact')])
+		self.assertListEqual(router.match('hermes/intent/Time'), [('skill', 'wildcard')])
+
+
+	def test_match_skill_order(self):
+		router = IntentRouter()
+		router.addSkill(skillName='first', intents={'hermes/intent/#': 'first'})
+		router.addSkill(skillName='catchAll', intents=dict(), catchAll=True)
+		router.addSkill(skillName='unrelated', intents={'hermes/intent/Time': 'unrelated'})
+		router.addSkill(skillName='last', intents={'hermes/intent/Weather': 'last'})
+
+		self.assertListEqual(
+			router.match('hermes/intent/Weather'),
+			[('first', 'first'), ('catchAll', None), ('last', 'last')]
+		)
+		self.assertEqual(router.skillCount, 4)
+		self.assertEqual(router.intentCount, 3)
@@ -0,0 +1,81 @@
+#  Copyright (c) 2021
+#
+#  This file, test_LazyAliceSkill.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+
+from core.base.model.LazyAliceSkill import LazyAliceSkill
+
+
+class TestLazyAliceSkill(TestCase):
+
+	def setUp(self):
+		patcher = mock.patch('core.base.SuperManager.SuperManager')
+		superManager = patcher.start()
+		self.addCleanup(patcher.stop)
+		self.superManager = MagicMock()
+		self.superManager.LanguageManager.activeLanguage = 'en'
+		superManager.getInstance.return_value = self.superManager
+
+		directory = tempfile.TemporaryDirectory()
+		self.addCleanup(directory.cleanup)
+		self.skillPath = Path(directory.name) / 'Jokes'
+		(self.skillPath / 'dialogTemplate').mkdir(parents=True)
+		(self.skillPath / 'dialogTemplate/en.json').write_text(json.dumps({
+			'skill'  : 'Jokes',
+			'intents': [
+				{'name': 'TellJoke', 'utterances': ['tell me a joke']},
+				{'name': 'TellAnotherJoke', 'utterances': ['another one']}
+			]
+		}))
+		self.installer = {'name': 'Jokes', 'author': 'ProjectAlice', 'version': '1.0.0'}
+
+
+	def test_declared_intents(self):
+		skill = LazyAliceSkill(installer=self.installer, skillPath=self.skillPath)
+		self.assertListEqual(list(skill.supportedIntents), ['hermes/intent/TellJoke', 'hermes/intent/TellAnotherJoke'])
+		self.assertTrue(skill.active)
+		self.assertIsNone(skill.databaseSchema)
+		self.assertListEqual(skill.widgets, list())
+
+		# No dialog template for the active language
+		self.superManager.LanguageManager.activeLanguage = 'fr'
+		self.assertDictEqual(LazyAliceSkill(installer=self.installer, skillPath=self.skillPath).supportedIntents, dict())
+
+
+	def test_on_start(self):
+		skill = LazyAliceSkill(installer=self.installer, skillPath=self.skillPath)
+		skill.onStart()
+		self.superManager.SkillManager.configureSkillIntents.assert_called_once_with('Jokes', True)
+
+		skill.subscribeIntents()
+		self.superManager.MqttManager.subscribeSkillIntents.assert_called_once_with(skill.supportedIntents)
+
+		skill.onStop()
+		self.superManager.SkillManager.configureSkillIntents.assert_called_with('Jokes', False)
+		self.assertFalse(skill.active)
+
+
+	def test_can_be_lazy(self):
+		self.assertTrue(LazyAliceSkill.canBeLazy(self.skillPath))
+		(self.skillPath / 'widgets').mkdir()
+		self.assertFalse(LazyAliceSkill.canBeLazy(self.skillPath))
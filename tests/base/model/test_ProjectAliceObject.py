@@ -19,6 +19,8 @@
 
 from unittest import TestCase
 
+from core.base.model.ProjectAliceObject import ProjectAliceObject
+
 
 class TestProjectAliceObject(TestCase):
 
@@ -26,6 +28,23 @@ class TestProjectAliceObject(TestCase):
 		pass  # To be implemented or nothing to test
 
 
+	def test_handles_event(self):
+		class Parent(ProjectAliceObject):
+			def onSay(self, session):
+				pass
+
+		class Child(Parent):
+			def onCustomEvent(self):
+				pass
+
+		self.assertFalse(ProjectAliceObject.handlesEvent('onSay'))
+		self.assertTrue(Parent.handlesEvent('onSay'))
+		self.assertTrue(Child().handlesEvent('onSay'))
+		self.assertTrue(Child.handlesEvent('onCustomEvent'))
+		self.assertFalse(Child.handlesEvent('onAudioFrame'))
+		self.assertFalse(Child.handlesEvent('onUnknownEvent'))
+
+
 	def test_check_dependencies(self):
 		pass  # To be implemented or nothing to test
 
@@ -17,11 +17,19 @@
 #
 #  Last modified: 2021.04.13 at 12:56:50 CEST
 
+import os
 from unittest import TestCase
 
+from benchmarks import importTime
+from core.base.SuperManager import SuperManager
+from core.base.model.ProjectAliceObject import ProjectAliceObject
+
 
 class TestSuperManager(TestCase):
 
+	def tearDown(self):
+		SuperManager._INSTANCE = None
+
 	def test_on_start(self):
 		pass  # To be implemented or nothing to test()
 
@@ -38,6 +46,15 @@ class TestSuperManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
+	def test_manager_imports(self):
+		# Import time audit, the budget can be raised on slow machines
+		budget = float(os.environ.get('ALICE_IMPORT_BUDGET_MS', 4000))
+		imports = importTime.measure()
+		self.assertIn('core.asr.ASRManager', {module.name for module in imports})
+		self.assertListEqual(importTime.deferredImported(imports), list())
+		self.assertLessEqual(importTime.totalTime(imports), budget)
+
+
 	def test_on_stop(self):
 		pass  # To be implemented or nothing to test()
 
@@ -52,3 +69,23 @@ class TestSuperManager(TestCase):
 
 	def test_managers(self):
 		pass  # To be implemented or nothing to test()
+
+
+	def test_get_event_subscribers(self):
+		class Listening(ProjectAliceObject):
+			def onSay(self, session):
+				pass
+
+		listening = Listening()
+		superManager = SuperManager(None)
+		superManager._managers = {'ListeningManager': listening, 'DeafManager': ProjectAliceObject(), 'DeadManager': None}
+
+		self.assertListEqual(superManager.getEventSubscribers('onSay'), [listening])
+		self.assertListEqual(superManager.getEventSubscribers('onAudioFrame'), list())
+		self.assertNotIn('DeadManager', superManager.managers)
+
+		# Not cached until managers are started
+		self.assertDictEqual(superManager._eventSubscribers, dict())
+		superManager.invalidateEventSubscribers(cache=True)
+		superManager.getEventSubscribers('onSay')
+		self.assertIn('onSay', superManager._eventSubscribers)
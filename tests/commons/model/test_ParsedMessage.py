@@ -0,0 +1,102 @@
+#  Copyright (c) 2021
+#
+#  This file, test_ParsedMessage.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import json
+from unittest import TestCase, mock
+
+from paho.mqtt.client import MQTTMessage
+
+from core.commons.CommonsManager import CommonsManager
+from core.commons.model.ParsedMessage import ParsedMessage
+
+
+class TestParsedMessage(TestCase):
+
+	PAYLOAD = {
+		'sessionId' : 'session',
+		'siteId'    : 'kitchen',
+		'input'     : 'turn on the lights in the kitchen',
+		'customData': json.dumps({'userId': 'john'}),
+		'intent'    : {'intentName': 'LightsOn', 'confidenceScore': 0.93},
+		'slots'     : [{
+			'slotName'       : 'Location',
+			'entity'         : 'Location',
+			'rawValue'       : 'kitchen',
+			'value'          : {'kind': 'Custom', 'value': 'kitchen'},
+			'range'          : {'start': 26, 'end': 33},
+			'confidenceScore': 0.9
+		}]
+	}
+
+
+	@staticmethod
+	def message(payload) -> MQTTMessage:
+		message = MQTTMessage(mid=3, topic=b'hermes/intent/LightsOn')
+		message.payload = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+		message.qos = 1
+		return message
+
+
+	def test_parse(self):
+		original = self.message(self.PAYLOAD)
+		message = ParsedMessage.parse(original)
+
+		self.assertIsInstance(message, MQTTMessage)
+		self.assertIs(ParsedMessage.parse(message), message)
+		self.assertEqual(message.topic, 'hermes/intent/LightsOn')
+		self.assertEqual(message.payload, original.payload)
+		self.assertEqual(message.mid, 3)
+		self.assertEqual(message.qos, 1)
+
+
+	def test_parsed_values(self):
+		message = ParsedMessage.parse(self.message(self.PAYLOAD))
+
+		self.assertEqual(message.sessionId, 'session')
+		self.assertEqual(message.deviceUid, 'kitchen')
+		self.assertDictEqual(message.slots, {'Location': 'kitchen'})
+		self.assertEqual(message.slotsAsObjects['Location'][0].value['value'], 'kitchen')
+		self.assertDictEqual(message.customData, {'userId': 'john'})
+
+
+	def test_decoded_once(self):
+		message = ParsedMessage.parse(self.message(self.PAYLOAD))
+
+		with mock.patch('core.commons.model.ParsedMessage.json.loads', wraps=json.loads) as loads:
+			# Copies, callers can modify them without changing the message
+			self.assertIsNot(CommonsManager.payload(message), CommonsManager.payload(message))
+			self.assertEqual(CommonsManager.payload(message), message.parsedPayload)
+			CommonsManager.parseSessionId(message)
+			CommonsManager.parseSlots(message)
+			CommonsManager.parseSlotsToObjects(message)
+			self.assertIsNot(CommonsManager.parseCustomData(message), message.customData)
+			CommonsManager.parseDeviceUid(message)
+			self.assertEqual(loads.call_count, 2)
+
+
+	def test_non_json_payload(self):
+		message = ParsedMessage.parse(self.message(b'\x81'))
+		self.assertDictEqual(message.parsedPayload, {'LightsOn': b'\x81'})
+		self.assertFalse(message.sessionId)
+		self.assertDictEqual(message.slots, dict())
+		self.assertDictEqual(message.customData, dict())
+
+		message = ParsedMessage.parse(self.message(b''))
+		self.assertIsNone(message.parsedPayload)
+		self.assertDictEqual(message.slotsAsObjects, dict())
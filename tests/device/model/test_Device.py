@@ -17,11 +17,106 @@
 #
 #  Last modified: 2021.04.13 at 12:56:50 CEST
 
-from unittest import TestCase
+import time
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+
+from core.commons import constants
+from core.device.model.Device import Device
 
 
 class TestDevice(TestCase):
 
+	def setUp(self):
+		patcher = mock.patch('core.base.SuperManager.SuperManager')
+		superManager = patcher.start()
+		self.addCleanup(patcher.stop)
+		self.superManager = MagicMock()
+		superManager.getInstance.return_value = self.superManager
+
+		deviceType = self.superManager.DeviceManager.getDeviceType.return_value
+		deviceType.heartbeatRate = 5
+		deviceType.deviceConfigsTemplates = dict()
+		deviceType.allowHeartbeatOverride = False
+
+		self.device = Device({'id': 3, 'uid': 'lamp', 'typeName': 'Lamp', 'skillName': 'Lights', 'deviceConfigs': '{"displayName": "Lamp", "heartbeatRate": 5}'})
+
+
+	def test_update_params(self):
+		writer = self.superManager.DeviceManager.deviceWriter
+		self.device.updateParam('on', True)
+		self.device.updateParams({'brightness': 50})
+		self.device.updateConfig('displayName', 'Desk lamp')
+		self.device.updateSettings({'x': 10})
+
+		# Nothing written right away, the device is flagged for the next batch
+		self.superManager.DatabaseManager.replace.assert_not_called()
+		writer.markDirty.assert_called_with(3, self.device)
+		self.assertEqual(writer.markDirty.call_count, 4)
+
+		row = self.device.toDBRow()
+		self.assertEqual(row['id'], 3)
+		self.assertIn('"brightness": 50', row['deviceParams'])
+		self.assertIn('Desk lamp', row['deviceConfigs'])
+
+
+	def test_delta_publish(self):
+		publish = self.superManager.MqttManager.publish
+		threadManager = self.superManager.ThreadManager
+
+		self.device.publishDevice()
+		publish.assert_called_once()
+		self.assertEqual(publish.call_args[0][0], constants.TOPIC_DEVICE_UPDATED)
+		self.assertNotIn('delta', publish.call_args[1]['payload'])
+
+		# Changes right after a publication are grouped and sent later
+		self.device.updateParam('on', True)
+		self.device.updateParam('brightness', 50)
+		self.assertEqual(publish.call_count, 1)
+		threadManager.newTimer.assert_called_once()
+		publishLater = threadManager.newTimer.call_args[1]
+		self.assertLessEqual(publishLater['interval'], Device.PUBLISH_INTERVAL)
+
+		publishLater['func'](**publishLater['kwargs'])
+		payload = publish.call_args[1]['payload']
+		self.assertTrue(payload['delta'])
+		self.assertDictEqual(payload['device'], {'id': 3, 'uid': 'lamp', 'deviceParams': {'on': True, 'brightness': 50}})
+
+		# Nothing changed, nothing published
+		self.device._lastPublish = time.monotonic() - Device.PUBLISH_INTERVAL
+		self.device.updateParam('on', True)
+		self.assertEqual(publish.call_count, 2)
+
+		# Once the interval is over, deltas are sent right away
+		self.device._lastPublish = time.monotonic() - Device.PUBLISH_INTERVAL
+		self.device.updateSettings({'x': 10})
+		self.assertEqual(publish.call_count, 3)
+		self.assertListEqual(sorted(publish.call_args[1]['payload']['device']), ['id', 'settings', 'uid'])
+
+
+	def test_no_publish_after_stop(self):
+		publish = self.superManager.MqttManager.publish
+		threadManager = self.superManager.ThreadManager
+		writer = self.superManager.DeviceManager.deviceWriter
+
+		# Edited, then deleted before the grouped delta went out
+		self.device.publishDevice()
+		self.device.updateParams({'brightness': 50})
+		publishLater = threadManager.newTimer.call_args[1]
+		self.device.onStop()
+		threadManager.newTimer.return_value.cancel.assert_called_once()
+
+		publishLater['func'](**publishLater['kwargs'])
+		self.device.updateParam('on', True)
+		self.device.publishDevice()
+		self.assertEqual(publish.call_count, 1)
+		self.assertEqual(writer.markDirty.call_count, 1)
+
+		self.device.onStart()
+		self.device.publishDevice()
+		self.assertEqual(publish.call_count, 2)
+
+
 	def test_replace(self):
 		pass  # To be implemented or nothing to test()
 
@@ -17,11 +17,69 @@
 #
 #  Last modified: 2021.04.13 at 12:56:51 CEST
 
-from unittest import TestCase
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+
+from core.device.DeviceManager import DeviceManager
+from core.device.model.DeviceAbility import DeviceAbility
+
+
+class FakeDevice(object):
+
+	def __init__(self, deviceId: int, uid: str, parentLocation: int, skillName: str, deviceType, abilities: int, connected: bool = False):
+		self.id = deviceId
+		self.uid = uid
+		self.parentLocation = parentLocation
+		self.skillName = skillName
+		self.deviceType = deviceType
+		self.abilities = abilities
+		self.connected = connected
+		self.displayName = uid
+
+
+	def getAbilities(self) -> int:
+		return self.abilities
+
+
+	def hasAbilities(self, abilities) -> bool:
+		check = 0
+		for ability in abilities:
+			check |= ability
+		return self.abilities & check == check
+
+
+	def onStop(self):
+		pass
 
 
 class TestDeviceManager(TestCase):
 
+	def setUp(self):
+		self._superManagerPatch = mock.patch('core.base.SuperManager.SuperManager')
+		superManager = self._superManagerPatch.start()
+		instance = MagicMock()
+		superManager.getInstance.return_value = instance
+		instance.ConfigManager.getAliceConfigByName.return_value = 0
+		instance.CommonsManager.getFunctionCaller.return_value = 'DeviceManager'
+
+		with mock.patch('socket.socket'):
+			self.deviceManager = DeviceManager()
+		self.deviceManager.loadingDone = True
+
+		self.speaker = MagicMock()
+		self.light = MagicMock()
+		self.core = FakeDevice(1, 'core', 1, 'AliceCore', MagicMock(), DeviceAbility.IS_CORE | DeviceAbility.PLAY_SOUND | DeviceAbility.CAPTURE_SOUND, connected=True)
+		self.satellite = FakeDevice(2, 'satellite', 2, 'AliceSatellite', MagicMock(), DeviceAbility.IS_SATELITTE | DeviceAbility.PLAY_SOUND | DeviceAbility.CAPTURE_SOUND)
+		self.lamp1 = FakeDevice(3, 'lamp1', 2, 'Lights', self.light, DeviceAbility.NONE, connected=True)
+		self.lamp2 = FakeDevice(4, 'lamp2', 3, 'Lights', self.light, DeviceAbility.NONE)
+		for device in (self.core, self.satellite, self.lamp1, self.lamp2):
+			self.deviceManager._addDevice(device)
+
+
+	def tearDown(self):
+		self._superManagerPatch.stop()
+
+
 	def test_on_start(self):
 		pass  # To be implemented or nothing to test()
 
@@ -75,7 +133,14 @@ class TestDeviceManager(TestCase):
 
 
 	def test_delete_device_id(self):
-		pass  # To be implemented or nothing to test()
+		self.deviceManager.deleteDevice(deviceId=3)
+		self.assertIsNone(self.deviceManager.getDevice(uid='lamp1'))
+		self.assertListEqual(self.deviceManager.getDevicesByLocation(2, connectedOnly=False), [self.satellite])
+		self.assertListEqual(self.deviceManager.getDevicesByType(self.light, connectedOnly=False), [self.lamp2])
+
+		with self.assertRaises(Exception):
+			self.deviceManager.deleteDevice(deviceId=1)
+		self.assertIs(self.deviceManager.getMainDevice(), self.core)
 
 
 	def test_get_device_type(self):
@@ -131,7 +196,18 @@ class TestDeviceManager(TestCase):
 
 
 	def test_device_connecting(self):
-		pass  # To be implemented or nothing to test()
+		self.assertIs(self.deviceManager.getDevice(uid='satellite'), self.satellite)
+		self.assertListEqual(self.deviceManager.getDevicesWithAbilities([DeviceAbility.IS_SATELITTE]), list())
+
+		# The fake device does not notify its manager, a real one does on connection change
+		self.satellite.connected = True
+		self.deviceManager.reindexDevice(self.satellite)
+		self.assertListEqual(self.deviceManager.getDevicesWithAbilities([DeviceAbility.IS_SATELITTE]), [self.satellite])
+
+		self.satellite.uid = 'paired'
+		self.deviceManager.reindexDevice(self.satellite)
+		self.assertIsNone(self.deviceManager.getDevice(uid='satellite'))
+		self.assertIs(self.deviceManager.getDevice(uid='paired'), self.satellite)
 
 
 	def test_device_disconnecting(self):
@@ -163,19 +239,42 @@ class TestDeviceManager(TestCase):
 
 
 	def test_get_devices_for_skill(self):
-		pass  # To be implemented or nothing to test()
+		self.assertListEqual(self.deviceManager.getDevicesBySkill('Lights', connectedOnly=False), [self.lamp1, self.lamp2])
+		self.assertListEqual(self.deviceManager.getDevicesWithAbilities([DeviceAbility.PLAY_SOUND, DeviceAbility.CAPTURE_SOUND], connectedOnly=False), [self.core, self.satellite])
+		self.assertListEqual(self.deviceManager.getDevicesWithAbilities([DeviceAbility.PLAY_SOUND | DeviceAbility.IS_SATELITTE], connectedOnly=False), [self.satellite])
+
+		self.deviceManager.onSkillDeactivated('Lights')
+		self.assertListEqual(self.deviceManager.getDevicesBySkill('Lights', connectedOnly=False), list())
+		self.assertIsNone(self.deviceManager.getDevice(uid='lamp1'))
+		self.assertNotIn(3, self.deviceManager.devices)
 
 
 	def test_get_main_device(self):
-		pass  # To be implemented or nothing to test()
+		self.assertIs(self.deviceManager.getMainDevice(), self.core)
+
+		self.deviceManager._removeDevice(self.core)
+		self.assertIsNone(self.deviceManager.getMainDevice())
+
+		self.satellite.abilities |= DeviceAbility.IS_CORE
+		self.deviceManager.reindexDevice(self.satellite)
+		self.assertIs(self.deviceManager.getMainDevice(), self.satellite)
 
 
 	def test_get_devices_by_location(self):
-		pass  # To be implemented or nothing to test()
+		self.assertListEqual(self.deviceManager.getDevicesByLocation(2), [self.lamp1])
+		self.assertListEqual(self.deviceManager.getDevicesByLocation(2, connectedOnly=False), [self.satellite, self.lamp1])
+		self.assertListEqual(self.deviceManager.getDevicesByLocation(2, abilities=[DeviceAbility.PLAY_SOUND], connectedOnly=False), [self.satellite])
+
+		self.lamp2.parentLocation = 2
+		self.deviceManager.reindexDevice(self.lamp2)
+		self.assertListEqual(self.deviceManager.getDevicesByLocation(3, connectedOnly=False), list())
+		self.assertListEqual(self.deviceManager.getDevicesByLocation(2, deviceType=self.light, connectedOnly=False), [self.lamp1, self.lamp2])
 
 
 	def test_get_devices_by_type(self):
-		pass  # To be implemented or nothing to test()
+		self.assertListEqual(self.deviceManager.getDevicesByType(self.light), [self.lamp1])
+		self.assertListEqual(self.deviceManager.getDevicesByType(self.light, connectedOnly=False), [self.lamp1, self.lamp2])
+		self.assertListEqual(self.deviceManager.getDevicesByType(self.speaker), list())
 
 
 	def test_get_devices_by_type_id(self):
@@ -17,17 +17,63 @@
 #
 #  Last modified: 2021.04.13 at 12:56:51 CEST
 
-from unittest import TestCase
+import json
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+
+from paho.mqtt.client import MQTTMessage
+
+from core.commons.CommonsManager import CommonsManager
+from core.commons.model.ParsedMessage import ParsedMessage
+from core.dialog.model.DialogSession import DialogSession
 
 
 class TestDialogSession(TestCase):
 
+	def setUp(self):
+		patcher = mock.patch('core.dialog.model.DialogSession.SuperManager')
+		superManager = patcher.start()
+		self.addCleanup(patcher.stop)
+		self.superManager = MagicMock()
+		self.superManager.CommonsManager = CommonsManager
+		self.superManager.DeviceManager = None
+		superManager.getInstance.return_value = self.superManager
+
+
+	@staticmethod
+	def message(slotName: str, value: str) -> ParsedMessage:
+		message = MQTTMessage(mid=1, topic=f'hermes/intent/{slotName}'.encode())
+		message.payload = json.dumps({
+			'sessionId': 'session',
+			'input'    : value,
+			'intent'   : {'intentName': slotName, 'confidenceScore': 1},
+			'slots'    : [{'slotName': slotName, 'entity': slotName, 'rawValue': value, 'value': {'kind': 'Custom', 'value': value}, 'range': {'start': 0, 'end': 1}}]
+		}).encode()
+		return ParsedMessage.parse(message)
+
+
 	def test_extend(self):
 		pass  # To be implemented or nothing to test()
 
 
 	def test_update(self):
-		pass  # To be implemented or nothing to test()
+		first = self.message('a', '1')
+		second = self.message('b', '2')
+
+		session = DialogSession(deviceUid='kitchen')
+		session.extend(first)
+		session.update(second)
+		session.payload['text'] = 'changed'
+
+		self.assertDictEqual(session.slots, {'a': '1', 'b': '2'})
+		self.assertListEqual(sorted(session.slotsAsObjects), ['a', 'b'])
+
+		# The parsed messages are left untouched
+		self.assertDictEqual(first.slots, {'a': '1'})
+		self.assertListEqual(list(first.slotsAsObjects), ['a'])
+		self.assertDictEqual(second.slots, {'b': '2'})
+		self.assertNotIn('text', second.parsedPayload)
+		self.assertNotIn('text', CommonsManager.payload(second))
 
 
 	def test_slot_value(self):
@@ -17,11 +17,41 @@
 #
 #  Last modified: 2021.04.13 at 12:56:51 CEST
 
-from unittest import TestCase
+import tempfile
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+
+from core.dialog.DialogTemplateManager import DialogTemplateManager
+from core.dialog.model.DialogTemplate import DialogTemplate
 
 
 class TestDialogTemplateManager(TestCase):
 
+	def setUp(self):
+		patcher = mock.patch('core.base.SuperManager.SuperManager')
+		superManager = patcher.start()
+		self.addCleanup(patcher.stop)
+
+		rootDir = tempfile.TemporaryDirectory()
+		self.addCleanup(rootDir.cleanup)
+
+		self.superManager = MagicMock()
+		self.superManager.CommonsManager.rootDir.return_value = rootDir.name
+		superManager.getInstance.return_value = self.superManager
+
+		self.manager = DialogTemplateManager()
+		self.manager.initHolders()
+
+
+	def addTemplate(self, **data):
+		dialogTemplate = DialogTemplate(**data)
+		for slot in dialogTemplate.allSlots:
+			self.manager._slotTypes.setdefault(slot.name, list()).append(dialogTemplate)
+
+		for intent in dialogTemplate.allIntents:
+			self.manager._intentsToSkills[intent.name] = dialogTemplate
+
+
 	def test_path_to_data(self):
 		pass  # To be implemented or nothing to test()
 
@@ -76,3 +106,32 @@ class TestDialogTemplateManager(TestCase):
 
 	def test_skill_resource(self):
 		pass  # To be implemented or nothing to test()
+
+
+	def test_command_phrases(self):
+		self.addTemplate(
+			skill='Lights',
+			slotTypes=[
+				{'name': 'Room', 'automaticallyExtensible': False, 'useSynonyms': True, 'values': [{'value': 'kitchen', 'synonyms': ['cooking room']}, {'value': 'office'}]},
+				{'name': 'Anything', 'automaticallyExtensible': True, 'useSynonyms': False, 'values': [{'value': 'something'}]}
+			],
+			intents=[
+				{'name': 'LightsOn', 'enabledByDefault': True, 'utterances': ['Turn on the lights in the {kitchen:=>Location}!', 'lights on'], 'slots': [{'name': 'Location', 'type': 'Room'}]},
+				{'name': 'Repeat', 'enabledByDefault': True, 'utterances': ['repeat {something:=>Text}'], 'slots': [{'name': 'Text', 'type': 'Anything'}]},
+				{'name': 'Dim', 'enabledByDefault': True, 'utterances': ['dim to {5:=>Percent}'], 'slots': [{'name': 'Percent', 'type': 'snips/percentage'}]}
+			]
+		)
+
+		self.assertListEqual(self.manager.commandPhrases(intents=['hermes/intent/LightsOn'], maxPhrases=10), [
+			'lights on',
+			'turn on the lights in the cooking room',
+			'turn on the lights in the kitchen',
+			'turn on the lights in the office'
+		])
+		# Too many sentences
+		self.assertIsNone(self.manager.commandPhrases(intents=['LightsOn'], maxPhrases=3))
+		# Free text and builtin slots can't be listed
+		self.assertIsNone(self.manager.commandPhrases(intents=['LightsOn', 'Repeat'], maxPhrases=10))
+		self.assertIsNone(self.manager.commandPhrases(intents=['Dim'], maxPhrases=10))
+		# Unknown intent
+		self.assertIsNone(self.manager.commandPhrases(intents=['Unknown'], maxPhrases=10))
@@ -0,0 +1,94 @@
+#  Copyright (c) 2021
+#
+#  This file, test_AudioFrameBus.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from core.commons import constants
+from core.server.model.AudioFrameBus import AudioFrameBus
+from core.server.model.AudioFrameFormat import AudioFrameFormat
+
+
+class TestAudioFrameBus(TestCase):
+
+	def test_device_uid_from_topic(self):
+		bus = AudioFrameBus()
+		self.assertEqual(bus.deviceUidFromTopic(constants.TOPIC_AUDIO_FRAME.format('abc-123')), 'abc-123')
+
+
+	def test_dispatch_routes_by_device(self):
+		bus = AudioFrameBus()
+		everyDevice = MagicMock()
+		oneDevice = MagicMock()
+		bus.subscribe(name='every', callback=everyDevice)
+		bus.subscribe(name='one', callback=oneDevice, deviceUid='abc')
+
+		payload = b'\x00\x01\x02\x03'
+		bus.dispatch(deviceUid='abc', payload=payload)
+		bus.dispatch(deviceUid='def', payload=payload)
+
+		self.assertEqual(everyDevice.call_count, 2)
+		oneDevice.assert_called_once()
+		frame, deviceUid = oneDevice.call_args[0]
+		self.assertIsInstance(frame, memoryview)
+		self.assertIs(frame.obj, payload)
+		self.assertEqual(deviceUid, 'abc')
+
+		bus.unsubscribe(name='one', deviceUid='abc')
+		bus.dispatch(deviceUid='abc', payload=payload)
+		oneDevice.assert_called_once()
+		self.assertEqual(everyDevice.call_count, 3)
+		self.assertFalse(bus.isSubscribed(name='one', deviceUid='abc'))
+
+
+	def test_stats(self):
+		bus = AudioFrameBus()
+		bus.logError = MagicMock()
+		bus.subscribe(name='failing', callback=MagicMock(side_effect=ValueError))
+		bus.subscribe(name='working', callback=MagicMock())
+
+		for _ in range(3):
+			bus.dispatch(deviceUid='abc', payload=b'\x00')
+
+		stats = {stat['name']: stat for stat in bus.stats()}
+		self.assertEqual(stats['failing']['calls'], 3)
+		self.assertEqual(stats['failing']['errors'], 3)
+		self.assertEqual(stats['working']['errors'], 0)
+		self.assertGreaterEqual(stats['working']['maxTime'], stats['working']['averageTime'])
+		self.assertEqual(bus.logError.call_count, 3)
+
+
+	def test_dropped_frames(self):
+		bus = AudioFrameBus()
+		bus.logWarning = MagicMock()
+		frameFormat = AudioFrameFormat(format=AudioFrameFormat.PCM, aggregation=3)
+		bus.setFrameFormat(deviceUid='abc', frameFormat=frameFormat)
+
+		for sequence in [0, 1, 4, 5, 0, 1, 3, 5, 7]:
+			bus.dispatch(deviceUid='abc', payload=bytes(frameFormat.buildFrame(bytes(64), sequence=sequence)))
+
+		self.assertEqual(bus.droppedFrames('abc'), 5)
+		self.assertEqual(bus.droppedFrames('def'), 0)
+		# Every gap is counted, but warned about once per interval
+		bus.logWarning.assert_called_once()
+
+		bus._lossWarnings['abc'] = (bus._lossWarnings['abc'][0] - AudioFrameBus.LOSS_WARNING_INTERVAL - 1, 2)
+		bus.dispatch(deviceUid='abc', payload=bytes(frameFormat.buildFrame(bytes(64), sequence=9)))
+		self.assertEqual(bus.logWarning.call_count, 2)
+		self.assertIn('Lost 4 audio frame(s)', bus.logWarning.call_args[0][0])
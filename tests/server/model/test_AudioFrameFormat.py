@@ -0,0 +1,83 @@
+#  Copyright (c) 2021
+#
+#  This file, test_AudioFrameFormat.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import io
+import wave
+from unittest import TestCase
+
+from core.server.model.AudioFrameBus import AudioFrameBus
+from core.server.model.AudioFrameFormat import AudioFrameFormat
+
+
+class TestAudioFrameFormat(TestCase):
+
+	PCM = bytes(range(256)) * 2 + bytes(128)
+
+
+	def wavFrame(self, frameFormat: AudioFrameFormat) -> bytes:
+		with io.BytesIO() as buffer:
+			with wave.open(buffer, 'wb') as wav:
+				wav.setnchannels(frameFormat.channels)
+				wav.setsampwidth(frameFormat.sampleWidth)
+				wav.setframerate(frameFormat.sampleRate)
+				wav.writeframes(self.PCM)
+			return buffer.getvalue()
+
+
+	def test_wav_header(self):
+		frameFormat = AudioFrameFormat(sampleRate=22050, channels=2)
+		self.assertEqual(frameFormat.wavHeader(len(self.PCM)) + self.PCM, self.wavFrame(frameFormat))
+
+
+	def test_pcm(self):
+		wavFormat = AudioFrameFormat()
+		data = wavFormat.pcm(memoryview(self.wavFrame(wavFormat)))
+		self.assertIsInstance(data, memoryview)
+		self.assertEqual(data, self.PCM)
+
+		rawFormat = AudioFrameFormat(format=AudioFrameFormat.PCM)
+		payload = memoryview(self.PCM)
+		self.assertIs(rawFormat.pcm(payload), payload)
+
+		with self.assertRaises(ValueError):
+			wavFormat.pcm(payload)
+
+
+	def test_from_dict(self):
+		frameFormat = AudioFrameFormat(format=AudioFrameFormat.PCM, sampleRate=48000, channels=2)
+		self.assertEqual(AudioFrameFormat.fromDict(frameFormat.toDict()), frameFormat)
+		self.assertEqual(AudioFrameFormat.fromDict(dict()), AudioFrameFormat())
+
+
+	def test_bus_negotiated_format(self):
+		bus = AudioFrameBus()
+		bus.setFrameFormat(deviceUid='raw', frameFormat=AudioFrameFormat(format=AudioFrameFormat.PCM))
+
+		self.assertEqual(bus.pcm(memoryview(self.PCM), 'raw'), self.PCM)
+		self.assertEqual(bus.pcm(memoryview(self.wavFrame(AudioFrameFormat())), 'wav'), self.PCM)
+		self.assertFalse(bus.frameFormat('wav').isRaw)
+
+
+	def test_aggregated_frames(self):
+		for frameFormat in [AudioFrameFormat(aggregation=3), AudioFrameFormat(format=AudioFrameFormat.PCM, aggregation=3)]:
+			frame = memoryview(frameFormat.buildFrame(self.PCM, sequence=42, timestamp=1234.5))
+			self.assertTupleEqual(frameFormat.sequence(frame), (42, 1234.5))
+			self.assertEqual(frameFormat.pcm(frame), self.PCM)
+
+		self.assertIsNone(AudioFrameFormat().sequence(memoryview(self.PCM)))
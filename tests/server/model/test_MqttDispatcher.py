@@ -0,0 +1,161 @@
+#  Copyright (c) 2021
+#
+#  This file, test_MqttDispatcher.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import json
+import threading
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from paho.mqtt.client import MQTTMessage
+
+from core.commons.model.ParsedMessage import ParsedMessage
+from core.server.model.MqttDispatcher import Histogram, MqttDispatcher
+
+
+class TestMqttDispatcher(TestCase):
+
+	def setUp(self):
+		self.dispatcher = MqttDispatcher(laneKey=lambda message: message.parsedPayload['siteId'])
+		self.dispatcher.logError = MagicMock()
+		self.addCleanup(self.dispatcher.stop)
+
+
+	@staticmethod
+	def message(topic: str, siteId: str, value: int = 0) -> MQTTMessage:
+		message = MQTTMessage(topic=topic.encode())
+		message.payload = json.dumps({'siteId': siteId, 'value': value}).encode()
+		return message
+
+
+	@staticmethod
+	def waitFor(predicate) -> bool:
+		for _ in range(200):
+			if predicate():
+				return True
+			threading.Event().wait(0.01)
+		return False
+
+
+	def test_no_workers(self):
+		callback = MagicMock()
+		self.dispatcher.start(workers=0)
+		self.assertIs(self.dispatcher.wrap(callback, topic='a/b'), callback)
+
+
+	def test_ordering_per_lane(self):
+		self.dispatcher.start(workers=4)
+		release = threading.Event()
+		kitchenDone = threading.Event()
+		received = {'kitchen': list(), 'office': list()}
+
+
+		def handler(_client, _userdata, message: ParsedMessage):
+			siteId = message.parsedPayload['siteId']
+			if siteId == 'kitchen':
+				release.wait(2)
+			received[siteId].append(message.parsedPayload['value'])
+			if siteId == 'kitchen' and len(received['kitchen']) == 50:
+				kitchenDone.set()
+
+
+		onMessage = self.dispatcher.wrap(handler, topic='test/#')
+		for value in range(50):
+			onMessage(None, None, self.message('test/a', 'kitchen', value))
+			onMessage(None, None, self.message('test/b', 'office', value))
+
+		# The kitchen lane being held doesn't hold the office one
+		self.assertTrue(self.waitFor(lambda: len(received['office']) == 50))
+		self.assertListEqual(received['office'], list(range(50)))
+		self.assertListEqual(received['kitchen'], list())
+		self.assertGreater(self.dispatcher.queueDepth('kitchen'), 0)
+
+		release.set()
+		self.assertTrue(kitchenDone.wait(2))
+		self.assertListEqual(received['kitchen'], list(range(50)))
+		self.assertTrue(self.waitFor(lambda: self.dispatcher.stats()['topics']['test/#']['messages'] == 100))
+
+		stats = self.dispatcher.stats()
+		self.assertEqual(stats['topics']['test/#']['messages'], 100)
+		self.assertEqual(stats['topics']['test/#']['latency']['samples'], 100)
+		self.assertEqual(sum(stats['topics']['test/#']['queueDepth']['buckets'].values()), 100)
+
+
+	def test_drop_oldest(self):
+		self.dispatcher.start(workers=1)
+		started = threading.Event()
+		release = threading.Event()
+		received = list()
+		done = threading.Event()
+
+
+		def handler(_client, _userdata, message: MQTTMessage):
+			started.set()
+			release.wait(2)
+			received.append(message.payload)
+			if message.payload == b'19':
+				done.set()
+
+
+		onMessage = self.dispatcher.wrap(handler, topic='audio/+', laneKey=lambda message: message.topic, maxQueue=5)
+		for frame in range(20):
+			message = MQTTMessage(topic=b'audio/kitchen')
+			message.payload = str(frame).encode()
+			onMessage(None, None, message)
+			if not frame:
+				self.assertTrue(started.wait(2))
+
+		release.set()
+		self.assertTrue(done.wait(2))
+		# The first frame was already being handled, then only the 5 last ones were kept
+		self.assertListEqual(received, [b'0', b'15', b'16', b'17', b'18', b'19'])
+		self.assertEqual(self.dispatcher.stats()['topics']['audio/+']['dropped'], 14)
+
+
+	def test_failing_handler(self):
+		self.dispatcher.start(workers=2)
+		done = threading.Event()
+		calls = list()
+
+
+		def handler(_client, _userdata, message: ParsedMessage):
+			calls.append(message.parsedPayload['value'])
+			if len(calls) == 2:
+				done.set()
+			raise ValueError('failing handler')
+
+
+		onMessage = self.dispatcher.wrap(handler)
+		onMessage(None, None, self.message('test/a', 'kitchen', 1))
+		onMessage(None, None, self.message('test/a', 'kitchen', 2))
+		self.assertTrue(done.wait(2))
+		self.assertTrue(self.waitFor(lambda: self.dispatcher.stats()['topics']['test/a']['errors'] == 2))
+		self.assertListEqual(calls, [1, 2])
+		self.assertEqual(self.dispatcher.logError.call_count, 2)
+
+
+	def test_histogram(self):
+		histogram = Histogram((1, 5, 10))
+		for value in (0, 1, 3, 7, 50, 60):
+			histogram.add(value)
+
+		histogram = histogram.toDict()
+		self.assertDictEqual(histogram['buckets'], {'<=1': 2, '<=5': 1, '<=10': 1, '>10': 2})
+		self.assertEqual(histogram['samples'], 6)
+		self.assertEqual(histogram['max'], 60)
+		self.assertAlmostEqual(histogram['average'], 121 / 6)
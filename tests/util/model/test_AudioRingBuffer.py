@@ -0,0 +1,107 @@
+#  Copyright (c) 2021
+#
+#  This file, test_AudioRingBuffer.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import threading
+import unittest
+
+import numpy as np
+
+from core.util.model.AudioRingBuffer import AudioRingBuffer
+
+
+class TestAudioRingBuffer(unittest.TestCase):
+
+	@staticmethod
+	def pcm(start: int, count: int) -> bytes:
+		return np.arange(start, start + count, dtype=np.int16).tobytes()
+
+
+	def test_read_frame(self):
+		buffer = AudioRingBuffer(capacity=10)
+		out = np.empty(4, dtype=np.int16)
+
+		buffer.write(self.pcm(0, 3))
+		self.assertIsNone(buffer.readFrame(4, out=out, timeout=0))
+
+		buffer.write(self.pcm(3, 6))
+		frame = buffer.readFrame(4, out=out)
+		self.assertIs(frame.base, out)
+		self.assertListEqual(frame.tolist(), [0, 1, 2, 3])
+		self.assertListEqual(buffer.readFrame(4).tolist(), [4, 5, 6, 7])
+		self.assertEqual(buffer.available, 1)
+
+		# Wraps around the end of the ring
+		buffer.write(self.pcm(9, 5))
+		self.assertListEqual(buffer.readFrame(6).tolist(), [8, 9, 10, 11, 12, 13])
+
+
+	def test_read_view(self):
+		buffer = AudioRingBuffer(capacity=8)
+		buffer.write(self.pcm(0, 6))
+
+		view = buffer.read(maxSamples=4)
+		self.assertTrue(np.shares_memory(view, buffer._ring))
+		self.assertListEqual(view.tolist(), [0, 1, 2, 3])
+
+		# Only the contiguous samples, then the rest from the start of the ring
+		buffer.write(self.pcm(6, 4))
+		self.assertListEqual(buffer.read().tolist(), [4, 5, 6, 7])
+		self.assertListEqual(buffer.read().tolist(), [8, 9])
+		self.assertIsNone(buffer.read(timeout=0))
+
+
+	def test_overrun(self):
+		buffer = AudioRingBuffer(capacity=4)
+		buffer.write(self.pcm(0, 3))
+		buffer.write(self.pcm(3, 3))
+		self.assertEqual(buffer.overruns, 2)
+		self.assertEqual(buffer.readAll(), self.pcm(2, 4))
+
+		buffer.write(self.pcm(0, 10))
+		self.assertEqual(buffer.overruns, 8)
+		self.assertEqual(buffer.readAll(), self.pcm(6, 4))
+
+
+	def test_close(self):
+		buffer = AudioRingBuffer(capacity=16)
+		results = list()
+		reader = threading.Thread(target=lambda: results.append(buffer.readFrame(8)))
+		reader.start()
+
+		buffer.write(self.pcm(0, 4))
+		buffer.close()
+		reader.join(2)
+		self.assertListEqual(results, [None])
+
+		# What was written before closing can still be read, nothing after
+		buffer.write(self.pcm(4, 4))
+		self.assertListEqual(buffer.read().tolist(), [0, 1, 2, 3])
+		self.assertIsNone(buffer.read())
+
+		buffer.reopen()
+		buffer.write(self.pcm(8, 2))
+		self.assertListEqual(buffer.read().tolist(), [8, 9])
+
+
+	def test_clear(self):
+		buffer = AudioRingBuffer(capacity=16)
+		buffer.write(self.pcm(0, 4))
+		buffer.clear()
+		self.assertEqual(buffer.available, 0)
+		self.assertEqual(buffer.overruns, 0)
@@ -0,0 +1,140 @@
+#  Copyright (c) 2021
+#
+#  This file, test_BootProfiler.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+
+from core.base.model.ProjectAliceObject import ProjectAliceObject
+from core.util.model.BootProfiler import BootProfiler
+
+
+class TestBootProfiler(TestCase):
+
+	def test_span(self):
+		profiler = BootProfiler()
+		with profiler.span(name='ConfigManager.onStart', category='manager'):
+			time.sleep(0.02)
+			with profiler.span(name='initDB ConfigManager', category='database', components=['ConfigManager']):
+				pass
+
+		spans = profiler.spans
+		self.assertListEqual([bootSpan.name for bootSpan in spans], ['initDB ConfigManager', 'ConfigManager.onStart'])
+		self.assertGreaterEqual(spans[1].wallTime, 0.02)
+		self.assertLess(spans[1].cpuTime, spans[1].wallTime)
+		self.assertLessEqual(spans[1].started, spans[0].started)
+		self.assertDictEqual(spans[0].args, {'components': ['ConfigManager']})
+
+
+	def test_span_failure(self):
+		profiler = BootProfiler()
+		with self.assertRaises(ValueError):
+			with profiler.span(name='broken', category='manager'):
+				raise ValueError('broken')
+
+		self.assertEqual(len(profiler.spans), 1)
+
+
+	def test_wrap(self):
+		profiler = BootProfiler()
+		func = profiler.wrap(name='AliceCore init', category='skill', func=lambda value: value * 2)
+		threads = [threading.Thread(target=func, args=[i]) for i in range(4)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+
+		self.assertEqual(func(2), 4)
+		self.assertEqual(len(profiler.spans), 5)
+
+
+	def test_finish(self):
+		profiler = BootProfiler()
+		self.assertTrue(profiler.recording)
+		profiler.finish()
+		duration = profiler.duration
+		self.assertFalse(profiler.recording)
+
+		with profiler.span(name='late', category='manager'):
+			pass
+		self.assertListEqual(profiler.spans, list())
+		self.assertEqual(profiler.duration, duration)
+
+
+	def test_chrome_trace(self):
+		profiler = BootProfiler()
+		with profiler.span(name='SnipsNlu', category='subprocess'):
+			pass
+		profiler.finish()
+
+		with tempfile.TemporaryDirectory() as directory:
+			path = Path(directory) / 'logs/bootTrace.json'
+			self.assertTrue(profiler.writeTrace(path))
+			trace = json.loads(path.read_text())
+
+		events = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+		self.assertEqual(len(events), 1)
+		self.assertEqual(events[0]['name'], 'SnipsNlu')
+		self.assertEqual(events[0]['cat'], 'subprocess')
+		self.assertIn('cpuTime', events[0]['args'])
+		self.assertTrue(any(event['ph'] == 'M' for event in trace['traceEvents']))
+
+
+	def test_summary(self):
+		profiler = BootProfiler()
+		for name, category, duration in [('fast', 'manager', 0), ('slow', 'manager', 0.02), ('AliceCore start', 'skill', 0)]:
+			with profiler.span(name=name, category=category):
+				time.sleep(duration)
+
+		summary = profiler.summary()
+		self.assertFalse(summary['finished'])
+		self.assertListEqual(sorted(summary['categories']), ['manager', 'skill'])
+		self.assertListEqual([bootSpan['name'] for bootSpan in summary['categories']['manager']['spans']], ['slow', 'fast'])
+		self.assertGreaterEqual(summary['categories']['manager']['wallTime'], 0.02)
+		self.assertListEqual([bootSpan.name for bootSpan in profiler.slowest(category='manager', count=1)], ['slow'])
+
+
+	def test_without_profiler(self):
+		func = MagicMock(return_value=3)
+		for projectAlice in (None, MagicMock(), SimpleNamespace()):
+			with BootProfiler.spanFor(projectAlice, name='initDB', category='database'):
+				pass
+			self.assertIs(BootProfiler.wrapFor(projectAlice, name='AliceCore init', category='skill', func=func), func)
+
+		profiler = BootProfiler()
+		projectAlice = SimpleNamespace(bootProfiler=profiler)
+		with BootProfiler.spanFor(projectAlice, name='initDB', category='database'):
+			pass
+		self.assertEqual(BootProfiler.wrapFor(projectAlice, name='AliceCore init', category='skill', func=func)(), 3)
+		self.assertEqual(len(profiler.spans), 2)
+
+
+	def test_boot_span_without_super_manager(self):
+		# Benchmarks use managers without booting Alice
+		with mock.patch('core.base.SuperManager.SuperManager._INSTANCE', None):
+			obj = ProjectAliceObject()
+			with obj.bootSpan(name='initDB', category='database'):
+				pass
+			func = MagicMock()
+			self.assertIs(obj.bootProfiled(name='AliceCore init', category='skill', func=func), func)
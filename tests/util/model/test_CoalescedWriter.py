@@ -0,0 +1,120 @@
+#  Copyright (c) 2021
+#
+#  This file, test_CoalescedWriter.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import threading
+from types import SimpleNamespace
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+
+from core.util.model.CoalescedWriter import CoalescedWriter
+
+
+class TestCoalescedWriter(TestCase):
+
+	def setUp(self):
+		patcher = mock.patch('core.base.SuperManager.SuperManager')
+		superManager = patcher.start()
+		self.addCleanup(patcher.stop)
+		self.superManager = MagicMock()
+		superManager.getInstance.return_value = self.superManager
+
+		self.writer = CoalescedWriter(tableName='widgets', callerName='WidgetManager', toRow=lambda widget: {'id': widget.id, 'x': widget.x}, delay=5)
+
+
+	def test_coalesce(self):
+		widget = SimpleNamespace(id=1, x=0)
+		other = SimpleNamespace(id=2, x=0)
+		for x in range(10):
+			widget.x = x
+			self.writer.markDirty(widget.id, widget)
+		self.writer.markDirty(other.id, other)
+
+		# One flush is scheduled for all the changes
+		self.superManager.ThreadManager.newTimer.assert_called_once_with(interval=5, func=self.writer.flush)
+		self.assertTrue(self.writer.isDirty(1))
+		self.assertEqual(self.writer.pending, 2)
+
+		self.assertEqual(self.writer.flush(), 2)
+		self.superManager.DatabaseManager.replaceMany.assert_called_once_with(tableName='widgets', callerName='WidgetManager', values=[{'id': 1, 'x': 9}, {'id': 2, 'x': 0}])
+		self.superManager.ThreadManager.newTimer.return_value.cancel.assert_called_once()
+
+		stats = self.writer.stats
+		self.assertEqual(stats['marked'], 11)
+		self.assertEqual(stats['written'], 2)
+		self.assertEqual(stats['flushes'], 1)
+		self.assertEqual(stats['pending'], 0)
+		self.assertEqual(self.writer.flush(), 0)
+
+
+	def test_discard(self):
+		self.writer.markDirty(1, SimpleNamespace(id=1, x=0))
+		self.writer.discard(1)
+		self.writer.discard(2)
+		self.assertFalse(self.writer.isDirty(1))
+		self.assertEqual(self.writer.flush(), 0)
+		self.superManager.DatabaseManager.replaceMany.assert_not_called()
+
+
+	def test_forget(self):
+		events = list()
+		writing = threading.Event()
+		release = threading.Event()
+
+
+		def replaceMany(**_kwargs):
+			writing.set()
+			release.wait(1)
+			events.append('replace')
+
+
+		self.superManager.DatabaseManager.replaceMany.side_effect = replaceMany
+		self.writer.markDirty(1, SimpleNamespace(id=1, x=0))
+		flush = threading.Thread(target=self.writer.flush)
+		flush.start()
+		self.assertTrue(writing.wait(1))
+
+		# The flush already picked the row up, the delete has to wait for its replace
+		threading.Timer(0.05, release.set).start()
+		with self.writer.forget(1):
+			events.append('delete')
+		flush.join(1)
+		self.assertListEqual(events, ['replace', 'delete'])
+
+		# And nothing is written back afterwards
+		self.writer.markDirty(2, SimpleNamespace(id=2, x=0))
+		with self.writer.forget(2):
+			self.assertFalse(self.writer.isDirty(2))
+		self.assertEqual(self.writer.flush(), 0)
+
+
+	def test_failure(self):
+		self.writer.logError = MagicMock()
+		self.superManager.DatabaseManager.replaceMany.side_effect = Exception('database is locked')
+		widget = SimpleNamespace(id=1, x=0)
+		self.writer.markDirty(widget.id, widget)
+		self.assertEqual(self.writer.flush(), 0)
+		self.writer.logError.assert_called_once()
+
+		# Kept and retried later
+		self.assertTrue(self.writer.isDirty(1))
+		self.assertEqual(self.superManager.ThreadManager.newTimer.call_count, 2)
+
+		self.superManager.DatabaseManager.replaceMany.side_effect = None
+		self.assertEqual(self.writer.flush(), 1)
+		self.assertEqual(self.writer.stats['failed'], 1)
@@ -0,0 +1,102 @@
+#  Copyright (c) 2021
+#
+#  This file, test_DependencyRunner.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from core.util.model.DependencyRunner import DependencyRunner
+
+
+class TestDependencyRunner(TestCase):
+
+	def setUp(self):
+		self.order = list()
+		self.lock = threading.Lock()
+
+
+	def task(self, name: str, duration: float = 0, result=True):
+		def run():
+			time.sleep(duration)
+			with self.lock:
+				self.order.append(name)
+			return result
+		return run
+
+
+	def test_dependencies(self):
+		for workers in (1, 4):
+			self.order = list()
+			runner = DependencyRunner(workers=workers)
+			timings = runner.run(
+				tasks={
+					'AliceSatellite': self.task('AliceSatellite'),
+					'AliceCore'     : self.task('AliceCore', duration=0.05),
+					'Telemetry'     : self.task('Telemetry'),
+					'RedQueen'      : self.task('RedQueen')
+				},
+				dependencies={
+					'AliceSatellite': ['AliceCore', 'Unknown'],
+					'RedQueen'      : ['AliceSatellite']
+				}
+			)
+			self.assertEqual(len(timings), 4)
+			self.assertLess(self.order.index('AliceCore'), self.order.index('AliceSatellite'))
+			self.assertLess(self.order.index('AliceSatellite'), self.order.index('RedQueen'))
+			self.assertGreaterEqual(timings['AliceSatellite'].started, timings['AliceCore'].wallTime)
+			self.assertTrue(timings['RedQueen'].result)
+
+
+	def test_parallel(self):
+		runner = DependencyRunner(workers=4)
+		start = time.perf_counter()
+		runner.run(tasks={str(i): self.task(str(i), duration=0.1) for i in range(4)})
+		self.assertLess(time.perf_counter() - start, 0.3)
+
+
+	def test_circular(self):
+		runner = DependencyRunner(workers=2)
+		runner.logWarning = MagicMock()
+		timings = runner.run(
+			tasks={'a': self.task('a'), 'b': self.task('b')},
+			dependencies={'a': ['b'], 'b': ['a']}
+		)
+		self.assertEqual(len(timings), 2)
+		runner.logWarning.assert_called_once()
+
+
+	def test_failures(self):
+		runner = DependencyRunner(workers=1)
+		runner.logError = MagicMock()
+
+
+		def broken():
+			raise Exception('broken')
+
+
+		# A failing task doesn't block those depending on it, returning False aborts
+		timings = runner.run(
+			tasks={'broken': broken, 'after': self.task('after'), 'fatal': self.task('fatal', result=False), 'skipped': self.task('skipped')},
+			dependencies={'after': ['broken'], 'fatal': ['after'], 'skipped': ['fatal']}
+		)
+		runner.logError.assert_called_once()
+		self.assertIsNone(timings['broken'].result)
+		self.assertListEqual(self.order, ['after', 'fatal'])
+		self.assertNotIn('skipped', timings)
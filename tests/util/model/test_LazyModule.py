@@ -0,0 +1,69 @@
+#  Copyright (c) 2021
+#
+#  This file, test_LazyModule.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import sys
+import threading
+from unittest import TestCase
+
+from core.util.model.LazyModule import LazyModule, lazyImport
+
+
+class TestLazyModule(TestCase):
+
+	def setUp(self):
+		# A small stdlib module not imported by the test run
+		self.name = 'colorsys'
+		sys.modules.pop(self.name, None)
+		LazyModule._registry.pop(self.name, None)
+		self.addCleanup(LazyModule._registry.pop, self.name, None)
+
+
+	def test_lazy_import(self):
+		module = lazyImport(self.name)
+		self.assertIs(lazyImport(self.name), module)
+		self.assertNotIn(self.name, sys.modules)
+		self.assertFalse(LazyModule.isLoaded(module))
+		self.assertFalse(LazyModule.lazyImports()[self.name])
+
+		self.assertEqual(module.rgb_to_hsv(1, 0, 0), (0, 1, 1))
+		self.assertIn(self.name, sys.modules)
+		self.assertTrue(LazyModule.isLoaded(module))
+		self.assertTrue(LazyModule.lazyImports()[self.name])
+		self.assertIn('hsv_to_rgb', dir(module))
+		self.assertIn('rgb_to_hsv', module.__dict__)
+
+
+	def test_concurrent_load(self):
+		module = lazyImport(self.name)
+		results = list()
+		threads = [threading.Thread(target=lambda: results.append(LazyModule.load(module))) for _ in range(8)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+
+		self.assertEqual(len({id(result) for result in results}), 1)
+
+
+	def test_missing_module(self):
+		module = lazyImport('notAModule')
+		self.addCleanup(LazyModule._registry.pop, 'notAModule', None)
+		with self.assertRaises(ModuleNotFoundError):
+			module.anything
+		self.assertFalse(LazyModule.isLoaded(module))
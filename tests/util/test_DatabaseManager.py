@@ -17,11 +17,63 @@
 #
 #  Last modified: 2021.04.13 at 12:56:52 CEST
 
-from unittest import TestCase
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+
+from core.ProjectAliceExceptions import DbConnectionError
+from core.commons.CommonsManager import CommonsManager
+from core.util.DatabaseManager import DatabaseManager
 
 
 class TestDatabaseManager(TestCase):
 
+	SCHEMA = {
+		'values': [
+			'id INTEGER PRIMARY KEY',
+			'name TEXT NOT NULL UNIQUE',
+			'value INTEGER'
+		]
+	}
+
+
+	def setUp(self):
+		self._superManagerPatch = mock.patch('core.base.SuperManager.SuperManager')
+		superManager = self._superManagerPatch.start()
+
+		instance = MagicMock()
+		superManager.getInstance.return_value = instance
+		instance.ConfigManager.getAliceConfigByName.return_value = False
+		instance.CommonsManager.getFunctionCaller.return_value = 'DatabaseManager'
+		instance.CommonsManager.dictFromRow = CommonsManager.dictFromRow
+		instance.ThreadManager.newThread.side_effect = self.newThread
+
+		self._directory = tempfile.TemporaryDirectory()
+		self.databaseManager = DatabaseManager()
+		self.databaseManager._databaseFile = str(Path(self._directory.name, 'data.db'))
+		self.assertTrue(self.databaseManager.initDB(schema=self.SCHEMA, callerName='Tests'))
+
+
+	@staticmethod
+	def newThread(name: str, target: Callable) -> threading.Thread:
+		thread = threading.Thread(name=name, target=target, daemon=True)
+		thread.start()
+		return thread
+
+
+	def tearDown(self):
+		self.databaseManager.stopWriteBehind()
+		self.databaseManager.closeConnections()
+		self._directory.cleanup()
+		self._superManagerPatch.stop()
+
+
 	def test_on_start(self):
 		pass  # To be implemented or nothing to test()
 
@@ -31,11 +83,66 @@ class TestDatabaseManager(TestCase):
 
 
 	def test_get_connection(self):
-		pass  # To be implemented or nothing to test()
+		connection = self.databaseManager.getConnection()
+		self.assertIs(self.databaseManager.getConnection(), connection)
+		self.assertEqual(connection.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+
+		others = list()
+		thread = threading.Thread(target=lambda: others.append(self.databaseManager.getConnection()))
+		thread.start()
+		thread.join()
+		self.assertIsNot(others[0], connection)
+
+		self.databaseManager.closeConnections()
+		with self.assertRaises(sqlite3.ProgrammingError):
+			connection.execute('SELECT 1')
+		self.assertIsNot(self.databaseManager.getConnection(), connection)
 
 
 	def test_init_db(self):
-		pass  # To be implemented or nothing to test()
+		database = self.databaseManager.getConnection()
+		self.assertIn('Tests_values', self.databaseManager._tables)
+		self.assertEqual(database.execute("SELECT hash FROM DatabaseManager_schemas WHERE component = 'Tests'").fetchone()[0], DatabaseManager.schemaHash(self.SCHEMA))
+
+		# An unchanged schema is not inspected again
+		with mock.patch.object(DatabaseManager, '_verifySchema') as verifySchema:
+			self.assertTrue(self.databaseManager.initDB(schema=self.SCHEMA, callerName='Tests'))
+			verifySchema.assert_not_called()
+
+		# A changed schema migrates the tables
+		self.databaseManager.insert(tableName='values', callerName='Tests', values={'name': 'kept', 'value': 1})
+		schema = {
+			'values': self.SCHEMA['values'] + ['comment TEXT'],
+			'others': ['id INTEGER PRIMARY KEY']
+		}
+		self.assertTrue(self.databaseManager.initDB(schema=schema, callerName='Tests'))
+		self.assertIn('comment', [row[1] for row in database.execute('PRAGMA table_info(Tests_values)')])
+		self.assertIn('Tests_others', self.databaseManager._tables)
+		self.assertEqual(len(self.databaseManager.fetch(tableName='values', query='SELECT * FROM :__table__', callerName='Tests')), 1)
+
+		# A dropped table is created again even though the schema did not change
+		self.assertTrue(self.databaseManager.dropTable(tableName='others', callerName='Tests'))
+		self.assertTrue(self.databaseManager.initDB(schema=schema, callerName='Tests'))
+		self.assertIn('Tests_others', [row[0] for row in database.execute("SELECT name FROM sqlite_master WHERE type = 'table'")])
+
+		# Deprecated tables are dropped
+		self.assertTrue(self.databaseManager.initDB(schema=self.SCHEMA, callerName='Tests'))
+		self.assertNotIn('Tests_others', self.databaseManager._tables)
+
+
+	def test_init_dbs(self):
+		results = self.databaseManager.initDBs({
+			'First' : {'values': ['id INTEGER PRIMARY KEY']},
+			'Second': {'values': ['id INTEGER PRIMARY KEY'], 'broken': ['id INTEGER PRIMARY KEY', 'id TEXT']}
+		})
+		self.assertDictEqual(results, {'First': True, 'Second': True})
+		self.assertIn('First_values', self.databaseManager._tables)
+		self.assertNotIn('Second_broken', self.databaseManager._tables)
+
+		# Second is not complete, its schema is checked again
+		hashes = dict(self.databaseManager.getConnection().execute('SELECT component, hash FROM DatabaseManager_schemas').fetchall())
+		self.assertIn('First', hashes)
+		self.assertNotIn('Second', hashes)
 
 
 	def test_drop_table(self):
@@ -47,7 +154,128 @@ class TestDatabaseManager(TestCase):
 
 
 	def test_insert(self):
-		pass  # To be implemented or nothing to test()
+		self.databaseManager.insert(tableName='values', callerName='Tests', values={'name': 'first', 'value': 1})
+		with self.assertRaises(sqlite3.IntegrityError):
+			self.databaseManager.insert(tableName='values', callerName='Tests', values={'name': 'first', 'value': 2})
+
+		self.assertFalse(self.databaseManager.getConnection().in_transaction)
+		rows = self.databaseManager.fetch(tableName='values', query='SELECT * FROM :__table__', callerName='Tests')
+		self.assertListEqual(rows, [{'id': 1, 'name': 'first', 'value': 1}])
+
+
+	def test_insert_many(self):
+		count = self.databaseManager.insertMany(tableName='values', callerName='Tests', values=({'name': f'row{i}', 'value': i} for i in range(25)), chunkSize=10)
+		self.assertEqual(count, 25)
+		self.assertEqual(self.databaseManager.insertMany(tableName='values', callerName='Tests', values=list()), 0)
+
+		# One failing row rolls the whole batch back
+		with self.assertRaises(sqlite3.IntegrityError):
+			self.databaseManager.insertMany(tableName='values', callerName='Tests', values=[{'name': 'new', 'value': 1}, {'name': 'row0', 'value': 1}])
+		self.assertFalse(self.databaseManager.getConnection().in_transaction)
+
+		count = self.databaseManager.replaceMany(tableName='values', callerName='Tests', values=[{'name': 'row0', 'value': 100}, {'name': 'row25', 'value': 25}])
+		self.assertEqual(count, 2)
+
+		rows = self.databaseManager.fetch(tableName='values', query='SELECT name, value FROM :__table__ ORDER BY value DESC', callerName='Tests')
+		self.assertEqual(len(rows), 26)
+		self.assertDictEqual(rows[0], {'name': 'row0', 'value': 100})
+
+
+	def test_write_behind(self):
+		self.databaseManager.startWriteBehind()
+		self.assertTrue(self.databaseManager.writeBehind)
+
+		self.assertIsNone(self.databaseManager.insert(tableName='values', callerName='Tests', values={'name': 'queued', 'value': 1}, blocking=False))
+		self.assertEqual(self.databaseManager.insertMany(tableName='values', callerName='Tests', values=({'name': f'row{i}', 'value': i} for i in range(10))), 10)
+		self.assertTrue(self.databaseManager.update(tableName='values', callerName='Tests', values={'value': 2}, row=('name', 'queued')))
+		self.databaseManager.delete(tableName='values', callerName='Tests', values={'name': 'row9'})
+
+		# A failing write does not take the rest of its batch down
+		with self.assertRaises(sqlite3.IntegrityError):
+			self.databaseManager.insert(tableName='values', callerName='Tests', values={'name': 'row0', 'value': 0})
+		rowId = self.databaseManager.insert(tableName='values', callerName='Tests', values={'name': 'blocking', 'value': 3})
+		self.assertIsNotNone(rowId)
+
+		self.assertTrue(self.databaseManager.flush(timeout=5))
+		rows = self.databaseManager.fetch(tableName='values', query='SELECT * FROM :__table__', callerName='Tests')
+		self.assertEqual(len(rows), 11)
+		self.assertIn({'id': rowId, 'name': 'blocking', 'value': 3}, rows)
+		self.assertIn({'id': 1, 'name': 'queued', 'value': 2}, rows)
+
+		stats = self.databaseManager.writeQueueStats
+		self.assertEqual(stats['failed'], 1)
+		self.assertEqual(stats['depth'], 0)
+		self.assertGreater(stats['written'], 0)
+
+		self.databaseManager.stopWriteBehind()
+		self.assertFalse(self.databaseManager.writeBehind)
+		self.assertEqual(self.databaseManager.insert(tableName='values', callerName='Tests', values={'name': 'direct', 'value': 4}), rowId + 1)
+
+
+	def test_write_behind_errors(self):
+		self.databaseManager.insertMany(tableName='values', callerName='Tests', values=[{'name': 'first', 'value': 1}, {'name': 'second', 'value': 2}])
+		self.databaseManager.startWriteBehind()
+
+		# Blocking writes report their errors like direct ones
+		with self.assertRaises(sqlite3.IntegrityError):
+			self.databaseManager.insertMany(tableName='values', callerName='Tests', values=[{'name': 'third', 'value': 3}, {'name': 'first', 'value': 1}])
+		self.assertFalse(self.databaseManager.update(tableName='values', callerName='Tests', values={'name': 'second'}, row=('name', 'first')))
+		self.assertFalse(self.databaseManager.delete(tableName='values', callerName='Tests', query='DELETE FROM :__table__ WHERE unknown = 1'))
+		self.assertTrue(self.databaseManager.delete(tableName='values', callerName='Tests', values={'name': 'second'}))
+
+		# Non blocking writes are only queued
+		self.assertTrue(self.databaseManager.update(tableName='values', callerName='Tests', values={'name': 'first'}, row=('name', 'first'), blocking=False))
+		self.assertEqual(self.databaseManager.insertMany(tableName='values', callerName='Tests', values=[{'name': 'first', 'value': 1}], blocking=False), 1)
+		self.assertTrue(self.databaseManager.flush(timeout=5))
+
+		rows = self.databaseManager.fetch(tableName='values', query='SELECT name FROM :__table__', callerName='Tests')
+		self.assertListEqual(rows, [{'name': 'first'}])
+		self.assertEqual(self.databaseManager.writeQueueStats['failed'], 4)
+
+
+	def test_write_behind_timeout(self):
+		self.databaseManager.WRITE_TIMEOUT = 0.05
+		self.databaseManager._writeBehind = True  # Queue writes without any writer thread to commit them
+
+		with self.assertRaises(DbConnectionError):
+			self.databaseManager.insert(tableName='values', callerName='Tests', values={'name': 'stalled', 'value': 1})
+		self.assertFalse(self.databaseManager.update(tableName='values', callerName='Tests', values={'value': 2}, row=('name', 'stalled')))
+		self.assertFalse(self.databaseManager.prune(tableName='values', callerName='Tests'))
+
+		self.databaseManager._writeBehind = False
+
+
+	def test_write_behind_queue_full(self):
+		self.databaseManager.WRITE_TIMEOUT = 0.3
+		self.databaseManager._writeQueue = queue.Queue(maxsize=1)
+		self.databaseManager._writeQueue.put(None)
+		self.databaseManager._writeBehind = True  # No writer thread to make room in the queue
+
+		errors = list()
+
+
+		def insert():
+			try:
+				self.databaseManager.insert(tableName='values', callerName='Tests', values={'name': 'full', 'value': 1}, blocking=False)
+			except DbConnectionError as e:
+				errors.append(e)
+
+
+		thread = threading.Thread(target=insert)
+		thread.start()
+
+		# A write waiting for room in the queue doesn't hold the others up
+		time.sleep(0.05)
+		self.assertTrue(self.databaseManager._writeLock.acquire(timeout=0.1))
+		self.databaseManager._writeLock.release()
+		self.databaseManager.WRITE_TIMEOUT = 0.05
+		self.assertFalse(self.databaseManager.update(tableName='values', callerName='Tests', values={'value': 2}, row=('name', 'full'), blocking=False))
+		self.assertFalse(self.databaseManager.flush())
+
+		thread.join(1)
+		self.assertEqual(len(errors), 1)
+		self.assertEqual(self.databaseManager._queueing, 0)
+		self.databaseManager._writeBehind = False
 
 
 	def test_update(self):
@@ -55,7 +283,50 @@ class TestDatabaseManager(TestCase):
 
 
 	def test_fetch(self):
-		pass  # To be implemented or nothing to test()
+		self.databaseManager.insertMany(tableName='values', callerName='Tests', values=({'name': f'row{i}', 'value': i} for i in range(5)))
+		rows = self.databaseManager.fetch(tableName='values', query='SELECT name, value FROM :__table__ ORDER BY value', callerName='Tests')
+		self.assertEqual(len(rows), 5)
+		self.assertDictEqual(rows[4], {'name': 'row4', 'value': 4})
+		self.assertListEqual(self.databaseManager.fetch(tableName='values', query='SELECT * FROM :__table__ WHERE value > :value', callerName='Tests', values={'value': 10}), list())
+
+
+	def test_iter_fetch(self):
+		self.databaseManager.insertMany(tableName='values', callerName='Tests', values=({'name': f'row{i}', 'value': i} for i in range(25)))
+		query = 'SELECT name, value FROM :__table__ ORDER BY value'
+
+		rows = self.databaseManager.iterFetch(tableName='values', query=query, callerName='Tests')
+		self.assertDictEqual(next(rows), {'name': 'row0', 'value': 0})
+		self.assertEqual(len(list(rows)), 24)
+
+		rows = list(self.databaseManager.iterFetch(tableName='values', query=query, callerName='Tests', rowType=DatabaseManager.ROW_TUPLE))
+		self.assertTupleEqual(rows[1], ('row1', 1))
+
+		row = next(self.databaseManager.iterFetch(tableName='values', query=query, callerName='Tests', rowType=DatabaseManager.ROW_SQLITE))
+		self.assertIsInstance(row, sqlite3.Row)
+		self.assertEqual(row['name'], 'row0')
+
+		pages = list(self.databaseManager.iterFetch(tableName='values', query=query, callerName='Tests', rowType=DatabaseManager.ROW_TUPLE, pageSize=10))
+		self.assertListEqual([len(page) for page in pages], [10, 10, 5])
+
+		# Closing early leaves the connection usable
+		rows = self.databaseManager.iterFetch(tableName='values', query=query, callerName='Tests')
+		next(rows)
+		rows.close()
+		self.assertIsNotNone(self.databaseManager.insert(tableName='values', callerName='Tests', values={'name': 'after', 'value': 100}))
+
+		with self.assertRaises(ValueError):
+			next(self.databaseManager.iterFetch(tableName='values', query=query, callerName='Tests', rowType='list'))
+
+
+	def test_fetch_one(self):
+		self.assertIsNone(self.databaseManager.fetchOne(tableName='values', query='SELECT * FROM :__table__', callerName='Tests'))
+
+		self.databaseManager.insertMany(tableName='values', callerName='Tests', values=({'name': f'row{i}', 'value': i} for i in range(5)))
+		row = self.databaseManager.fetchOne(tableName='values', query='SELECT name, value FROM :__table__ WHERE value = :value', callerName='Tests', values={'value': 3})
+		self.assertDictEqual(row, {'name': 'row3', 'value': 3})
+
+		row = self.databaseManager.fetchOne(tableName='values', query='SELECT name FROM :__table__ ORDER BY value DESC', callerName='Tests', rowType=DatabaseManager.ROW_TUPLE)
+		self.assertTupleEqual(row, ('row4',))
 
 
 	def test_purge(self):
@@ -17,13 +17,27 @@
 #
 #  Last modified: 2021.04.13 at 12:56:52 CEST
 
-from unittest import TestCase
+import threading
+import time
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+
+from core.util.ThreadManager import ThreadManager
+from core.util.model.ThreadTimer import ThreadTimer
+from core.util.model.TimerScheduler import TimerScheduler
 
 
 class TestThreadManager(TestCase):
 
-	def test_on_stop(self):
-		pass  # To be implemented or nothing to test()
+	def setUp(self):
+		patcher = mock.patch('core.base.SuperManager.SuperManager')
+		superManager = patcher.start()
+		superManager.getInstance.return_value = MagicMock()
+		superManager.getInstance.return_value.ConfigManager.getAliceConfigByName.side_effect = lambda name: {'timerWorkers': 3}.get(name)
+		self.addCleanup(patcher.stop)
+
+		self.threadManager = ThreadManager()
+		self.addCleanup(self.threadManager._scheduler.stop)
 
 
 	def test_on_booted(self):
@@ -39,19 +53,142 @@ class TestThreadManager(TestCase):
 
 
 	def test_new_timer(self):
-		pass  # To be implemented or nothing to test()
+		called = threading.Event()
+		timer = self.threadManager.newTimer(interval=0.01, func=lambda value, other: called.set() if (value, other) == (1, 2) else None, args=[1], kwargs={'other': 2})
+		self.assertTrue(called.wait(1))
+		self.assertTrue(timer.join(1))
+		self.assertFalse(timer.is_alive())
 
+		timer = self.threadManager.newTimer(interval=0.01, func=MagicMock(), autoStart=False)
+		time.sleep(0.05)
+		timer.function.assert_not_called()
+		timer.start()
+		self.assertTrue(timer.join(1))
+		timer.function.assert_called_once()
+		self.assertRaises(RuntimeError, timer.start)
 
-	def test_do_later(self):
-		pass  # To be implemented or nothing to test()
+		self.assertRaises(ValueError, self.threadManager.newTimer, interval=0, func=MagicMock(), periodic=True)
 
 
-	def test_on_timer_end(self):
-		pass  # To be implemented or nothing to test()
+	def test_new_periodic_timer(self):
+		calls = list()
+		done = threading.Event()
+
+
+		def tick():
+			calls.append(time.monotonic())
+			if len(calls) == 3:
+				done.set()
+
+
+		timer = self.threadManager.newTimer(interval=0.02, func=tick, periodic=True)
+		self.assertTrue(done.wait(1))
+		timer.cancel()
+		self.assertFalse(timer.is_alive())
+		count = len(calls)
+		time.sleep(0.06)
+		self.assertEqual(len(calls), count)
+
+
+	def test_timers_order(self):
+		calls = list()
+		done = threading.Event()
+		self.threadManager.newTimer(interval=0.06, func=lambda: (calls.append('last'), done.set()))
+		self.threadManager.newTimer(interval=0.02, func=calls.append, args=['first'])
+		self.threadManager.newTimer(interval=0.04, func=calls.append, args=['second'])
+		self.assertTrue(done.wait(1))
+		self.assertListEqual(calls, ['first', 'second', 'last'])
+
+
+	def test_do_later(self):
+		called = threading.Event()
+		self.threadManager.doLater(interval=0.01, func=called.set)
+		self.assertTrue(called.wait(1))
 
 
 	def test_remove_timer(self):
-		pass  # To be implemented or nothing to test()
+		callback = MagicMock()
+		timer = self.threadManager.newTimer(interval=0.05, func=callback)
+		self.threadManager.removeTimer(timer)
+		self.threadManager.removeTimer(None)
+		self.assertFalse(timer.is_alive())
+		time.sleep(0.1)
+		callback.assert_not_called()
+
+
+	def test_timer_stats(self):
+		failed = threading.Event()
+
+
+		def fail():
+			failed.set()
+			raise Exception('failing callback')
+
+
+		self.threadManager.newTimer(interval=0.01, func=fail)
+		self.threadManager.newTimer(interval=10, func=MagicMock()).cancel()
+		self.threadManager.newTimer(interval=10, func=MagicMock())
+		self.assertTrue(failed.wait(1))
+		time.sleep(0.02)
+
+		stats = self.threadManager.timerStats
+		self.assertEqual(stats['scheduled'], 3)
+		self.assertEqual(stats['fired'], 1)
+		self.assertEqual(stats['failed'], 1)
+		self.assertEqual(stats['cancelled'], 1)
+		self.assertEqual(stats['pending'], 1)
+		self.assertGreater(stats['nextIn'], 9)
+		self.assertGreaterEqual(stats['averageLag'], 0)
+
+
+	def test_timer_workers(self):
+		self.assertEqual(self.threadManager._scheduler._workers, 3)
+
+
+	def test_slow_and_late_timers(self):
+		scheduler = TimerScheduler(workers=1, slowCallback=0.05, lagWarning=0.05)
+		self.addCleanup(scheduler.stop)
+		done = threading.Event()
+
+		with mock.patch.object(scheduler, 'logWarning') as logWarning:
+			# The only worker is busy with the slow callback, the other one starts late
+			ThreadTimer(callback=time.sleep, args=[0.2], interval=0.01, scheduler=scheduler).start()
+			lateTimer = ThreadTimer(callback=done.set, interval=0.02, scheduler=scheduler)
+			lateTimer.start()
+
+			self.assertTrue(done.wait(1))
+			self.assertTrue(lateTimer.join(1))
+
+		stats = scheduler.stats()
+		self.assertEqual(stats['slow'], 1)
+		self.assertEqual(stats['late'], 1)
+		messages = [call.args[0] for call in logWarning.call_args_list]
+		self.assertEqual(len(messages), 2)
+		self.assertTrue(any('ran for' in message for message in messages))
+		self.assertTrue(any('late' in message for message in messages))
+
+
+	def test_has_pending_timers(self):
+		owner = threading.Event()
+		other = threading.Event()
+		self.assertFalse(self.threadManager.hasPendingTimers(owner=owner))
+
+		timer = self.threadManager.newTimer(interval=10, func=owner.set)
+		self.threadManager.newTimer(interval=10, func=other.set)
+		self.assertTrue(self.threadManager.hasPendingTimers(owner=owner))
+
+		timer.cancel()
+		self.assertFalse(self.threadManager.hasPendingTimers(owner=owner))
+		self.assertTrue(self.threadManager.hasPendingTimers(owner=other))
+
+
+	def test_on_stop(self):
+		callback = MagicMock()
+		timer = self.threadManager.newTimer(interval=0.05, func=callback)
+		self.threadManager._scheduler.stop()
+		self.assertFalse(timer.is_alive())
+		time.sleep(0.1)
+		callback.assert_not_called()
 
 
 	def test_new_thread(self):
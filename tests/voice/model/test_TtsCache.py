@@ -0,0 +1,138 @@
+#  Copyright (c) 2021
+#
+#  This file, test_TtsCache.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import tempfile
+import wave
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from core.voice.model.TtsCache import TtsCache
+
+
+class TestTtsCache(TestCase):
+
+	def setUp(self):
+		directory = tempfile.TemporaryDirectory()
+		self.addCleanup(directory.cleanup)
+		self.root = Path(directory.name)
+		self.voice = self.root / 'pico/en-US/male/en-US'
+		self.voice.mkdir(parents=True)
+
+
+	def wav(self, name: str, seconds: float = 1) -> Path:
+		file = self.voice / f'{name}.wav'
+		with wave.open(str(file), 'wb') as wav:
+			wav.setnchannels(1)
+			wav.setsampwidth(2)
+			wav.setframerate(16000)
+			wav.writeframes(bytes(int(32000 * seconds)))
+		return file
+
+
+	def test_use(self):
+		cache = TtsCache(root=self.root)
+		file = self.wav('hello', seconds=1.5)
+
+		entry = cache.use(file)
+		self.assertEqual(entry.duration, 1.5)
+		self.assertEqual(entry.sampleRate, 16000)
+		self.assertEqual(entry.size, file.stat().st_size)
+
+		self.assertIs(cache.use(file), entry)
+		self.assertEqual(entry.hits, 2)
+		self.assertEqual(cache.stats['hits'], 1)
+		self.assertEqual(cache.stats['stored'], 1)
+		self.assertEqual(cache.size, file.stat().st_size)
+
+
+	def test_invalid_file(self):
+		cache = TtsCache(root=self.root)
+		cache.logWarning = MagicMock()
+		file = self.voice / 'broken.wav'
+		file.write_bytes(b'not a wav')
+		self.assertIsNone(cache.use(file))
+		self.assertIsNone(cache.use(self.voice / 'missing.wav'))
+
+		# A deleted file is dropped from the index
+		file = self.wav('hello')
+		cache.use(file)
+		file.unlink()
+		self.assertIsNone(cache.get(file))
+		self.assertEqual(cache.size, 0)
+
+
+	def test_lru_eviction(self):
+		size = self.wav('size').stat().st_size
+		cache = TtsCache(root=self.root, maxSize=size * 2)
+		first = self.wav('first')
+		second = self.wav('second')
+		cache.store(first, lastHit=1)
+		cache.store(second, lastHit=2)
+		cache.use(first)
+
+		third = self.wav('third')
+		cache.store(third)
+		self.assertTrue(first.exists())
+		self.assertFalse(second.exists())
+		self.assertTrue(third.exists())
+		self.assertEqual(cache.stats['evicted'], 1)
+		self.assertEqual(cache.size, size * 2)
+
+
+	def test_lfu_eviction(self):
+		size = self.wav('size').stat().st_size
+		cache = TtsCache(root=self.root, maxSize=size * 2, policy='lfu')
+		first = self.wav('first')
+		second = self.wav('second')
+		cache.store(first, lastHit=1)
+		cache.store(second, lastHit=2)
+		for _ in range(3):
+			cache.use(first)
+		cache.use(second)
+
+		# The file just stored is never evicted, even though never used
+		third = self.wav('third')
+		cache.store(third)
+		self.assertTrue(first.exists())
+		self.assertFalse(second.exists())
+		self.assertTrue(third.exists())
+
+
+	def test_save_load(self):
+		cache = TtsCache(root=self.root)
+		file = self.wav('hello', seconds=2)
+		cache.use(file)
+		cache.save()
+
+		loaded = TtsCache(root=self.root)
+		loaded.load()
+		entry = loaded.get(file)
+		self.assertEqual(entry.duration, 2)
+		self.assertEqual(entry.hits, 1)
+		self.assertEqual(loaded.size, file.stat().st_size)
+
+
+	def test_scan(self):
+		cache = TtsCache(root=self.root)
+		files = [self.wav(name) for name in ('one', 'two')]
+		cache.scan([self.root / 'pico'])
+		self.assertEqual(cache.stats['entries'], 2)
+		self.assertEqual(cache.get(files[0]).lastHit, files[0].stat().st_mtime)
+		self.assertTrue((self.root / TtsCache.INDEX_FILE).exists())
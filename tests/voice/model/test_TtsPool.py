@@ -0,0 +1,82 @@
+#  Copyright (c) 2021
+#
+#  This file, test_TtsPool.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from core.voice.model.TtsPool import TtsPool
+
+
+class TestTtsPool(TestCase):
+
+	KEY = ('pico', 'en-US', 'male', 'en-US')
+
+
+	def test_get(self):
+		pool = TtsPool()
+		factory = MagicMock(side_effect=lambda: object())
+
+		tts = pool.get(key=self.KEY, factory=factory)
+		self.assertIs(pool.get(key=self.KEY, factory=factory), tts)
+		self.assertIsNot(pool.get(key=('pico', 'de-DE', 'male', 'de-DE'), factory=factory), tts)
+		self.assertEqual(factory.call_count, 2)
+		self.assertEqual(pool.stats['built'], 2)
+		self.assertEqual(pool.stats['reused'], 1)
+		self.assertEqual(pool.stats['instances']['pico/en-US/male/en-US'], 2)
+
+
+	def test_failed_build(self):
+		pool = TtsPool()
+		self.assertIsNone(pool.get(key=self.KEY, factory=lambda: None))
+		self.assertIsNotNone(pool.get(key=self.KEY, factory=lambda: object()))
+
+
+	def test_concurrent_build(self):
+		pool = TtsPool()
+		built = list()
+
+
+		def factory():
+			time.sleep(0.05)
+			built.append(object())
+			return built[-1]
+
+
+		results = list()
+		threads = [threading.Thread(target=lambda: results.append(pool.get(key=self.KEY, factory=factory))) for _ in range(4)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+
+		self.assertEqual(len(built), 1)
+		self.assertListEqual(results, built * 4)
+
+
+	def test_evict_idle(self):
+		pool = TtsPool()
+		first = pool.get(key=self.KEY, factory=lambda: object())
+		self.assertEqual(pool.evictIdle(timeout=60), 0)
+		self.assertEqual(pool.evictIdle(timeout=0), 1)
+		self.assertIsNot(pool.get(key=self.KEY, factory=lambda: object()), first)
+
+		pool.clear()
+		self.assertDictEqual(pool.stats['instances'], dict())
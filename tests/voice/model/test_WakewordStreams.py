@@ -0,0 +1,134 @@
+#  Copyright (c) 2021
+#
+#  This file, test_WakewordStreams.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.08.02 at 06:12:17 CEST
+
+import threading
+from typing import List
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from core.voice.model.WakewordStreams import WakewordStream, WakewordStreams
+
+
+class FakeHandle(object):
+	"""
+	Detects keyword 0 on any frame holding the sample value 1000
+	"""
+	frame_length = 4
+
+
+	def __init__(self):
+		self.frames: List[List[int]] = list()
+		self.delete = MagicMock()
+
+
+	def process(self, pcm: np.ndarray) -> int:
+		self.frames.append(pcm.tolist())
+		return 0 if 1000 in pcm else -1
+
+
+class TestWakewordStreams(TestCase):
+
+	def setUp(self):
+		self.handles = list()
+		self.detections = list()
+		self.detected = threading.Event()
+		self.streams = WakewordStreams(factory=self.newHandle, onDetection=self.onDetection)
+		self.streams.logError = MagicMock()
+		self.streams.start(workers=2)
+		self.addCleanup(self.streams.stop)
+
+
+	def newHandle(self) -> FakeHandle:
+		handle = FakeHandle()
+		self.handles.append(handle)
+		return handle
+
+
+	def onDetection(self, stream: WakewordStream, keyword: int):
+		self.detections.append((stream.deviceUid, keyword))
+		self.detected.set()
+
+
+	@staticmethod
+	def waitFor(predicate) -> bool:
+		for _ in range(200):
+			if predicate():
+				return True
+			threading.Event().wait(0.01)
+		return False
+
+
+	@staticmethod
+	def pcm(*samples: int) -> bytes:
+		return np.array(samples, dtype=np.int16).tobytes()
+
+
+	def test_per_device(self):
+		# Half frames, interleaved between devices, must not mix
+		for i in range(4):
+			self.streams.feed('kitchen', self.pcm(i * 2, i * 2 + 1))
+			self.streams.feed('office', self.pcm(100 + i * 2, 100 + i * 2 + 1))
+
+		self.assertTrue(self.waitFor(lambda: self.streams.stats()['devices'].get('office', {}).get('audioSeconds') == 8 / 16000))
+		self.assertTrue(self.waitFor(lambda: self.streams.stats()['devices'].get('kitchen', {}).get('audioSeconds') == 8 / 16000))
+		frames = sorted(frame for handle in self.handles for frame in handle.frames)
+		self.assertListEqual(frames, [[0, 1, 2, 3], [4, 5, 6, 7], [100, 101, 102, 103], [104, 105, 106, 107]])
+		self.assertEqual(len(self.handles), 2)
+
+
+	def test_detection(self):
+		self.streams.feed('office', self.pcm(0, 0, 0, 0))
+		self.streams.feed('kitchen', self.pcm(0, 1000, 0, 0))
+		self.assertTrue(self.detected.wait(2))
+		self.assertListEqual(self.detections, [('kitchen', 0)])
+
+		# The device stops listening until resumed, the others go on
+		self.streams.feed('kitchen', self.pcm(1000, 0, 0, 0))
+		self.streams.feed('office', self.pcm(0, 0, 0, 1000))
+		self.assertTrue(self.waitFor(lambda: len(self.detections) == 2))
+		self.assertListEqual(self.detections, [('kitchen', 0), ('office', 0)])
+		self.assertFalse(self.streams.stats()['devices']['kitchen']['listening'])
+
+		self.streams.resume('kitchen')
+		self.streams.feed('kitchen', self.pcm(1000, 0, 0, 0))
+		self.assertTrue(self.waitFor(lambda: len(self.detections) == 3))
+		self.assertEqual(self.streams.stats()['devices']['kitchen']['detections'], 2)
+
+
+	def test_failing_handle(self):
+		self.streams.feed('kitchen', self.pcm(0, 0, 0))
+		self.assertTrue(self.waitFor(lambda: self.handles))
+		self.handles[0].process = MagicMock(side_effect=RuntimeError('broken'))
+		self.streams.feed('kitchen', self.pcm(0))
+		self.assertTrue(self.waitFor(lambda: self.streams.logError.called))
+		self.assertFalse(self.streams.stats()['devices']['kitchen']['listening'])
+
+
+	def test_stop(self):
+		self.streams.feed('kitchen', self.pcm(0, 0, 0, 0))
+		self.assertTrue(self.waitFor(lambda: self.handles and self.handles[0].frames))
+		self.streams.stop()
+		self.handles[0].delete.assert_called_once()
+		self.assertListEqual(self.streams.devices, list())
+
+		# Stopped, frames are ignored
+		self.streams.feed('kitchen', self.pcm(1000, 0, 0, 0))
+		self.assertListEqual(self.streams.devices, list())